@@ -3,6 +3,10 @@ import struct
 import time
 from machine import Pin
 from micropython import const
+# Shared BLE modules (copy irq_dispatch.py, link_profile.py and conn_slots.py
+# from EmbeddedSystems/AudioSink/ble/ to ble/ on the board)
+from ble.irq_dispatch import IRQDispatcher
+from ble.link_profile import LinkProfile
 
 # Debug flag
 dbg = 1
@@ -56,9 +60,26 @@ class BLECentralController:
     def __init__(self, name="BLE-Central"):
         self._ble = bluetooth.BLE()
         self._ble.active(True)
-        self._ble.irq(self._irq)
+        # IRQ events go straight to their handlers through the dispatcher
+        self._irq = IRQDispatcher()
+        self._irq.on(_IRQ_SCAN_RESULT, self._on_scan_result)
+        self._irq.on(_IRQ_SCAN_DONE, self._on_scan_done)
+        self._irq.on(_IRQ_PERIPHERAL_CONNECT, self._on_peripheral_connect)
+        self._irq.on(_IRQ_PERIPHERAL_DISCONNECT, self._on_peripheral_disconnect)
+        self._irq.on(_IRQ_GATTC_SERVICE_RESULT, self._on_service_result)
+        self._irq.on(_IRQ_GATTC_CHARACTERISTIC_RESULT, self._on_characteristic_result)
+        self._irq.on(_IRQ_L2CAP_ACCEPT, self._on_l2cap_accept)
+        self._irq.on(_IRQ_L2CAP_CONNECT, self._on_l2cap_connect)
+        self._irq.on(_IRQ_L2CAP_DISCONNECT, self._on_l2cap_disconnect)
+        self._irq.on(_IRQ_L2CAP_RECV, self._on_l2cap_recv)
+        self._ble.irq(self._irq.dispatch)
         self._name = name
         
+        # Link settings (MTU, connection interval) applied to every peripheral connection
+        self.link = LinkProfile(self._ble, "streaming")
+        self.link.register(self._irq)
+        self.link.set_callback(self._on_link_update)
+        
         # Device tracking
         self.led_device = None
         self.audio_device = None
@@ -66,6 +87,7 @@ class BLECentralController:
         
         # L2CAP channels
         self.audio_channel = None               # L2CAP State
+        self.audio_mtu = _L2CAP_MTU             # Largest SDU the audio peripheral takes
         self.client_channel = None
         
         # Connection handles
@@ -86,6 +108,9 @@ class BLECentralController:
         # Check for Client Connection Configuration
         if ENABLE_CLIENT_CONNECTION:
             self._register_client_service()
+            self._irq.on(_IRQ_CENTRAL_CONNECT, self._on_client_connect)
+            self._irq.on(_IRQ_CENTRAL_DISCONNECT, self._on_client_disconnect)
+            self._irq.on_handle(_IRQ_GATTS_WRITE, self._handle_control, self._on_control_write)
         
         if dbg:
             print("[*] BLE Central Controller initialized")
@@ -154,168 +179,178 @@ class BLECentralController:
             except:
                 pass
 
-    def _irq(self, event, data):
-        if event == _IRQ_SCAN_RESULT:
-            addr_type, addr, adv_type, rssi, adv_data = data
-            addr = bytes(addr)  # Convert to bytes
-            
-            if addr not in self._scan_results:
-                name = None
-                # Find device name
-                i = 0
-                while i < len(adv_data):
-                    if i + 1 < len(adv_data):
-                        field_length = adv_data[i]
-                        field_type = adv_data[i + 1]
-                        field_data = bytes(adv_data[i + 2:i + field_length + 1])  # Convert memoryview to bytes
-                        
-                        if field_type == 0x09:  # Complete Local Name
-                            try:
-                                name = field_data.decode()
-                            except:
-                                pass
-                        elif field_type == 0x03:  # 16-bit Service UUIDs
-                            for j in range(0, len(field_data), 2):
-                                uuid = struct.unpack('<H', field_data[j:j+2])[0]
-                                if uuid == _LED_SERVICE_UUID:
-                                    print(f"[+] Found LED device: {addr.hex()}")
-                                    self.led_device = addr
-                                    self._ble.gap_connect(addr_type, addr)
-                    i += adv_data[i] + 1
-                    if dbg:
-                        print(f"[*] Active connections: {len(self._connections)}")
-                
-                # Check for audio device by name
-                if name == "BLE-I2S-Audio":
-                    print(f"[+] Found Audio device: {addr.hex()}")
-                    self.audio_device = addr
-                    self._ble.gap_connect(addr_type, addr)
-                
-                self._scan_results.add(addr)
-                
-        elif event == _IRQ_SCAN_DONE:
-            self._scanning = False
-            if dbg:
-                print("[*] Scan complete")
-                
-        elif event == _IRQ_PERIPHERAL_CONNECT:
-            conn_handle, addr_type, addr = data
-            addr = bytes(addr)
-            self._connections[addr] = conn_handle
-            if dbg:
-                print(f"[+] Connected to peripheral: {addr.hex()}")
-                print(f"[*] Total connections: {len(self._connections)}")
-            
-            # If this is the LED device, discover services
-            if addr == self.led_device:
-                print("[*] Discovering LED services...")
-                self._ble.gattc_discover_services(conn_handle)
-            elif addr == self.audio_device:
-                print("[*] Setting up L2CAP for audio...")
-                self._ble.l2cap_connect(conn_handle, _L2CAP_PSM_AUDIO)
-                
-        elif event == _IRQ_PERIPHERAL_DISCONNECT:
-            conn_handle, addr_type, addr = data
-            addr = bytes(addr)
-            if addr in self._connections:
-                del self._connections[addr]
-            if dbg:
-                print(f"[-] Peripheral disconnected: {addr.hex()}")
-                print(f"[*] Remaining connections: {len(self._connections)}")
-                
-        elif event == _IRQ_L2CAP_ACCEPT:
-            # Client connection request
-            conn_handle, psm = data
-            if psm == _L2CAP_PSM_CLIENT:
-                if dbg:
-                    print("[+] Client L2CAP connection request")
-                return 0  # Accept
-            return 1  # Reject other PSMs
-            
-        elif event == _IRQ_L2CAP_CONNECT:
-            conn_handle, mtu, cid = data
-            if conn_handle == self._connections.get(self.audio_device):
-                self.audio_channel = cid
-                if dbg:
-                    print("[+] Audio L2CAP channel established")
-            else:
-                self.client_channel = cid
+    # IRQ event handlers, registered with the IRQ dispatcher in __init__()
+    def _on_scan_result(self, data):
+        addr_type, addr, adv_type, rssi, adv_data = data
+        addr = bytes(addr)  # Convert to bytes
+
+        if addr not in self._scan_results:
+            name = None
+            # Find device name
+            i = 0
+            while i < len(adv_data):
+                if i + 1 < len(adv_data):
+                    field_length = adv_data[i]
+                    field_type = adv_data[i + 1]
+                    field_data = bytes(adv_data[i + 2:i + field_length + 1])  # Convert memoryview to bytes
+
+                    if field_type == 0x09:  # Complete Local Name
+                        try:
+                            name = field_data.decode()
+                        except:
+                            pass
+                    elif field_type == 0x03:  # 16-bit Service UUIDs
+                        for j in range(0, len(field_data), 2):
+                            uuid = struct.unpack('<H', field_data[j:j+2])[0]
+                            if uuid == _LED_SERVICE_UUID:
+                                print(f"[+] Found LED device: {addr.hex()}")
+                                self.led_device = addr
+                                self.link.connect(addr_type, addr)
+                i += adv_data[i] + 1
                 if dbg:
-                    print("[+] Client L2CAP channel established")
-                    
-        elif event == _IRQ_L2CAP_DISCONNECT:
-            conn_handle, cid, status = data
-            if cid == self.audio_channel:
-                self.audio_channel = None
-            elif cid == self.client_channel:
-                self.client_channel = None
-                
-        elif event == _IRQ_L2CAP_RECV:
-            conn_handle, cid = data
-            if cid == self.client_channel:
-                # Forward data from client to audio device
-                self._handle_client_data()
-
-        elif event == _IRQ_GATTC_SERVICE_RESULT:
-            conn_handle, start_handle, end_handle, uuid = data
-            if uuid == _LED_SERVICE_UUID:
-                print("[+] Found LED service")
-                # Discover characteristics
-                self._ble.gattc_discover_characteristics(conn_handle, start_handle, end_handle)
-                
-        elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
-            conn_handle, def_handle, value_handle, properties, uuid = data
-            if uuid == _RGB_CHAR_UUID:
-                addr = None
-                # Find address for this connection handle
-                for a, h in self._connections.items():
-                    if h == conn_handle:
-                        addr = a
-                        break
-                if addr:
-                    if addr not in self._characteristics:
-                        self._characteristics[addr] = {}
-                    self._characteristics[addr]['rgb'] = value_handle
-                    print("[+] Found RGB characteristic")
-
-        ## Central IRQ Events
-        # New client connection handling
-        elif event == _IRQ_CENTRAL_CONNECT and ENABLE_CLIENT_CONNECTION:
-            conn_handle, addr_type, addr = data
-            self._client_connected = True
-            self.client_device = bytes(addr)
-            self._connections[addr] = conn_handle
-            if dbg:
-                print(f"[+] Client connected: {self.client_device.hex()}")
-                print(f"[*] Total connetions: {len(self._connections)}")
-            self._update_client_status("Connected")
-            # Stop advertising when client connects
-            self._ble.gap_advertise(None)  # Stop advertising
+                    print(f"[*] Active connections: {len(self._connections)}")
+
+            # Check for audio device by name
+            if name == "BLE-I2S-Audio":
+                print(f"[+] Found Audio device: {addr.hex()}")
+                self.audio_device = addr
+                self.link.connect(addr_type, addr)
+
+            self._scan_results.add(addr)
+
+    def _on_scan_done(self, data):
+        self._scanning = False
+        if dbg:
+            print("[*] Scan complete")
+
+    def _on_peripheral_connect(self, data):
+        conn_handle, addr_type, addr = data
+        addr = bytes(addr)
+        self._connections[addr] = conn_handle
+        self.link.on_connect(conn_handle)
+        if dbg:
+            print(f"[+] Connected to peripheral: {addr.hex()}")
+            print(f"[*] Total connections: {len(self._connections)}")
+
+        # If this is the LED device, discover services
+        if addr == self.led_device:
+            print("[*] Discovering LED services...")
+            self._ble.gattc_discover_services(conn_handle)
+        elif addr == self.audio_device:
+            print("[*] Setting up L2CAP for audio...")
+            self._ble.l2cap_connect(conn_handle, _L2CAP_PSM_AUDIO)
+
+    def _on_peripheral_disconnect(self, data):
+        conn_handle, addr_type, addr = data
+        addr = bytes(addr)
+        if addr in self._connections:
+            del self._connections[addr]
+        self.link.on_disconnect(conn_handle)
+        if dbg:
+            print(f"[-] Peripheral disconnected: {addr.hex()}")
+            print(f"[*] Remaining connections: {len(self._connections)}")
+
+    def _on_l2cap_accept(self, data):
+        # Client connection request
+        conn_handle, psm = data
+        if psm == _L2CAP_PSM_CLIENT:
             if dbg:
-                print("[*] Advertising stopped")
-            
-        elif event == _IRQ_CENTRAL_DISCONNECT and ENABLE_CLIENT_CONNECTION:
-            conn_handle, addr_type, addr = data
-            addr = bytes(addr)
-            self._client_connected = False
-            self.client_device = None
-            if addr in self._connections:
-                del self._connections[addr]
+                print("[+] Client L2CAP connection request")
+            return 0  # Accept
+        return 1  # Reject other PSMs
+
+    def _on_l2cap_connect(self, data):
+        conn_handle, cid, psm, our_mtu, peer_mtu = data
+        if conn_handle == self._connections.get(self.audio_device):
+            self.audio_channel = cid
+            self.audio_mtu = min(peer_mtu, _L2CAP_MTU)
             if dbg:
-                print(f"[-] Client disconnected: {addr.hex()}")
-                print(f"[*] Remaining connections: {len(self._connections)}")
-            self._update_client_status("Ready")
-            # Restart advertising
-            self._advertise()
+                print(f"[+] Audio L2CAP channel established - MTU: {self.audio_mtu}")
+        else:
+            self.client_channel = cid
             if dbg:
-                print("[*] Advertising restarted")
-            
-        elif event == _IRQ_GATTS_WRITE and ENABLE_CLIENT_CONNECTION:
-            conn_handle, attr_handle = data
-            if attr_handle == self._handle_control:
-                # Handle client control commands
-                value = self._ble.gatts_read(self._handle_control)
-                self._handle_client_command(value)
+                print("[+] Client L2CAP channel established")
+
+    def _on_l2cap_disconnect(self, data):
+        conn_handle, cid, status = data
+        if cid == self.audio_channel:
+            self.audio_channel = None
+        elif cid == self.client_channel:
+            self.client_channel = None
+
+    def _on_l2cap_recv(self, data):
+        conn_handle, cid = data
+        if cid == self.client_channel:
+            # Forward data from client to audio device
+            self._handle_client_data()
+
+    def _on_link_update(self, conn_handle, payload, interval_us):
+        # Negotiated MTU (as the ATT payload it leaves) and connection interval
+        if dbg:
+            print(f"[*] Link {conn_handle}: {payload} byte payload, {interval_us} us interval")
+
+    def set_link_profile(self, name):
+        """Switch link profile (streaming, interactive or idle); applies to new connections."""
+        self.link.set_profile(name)
+
+    def _on_service_result(self, data):
+        conn_handle, start_handle, end_handle, uuid = data
+        if uuid == _LED_SERVICE_UUID:
+            print("[+] Found LED service")
+            # Discover characteristics
+            self._ble.gattc_discover_characteristics(conn_handle, start_handle, end_handle)
+
+    def _on_characteristic_result(self, data):
+        conn_handle, def_handle, value_handle, properties, uuid = data
+        if uuid == _RGB_CHAR_UUID:
+            addr = None
+            # Find address for this connection handle
+            for a, h in self._connections.items():
+                if h == conn_handle:
+                    addr = a
+                    break
+            if addr:
+                if addr not in self._characteristics:
+                    self._characteristics[addr] = {}
+                self._characteristics[addr]['rgb'] = value_handle
+                print("[+] Found RGB characteristic")
+
+    ## Central IRQ Events
+    # New client connection handling
+    def _on_client_connect(self, data):
+        conn_handle, addr_type, addr = data
+        self._client_connected = True
+        self.client_device = bytes(addr)
+        self._connections[addr] = conn_handle
+        if dbg:
+            print(f"[+] Client connected: {self.client_device.hex()}")
+            print(f"[*] Total connetions: {len(self._connections)}")
+        self._update_client_status("Connected")
+        # Stop advertising when client connects
+        self._ble.gap_advertise(None)  # Stop advertising
+        if dbg:
+            print("[*] Advertising stopped")
+
+    def _on_client_disconnect(self, data):
+        conn_handle, addr_type, addr = data
+        addr = bytes(addr)
+        self._client_connected = False
+        self.client_device = None
+        if addr in self._connections:
+            del self._connections[addr]
+        if dbg:
+            print(f"[-] Client disconnected: {addr.hex()}")
+            print(f"[*] Remaining connections: {len(self._connections)}")
+        self._update_client_status("Ready")
+        # Restart advertising
+        self._advertise()
+        if dbg:
+            print("[*] Advertising restarted")
+
+    def _on_control_write(self, data):
+        # Handle client control commands
+        value = self._ble.gatts_read(self._handle_control)
+        self._handle_client_command(value)
 
     def _handle_client_command(self, command):
         """Handle commands from client."""
@@ -343,10 +378,10 @@ class BLECentralController:
                 #time.sleep_ms(500)
                 # Reconnect logic for peripherals
                 if self.led_device and self.led_device not in self._connections:
-                    self._ble.gap_connect(0, self.led_device)
+                    self.link.connect(0, self.led_device)
 
                 if self.audio_device and self.audio_device not in self._connections:
-                    self._ble.gap_connect(0, self.audio_device)
+                    self.link.connect(0, self.audio_device)
             
                 # Toggle LED and check if we need to re-advertise
                 self.led.toggle()
@@ -407,12 +442,15 @@ class BLECentralController:
                 print(f"[-] RGB send error: {e}")
 
     def send_audio(self, audio_data):
-        """Send audio data to audio device."""
+        """Send audio data to audio device, in SDUs of the channel's negotiated MTU."""
         if self.audio_device and self.audio_channel:
             try:
-                self._ble.l2cap_send(self._connections[self.audio_device], 
-                                   self.audio_channel, 
-                                   audio_data)
+                conn_handle = self._connections[self.audio_device]
+                data = memoryview(audio_data)
+                for offset in range(0, len(data), self.audio_mtu):
+                    self._ble.l2cap_send(conn_handle,
+                                       self.audio_channel,
+                                       data[offset:offset + self.audio_mtu])
                 if dbg:
                     print(f"[*] Sent {len(audio_data)} bytes of audio")
             except Exception as e:
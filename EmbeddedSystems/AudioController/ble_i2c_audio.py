@@ -3,7 +3,10 @@ import bluetooth
 import struct
 import time
 from micropython import const
-from array import array
+
+# Shared ring buffer (copy EmbeddedSystems/AudioSink/audio/ring_buffer.py
+# to audio/ring_buffer.py on the board)
+from audio.ring_buffer import RingBuffer
 
 # Debug flag
 dbg = 1
@@ -26,15 +29,6 @@ _L2CAP_MTU = const(512)
 BUFFER_SIZE = 4096
 CHUNK_SIZE = 256  # Size of each audio chunk to process
 
-# Circular buffer for audio data
-class AudioBuffer:
-    def __init__(self, size):
-        self.buffer = array('B', [0] * size)
-        self.size = size
-        self.write_ptr = 0
-        self.read_ptr = 0
-        self.count = 0
-
 class BLEI2CAudioBridge:
     def __init__(self):
         # Initialize BLE
@@ -46,7 +40,11 @@ class BLEI2CAudioBridge:
         self.i2c = I2C(0, sda=Pin(I2C_SDA), scl=Pin(I2C_SCL), freq=I2C_FREQ)
         
         # Audio buffer (circular buffer implementation)
-        self._buffer = AudioBuffer(BUFFER_SIZE)
+        self._buffer = RingBuffer(BUFFER_SIZE)
+        
+        # Preallocated receive and output buffers
+        self._rx_buf = bytearray(_L2CAP_MTU)
+        self._chunk = bytearray(CHUNK_SIZE)
         
         # L2CAP state
         self._l2cap_connected = False
@@ -104,47 +102,36 @@ class BLEI2CAudioBridge:
             return
             
         try:
-            # Create buffer for receiving
-            data = bytearray(_L2CAP_MTU)
-            # Read data
+            # Read data into the preallocated receive buffer
             bytes_read = self._ble.l2cap_recvinto(
                 self._l2cap_conn_handle,
                 self._l2cap_channel,
-                data
+                self._rx_buf
             )
             
             if bytes_read > 0:
                 # Add to circular buffer
-                self._add_to_buffer(data[:bytes_read])
+                self._add_to_buffer(self._rx_buf, bytes_read)
                 
         except Exception as e:
             print(f"[-] Error receiving data: {e}")
 
-    def _add_to_buffer(self, data):
-        """Add data to circular buffer."""
-        for byte in data:
-            if self._buffer.count < self._buffer.size:
-                self._buffer.buffer[self._buffer.write_ptr] = byte
-                self._buffer.write_ptr = (self._buffer.write_ptr + 1) % self._buffer.size
-                self._buffer.count += 1
+    def _add_to_buffer(self, data, length):
+        """Add data to circular buffer (data that does not fit is dropped)."""
+        return self._buffer.write_into(data, length)
 
     def _get_from_buffer(self, size):
-        """Get data from circular buffer."""
-        if self._buffer.count < size:
+        """Get data from circular buffer into the reused chunk buffer."""
+        if self._buffer.count() < size:
             return None
             
-        data = bytearray(size)
-        for i in range(size):
-            data[i] = self._buffer.buffer[self._buffer.read_ptr]
-            self._buffer.read_ptr = (self._buffer.read_ptr + 1) % self._buffer.size
-            self._buffer.count -= 1
-            
-        return data
+        self._buffer.read_into(self._chunk, size)
+        return self._chunk
 
     def process_audio(self):
         """Process and output audio data."""
         while True:
-            if self._buffer.count >= CHUNK_SIZE:
+            if self._buffer.count() >= CHUNK_SIZE:
                 chunk = self._get_from_buffer(CHUNK_SIZE)
                 if chunk:
                     try:
@@ -3,7 +3,10 @@ import bluetooth
 import struct
 import time
 from micropython import const
-from array import array
+
+# Shared ring buffer (copy EmbeddedSystems/AudioSink/audio/ring_buffer.py
+# to audio/ring_buffer.py on the board)
+from audio.ring_buffer import RingBuffer
 
 # Debug flag
 dbg = 1
@@ -48,11 +51,12 @@ class BLEI2SAudioBridge:
             ibuf=BUFFER_SIZE
         )
         
-        # Audio buffer
-        self._buffer = array('h', [0] * BUFFER_SIZE)  # 16-bit buffer
-        self._write_ptr = 0
-        self._read_ptr = 0
-        self._buffer_count = 0
+        # Audio buffer (BUFFER_SIZE 16-bit samples)
+        self._buffer = RingBuffer(BUFFER_SIZE * 2)
+        
+        # Preallocated receive and output buffers
+        self._rx_buf = bytearray(_L2CAP_MTU)
+        self._chunk = bytearray(CHUNK_SIZE * 2)
         
         # L2CAP state
         self._l2cap_connected = False
@@ -98,49 +102,36 @@ class BLEI2SAudioBridge:
             return
             
         try:
-            # Create buffer for receiving
-            data = bytearray(_L2CAP_MTU)
-            # Read data
+            # Read data into the preallocated receive buffer
             bytes_read = self._ble.l2cap_recvinto(
                 self._l2cap_conn_handle,
                 self._l2cap_channel,
-                data
+                self._rx_buf
             )
             
             if bytes_read > 0:
-                # Convert bytes to 16-bit samples
-                samples = array('h')
-                samples.frombytes(data[:bytes_read])
-                self._add_to_buffer(samples)
+                # Keep whole 16-bit samples only
+                self._add_to_buffer(self._rx_buf, bytes_read & ~1)
                 
         except Exception as e:
             print(f"[-] Error receiving data: {e}")
 
-    def _add_to_buffer(self, samples):
-        """Add samples to circular buffer."""
-        for sample in samples:
-            if self._buffer_count < BUFFER_SIZE:
-                self._buffer[self._write_ptr] = sample
-                self._write_ptr = (self._write_ptr + 1) % BUFFER_SIZE
-                self._buffer_count += 1
+    def _add_to_buffer(self, data, length):
+        """Add sample bytes to circular buffer (data that does not fit is dropped)."""
+        return self._buffer.write_into(data, length)
 
     def _get_from_buffer(self, size):
-        """Get samples from circular buffer."""
-        if self._buffer_count < size:
+        """Get size samples from circular buffer into the reused chunk buffer."""
+        if self._buffer.count() < size * 2:
             return None
             
-        samples = array('h', [0] * size)
-        for i in range(size):
-            samples[i] = self._buffer[self._read_ptr]
-            self._read_ptr = (self._read_ptr + 1) % BUFFER_SIZE
-            self._buffer_count -= 1
-            
-        return samples
+        self._buffer.read_into(self._chunk, size * 2)
+        return self._chunk
 
     def process_audio(self):
         """Process and output audio data."""
         while True:
-            if self._buffer_count >= CHUNK_SIZE:
+            if self._buffer.count() >= CHUNK_SIZE * 2:
                 chunk = self._get_from_buffer(CHUNK_SIZE)
                 if chunk:
                     try:
@@ -3,10 +3,16 @@ import struct
 import time
 from machine import Pin, PWM
 from micropython import const
+# Shared connection slots (copy EmbeddedSystems/AudioSink/ble/conn_slots.py
+# to ble/conn_slots.py on the board)
+from ble.conn_slots import ConnectionSlots
 
 # Debug flag
 dbg = 0
 
+# Centrals connected at once; further ones are disconnected
+_MAX_CONNECTIONS = const(4)
+
 # IRQ Events
 _IRQ_CENTRAL_CONNECT = const(1)
 _IRQ_CENTRAL_DISCONNECT = const(2)
@@ -43,8 +49,8 @@ class BLELEDPeripheral:
         # Status LED
         self.led = Pin("LED", Pin.OUT)
         
-        # Connection state
-        self._connected = False
+        # Connection state, one slot per central
+        self._slots = ConnectionSlots(_MAX_CONNECTIONS)
         self._current_rgb = (0, 0, 0)
         
         # Register GATT service
@@ -104,6 +110,10 @@ class BLELEDPeripheral:
         if dbg:
             print("[*] Services registered")
 
+    def is_connected(self):
+        """Check if any central is connected."""
+        return len(self._slots) > 0
+
     def _advertise(self):
         """Start advertising LED service."""
         payload = bytearray()
@@ -134,23 +144,38 @@ class BLELEDPeripheral:
         if event == _IRQ_CENTRAL_CONNECT:
             # Central device connected
             conn_handle, addr_type, addr = data
-            self._connected = True
+            if self._slots.open(conn_handle) < 0:
+                # Every slot is taken
+                self._ble.gap_disconnect(conn_handle)
+                return
             if dbg:
                 print(f"[+] Connected to central: {bytes(addr).hex()}")
-            self._update_status("Connected")
+            self._update_status(f"Connected ({len(self._slots)})")
+            # Keep advertising while a slot is free
+            if self._slots.free():
+                self._advertise()
             
         elif event == _IRQ_CENTRAL_DISCONNECT:
             # Central device disconnected
             conn_handle, addr_type, addr = data
-            self._connected = False
+            if self._slots.close(conn_handle) < 0:
+                # Refused while every slot was taken
+                return
             if dbg:
                 print(f"[-] Disconnected from central: {bytes(addr).hex()}")
-            self._update_status("Ready")
+            # Ready only once the last central has gone
+            if self._slots:
+                self._update_status(f"Connected ({len(self._slots)})")
+            else:
+                self._update_status("Ready")
             # Restart advertising
             self._advertise()
             
         elif event == _IRQ_GATTS_WRITE:
             conn_handle, attr_handle = data
+            s = self._slots.slot(conn_handle)
+            if s >= 0:
+                self._slots.rx_packets[s] += 1
             
             if attr_handle == self._handle_rgb:
                 if dbg != 0:
@@ -186,7 +211,7 @@ class BLELEDPeripheral:
         try:
             while True:
                 # Blink status LED when connected
-                if self._connected:
+                if self._slots:
                     self.led.toggle()
                 else:
                     self.led.off()
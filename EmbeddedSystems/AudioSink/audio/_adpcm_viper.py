@@ -0,0 +1,69 @@
+"""
+Viper IMA-ADPCM Decoder
+
+Native fast path for audio/adpcm.py. This module only compiles on ports
+with the viper code emitter; adpcm falls back to the portable decoder
+when importing it fails.
+
+The state array is shared with adpcm.decode_block:
+    [channels, data offset, pred0, index0, pred1, index1]
+"""
+
+import micropython
+
+from audio.adpcm import STEP_TABLE
+
+# INDEX_TABLE shifted by +1 so it fits in unsigned bytes
+_INDEX_ADJ = b'\x00\x00\x00\x00\x03\x05\x07\x09'
+
+
+@micropython.viper
+def decode_nibbles(src, nbytes: int, dst, state) -> int:
+    """Decode nbytes of nibbles from src into int16 samples in dst."""
+    s = ptr8(src)
+    d = ptr16(dst)
+    st = ptr32(state)
+    steps = ptr16(STEP_TABLE)
+    adj = ptr8(_INDEX_ADJ)
+
+    stereo = int(st[0]) - 1
+    pos = int(st[1])
+    end = pos + nbytes
+    o = 0
+    while pos < end:
+        b = int(s[pos])
+        k = 0
+        while k < 2:
+            nib = b & 15
+            b = b >> 4
+            slot = 2 + 2 * (k & stereo)
+            pred = int(st[slot])
+            index = int(st[slot + 1])
+            step = int(steps[index])
+            diff = step >> 3
+            if nib & 4:
+                diff += step
+            if nib & 2:
+                diff += step >> 1
+            if nib & 1:
+                diff += step >> 2
+            if nib & 8:
+                pred -= diff
+                if pred < -32768:
+                    pred = -32768
+            else:
+                pred += diff
+                if pred > 32767:
+                    pred = 32767
+            index += int(adj[nib & 7]) - 1
+            if index < 0:
+                index = 0
+            elif index > 88:
+                index = 88
+            st[slot] = pred
+            st[slot + 1] = index
+            d[o] = pred
+            o += 1
+            k += 1
+        pos += 1
+    return o
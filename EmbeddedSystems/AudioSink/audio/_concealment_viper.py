@@ -0,0 +1,111 @@
+"""
+Viper Concealment Kernels
+
+Native fast paths for audio/concealment.py. This module only compiles
+on ports with the viper code emitter; concealment falls back to the
+portable kernels when importing it fails.
+
+Gains step once per frame with 10 fraction bits, as described in
+audio/concealment.py. Offsets and counts are in samples.
+"""
+
+import micropython
+
+
+@micropython.viper
+def ramp(buf, nframes: int, channels: int, g0: int, step: int):
+    """Scale frames in place by a Q15 gain of g0 + (step * frame >> 10)."""
+    b = ptr16(buf)
+    i = 0
+    for f in range(nframes):
+        g = g0 + ((step * f) >> 10)
+        for c in range(channels):
+            v = int(b[i])
+            if v & 0x8000:
+                v -= 0x10000
+            b[i] = (v * g) >> 15
+            i += 1
+
+
+@micropython.viper
+def crossfade(dst, src, nframes: int, channels: int, step: int):
+    """Fade from src into dst in place with a Q14 weight of step * frame >> 10."""
+    d = ptr16(dst)
+    s = ptr16(src)
+    i = 0
+    for f in range(nframes):
+        w = (step * f) >> 10
+        for c in range(channels):
+            a = int(s[i])
+            if a & 0x8000:
+                a -= 0x10000
+            v = int(d[i])
+            if v & 0x8000:
+                v -= 0x10000
+            d[i] = (a * (16384 - w) + v * w) >> 14
+            i += 1
+
+
+@micropython.viper
+def corr_energy(buf, t_off: int, c_off: int, n: int, stride: int, out):
+    """Correlation of two sample runs and energy of the second (samples >> 5)."""
+    x = ptr16(buf)
+    o = ptr32(out)
+    c = 0
+    e = 0
+    t = t_off
+    k = c_off
+    for i in range(n):
+        a = int(x[t])
+        if a & 0x8000:
+            a -= 0x10000
+        v = int(x[k])
+        if v & 0x8000:
+            v -= 0x10000
+        a >>= 5
+        v >>= 5
+        c += a * v
+        e += v * v
+        t += stride
+        k += stride
+    o[0] = c
+    o[1] = e
+
+
+@micropython.viper
+def lag_search(buf, t_off: int, lo: int, hi: int, lag_step: int, channels: int,
+               n: int, stride: int, shift: int, out):
+    """Best scoring lag in lo..hi for the run of n samples at t_off."""
+    x = ptr16(buf)
+    o = ptr32(out)
+    best = 0
+    best_score = 0
+    lag = lo
+    while lag <= hi:
+        c = 0
+        e = 0
+        t = t_off
+        k = t_off - lag * channels
+        for i in range(n):
+            a = int(x[t])
+            if a & 0x8000:
+                a -= 0x10000
+            v = int(x[k])
+            if v & 0x8000:
+                v -= 0x10000
+            a >>= 5
+            v >>= 5
+            c += a * v
+            e += v * v
+            t += stride
+            k += stride
+        c >>= shift
+        e >>= shift
+        if c > 0:
+            score = c * c // (e + 1)
+            if score > best_score:
+                best = lag
+                best_score = score
+        lag += lag_step
+    o[0] = best
+    o[1] = best_score
@@ -0,0 +1,133 @@
+"""
+Viper DSP Kernels
+
+Native fast paths for audio/dsp.py. This module only compiles on ports
+with the viper code emitter; dsp falls back to the portable
+implementations when importing it fails.
+
+All kernels work in place on interleaved 16-bit stereo frames. Filter
+state and coefficients are array('i') objects owned by the stages.
+Viper integers are 32 bits wide, which is why EQ gains are limited to
++-12 dB: every biquad product then fits, and so does their sum for any
+signal the saturated output can represent.
+"""
+
+import micropython
+
+
+@micropython.viper
+def biquad(buf, nframes: int, coefs, state):
+    """Filter stereo frames in place with a Q13 direct form I biquad."""
+    s = ptr16(buf)
+    c = ptr32(coefs)
+    st = ptr32(state)
+    b0 = c[0]
+    b1 = c[1]
+    b2 = c[2]
+    a1 = c[3]
+    a2 = c[4]
+    n = nframes * 2
+    ch = 0
+    while ch < 2:
+        o = ch * 5
+        x1 = st[o]
+        x2 = st[o + 1]
+        y1 = st[o + 2]
+        y2 = st[o + 3]
+        err = st[o + 4]
+        i = ch
+        while i < n:
+            x = int(s[i])
+            if x & 0x8000:
+                x -= 0x10000
+            acc = b0 * x + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2 + err
+            y = acc >> 13
+            err = acc - (y << 13)
+            if y > 32767:
+                y = 32767
+            elif y < -32768:
+                y = -32768
+            x2 = x1
+            x1 = x
+            y2 = y1
+            y1 = y
+            s[i] = y
+            i += 2
+        st[o] = x1
+        st[o + 1] = x2
+        st[o + 2] = y1
+        st[o + 3] = y2
+        st[o + 4] = err
+        ch += 1
+
+
+@micropython.viper
+def dc_block(buf, nframes: int, state):
+    """Remove DC from stereo frames in place (state: x1 and Q8 output per channel)."""
+    s = ptr16(buf)
+    st = ptr32(state)
+    n = nframes * 2
+    ch = 0
+    while ch < 2:
+        x1 = st[2 * ch]
+        acc = st[2 * ch + 1]
+        i = ch
+        while i < n:
+            x = int(s[i])
+            if x & 0x8000:
+                x -= 0x10000
+            acc += ((x - x1) << 8) - (acc >> 8)
+            x1 = x
+            y = acc >> 8
+            if y > 32767:
+                y = 32767
+            elif y < -32768:
+                y = -32768
+            s[i] = y
+            i += 2
+        st[2 * ch] = x1
+        st[2 * ch + 1] = acc
+        ch += 1
+
+
+@micropython.viper
+def ramp_gain(buf, nframes: int, gain: int, target: int, step: int) -> int:
+    """Scale stereo frames by a Q15 gain moving step per frame toward target."""
+    s = ptr16(buf)
+    i = 0
+    n = nframes * 2
+    while i < n:
+        if gain < target:
+            gain += step
+            if gain > target:
+                gain = target
+        elif gain > target:
+            gain -= step
+            if gain < target:
+                gain = target
+        for j in range(2):
+            v = int(s[i + j])
+            if v & 0x8000:
+                v -= 0x10000
+            v = (v * gain) >> 15
+            if v > 32767:
+                v = 32767
+            elif v < -32768:
+                v = -32768
+            s[i + j] = v
+        i += 2
+    return gain
+
+
+@micropython.viper
+def peak_abs(buf, nsamples: int) -> int:
+    """Return the largest absolute 16-bit sample value."""
+    s = ptr16(buf)
+    peak = 0
+    for i in range(nsamples):
+        v = int(s[i])
+        if v & 0x8000:
+            v = 0x10000 - v
+        if v > peak:
+            peak = v
+    return peak
@@ -0,0 +1,18 @@
+"""
+Viper FEC Kernel
+
+Native fast path for audio/fec.py. This module only compiles on ports
+with the viper code emitter; fec falls back to the portable kernel when
+importing it fails.
+"""
+
+import micropython
+
+
+@micropython.viper
+def xor_into(dst, src, n: int):
+    """XOR the first n bytes of src into dst."""
+    d = ptr8(dst)
+    s = ptr8(src)
+    for i in range(n):
+        d[i] = d[i] ^ s[i]
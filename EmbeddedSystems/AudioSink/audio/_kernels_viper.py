@@ -0,0 +1,102 @@
+"""
+Viper Sample Kernels
+
+Native fast paths for audio/sample_kernels.py. This module only
+compiles on ports with the viper code emitter; sample_kernels falls
+back to the portable implementations when importing it fails.
+
+All kernels take the number of input samples and a Q15 gain
+(32768 = unity). Output is 16-bit little-endian PCM saturated to the
+int16 range. dst must not overlap src, except for gain_q15 which may
+work in place. mix_q15 adds into dst instead of overwriting it.
+"""
+
+import micropython
+
+
+@micropython.viper
+def gain_q15(src, dst, nsamples: int, gain: int):
+    """Scale 16-bit samples by a Q15 gain."""
+    s = ptr16(src)
+    d = ptr16(dst)
+    for i in range(nsamples):
+        v = int(s[i])
+        if v & 0x8000:
+            v -= 0x10000
+        v = (v * gain) >> 15
+        if v > 32767:
+            v = 32767
+        elif v < -32768:
+            v = -32768
+        d[i] = v
+
+
+@micropython.viper
+def mix_q15(src, dst, nsamples: int, gain: int):
+    """Add 16-bit samples scaled by a Q15 gain into dst with saturation."""
+    s = ptr16(src)
+    d = ptr16(dst)
+    for i in range(nsamples):
+        v = int(s[i])
+        if v & 0x8000:
+            v -= 0x10000
+        a = int(d[i])
+        if a & 0x8000:
+            a -= 0x10000
+        v = a + ((v * gain) >> 15)
+        if v > 32767:
+            v = 32767
+        elif v < -32768:
+            v = -32768
+        d[i] = v
+
+
+@micropython.viper
+def mono_to_stereo_q15(src, dst, nsamples: int, gain: int):
+    """Duplicate 16-bit mono samples into interleaved stereo frames."""
+    s = ptr16(src)
+    d = ptr16(dst)
+    j = 0
+    for i in range(nsamples):
+        v = int(s[i])
+        if v & 0x8000:
+            v -= 0x10000
+        v = (v * gain) >> 15
+        if v > 32767:
+            v = 32767
+        elif v < -32768:
+            v = -32768
+        d[j] = v
+        d[j + 1] = v
+        j += 2
+
+
+@micropython.viper
+def u8_to_s16_q15(src, dst, nsamples: int, gain: int):
+    """Widen unsigned 8-bit samples to signed 16-bit."""
+    s = ptr8(src)
+    d = ptr16(dst)
+    for i in range(nsamples):
+        v = ((int(s[i]) - 128) << 8) * gain >> 15
+        if v > 32767:
+            v = 32767
+        elif v < -32768:
+            v = -32768
+        d[i] = v
+
+
+@micropython.viper
+def u8_mono_to_stereo_q15(src, dst, nsamples: int, gain: int):
+    """Widen unsigned 8-bit mono samples to 16-bit stereo frames."""
+    s = ptr8(src)
+    d = ptr16(dst)
+    j = 0
+    for i in range(nsamples):
+        v = ((int(s[i]) - 128) << 8) * gain >> 15
+        if v > 32767:
+            v = 32767
+        elif v < -32768:
+            v = -32768
+        d[j] = v
+        d[j + 1] = v
+        j += 2
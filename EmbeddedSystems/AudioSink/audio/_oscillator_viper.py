@@ -0,0 +1,45 @@
+"""
+Viper Oscillator Kernel
+
+Native fast path for audio/oscillator.py. This module only compiles on
+ports with the viper code emitter; oscillator falls back to the portable
+implementation when importing it fails.
+
+The table is an array('h') with one guard entry past its end, so the
+interpolation never wraps. The state is the oscillator's array('i'):
+phase, phase increment, Q15 amplitude and the shift from phase to
+table index. Every product fits the 32-bit viper integers: table steps
+are at most 16 bits and the fraction at most 14.
+"""
+
+import micropython
+
+
+@micropython.viper
+def wavetable(buf, nframes: int, channels: int, table, state):
+    """Fill frames with the interpolated table at the state's phase, advancing it."""
+    s = ptr16(buf)
+    t = ptr16(table)
+    st = ptr32(state)
+    phase = st[0]
+    inc = st[1]
+    amp = st[2]
+    shift = st[3]
+    mask = (1 << shift) - 1
+    n = nframes * channels
+    i = 0
+    while i < n:
+        idx = phase >> shift
+        a = int(t[idx])
+        if a & 0x8000:
+            a -= 0x10000
+        b = int(t[idx + 1])
+        if b & 0x8000:
+            b -= 0x10000
+        v = a + (((b - a) * (phase & mask)) >> shift)
+        v = (v * amp) >> 15
+        for ch in range(channels):
+            s[i + ch] = v
+        i += channels
+        phase = (phase + inc) & 0xFFFFFF
+    st[0] = phase
@@ -0,0 +1,65 @@
+"""
+Viper Resampler Kernel
+
+Native fast path for audio/resampler.py. This module only compiles on
+ports with the viper code emitter; resampler falls back to the portable
+kernel when importing it fails.
+
+The table and state layouts are described in audio/resampler.py.
+"""
+
+import micropython
+
+
+@micropython.viper
+def resample_block(work, dst, table, state) -> int:
+    """Filter the frames held in work into dst; return samples written."""
+    x = ptr16(work)
+    d = ptr16(dst)
+    c = ptr16(table)
+    st = ptr32(state)
+
+    have = int(st[0])
+    channels = int(st[1])
+    taps = int(st[2])
+    pos = int(st[4])
+    frac = int(st[5])
+    step = int(st[6])
+    frac_step = int(st[7])
+    modulus = int(st[8])
+
+    o = 0
+    while pos + taps <= have:
+        base = int(c[frac])
+        ch = 0
+        while ch < channels:
+            acc = 0
+            xi = pos * channels + ch
+            j = 0
+            while j < taps:
+                v = int(x[xi])
+                if v & 0x8000:
+                    v -= 0x10000
+                k = int(c[base + j])
+                if k & 0x8000:
+                    k -= 0x10000
+                acc += v * k
+                xi += channels
+                j += 1
+            acc = (acc + 16384) >> 15
+            if acc > 32767:
+                acc = 32767
+            elif acc < -32768:
+                acc = -32768
+            d[o] = acc
+            o += 1
+            ch += 1
+        pos += step
+        frac += frac_step
+        if frac >= modulus:
+            frac -= modulus
+            pos += 1
+
+    st[4] = pos
+    st[5] = frac
+    return o
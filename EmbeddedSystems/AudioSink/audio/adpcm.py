@@ -0,0 +1,142 @@
+"""
+IMA-ADPCM Decoder
+
+Decodes 4-bit IMA-ADPCM packets (4:1 against 16-bit PCM) into 16-bit
+little-endian PCM. Every packet carries its own decoder state, so a lost
+packet never corrupts the ones after it.
+
+Packet layout:
+    For each channel: predictor (int16 LE), step index (uint8), 0x00
+    Then one byte per nibble pair:
+        mono   - two consecutive samples, low nibble first
+        stereo - one frame, low nibble = left, high nibble = right
+
+A stereo packet of 240 bytes carries 232 frames; a mono packet of 240
+bytes carries 472 samples. The matching encoder is tools/adpcm_encode.py.
+
+On ports with the viper code emitter the inner loop comes from
+audio/_adpcm_viper.py; everywhere else the portable version below is
+used.
+"""
+
+import struct
+from array import array
+
+# Standard IMA step sizes
+STEP_TABLE = array('H', (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17,
+    19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118,
+    130, 143, 157, 173, 190, 209, 230, 253, 279, 307,
+    337, 371, 408, 449, 494, 544, 598, 658, 724, 796,
+    876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066,
+    2272, 2499, 2749, 3024, 3327, 3660, 4026, 4428, 4871, 5358,
+    5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487, 12635, 13899,
+    15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767
+))
+
+# Step index change for each nibble magnitude (sign bit ignored)
+INDEX_TABLE = (-1, -1, -1, -1, 2, 4, 6, 8)
+
+STEP_INDEX_MAX = len(STEP_TABLE) - 1
+
+# Header bytes per channel
+HEADER_BYTES = 4
+
+# Codec identifiers used on the control characteristic
+CODEC_PCM = 0
+CODEC_IMA_ADPCM = 1
+
+# Decoder state: [channels, data offset, pred0, index0, pred1, index1]
+_state = array('i', [0] * 6)
+
+
+def decoded_size(packet_len, channels):
+    """
+    Get the number of PCM bytes a packet decodes to.
+
+    Args:
+        packet_len (int): Encoded packet length in bytes
+        channels (int): Channel count (1 or 2)
+
+    Returns:
+        int: Decoded 16-bit PCM bytes
+    """
+    data = packet_len - HEADER_BYTES * channels
+    if data <= 0:
+        return 0
+    return data * 4  # Two nibbles per byte, two bytes per sample
+
+
+def _decode_py(src, nbytes, dst, state):
+    """Decode nbytes of nibbles from src into int16 samples in dst."""
+    steps = STEP_TABLE
+    index_table = INDEX_TABLE
+    stereo = state[0] - 1
+    preds = [state[2], state[4]]
+    indices = [state[3], state[5]]
+    out = []
+    append = out.append
+
+    for b in memoryview(src)[state[1]:state[1] + nbytes]:
+        for ch, nib in ((0, b & 15), (stereo, b >> 4)):
+            step = steps[indices[ch]]
+            diff = step >> 3
+            if nib & 4:
+                diff += step
+            if nib & 2:
+                diff += step >> 1
+            if nib & 1:
+                diff += step >> 2
+            if nib & 8:
+                pred = preds[ch] - diff
+                if pred < -32768:
+                    pred = -32768
+            else:
+                pred = preds[ch] + diff
+                if pred > 32767:
+                    pred = 32767
+            preds[ch] = pred
+            append(pred)
+            index = indices[ch] + index_table[nib & 7]
+            indices[ch] = 0 if index < 0 else (STEP_INDEX_MAX if index > STEP_INDEX_MAX else index)
+
+    struct.pack_into("<%dh" % len(out), dst, 0, *out)
+    state[2], state[3], state[4], state[5] = preds[0], indices[0], preds[1], indices[1]
+    return len(out)
+
+
+try:
+    from audio._adpcm_viper import decode_nibbles
+    DECODER_IMPL = "viper"
+except (ImportError, SyntaxError):
+    decode_nibbles = _decode_py
+    DECODER_IMPL = "python"
+
+
+def decode_block(src, dst, channels):
+    """
+    Decode one IMA-ADPCM packet.
+
+    Args:
+        src: bytes-like encoded packet
+        dst: bytearray with room for decoded_size(len(src), channels) bytes
+        channels (int): Channel count (1 or 2)
+
+    Returns:
+        int: Decoded PCM bytes written to dst (0 for a malformed packet)
+    """
+    header = HEADER_BYTES * channels
+    nbytes = len(src) - header
+    if nbytes <= 0 or channels not in (1, 2):
+        return 0
+
+    state = _state
+    state[0] = channels
+    state[1] = header
+    for ch in range(channels):
+        pred, index = struct.unpack_from('<hB', src, ch * HEADER_BYTES)
+        state[2 + 2 * ch] = pred
+        state[3 + 2 * ch] = index if index <= STEP_INDEX_MAX else STEP_INDEX_MAX
+
+    return decode_nibbles(src, nbytes, dst, state) * 2
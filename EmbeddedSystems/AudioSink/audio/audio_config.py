@@ -8,6 +8,8 @@ audio processing implementation.
 from micropython import const
 import array
 
+from audio.ring_buffer import RingBuffer
+
 # Audio format configuration
 AUDIO_FORMAT_PCM = const(0x01)
 AUDIO_FORMAT_MP3 = const(0x02)
@@ -28,49 +30,57 @@ VOLUME_MIN = const(0)
 VOLUME_MAX = const(100)
 VOLUME_DEFAULT = const(80)
 
+# Packet length prefix stored in the ring ahead of each packet
+_LEN_BYTES = const(2)
+
 # Circular buffer implementation for audio
 class AudioBuffer:
     def __init__(self, buffer_size=AUDIO_BUFFER_SIZE, buffer_count=AUDIO_BUFFER_COUNT):
         """Initialize audio buffer system"""
-        self.buffers = [bytearray(buffer_size) for _ in range(buffer_count)]
-        self.buffer_sizes = [0] * buffer_count
-        self.write_index = 0
-        self.read_index = 0
-        self.count = 0
-        self.max_count = buffer_count
+        self.buffer_size = buffer_size
+        # Room for buffer_count full packets, each with its length prefix
+        self._ring = RingBuffer((buffer_size + _LEN_BYTES) * buffer_count)
+        self._len = bytearray(_LEN_BYTES)
+        self._out = bytearray(buffer_size)
     
     def push(self, data, length):
-        """Add data to buffer"""
-        if self.count >= self.max_count:
+        """Add one packet (up to buffer_size bytes) to buffer"""
+        copy_len = min(length, self.buffer_size)
+        if copy_len + _LEN_BYTES > self._ring.free():
             return False  # Buffer full
         
-        # Copy data to current write buffer
-        buffer = self.buffers[self.write_index]
-        copy_len = min(length, len(buffer))
-        for i in range(copy_len):
-            buffer[i] = data[i]
-        
-        self.buffer_sizes[self.write_index] = copy_len
-        self.write_index = (self.write_index + 1) % self.max_count
-        self.count += 1
+        # Length prefix, then a bulk copy into the shared ring
+        self._len[0] = copy_len & 0xFF
+        self._len[1] = copy_len >> 8
+        self._ring.write_into(self._len)
+        self._ring.write_into(data, copy_len)
         return True
     
     def pop(self):
-        """Get data from buffer"""
-        if self.count <= 0:
+        """
+        Get the oldest packet from buffer, as pushed.
+
+        Returns (buffer, size). The buffer is reused by the next pop(),
+        so copy the packet out first if it must be kept.
+        """
+        ring = self._ring
+        if ring.peek_into(self._len) < _LEN_BYTES:
             return None, 0  # Buffer empty
+        size = self._len[0] | (self._len[1] << 8)
+        if ring.count() < _LEN_BYTES + size:
+            return None, 0  # Packet still being written
         
-        buffer = self.buffers[self.read_index]
-        size = self.buffer_sizes[self.read_index]
-        self.read_index = (self.read_index + 1) % self.max_count
-        self.count -= 1
-        return buffer, size
+        ring.skip(_LEN_BYTES)
+        ring.read_into(self._out, size)
+        return self._out, size
+    
+    def level(self):
+        """Get buffer fill level (percent)"""
+        return self._ring.level()
     
     def clear(self):
         """Clear all buffers"""
-        self.write_index = 0
-        self.read_index = 0
-        self.count = 0
+        self._ring.clear()
 
 # Global audio buffer
 audio_buffer = AudioBuffer()
@@ -108,27 +118,10 @@ def set_audio_volume(volume_level):
 
 def generate_test_tone(buffer, length):
     """Generate a test tone"""
-    # Generate a simple sine wave test tone
-    import math
-    
-    frequency = 440  # A4 note
-    amplitude = 0.5  # Half volume
-    
-    # For 16-bit stereo
-    if length % 4 != 0:
-        length = length - (length % 4)  # Ensure length is multiple of 4
-        
-    samples = length // 4  # 2 bytes per sample, 2 channels
-    
-    for i in range(samples):
-        # Calculate sine wave value for this sample
-        value = int(32767 * amplitude * math.sin(2 * math.pi * frequency * i / SAMPLE_RATE))
-        
-        # Set left and right channel to same value
-        idx = i * 4
-        # Low byte
-        buffer[idx] = value & 0xFF
-        buffer[idx + 2] = value & 0xFF
-        # High byte
-        buffer[idx + 1] = (value >> 8) & 0xFF
-        buffer[idx + 3] = (value >> 8) & 0xFF 
\ No newline at end of file
+    # 440 Hz (A4) at half volume, 16-bit stereo, from the wavetable oscillator
+    from audio.oscillator import Oscillator
+    from config import AUDIO_SAMPLE_RATE
+
+    # Whole frames only
+    samples = length // 4
+    Oscillator(AUDIO_SAMPLE_RATE, freq=440, amplitude=0.5).fill(buffer, samples) 
\ No newline at end of file
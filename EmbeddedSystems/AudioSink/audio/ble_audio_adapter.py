@@ -3,6 +3,23 @@ BLE Audio Adapter
 
 Connects BLE audio input to I2S output.
 Handles audio data conversion and buffering.
+
+Every connected central is a source of its own: its packets are tagged
+with the connection in the ingest queue, decoded and resampled with its
+own state and written to its own buffer in the I2S driver, where the
+mixer (audio/mixer.py) sums the sources with saturation.
+
+Senders that enable credit flow control (ble/flow_control.py) are told
+how many packets fit in the ingest queue and their I2S buffer without
+waiting, every FLOW_CREDIT_INTERVAL_MS while the limit moves.
+
+A central that enables timestamps (CMD_SET_TIMESTAMPS) starts each
+packet with a 16-bit sequence number and a presentation timestamp, its
+ticks_us() modulo 2**30. Its stream then plays PLAYOUT_LATENCY_MS after
+the fastest packets arrive (audio/playout_clock.py): early packets wait
+behind silence in its I2S buffer and late ones lose the part whose time
+has passed. Packets still play in arrival order, which GATT and L2CAP
+keep.
 """
 
 import uasyncio as asyncio
@@ -11,14 +28,31 @@ import time
 import gc
 
 from audio.i2s_driver import I2SDriver
+from audio.packet_queue import PacketQueue
+from audio.adpcm import CODEC_PCM, CODEC_IMA_ADPCM, decode_block, decoded_size
+from audio.resampler import Resampler, SUPPORTED_RATES
+from audio.latency_trace import (LatencyTrace, STAGES, TRACE_OFF, TRACE_ON,
+                                 TRACE_SNAPSHOT, TRACE_RESET)
+from audio.packet_capture import PacketCapture, CAPTURE_OFF, CAPTURE_ON
+from audio.playout_clock import PlayoutClock
 from ble.ble_core import BLEAudioSink
 from config import (
     I2S_BCK_PIN, I2S_WS_PIN, I2S_SD_PIN,
     AUDIO_SAMPLE_RATE, AUDIO_BIT_DEPTH, AUDIO_CHANNELS, AUDIO_BUFFER_SIZE,
-    AUDIO_CHUNK_SIZE, BLE_AUDIO_PACKET_SIZE,
-    CMD_PLAY, CMD_PAUSE, STATUS_PLAYING, STATUS_PAUSED
+    AUDIO_CHUNK_SIZE, AUDIO_INGEST_SLOTS, AUDIO_DUAL_CORE, BLE_AUDIO_PACKET_SIZE,
+    BLE_MAX_CONNECTIONS, DSP_EQ_BANDS, DSP_VOLUME_RAMP_MS, FLOW_CREDIT_INTERVAL_MS,
+    CMD_PLAY, CMD_PAUSE, CMD_SET_SAMPLE_RATE, CMD_SET_CODEC, CMD_LATENCY_TRACE,
+    CMD_SET_SOURCE_GAIN, CMD_DSP, CMD_CAPTURE, CMD_SET_TIMESTAMPS,
+    STATUS_PLAYING, STATUS_PAUSED, LATENCY_TRACE_ENABLED, LATENCY_TRACE_RECORDS,
+    CAPTURE_PATH, CAPTURE_BUFFER_SIZE, CAPTURE_FLUSH_MS,
+    PLAYOUT_LATENCY_MS, PLAYOUT_CLOCK_WINDOW
 )
 
+# Timestamped packets: sequence number and PTS ahead of the audio
+_TS_HEADER_BYTES = 6
+_PTS_MASK = 0x3FFFFFFF
+_FRAME_US = 1000000 // AUDIO_SAMPLE_RATE  # One output frame
+
 class BLEAudioAdapter:
     """
     Adapter that connects BLE audio input to I2S output.
@@ -35,16 +69,68 @@ class BLEAudioAdapter:
             sample_rate=AUDIO_SAMPLE_RATE,
             bits=AUDIO_BIT_DEPTH,
             channels=AUDIO_CHANNELS,
-            buffer_size=AUDIO_BUFFER_SIZE
+            buffer_size=AUDIO_BUFFER_SIZE,
+            dual_core=AUDIO_DUAL_CORE,
+            sources=BLE_MAX_CONNECTIONS,
+            dsp_bands=DSP_EQ_BANDS,
+            volume_ramp_ms=DSP_VOLUME_RAMP_MS
         )
         
+        # Mixer source of each connected central
+        self._sources = {}  # conn_handle -> source index
+        self._free_sources = list(range(BLE_MAX_CONNECTIONS - 1, -1, -1))
+        
+        # Packets from the BLE IRQ wait here for the single ingest task,
+        # tagged with the connection they arrived on
+        self._queue = PacketQueue(AUDIO_INGEST_SLOTS, AUDIO_CHUNK_SIZE)
+        self._queue_ready = asyncio.ThreadSafeFlag()
+        self._discard_queued = False  # Set on disconnect, handled by the task
+        
+        # Codec of incoming packets and the buffer compressed ones decode into
+        self.codec = CODEC_PCM
+        self._pcm = bytearray(decoded_size(AUDIO_CHUNK_SIZE, 1))
+        self._pcm_mv = memoryview(self._pcm)
+        
+        # Sender sample rate; other rates than the I2S clock are resampled
+        self.input_rate = AUDIO_SAMPLE_RATE
+        self._pending_rate = 0  # Set by the control handler, applied by the task
+        self._resamplers = [None] * BLE_MAX_CONNECTIONS  # Filter state per source
+        self._resampled = None
+        
+        # Presentation timestamps per source, with each sender's clock offset
+        self._timed = [False] * BLE_MAX_CONNECTIONS
+        self._clocks = [PlayoutClock(PLAYOUT_LATENCY_MS, PLAYOUT_CLOCK_WINDOW)
+                        for _ in range(BLE_MAX_CONNECTIONS)]
+        self._playout_stats = {"waits": 0, "late": 0, "frames_trimmed": 0}
+        
         # Create BLE audio sink
         self.ble_sink = BLEAudioSink()
         
         # Register callbacks
-        self.ble_sink.set_audio_data_callback(self._handle_audio_data)
+        self.ble_sink.set_audio_source_callback(self._handle_audio_data)
         self.ble_sink.set_control_callback(self._handle_control_command)
         self.ble_sink.set_status_callback(self._handle_status_update)
+        self.ble_sink.set_connection_callback(self._handle_connection)
+        self.ble_sink.set_link_callback(self._handle_link)
+        
+        # L2CAP credits are withheld once the ingest queue is half full
+        self._l2cap = self.ble_sink.l2cap
+        self._queue_high = AUDIO_INGEST_SLOTS // 2
+        self.ble_sink.set_flow_control(self._can_receive)
+        
+        # GATT senders are paced with credits: packets that fit in the
+        # queue and the I2S buffer, at the PCM size the last packet had
+        self._packet_pcm = AUDIO_CHUNK_SIZE
+        self.ble_sink.set_credit_callback(self._credits)
+        
+        # Latency tracing; _trace is None while tracing is off
+        self._latency = None
+        self._trace = None
+        if LATENCY_TRACE_ENABLED:
+            self._set_tracing(True)
+        
+        # Packet capture to flash; None while not capturing
+        self.capture = None
         
         # Status tracking
         self.is_running = False
@@ -56,7 +142,8 @@ class BLEAudioAdapter:
             "packets_received": 0,
             "buffer_overruns": 0,
             "audio_bytes_processed": 0,
-            "last_packet_time": 0
+            "last_packet_time": 0,
+            "queue_overflows": 0
         }
         
         # Memory management
@@ -71,33 +158,46 @@ class BLEAudioAdapter:
             # Start I2S playback
             await self.i2s_driver.start()
             
-            # Start BLE advertising
+            # Start the task that moves queued packets into the I2S driver
+            asyncio.create_task(self._ingest_task())
+            
+            # Start the task that sends the coalesced status notifications
+            asyncio.create_task(self.ble_sink.notify.run())
+            
+            # Start BLE advertising, with the links set up for audio
+            self.ble_sink.set_link_profile("streaming")
             self.ble_sink.start_advertising()
             
             # Start statistics task
             if self.is_running:
                 asyncio.create_task(self._stats_task())
+                asyncio.create_task(self._credit_task())
             
             print("BLE Audio Adapter started")
     
     async def stop(self):
         """Stop the BLE audio adapter."""
         self.is_running = False
+        self._queue_ready.set()  # Wake the ingest task so it can exit
         
         # Stop I2S playback
         await self.i2s_driver.stop()
+        self.stop_capture()
         
         # Stop BLE
         self.ble_sink.disconnect()
+        self.ble_sink.set_link_profile("idle")
+        self.ble_sink.notify.stop()
         
         print("BLE Audio Adapter stopped")
         gc.collect()  # Free memory after stopping
     
-    def _handle_audio_data(self, data):
+    def _handle_audio_data(self, conn_handle, data):
         """
         Handle audio data received from BLE.
         
         Args:
+            conn_handle (int): Connection the data arrived on
             data (bytes): Audio data received via BLE
         """
         if not self.is_running:
@@ -108,37 +208,189 @@ class BLEAudioAdapter:
         self.stats["audio_bytes_processed"] += len(data)
         self.stats["last_packet_time"] = self.ble_sink.get_ticks_ms()
         
-        # Process only manageable chunks to prevent memory issues
-        max_chunk = min(len(data), AUDIO_CHUNK_SIZE)
+        # The clock offset of a timestamped stream is taken on arrival
+        source = self._sources.get(conn_handle)
+        if source is not None and self._timed[source] and len(data) > _TS_HEADER_BYTES:
+            self._clocks[source].observe(struct.unpack_from('<I', data, 2)[0] & _PTS_MASK)
         
-        # Create a task to write data to I2S
-        # Pass the data directly without creating a copy
-        asyncio.create_task(self._write_audio_data(data[:max_chunk]))
+        # Copy into a preallocated slot and wake the ingest task;
+        # packets arriving while the queue is full are counted and dropped
+        if not self._queue.put(data, conn_handle):
+            self.stats["queue_overflows"] += 1
+        elif self._trace:
+            self._trace.enqueued()
+        self._queue_ready.set()
     
-    async def _write_audio_data(self, data):
+    def _can_receive(self):
+        """Return True while the ingest queue can take another L2CAP read."""
+        return self._queue.count() < self._queue_high
+    
+    def _credits(self, conn_handle):
         """
-        Write audio data to I2S driver.
+        Return the packets a connection can send without being dropped.
+        
+        Everything queued is assumed to end up in this connection's I2S
+        buffer, which holds only a few packets; on top of what fits there
+        a sender gets _queue_high packets of headroom in the ingest queue
+        (as with L2CAP credits) to cover the notification round trip, so
+        ingest may wait on the I2S buffer but the queue never overflows.
+        The free queue slots are shared between the sources.
         
         Args:
-            data (bytes): Audio data to write
+            conn_handle (int): Flow-controlled connection
         """
-        try:
-            # Write data to I2S buffer in smaller chunks if necessary
-            chunk_size = 128  # Process in very small chunks
-            for i in range(0, len(data), chunk_size):
-                chunk = data[i:i+chunk_size]
-                buffer_full = await self.i2s_driver.write(chunk)
-                
-                # Track buffer overruns
-                if buffer_full:
-                    self.stats["buffer_overruns"] += 1
-                    await asyncio.sleep_ms(5)  # Wait for buffer to drain
+        source = self._sources.get(conn_handle)
+        if source is None or not self.is_running:
+            return 0
+        queued = self._queue.count()
+        slots = (AUDIO_INGEST_SLOTS - queued) // len(self._sources)
+        fit = self.i2s_driver.space(source) // self._packet_pcm + self._queue_high - queued
+        return max(0, min(slots, fit))
+    
+    async def _credit_task(self):
+        """Notify flow-controlled senders as buffer space frees up."""
+        while self.is_running:
+            await asyncio.sleep_ms(FLOW_CREDIT_INTERVAL_MS)
+            self.ble_sink.notify_credits()
+    
+    async def _ingest_task(self):
+        """Drain queued packets into the I2S driver in arrival order."""
+        queue = self._queue
+        frame_bytes = 2 * AUDIO_CHANNELS
+        while self.is_running:
+            await self._queue_ready.wait()
             
-            # Explicitly delete references to release memory
-            del data
-            gc.collect()  # Force garbage collection after processing
-        except Exception as e:
-            print(f"Error writing audio data: {e}")
+            if self._discard_queued:
+                # Stale packets from a closed connection
+                self._discard_queued = False
+                queue.discard()
+            
+            if self._pending_rate:
+                self._apply_input_rate(self._pending_rate)
+                self._pending_rate = 0
+            
+            while self.is_running and not queue.is_empty():
+                packet = queue.peek()
+                source = self._sources.get(queue.peek_tag())
+                if self._trace:
+                    self._trace.dequeued()
+                if source is None:
+                    # From a connection that has closed since
+                    queue.release()
+                    continue
+                skip = 0
+                if self._timed[source]:
+                    if len(packet) <= _TS_HEADER_BYTES:
+                        queue.release()
+                        continue
+                    pts = struct.unpack_from('<I', packet, 2)[0] & _PTS_MASK
+                    packet = memoryview(packet)[_TS_HEADER_BYTES:]
+                    skip = await self._line_up(pts, source)
+                if self.codec == CODEC_IMA_ADPCM:
+                    n = decode_block(packet, self._pcm, AUDIO_CHANNELS)
+                    packet = self._pcm_mv[:n]
+                if skip:
+                    # Late: the part whose time has passed is dropped
+                    skip = min(skip, len(packet))
+                    self._playout_stats["frames_trimmed"] += skip // frame_bytes
+                    if skip == len(packet):
+                        self._playout_stats["late"] += 1
+                        queue.release()
+                        if self._l2cap:
+                            self._l2cap.resume()
+                        continue
+                    packet = memoryview(packet)[skip:]
+                try:
+                    resampler = self._resamplers[source]
+                    if resampler is None:
+                        self._packet_pcm = max(frame_bytes, len(packet))
+                        await self._write_pcm(packet, source)
+                    else:
+                        # Convert to the I2S rate in blocks the resampler was sized for
+                        frames = len(packet) // frame_bytes
+                        offset = 0
+                        pcm = 0
+                        while offset < frames:
+                            n = min(frames - offset, resampler.max_frames)
+                            start = offset * frame_bytes
+                            out = resampler.process(packet[start:start + n * frame_bytes],
+                                                    n, self._resampled)
+                            await self._write_pcm(memoryview(self._resampled)[:out * frame_bytes],
+                                                  source)
+                            offset += n
+                            pcm += out * frame_bytes
+                        self._packet_pcm = max(frame_bytes, pcm)
+                except Exception as e:
+                    print(f"Error writing audio data: {e}")
+                if self._trace:
+                    self._trace.buffered()
+                queue.release()
+                if self._l2cap:
+                    # Read what flow control held back, returning credits
+                    self._l2cap.resume()
+        
+        # Nothing queued should survive a restart
+        queue.discard()
+    
+    async def _line_up(self, pts, source):
+        """
+        Wait behind silence until a timestamped packet is due.
+        
+        Silence goes into the source's I2S buffer until the packet lands
+        at its playout time, waiting while the buffer is full.
+        
+        Args:
+            pts (int): Presentation timestamp of the packet
+            source (int): Mixer source of the stream
+        
+        Returns:
+            int: Bytes of the packet's PCM whose time has already passed
+        """
+        clock = self._clocks[source]
+        waited = False
+        while self.is_running:
+            at = self.i2s_driver.play_time_us(source)
+            due = clock.due_us(pts)
+            if at is None or due is None:
+                # Playback stopped: the audio plays in order on resume
+                return 0
+            early = time.ticks_diff(due, at)
+            if early < _FRAME_US:
+                if early > -_FRAME_US:
+                    return 0
+                return (-early * self.input_rate // 1000000) * 2 * AUDIO_CHANNELS
+            if not waited:
+                self._playout_stats["waits"] += 1
+                waited = True
+            frames = early * AUDIO_SAMPLE_RATE // 1000000
+            if self.i2s_driver.pad(frames, source) == frames:
+                return 0
+            await asyncio.sleep_ms(5)
+        return 0
+    
+    async def _write_pcm(self, data, source=0):
+        """
+        Write PCM to the I2S driver, waiting while its buffer is full.
+        
+        Args:
+            data: bytes-like PCM in the driver's input format
+            source (int): Mixer source of the stream
+        """
+        size = len(data)
+        offset = 0
+        waited = False
+        while offset < size and self.is_running:
+            space = self.i2s_driver.space(source)
+            if not space:
+                # Buffer full: wait for playback to drain it
+                if not waited:
+                    self.stats["buffer_overruns"] += 1
+                    waited = True
+                await asyncio.sleep_ms(5)
+                continue
+            n = min(size - offset, space)
+            await self.i2s_driver.write(data[offset:offset + n], source)
+            offset += n
     
     def _handle_control_command(self, command):
         """
@@ -168,6 +420,179 @@ class BLEAudioAdapter:
             latency = struct.unpack('<H', command[1:3])[0]
             self.audio_latency = latency
             print(f"Latency adjustment: {latency}ms")
+        
+        # Input sample rate (0x08), applied by the ingest task
+        elif cmd_type == CMD_SET_SAMPLE_RATE and len(command) >= 3:
+            rate = struct.unpack('<H', command[1:3])[0]
+            if rate in SUPPORTED_RATES:
+                self._pending_rate = rate
+                self._queue_ready.set()
+            else:
+                print(f"Unsupported sample rate: {rate}Hz")
+        
+        # Codec selection (0x09)
+        elif cmd_type == CMD_SET_CODEC and len(command) >= 2:
+            self._set_codec(command[1])
+        
+        # Latency tracing (0x0A)
+        elif cmd_type == CMD_LATENCY_TRACE and len(command) >= 2:
+            self._handle_trace_command(command[1])
+        
+        # Mixing gain of the sending central's stream (0x0C)
+        elif cmd_type == CMD_SET_SOURCE_GAIN and len(command) >= 2:
+            source = self._sources.get(self.ble_sink.control_conn)
+            if source is not None:
+                self.i2s_driver.set_source_gain(source, command[1] / 255.0)
+                print(f"Source {source} gain set to {command[1] / 255.0:.2f}")
+        
+        # DSP chain configuration (0x0D)
+        elif cmd_type == CMD_DSP and len(command) >= 3:
+            if self.i2s_driver.configure_dsp(command):
+                print(f"DSP: {self.i2s_driver.dsp.get_stats()}")
+        
+        # Packet capture to flash (0x0E)
+        elif cmd_type == CMD_CAPTURE and len(command) >= 2:
+            if command[1] == CAPTURE_ON:
+                self.start_capture()
+            elif command[1] == CAPTURE_OFF:
+                self.stop_capture()
+        
+        # Presentation timestamps on the sending central's packets (0x10)
+        elif cmd_type == CMD_SET_TIMESTAMPS and len(command) >= 2:
+            conn_handle = self.ble_sink.control_conn
+            source = self._sources.get(conn_handle)
+            if source is not None:
+                on = command[1] != 0
+                self._set_timestamps(source, on)
+                self.ble_sink.reply_control(conn_handle, bytes([CMD_SET_TIMESTAMPS, on]))
+    
+    def _apply_input_rate(self, rate):
+        """
+        Set up conversion from the sender's sample rate to the I2S rate.
+        
+        Args:
+            rate (int): Sender sample rate in Hz
+        """
+        if rate == self.input_rate:
+            return
+        if rate == AUDIO_SAMPLE_RATE or self.i2s_driver.bits != 16:
+            if rate != AUDIO_SAMPLE_RATE:
+                print("Resampling needs 16-bit input")
+            for i in range(BLE_MAX_CONNECTIONS):
+                self._resamplers[i] = None
+            self._resampled = None
+            self.input_rate = AUDIO_SAMPLE_RATE
+        else:
+            max_frames = len(self._pcm) // (2 * AUDIO_CHANNELS)
+            for i in range(BLE_MAX_CONNECTIONS):
+                self._resamplers[i] = Resampler(rate, AUDIO_SAMPLE_RATE, AUDIO_CHANNELS, max_frames)
+            self._resampled = bytearray(
+                self._resamplers[0].max_output(max_frames) * 2 * AUDIO_CHANNELS)
+            self.input_rate = rate
+        print(f"Input rate {self.input_rate}Hz, I2S rate {AUDIO_SAMPLE_RATE}Hz")
+    
+    def _set_timestamps(self, source, on):
+        """
+        Turn presentation timestamps on or off for one source.
+        
+        The clock offset estimate starts again from the next packet.
+        
+        Args:
+            source (int): Mixer source of the sending central
+            on (bool): True if its packets carry a sequence number and PTS
+        """
+        self._timed[source] = on
+        self._clocks[source].reset()
+        print(f"Source {source}: {'timestamped playout' if on else 'timestamps off'}")
+    
+    def start_capture(self, path=CAPTURE_PATH):
+        """
+        Start logging received packets to a file (audio/packet_capture.py).
+        
+        Args:
+            path (str): Capture log to create
+        """
+        if self.capture:
+            return
+        try:
+            capture = PacketCapture(path, CAPTURE_BUFFER_SIZE, CAPTURE_FLUSH_MS)
+        except OSError as e:
+            print(f"Cannot open capture log {path}: {e}")
+            return
+        self.capture = capture
+        self.ble_sink.capture = capture
+        asyncio.create_task(capture.run())
+        print(f"Capturing packets to {path}")
+    
+    def stop_capture(self):
+        """Stop logging packets and close the capture log."""
+        capture = self.capture
+        if not capture:
+            return
+        self.ble_sink.capture = None
+        self.capture = None
+        capture.close()
+        print(f"Capture stopped: {capture.get_stats()}")
+    
+    def _set_codec(self, codec):
+        """
+        Select the codec of incoming audio packets.
+        
+        Args:
+            codec (int): CODEC_PCM or CODEC_IMA_ADPCM
+        """
+        if codec == CODEC_IMA_ADPCM:
+            # ADPCM always decodes to 16-bit samples
+            self.i2s_driver.set_input_format(16, AUDIO_CHANNELS)
+        elif codec == CODEC_PCM:
+            self.i2s_driver.set_input_format(AUDIO_BIT_DEPTH, AUDIO_CHANNELS)
+        else:
+            print(f"Unknown codec: {codec}")
+            return
+        self.codec = codec
+        print(f"Codec set to {'IMA-ADPCM' if codec == CODEC_IMA_ADPCM else 'PCM'}")
+    
+    def _set_tracing(self, enabled):
+        """
+        Turn the latency tracepoints on or off.
+        
+        Args:
+            enabled (bool): True to start tracing with cleared histograms
+        """
+        trace = None
+        if enabled:
+            if self._latency is None:
+                self._latency = LatencyTrace(LATENCY_TRACE_RECORDS)
+            trace = self._latency
+            trace.reset(self.i2s_driver.buffer.count())
+        # Every tracepoint tests its own reference, so set them all
+        self._trace = trace
+        self.ble_sink.trace = trace
+        if self._l2cap:
+            self._l2cap.trace = trace
+        self.i2s_driver.trace = trace
+        self.i2s_driver.engine.trace = trace
+    
+    def _handle_trace_command(self, arg):
+        """
+        Handle a latency trace control command.
+        
+        Args:
+            arg (int): TRACE_OFF, TRACE_ON, TRACE_SNAPSHOT or TRACE_RESET
+        """
+        if arg == TRACE_ON:
+            self._set_tracing(True)
+            print("Latency tracing on")
+        elif arg == TRACE_OFF:
+            self._set_tracing(False)
+            print("Latency tracing off")
+        elif self._latency is None:
+            print("Latency tracing was never enabled")
+        elif arg == TRACE_SNAPSHOT:
+            self.ble_sink.set_latency_snapshot(self._latency.snapshot())
+            self._latency.report()
+        elif arg == TRACE_RESET:
+            self._latency.reset(self.i2s_driver.buffer.count())
     
     async def _handle_play_pause(self, state):
         """
@@ -178,10 +603,12 @@ class BLEAudioAdapter:
         """
         if state == 0:  # Pause
             await self.i2s_driver.stop()
+            self.ble_sink.set_link_profile("interactive")
             self.ble_sink.set_status(STATUS_PAUSED)
             print("Playback paused")
         else:  # Play
             await self.i2s_driver.start()
+            self.ble_sink.set_link_profile("streaming")
             self.ble_sink.set_status(STATUS_PLAYING)
             print("Playback started")
     
@@ -197,18 +624,90 @@ class BLEAudioAdapter:
             self._reset_stats()
         else:
             print("BLE device disconnected")
-            # Clear audio buffer on disconnect
+            # Drop queued packets and clear audio buffer on disconnect
+            self._discard_queued = True
+            self._queue_ready.set()
             self.i2s_driver.clear_buffer()
             # Force garbage collection after disconnect
             gc.collect()
     
+    def _handle_link(self, conn_handle, payload, interval_us):
+        """
+        Report the link a central ended up with.
+        
+        Args:
+            conn_handle (int): Connection handle
+            payload (int): Largest audio write the MTU allows, in bytes
+            interval_us (int): Connection interval (0 until reported)
+        """
+        if payload < BLE_AUDIO_PACKET_SIZE:
+            print(f"Link {conn_handle}: {payload}-byte writes, audio packets must be smaller")
+        elif interval_us:
+            print(f"Link {conn_handle}: {payload}-byte writes every {interval_us / 1000:.2f}ms")
+    
+    def _handle_connection(self, conn_handle, connected):
+        """
+        Give each connected central a mixer source of its own.
+        
+        Args:
+            conn_handle (int): Connection handle
+            connected (bool): True on connect, False on disconnect
+        """
+        if connected:
+            source = self._free_sources.pop()
+            self._sources[conn_handle] = source
+            self.i2s_driver.set_source_gain(source, 1.0)
+            self._timed[source] = False
+            resampler = self._resamplers[source]
+            if resampler:
+                resampler.reset()
+        else:
+            source = self._sources.pop(conn_handle, None)
+            if source is None:
+                return
+            # Its queued packets are dropped by the ingest task
+            self.i2s_driver.clear_buffer(source)
+            self._free_sources.append(source)
+    
+    def get_stats(self):
+        """
+        Get adapter statistics.
+        
+        Returns:
+            dict: Packet counters, ingest queue and playback statistics
+        """
+        stats = dict(self.stats)
+        stats["codec"] = self.codec
+        stats["input_rate"] = self.input_rate
+        stats["queue"] = self._queue.get_stats()
+        stats["playback"] = self.i2s_driver.get_stats()
+        if self._l2cap:
+            stats["l2cap"] = self._l2cap.get_stats()
+        stats["fec"] = self.ble_sink.get_fec_stats()
+        stats["flow"] = self.ble_sink.flow.get_stats()
+        stats["deferred"] = self.ble_sink.deferred.get_stats()
+        stats["link"] = self.ble_sink.link.get_stats()
+        stats["notify"] = self.ble_sink.notify.get_stats()
+        stats["connections"] = self.ble_sink.get_connection_stats()
+        stats["sources"] = dict(self._sources)
+        playout = dict(self._playout_stats)
+        playout["clocks"] = {s: self._clocks[s].get_stats()
+                             for s in range(BLE_MAX_CONNECTIONS) if self._timed[s]}
+        stats["playout"] = playout
+        if self._latency is not None:
+            stats["latency"] = [self._latency.get_stage(s) for s in range(STAGES)]
+        if self.capture:
+            stats["capture"] = self.capture.get_stats()
+        return stats
+    
     def _reset_stats(self):
         """Reset the debug statistics."""
         self.stats = {
             "packets_received": 0,
             "buffer_overruns": 0,
             "audio_bytes_processed": 0,
-            "last_packet_time": 0
+            "last_packet_time": 0,
+            "queue_overflows": 0
         }
         gc.collect()  # Force garbage collection after resetting stats
     
@@ -216,7 +715,10 @@ class BLEAudioAdapter:
         """Task to periodically print statistics."""
         while self.is_running:
             if self.ble_sink.is_connected() and self.stats["packets_received"] > 0:
-                print(f"Stats:\nPackets: {self.stats['packets_received']},\nOverruns: {self.stats['buffer_overruns']},\nData: {self.stats['audio_bytes_processed']/1024:.1f}KB")
+                print(f"Stats:\nPackets: {self.stats['packets_received']},\nOverruns: {self.stats['buffer_overruns']},\nQueue drops: {self.stats['queue_overflows']},\nData: {self.stats['audio_bytes_processed']/1024:.1f}KB")
+                if self._trace:
+                    self._trace.report()
+                    self.ble_sink.set_latency_snapshot(self._trace.snapshot())
             await asyncio.sleep(5)
             gc.collect()  # Force garbage collection after printing stats
 
@@ -0,0 +1,332 @@
+"""
+Packet Loss Concealment
+
+Synthesises audio for packets the jitter buffer reports as LOST, so a
+gap neither clicks nor shifts the timing of the rest of the stream.
+
+Strategies (AUDIO_PLC in ble/ble_config.py):
+
+- PLC_SILENCE: play silence for the missing packet.
+- PLC_REPEAT: play the last packet again.
+- PLC_WSOLA: waveform-similarity overlap-add. The pitch period of the
+  recent output is found by normalised cross-correlation between its
+  last few milliseconds and earlier positions in the history, and the
+  last period is repeated from there, so the waveform continues
+  without a jump.
+
+Repeated audio fades out linearly over fade_ms of consecutive loss.
+When real packets resume, the start of the first one is cross-faded
+with the continuation of the concealment signal over overlap_ms (for
+silence, it simply fades in). The same fade-in follows an underrun.
+
+Everything works on whole blocks of 16-bit interleaved PCM with Q15 and
+Q14 fixed-point gains. Copies go through preallocated memoryviews; on
+ports with the viper code emitter the per-sample loops come from
+audio/_concealment_viper.py, everywhere else the portable versions
+below are used.
+"""
+
+import struct
+from array import array
+
+PLC_SILENCE = 0
+PLC_REPEAT = 1
+PLC_WSOLA = 2
+PLC_NAMES = ("silence", "repeat", "wsola")
+
+_Q15 = 1 << 15
+_Q14 = 1 << 14
+_STEP_SHIFT = 10        # Gain steps per frame are kept with 10 fraction bits
+
+
+def _ramp_py(buf, nframes, channels, g0, step):
+    """Scale frames in place by a Q15 gain of g0 + (step * frame >> 10)."""
+    ns = nframes * channels
+    fmt = "<%dh" % ns
+    values = struct.unpack_from(fmt, buf, 0)
+    out = []
+    append = out.append
+    i = 0
+    for f in range(nframes):
+        g = g0 + ((step * f) >> _STEP_SHIFT)
+        for v in values[i:i + channels]:
+            append((v * g) >> 15)
+        i += channels
+    struct.pack_into(fmt, buf, 0, *out)
+
+
+def _crossfade_py(dst, src, nframes, channels, step):
+    """Fade from src into dst in place with a Q14 weight of step * frame >> 10."""
+    ns = nframes * channels
+    fmt = "<%dh" % ns
+    a = struct.unpack_from(fmt, src, 0)
+    b = struct.unpack_from(fmt, dst, 0)
+    out = []
+    append = out.append
+    for i in range(ns):
+        w = (step * (i // channels)) >> _STEP_SHIFT
+        append((a[i] * (_Q14 - w) + b[i] * w) >> 14)
+    struct.pack_into(fmt, dst, 0, *out)
+
+
+def _corr_energy_py(buf, t_off, c_off, n, stride, out):
+    """Correlation of two sample runs and energy of the second (samples >> 5)."""
+    span = (n - 1) * stride + 1
+    t = struct.unpack_from("<%dh" % span, buf, 2 * t_off)[::stride]
+    x = struct.unpack_from("<%dh" % span, buf, 2 * c_off)[::stride]
+    c = 0
+    e = 0
+    for a, b in zip(t, x):
+        b >>= 5
+        c += (a >> 5) * b
+        e += b * b
+    out[0] = c
+    out[1] = e
+
+
+def _lag_search_py(buf, t_off, lo, hi, lag_step, channels, n, stride, shift, out):
+    """Best scoring lag in lo..hi for the run of n samples at t_off."""
+    # Unpack the template and the candidate region once; every lag is a
+    # strided slice of the region
+    span = (n - 1) * stride + 1
+    t = [v >> 5 for v in struct.unpack_from("<%dh" % span, buf, 2 * t_off)[::stride]]
+    first = t_off - hi * channels
+    x = struct.unpack_from("<%dh" % ((hi - lo) * channels + span), buf, 2 * first)
+    best = 0
+    best_score = 0
+    for lag in range(lo, hi + 1, lag_step):
+        c_rel = (hi - lag) * channels
+        c = 0
+        e = 0
+        for a, b in zip(t, x[c_rel:c_rel + span:stride]):
+            b >>= 5
+            c += a * b
+            e += b * b
+        c >>= shift
+        score = c * abs(c) // ((e >> shift) + 1)
+        if score > best_score:
+            best = lag
+            best_score = score
+    out[0] = best
+    out[1] = best_score
+
+
+try:
+    from audio._concealment_viper import ramp, crossfade, corr_energy, lag_search
+    PLC_IMPL = "viper"
+except (ImportError, SyntaxError):
+    ramp = _ramp_py
+    crossfade = _crossfade_py
+    corr_energy = _corr_energy_py
+    lag_search = _lag_search_py
+    PLC_IMPL = "python"
+
+
+class Concealer:
+    """
+    Loss concealment for one 16-bit PCM stream.
+    """
+
+    def __init__(self, mode, sample_rate, max_bytes, channels=2,
+                 overlap_ms=2, fade_ms=60):
+        """
+        Initialize the concealer.
+
+        Args:
+            mode (int): PLC_SILENCE, PLC_REPEAT or PLC_WSOLA
+            sample_rate (int): Stream sample rate in Hz
+            max_bytes (int): Largest packet passed to good() or conceal()
+            channels (int): Interleaved channels
+            overlap_ms (int): Cross-fade length when real audio resumes
+            fade_ms (int): Consecutive loss after which output is silent
+        """
+        if mode not in (PLC_SILENCE, PLC_REPEAT, PLC_WSOLA):
+            raise ValueError("Unknown concealment mode %d" % mode)
+        self.mode = mode
+        self._channels = channels
+        self._fb = 2 * channels
+        self._max_frames = max_bytes // self._fb
+
+        # Pitch search range 70-400 Hz, template one shortest period long
+        self._pmin = sample_rate // 400
+        self._pmax = sample_rate // 70
+        self._template = self._pmin
+        self._coarse = 16 if sample_rate > 32000 else 8   # Power of two
+        self._overlap = max(1, sample_rate * overlap_ms // 1000)
+        self._fade = max(1, sample_rate * fade_ms // 1000)
+
+        # Output history, newest frame last
+        frames = max(self._pmax + self._template, self._max_frames)
+        self._hist_frames = frames
+        self._hist = bytearray(frames * self._fb)
+        self._hist_mv = memoryview(self._hist)
+
+        # Continuation of the concealment signal for the resume cross-fade
+        self._tail = bytearray(min(self._overlap, self._max_frames) * self._fb)
+        self._tail_mv = memoryview(self._tail)
+        self._zeros = memoryview(bytearray(self._max_frames * self._fb))
+        self._ce = array('i', [0, 0])
+
+        self.concealed = 0
+        self.concealed_frames = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the history (new stream)."""
+        self._valid = 0             # Frames of history holding real output
+        self._last_frames = 0       # Frames in the last good packet
+        self._active = False        # Concealing, or resuming from silence
+        self._period = 0            # Frames repeated (0 = silence)
+        self._pos = 0               # Frame within the period to play next
+        self._lost = 0              # Frames synthesised in the current loss
+
+    def good(self, buf, n):
+        """
+        Pass a received packet through, cross-fading it in after a loss.
+
+        Args:
+            buf: bytearray or memoryview holding the packet, modified in place
+            n (int): Packet bytes
+        """
+        fb = self._fb
+        frames = n // fb
+        if self._active and frames:
+            ov = min(len(self._tail) // fb, frames)
+            if self._period and self._lost < self._fade:
+                # Continue the synthetic signal and fade from it into the packet
+                self._synth(self._tail_mv, ov)
+                crossfade(buf, self._tail_mv, ov, self._channels,
+                          (_Q14 << _STEP_SHIFT) // ov)
+            else:
+                ramp(buf, ov, self._channels, 0, (_Q15 << _STEP_SHIFT) // ov)
+            self._active = False
+        if frames and self.mode != PLC_SILENCE:
+            self._push(buf, frames)
+            self._last_frames = frames
+
+    def conceal(self, buf, n):
+        """
+        Synthesise audio for a lost packet.
+
+        Args:
+            buf: bytearray or memoryview to fill
+            n (int): Bytes the missing packet would have held
+
+        Returns:
+            int: Bytes written (n rounded down to whole frames)
+        """
+        frames = min(n // self._fb, self._max_frames)
+        if not self._active:
+            self._active = True
+            self._lost = 0
+            self._pos = 0
+            self._period = self._choose_period()
+        self._synth(buf, frames)
+        self.concealed += 1
+        self.concealed_frames += frames
+        return frames * self._fb
+
+    def silence(self):
+        """Output was interrupted (underrun): fade the next packet in."""
+        self._active = True
+        self._period = 0
+
+    def _choose_period(self):
+        """Frames of history to repeat for this loss (0 = silence)."""
+        if self.mode == PLC_SILENCE or not self._valid:
+            return 0
+        repeat = min(self._last_frames, self._valid)
+        if self.mode == PLC_REPEAT or self._valid < self._pmax + self._template:
+            return repeat
+        return self._find_period()
+
+    def _find_period(self):
+        """Pitch period of the history by normalised cross-correlation."""
+        ch = self._channels
+        t_off = (self._hist_frames - self._template) * ch
+        ce = self._ce
+
+        # Scale so that squared correlations stay within small integers
+        corr_energy(self._hist, t_off, t_off, self._template // 2, 2 * ch, ce)
+        shift = 0
+        while ce[1] >> shift > 0x3FFF:
+            shift += 1
+
+        # Coarse lags on a decimated template, then halve the step around
+        # the best one, scoring on a quarter of the coarse stride
+        step = self._coarse
+        lag_search(self._hist, t_off, self._pmin, self._pmax, step, ch,
+                   self._template // step, step * ch, shift, ce)
+        best = ce[0]
+        if not best:
+            # Nothing periodic (or silent): fall back to repetition
+            return min(self._last_frames, self._valid)
+        stride = self._coarse >> 2
+        points = self._template // stride
+        while step > 1:
+            step >>= 1
+            lo = best - step if best - step >= self._pmin else best
+            hi = best + step if best + step <= self._pmax else best
+            lag_search(self._hist, t_off, lo, hi, step, ch, points, stride * ch,
+                       shift, ce)
+            best = ce[0] or best
+        return best
+
+    def _synth(self, dst, frames):
+        """Write frames of concealment signal into dst, advancing the fade."""
+        fb = self._fb
+        lost = self._lost
+        self._lost = lost + frames
+        period = self._period
+        if not period or lost >= self._fade:
+            dst[0:frames * fb] = self._zeros[0:frames * fb]
+            return
+
+        # Repeat the last period of the history from the current position
+        base = (self._hist_frames - period) * fb
+        hist = self._hist_mv
+        pos = self._pos
+        out = 0
+        while out < frames:
+            n = min(frames - out, period - pos)
+            start = base + pos * fb
+            dst[out * fb:(out + n) * fb] = hist[start:start + n * fb]
+            out += n
+            pos += n
+            if pos == period:
+                pos = 0
+        self._pos = pos
+
+        # Linear fade over the loss so far; silence once it reaches zero
+        fade = self._fade
+        g0 = _Q15 - (_Q15 * lost) // fade
+        end = lost + frames
+        if end < fade:
+            g1 = _Q15 - (_Q15 * end) // fade
+            ramp(dst, frames, self._channels, g0, ((g1 - g0) << _STEP_SHIFT) // frames)
+        else:
+            audible = fade - lost
+            ramp(dst, audible, self._channels, g0, -((g0 << _STEP_SHIFT) // audible))
+            dst[audible * fb:frames * fb] = self._zeros[0:(frames - audible) * fb]
+
+    def _push(self, buf, frames):
+        """Append frames of output to the history."""
+        fb = self._fb
+        total = self._hist_frames
+        hist = self._hist_mv
+        if frames >= total:
+            start = (frames - total) * fb
+            hist[0:total * fb] = memoryview(buf)[start:start + total * fb]
+        else:
+            keep = (total - frames) * fb
+            hist[0:keep] = hist[frames * fb:total * fb]
+            hist[keep:total * fb] = memoryview(buf)[0:frames * fb]
+        self._valid = min(total, self._valid + frames)
+
+    def get_stats(self):
+        """Return concealment statistics."""
+        return {
+            'mode': PLC_NAMES[self.mode],
+            'concealed': self.concealed,
+            'concealed_frames': self.concealed_frames,
+        }
@@ -0,0 +1,142 @@
+"""
+Dual-Core I2S Playback Engine
+
+Runs the I2S refill loop on the RP2040's second core. Core 1 fills a
+preallocated block from the fill callback and hands it to a blocking
+I2S write, over and over, while core 0 keeps BLE and asyncio. The
+interface matches audio/playback_engine.py, so either engine can be fed
+by the same source.
+
+The source is the handoff between the cores. It must be a
+single-producer/single-consumer structure whose two sides each own
+their indices, such as RingBuffer.read_into or JitterBuffer.pop_into:
+core 0 only moves the write side and core 1 only the read side. Every
+index is a small integer published with one store after the data it
+covers, so neither side ever sees a half-written packet and the fast
+path takes no lock.
+
+Shutdown is a handshake rather than a sleep: a lock is held for as long
+as the loop runs, stop() clears the run flag and then acquires the
+lock, and core 1 releases it once its last write has returned. A
+blocking write returns within one I2S buffer of audio, which bounds the
+wait. Once stop() returns, core 0 owns both sides again and may reset
+the source or deinit the I2S peripheral.
+
+due_us, the play time of the block being filled, is kept as in
+audio/playback_engine.py when the output byte rate is given.
+"""
+
+import _thread
+import time
+
+
+class Core1PlaybackEngine:
+    """
+    I2S output refilled by a loop on the second core.
+    """
+
+    def __init__(self, i2s, fill, block_size=512, bytes_per_sec=0):
+        """
+        Initialize the playback engine.
+
+        Args:
+            i2s: machine.I2S instance configured for TX
+            fill (callable): fill(buf) -> int, copies audio into buf; runs on core 1
+            block_size (int): Bytes per I2S write
+            bytes_per_sec (int): Output byte rate; 0 leaves due_us unused
+        """
+        self._i2s = i2s
+        self._fill = fill
+        self._block_size = block_size
+
+        # Output clock: block length in whole microseconds and remainder
+        self._bytes_per_sec = bytes_per_sec
+        if bytes_per_sec:
+            self._block_us, self._block_rem = divmod(block_size * 1000000, bytes_per_sec)
+        self.due_us = 0
+
+        # Block and views (created once, reused forever)
+        self._block = bytearray(block_size)
+        self._view = memoryview(self._block)
+        self._zeros = memoryview(bytearray(block_size))
+
+        # Held while the core 1 loop runs
+        self._done = _thread.allocate_lock()
+        self._run = False
+
+        # Optional audio/latency_trace.LatencyTrace told about each submit
+        self.trace = None
+
+        self.running = False
+        self.error = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset playback statistics."""
+        self.blocks_played = 0
+        self.underruns = 0
+        self.underrun_bytes = 0
+
+    def set_fill(self, fill):
+        """Replace the fill callback; takes effect from the next block."""
+        self._fill = fill
+
+    def start(self):
+        """Start the refill loop on core 1."""
+        if self.running:
+            return
+        self._i2s.irq(None)     # Blocking writes pace the loop
+        self._done.acquire()
+        self._run = True
+        self.running = True
+        self.error = None
+        self.due_us = time.ticks_us()
+        _thread.start_new_thread(self._loop, ())
+
+    def stop(self):
+        """Stop the loop and wait until core 1 has left it."""
+        if not self.running:
+            return
+        self._run = False
+        self._done.acquire()
+        self._done.release()
+        self.running = False
+
+    def _loop(self):
+        """Core 1: fill and write blocks until stopped."""
+        i2s = self._i2s
+        view = self._view
+        size = self._block_size
+        bps = self._bytes_per_sec
+        rem = 0
+        try:
+            while self._run:
+                n = self._fill(view)
+                if n < size:
+                    view[n:] = self._zeros[n:]
+                    self.underruns += 1
+                    self.underrun_bytes += size - n
+                if bps:
+                    step = self._block_us
+                    rem += self._block_rem
+                    if rem >= bps:
+                        rem -= bps
+                        step += 1
+                    self.due_us = time.ticks_add(self.due_us, step)
+                i2s.write(view)
+                self.blocks_played += 1
+                if self.trace:
+                    self.trace.submitted(n)
+        except Exception as e:
+            self.error = e
+            print(f"Core 1 playback stopped: {e}")
+        finally:
+            self._done.release()
+
+    def get_stats(self):
+        """Return playback statistics."""
+        return {
+            'blocks_played': self.blocks_played,
+            'underruns': self.underruns,
+            'underrun_bytes': self.underrun_bytes,
+        }
@@ -0,0 +1,544 @@
+"""
+Fixed-Point DSP Chain
+
+Ordered block-processing stages applied to the mixed 16-bit stereo
+output right before it reaches the I2S peripheral:
+
+1. DC blocker: one-pole high-pass at about 14 Hz (22050 Hz rate)
+2. Parametric EQ: DSP_EQ_BANDS biquads (peaking, shelving, low/high
+   pass) designed with the RBJ cookbook formulas
+3. Gain ramp: the volume, moved a little per frame instead of in one
+   step, so volume changes do not cause zipper noise
+4. Peak limiter: gain reduction when a block would exceed the
+   threshold, reached within that block and released gradually
+
+Every stage keeps its state in arrays allocated at construction and
+processes whole blocks in place with integer arithmetic only: biquad
+coefficients are Q13 with the rounding error fed back into the next
+sample, gains are Q15. Coefficients are designed in floating point
+when a stage is configured, never on the audio path, and are swapped
+in as a new array so the output never sees half an update.
+
+Only enabled stages are run. With every stage disabled or the chain
+bypassed, active is False and I2SDriver takes the chain out of the
+output path entirely, so bypass costs nothing.
+
+Runtime configuration arrives as CMD_DSP control commands, decoded by
+DspChain.configure() (layout in the README). On ports with the viper
+code emitter the kernels come from audio/_dsp_viper.py; everywhere else
+the portable versions below are used.
+"""
+
+import math
+import struct
+from array import array
+
+from audio.sample_kernels import Q15_UNITY, gain_q15
+
+# Biquad coefficient format
+Q13_SHIFT = 13
+
+# DC blocker pole: 1 - 2**-DC_SHIFT
+DC_SHIFT = 8
+
+# EQ band types
+EQ_OFF = 0
+EQ_PEAK = 1
+EQ_LOW_SHELF = 2
+EQ_HIGH_SHELF = 3
+EQ_LOW_PASS = 4
+EQ_HIGH_PASS = 5
+
+# Largest boost or cut, so the Q13 accumulator fits 32 bits
+EQ_MAX_GAIN_DB = 12
+
+# CMD_DSP sub-commands
+DSP_BYPASS = 0
+DSP_EQ = 1
+DSP_LIMITER = 2
+DSP_RAMP = 3
+DSP_DC = 4
+
+_INT16_MIN = -32768
+_INT16_MAX = 32767
+
+
+def _biquad_py(buf, nframes, coefs, state):
+    """Filter stereo frames in place with a Q13 direct form I biquad."""
+    n = 2 * nframes
+    fmt = "<%dh" % n
+    samples = list(struct.unpack_from(fmt, buf, 0))
+    b0, b1, b2, a1, a2 = coefs
+    for ch in (0, 1):
+        o = 5 * ch
+        x1, x2, y1, y2, err = state[o], state[o + 1], state[o + 2], state[o + 3], state[o + 4]
+        for i in range(ch, n, 2):
+            x = samples[i]
+            acc = b0 * x + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2 + err
+            y = acc >> Q13_SHIFT
+            err = acc - (y << Q13_SHIFT)
+            if y > _INT16_MAX:
+                y = _INT16_MAX
+            elif y < _INT16_MIN:
+                y = _INT16_MIN
+            x2 = x1
+            x1 = x
+            y2 = y1
+            y1 = y
+            samples[i] = y
+        state[o], state[o + 1], state[o + 2], state[o + 3], state[o + 4] = x1, x2, y1, y2, err
+    struct.pack_into(fmt, buf, 0, *samples)
+
+
+def _dc_block_py(buf, nframes, state):
+    """Remove DC from stereo frames in place (state: x1 and Q8 output per channel)."""
+    n = 2 * nframes
+    fmt = "<%dh" % n
+    samples = list(struct.unpack_from(fmt, buf, 0))
+    for ch in (0, 1):
+        x1 = state[2 * ch]
+        acc = state[2 * ch + 1]
+        for i in range(ch, n, 2):
+            x = samples[i]
+            acc += ((x - x1) << DC_SHIFT) - (acc >> DC_SHIFT)
+            x1 = x
+            y = acc >> DC_SHIFT
+            if y > _INT16_MAX:
+                y = _INT16_MAX
+            elif y < _INT16_MIN:
+                y = _INT16_MIN
+            samples[i] = y
+        state[2 * ch] = x1
+        state[2 * ch + 1] = acc
+    struct.pack_into(fmt, buf, 0, *samples)
+
+
+def _ramp_gain_py(buf, nframes, gain, target, step):
+    """Scale stereo frames by a Q15 gain moving step per frame toward target."""
+    n = 2 * nframes
+    fmt = "<%dh" % n
+    samples = struct.unpack_from(fmt, buf, 0)
+    out = []
+    for i in range(0, n, 2):
+        if gain < target:
+            gain = min(gain + step, target)
+        elif gain > target:
+            gain = max(gain - step, target)
+        out.append(max(_INT16_MIN, min(_INT16_MAX, (samples[i] * gain) >> 15)))
+        out.append(max(_INT16_MIN, min(_INT16_MAX, (samples[i + 1] * gain) >> 15)))
+    struct.pack_into(fmt, buf, 0, *out)
+    return gain
+
+
+def _peak_abs_py(buf, nsamples):
+    """Return the largest absolute 16-bit sample value."""
+    samples = struct.unpack_from("<%dh" % nsamples, buf, 0)
+    return max(max(samples), -min(samples))
+
+
+try:
+    from audio._dsp_viper import biquad, dc_block, ramp_gain, peak_abs
+    DSP_IMPL = "viper"
+except (ImportError, SyntaxError):
+    biquad = _biquad_py
+    dc_block = _dc_block_py
+    ramp_gain = _ramp_gain_py
+    peak_abs = _peak_abs_py
+    DSP_IMPL = "python"
+
+
+def db_to_q15(db):
+    """Convert a gain in dB to Q15, capped at unity."""
+    return min(Q15_UNITY, int(Q15_UNITY * math.pow(10, db / 20) + 0.5))
+
+
+class DcBlocker:
+    """
+    One-pole DC blocking high-pass filter.
+    """
+
+    def __init__(self):
+        """Initialize the filter (disabled)."""
+        self.enabled = False
+        self._state = array('i', [0] * 4)
+
+    def reset(self):
+        """Clear the filter state."""
+        for i in range(4):
+            self._state[i] = 0
+
+    def process(self, buf, nframes):
+        """Filter stereo frames in place."""
+        dc_block(buf, nframes, self._state)
+
+
+class Biquad:
+    """
+    One EQ band: a second-order IIR section with Q13 coefficients.
+    """
+
+    def __init__(self, sample_rate):
+        """
+        Initialize the band (EQ_OFF).
+
+        Args:
+            sample_rate (int): Output sample rate in Hz
+        """
+        self._rate = sample_rate
+        self.kind = EQ_OFF
+        self.freq = 1000
+        self.gain_db = 0
+        self.q = 0.7
+        self._coefs = array('i', [1 << Q13_SHIFT, 0, 0, 0, 0])
+        self._state = array('i', [0] * 10)
+
+    @property
+    def enabled(self):
+        """True unless the band is EQ_OFF."""
+        return self.kind != EQ_OFF
+
+    def set(self, kind, freq, gain_db=0, q=0.7):
+        """
+        Design the band.
+
+        Args:
+            kind (int): EQ_OFF, EQ_PEAK, EQ_LOW_SHELF, EQ_HIGH_SHELF,
+                        EQ_LOW_PASS or EQ_HIGH_PASS
+            freq (int): Centre or corner frequency in Hz
+            gain_db (float): Boost or cut for peak and shelf bands,
+                             limited to +-EQ_MAX_GAIN_DB
+            q (float): Quality factor (peak, pass) or shelf slope
+
+        Raises:
+            ValueError: If the type, frequency or Q is out of range
+        """
+        if not EQ_OFF <= kind <= EQ_HIGH_PASS:
+            raise ValueError("Unknown EQ band type")
+        if kind != EQ_OFF and not (10 <= freq < self._rate // 2 and q > 0):
+            raise ValueError("EQ frequency or Q out of range")
+        gain_db = max(-EQ_MAX_GAIN_DB, min(EQ_MAX_GAIN_DB, gain_db))
+        if kind != EQ_OFF:
+            self._coefs = self._design(kind, freq, gain_db, q)
+            self.reset()
+        self.kind = kind
+        self.freq = freq
+        self.gain_db = gain_db
+        self.q = q
+
+    def _design(self, kind, freq, gain_db, q):
+        """Return Q13 coefficients b0, b1, b2, a1, a2 normalised by a0."""
+        a = math.pow(10, gain_db / 40)
+        w0 = 2 * math.pi * freq / self._rate
+        cos_w = math.cos(w0)
+        alpha = math.sin(w0) / (2 * q)
+        if kind == EQ_PEAK:
+            b = (1 + alpha * a, -2 * cos_w, 1 - alpha * a)
+            den = (1 + alpha / a, -2 * cos_w, 1 - alpha / a)
+        elif kind in (EQ_LOW_SHELF, EQ_HIGH_SHELF):
+            sq = 2 * math.sqrt(a) * alpha
+            sign = 1 if kind == EQ_LOW_SHELF else -1
+            b = (a * ((a + 1) - sign * (a - 1) * cos_w + sq),
+                 sign * 2 * a * ((a - 1) - sign * (a + 1) * cos_w),
+                 a * ((a + 1) - sign * (a - 1) * cos_w - sq))
+            den = ((a + 1) + sign * (a - 1) * cos_w + sq,
+                   -sign * 2 * ((a - 1) + sign * (a + 1) * cos_w),
+                   (a + 1) + sign * (a - 1) * cos_w - sq)
+        elif kind == EQ_LOW_PASS:
+            b = ((1 - cos_w) / 2, 1 - cos_w, (1 - cos_w) / 2)
+            den = (1 + alpha, -2 * cos_w, 1 - alpha)
+        else:
+            b = ((1 + cos_w) / 2, -(1 + cos_w), (1 + cos_w) / 2)
+            den = (1 + alpha, -2 * cos_w, 1 - alpha)
+        scale = (1 << Q13_SHIFT) / den[0]
+        return array('i', [int(round(c * scale)) for c in (b[0], b[1], b[2], den[1], den[2])])
+
+    def reset(self):
+        """Clear the filter state."""
+        for i in range(10):
+            self._state[i] = 0
+
+    def process(self, buf, nframes):
+        """Filter stereo frames in place."""
+        biquad(buf, nframes, self._coefs, self._state)
+
+
+class GainRamp:
+    """
+    Volume that moves toward its target over a fixed ramp time.
+    """
+
+    def __init__(self, sample_rate, ramp_ms=20):
+        """
+        Initialize the ramp at unity gain.
+
+        Args:
+            sample_rate (int): Output sample rate in Hz
+            ramp_ms (int): Time for a full-scale change, 0 to disable
+        """
+        self._rate = sample_rate
+        self.gain = Q15_UNITY
+        self.target = Q15_UNITY
+        self.set_ramp_ms(ramp_ms)
+
+    def set_ramp_ms(self, ramp_ms):
+        """Set the ramp time (0 disables the stage)."""
+        self.ramp_ms = ramp_ms
+        self.enabled = ramp_ms > 0
+        frames = max(1, ramp_ms * self._rate // 1000)
+        self._step = max(1, Q15_UNITY // frames)
+
+    def set_target(self, gain):
+        """Ramp to a Q15 gain."""
+        self.target = gain
+
+    def jump_to(self, gain):
+        """Set the gain at once (while the stage is out of the chain)."""
+        self.gain = gain
+        self.target = gain
+
+    def process(self, buf, nframes):
+        """Scale stereo frames in place."""
+        gain = self.gain
+        if gain == self.target:
+            if gain != Q15_UNITY:
+                gain_q15(buf, buf, 2 * nframes, gain)
+            return
+        self.gain = ramp_gain(buf, nframes, gain, self.target, self._step)
+
+
+class Limiter:
+    """
+    Block peak limiter with gradual release.
+    """
+
+    def __init__(self, sample_rate, threshold_db=-1, release_ms=200):
+        """
+        Initialize the limiter (disabled).
+
+        Args:
+            sample_rate (int): Output sample rate in Hz
+            threshold_db (int): Output ceiling in dBFS
+            release_ms (int): Time to recover from full reduction to unity
+        """
+        self._rate = sample_rate
+        self.enabled = False
+        self.gain = Q15_UNITY
+        self.blocks_limited = 0
+        self.min_gain = Q15_UNITY
+        self.configure(threshold_db, release_ms)
+
+    def configure(self, threshold_db, release_ms):
+        """Set the ceiling in dBFS and the release time."""
+        self.threshold_db = threshold_db
+        self.release_ms = release_ms
+        self._threshold = (db_to_q15(threshold_db) * _INT16_MAX) >> 15
+        frames = max(1, release_ms * self._rate // 1000)
+        self._release = max(1, Q15_UNITY // frames)
+
+    def reset(self):
+        """Return to unity gain and clear the counters."""
+        self.gain = Q15_UNITY
+        self.blocks_limited = 0
+        self.min_gain = Q15_UNITY
+
+    def process(self, buf, nframes):
+        """Limit stereo frames in place."""
+        gain = self.gain
+        peak = peak_abs(buf, 2 * nframes)
+        if peak > self._threshold:
+            want = (self._threshold << 15) // peak
+        else:
+            want = Q15_UNITY
+        if want < gain:
+            # Attack: reach the reduction within this block
+            target = want
+            step = (gain - want) // nframes + 1
+            self.blocks_limited += 1
+            if want < self.min_gain:
+                self.min_gain = want
+        else:
+            target = min(want, gain + self._release * nframes)
+            step = self._release
+        if gain == target:
+            if gain != Q15_UNITY:
+                gain_q15(buf, buf, 2 * nframes, gain)
+            return
+        self.gain = ramp_gain(buf, nframes, gain, target, step)
+
+
+class DspChain:
+    """
+    Ordered DSP stages on 16-bit stereo blocks.
+    """
+
+    def __init__(self, sample_rate, bands=4, ramp_ms=20):
+        """
+        Initialize the chain.
+
+        Args:
+            sample_rate (int): Output sample rate in Hz
+            bands (int): Number of EQ bands
+            ramp_ms (int): Volume ramp time, 0 to leave the ramp off
+        """
+        self.sample_rate = sample_rate
+        self.dc = DcBlocker()
+        self.eq = [Biquad(sample_rate) for _ in range(bands)]
+        self.ramp = GainRamp(sample_rate, ramp_ms)
+        self.limiter = Limiter(sample_rate)
+        self.bypass = False
+        self._update()
+
+    @property
+    def active(self):
+        """True while at least one stage runs."""
+        return bool(self._stages)
+
+    def stages(self):
+        """Return the stages in processing order."""
+        return [self.dc] + self.eq + [self.ramp, self.limiter]
+
+    def has_stage(self, stage):
+        """Return True if a stage currently runs."""
+        return stage in self._stages
+
+    def _update(self):
+        """Rebuild the tuple of running stages (swapped in with one store)."""
+        if self.bypass:
+            self._stages = ()
+        else:
+            self._stages = tuple(s for s in self.stages() if s.enabled)
+
+    def set_bypass(self, bypass):
+        """Take every stage out of the output path, or put them back."""
+        self.bypass = bool(bypass)
+        self._update()
+
+    def set_eq(self, band, kind, freq, gain_db=0, q=0.7):
+        """Configure one EQ band (see Biquad.set)."""
+        self.eq[band].set(kind, freq, gain_db, q)
+        self._update()
+
+    def set_dc_blocker(self, enabled):
+        """Enable or disable the DC blocker."""
+        if enabled and not self.dc.enabled:
+            self.dc.reset()
+        self.dc.enabled = bool(enabled)
+        self._update()
+
+    def set_ramp(self, ramp_ms):
+        """Set the volume ramp time, 0 to disable the ramp."""
+        self.ramp.set_ramp_ms(ramp_ms)
+        self._update()
+
+    def set_limiter(self, enabled, threshold_db=-1, release_ms=200):
+        """Enable or disable the limiter and set its ceiling and release."""
+        self.limiter.configure(threshold_db, release_ms)
+        if enabled and not self.limiter.enabled:
+            self.limiter.reset()
+        self.limiter.enabled = bool(enabled)
+        self._update()
+
+    def configure(self, command):
+        """
+        Apply a CMD_DSP control command.
+
+        Args:
+            command: bytes-like [CMD_DSP, sub-command, arguments...]
+
+        Returns:
+            bool: True if the command was understood and applied
+        """
+        if len(command) < 3:
+            return False
+        sub = command[1]
+        try:
+            if sub == DSP_BYPASS:
+                self.set_bypass(command[2])
+            elif sub == DSP_EQ and len(command) >= 8:
+                # band, type, freq (uint16 LE), gain dB (int8), Q x10
+                gain = command[6] - 256 if command[6] > 127 else command[6]
+                self.set_eq(command[2], command[3], command[4] | (command[5] << 8),
+                            gain, command[7] / 10)
+            elif sub == DSP_LIMITER and len(command) >= 6:
+                # enable, ceiling in dB below full scale, release ms (uint16 LE)
+                self.set_limiter(command[2], -command[3], command[4] | (command[5] << 8))
+            elif sub == DSP_RAMP and len(command) >= 4:
+                self.set_ramp(command[2] | (command[3] << 8))
+            elif sub == DSP_DC:
+                self.set_dc_blocker(command[2])
+            else:
+                return False
+        except (ValueError, IndexError) as e:
+            print(f"DSP command rejected: {e}")
+            return False
+        return True
+
+    def process(self, buf, nbytes):
+        """
+        Run the enabled stages over a block in place.
+
+        Args:
+            buf: Writable 16-bit stereo PCM
+            nbytes (int): Bytes of buf holding audio
+        """
+        nframes = nbytes >> 2
+        if nframes:
+            for stage in self._stages:
+                stage.process(buf, nframes)
+
+    def get_stats(self):
+        """Return the chain configuration and limiter activity."""
+        return {
+            'bypass': self.bypass,
+            'stages': len(self._stages),
+            'dc': self.dc.enabled,
+            'eq': [(b.kind, b.freq, b.gain_db, b.q) for b in self.eq],
+            'ramp_ms': self.ramp.ramp_ms,
+            'limiter': self.limiter.enabled,
+            'limited_blocks': self.limiter.blocks_limited,
+            'limiter_min_gain': self.limiter.min_gain,
+        }
+
+
+def benchmark_dsp(block_size=512, rounds=50, sample_rate=22050):
+    """
+    Time each stage on the device.
+
+    Prints microseconds and CPU cycles per block and the share of the
+    block's playing time, using time.ticks_us.
+    """
+    import time
+    try:
+        import machine
+        mhz = machine.freq() // 1000000
+    except (ImportError, AttributeError):
+        mhz = 0
+
+    nframes = block_size // 4
+    buf = bytearray(block_size)
+    struct.pack_into("<%dh" % (2 * nframes), buf, 0,
+                     *[(i * 997 % 20000) - 10000 for i in range(2 * nframes)])
+    period_us = nframes * 1000000 // sample_rate
+
+    chain = DspChain(sample_rate)
+    chain.set_dc_blocker(True)
+    chain.set_eq(0, EQ_PEAK, 1000, 6, 1.0)
+    chain.set_limiter(True, -6)
+    chain.ramp.jump_to(Q15_UNITY // 2)
+    chain.ramp.set_target(Q15_UNITY)
+    chain.ramp._step = 1    # Keep ramping for the whole run
+    cases = (("dc blocker", chain.dc), ("eq band", chain.eq[0]),
+             ("gain ramp", chain.ramp), ("limiter", chain.limiter))
+
+    print(f"DSP kernels: {DSP_IMPL}; {block_size}-byte blocks ({period_us} us of audio)")
+    for name, stage in cases:
+        start = time.ticks_us()
+        for _ in range(rounds):
+            stage.process(buf, nframes)
+        us = time.ticks_diff(time.ticks_us(), start) / rounds
+        cycles = f", {int(us * mhz)} cycles" if mhz else ""
+        print(f"  {name:<11}{us:8.1f} us/block{cycles} ({100 * us / period_us:.1f}%)")
+
+
+if __name__ == "__main__":
+    benchmark_dsp()
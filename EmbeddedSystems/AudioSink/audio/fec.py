@@ -0,0 +1,226 @@
+"""
+XOR Parity Forward Error Correction
+
+Rebuilds single lost audio packets. The sender splits the stream into
+groups of N packets and after every group sends one parity packet, the
+XOR of the group's payloads. If one packet of a group is lost, the XOR
+of the parity packet and the other N-1 payloads is the missing one.
+Two or more losses in a group are not recoverable and are left as gaps.
+
+Frame layout with FEC enabled (N negotiated with CMD_SET_FEC):
+    data:   group (uint8), index 0..N-1 (uint8), payload
+    parity: group (uint8), 0xFF (uint8), XOR of the payload lengths
+            (uint16 LE), XOR of the payloads (zero-padded to the longest)
+
+Group numbers count up by one per group and wrap at 256. The payload is
+whatever the path carried without FEC (raw audio for BLEAudioSink, the
+sequence header and audio for ble/ble_audio.py). The matching encoder
+is tools/fec_encode.py.
+
+Packets are passed on in order. While the group has no gap, each data
+packet goes straight through without a copy; after a gap, later packets
+of the group are held in preallocated slots until the parity packet
+rebuilds the missing one or the next group starts. Payloads are folded
+into a running XOR as they arrive, so nothing already passed on needs
+to be kept. On ports with the viper code emitter the XOR loop comes
+from audio/_fec_viper.py; everywhere else the portable version below
+is used.
+"""
+
+from array import array
+
+FEC_HEADER_BYTES = 2
+FEC_PARITY_INDEX = 0xFF
+FEC_PARITY_HEADER_BYTES = 4     # Header and the XOR of the lengths
+
+
+def _xor_into_py(dst, src, n):
+    """XOR the first n bytes of src into dst."""
+    value = int.from_bytes(dst[:n], 'little') ^ int.from_bytes(src[:n], 'little')
+    dst[:n] = value.to_bytes(n, 'little')
+
+
+try:
+    from audio._fec_viper import xor_into
+    FEC_IMPL = "viper"
+except (ImportError, SyntaxError):
+    xor_into = _xor_into_py
+    FEC_IMPL = "python"
+
+
+class FecDecoder:
+    """
+    In-order receiver for XOR parity protected packet groups.
+    """
+
+    def __init__(self, max_group, max_payload):
+        """
+        Initialize the decoder.
+
+        Args:
+            max_group (int): Largest group size accepted from the sender
+            max_payload (int): Largest payload of a data packet in bytes
+        """
+        self._max_group = max_group
+        self._max_payload = max_payload
+
+        # Running XOR of the group and packets held back behind a gap
+        self._acc = bytearray(max_payload)
+        self._acc_mv = memoryview(self._acc)
+        self._zeros = memoryview(bytearray(max_payload))
+        self._held = [bytearray(max_payload) for _ in range(max_group - 1)]
+        self._held_mv = [memoryview(slot) for slot in self._held]
+        self._held_len = array('H', [0] * max_group)
+
+        self.group_size = 0
+        self.reset_stats()
+        self.reset()
+
+    def reset_stats(self):
+        """Reset the decoder statistics."""
+        self.parity_received = 0
+        self.recovered = 0
+        self.unrecovered = 0
+        self.duplicates = 0
+        self.late = 0
+        self.invalid = 0
+
+    def reset(self):
+        """Forget the current group (new stream)."""
+        self._group = -1        # Group being received, -1 before the first
+        self._start()
+
+    def set_group_size(self, size):
+        """
+        Set the group size the sender uses.
+
+        Args:
+            size (int): Data packets per parity packet, 0 to turn FEC off
+
+        Returns:
+            int: Group size accepted: size capped at max_group, or 0 (off)
+                 for sizes below 2
+        """
+        self.group_size = min(size, self._max_group) if size >= 2 else 0
+        self.reset()
+        return self.group_size
+
+    def feed(self, frame, emit):
+        """
+        Receive one FEC frame and pass on the packets it completes.
+
+        Args:
+            frame: bytes-like data or parity frame
+            emit (callable): emit(payload) called in order for every
+                             received or rebuilt packet; the view is only
+                             valid during the call
+        """
+        n = len(frame)
+        if n < FEC_HEADER_BYTES:
+            self.invalid += 1
+            return
+        group = frame[0]
+        index = frame[1]
+
+        if group != self._group:
+            if self._group >= 0 and (group - self._group) & 0xFF >= 128:
+                # From a group that has already been passed on
+                self.late += 1
+                return
+            self._finish(emit)
+            self._group = group
+            self._start()
+
+        if index == FEC_PARITY_INDEX:
+            plen = n - FEC_PARITY_HEADER_BYTES
+            if plen < 0 or plen > self._max_payload:
+                self.invalid += 1
+                return
+            if self._parity:
+                self.duplicates += 1
+                return
+            self._parity = True
+            self.parity_received += 1
+            self._acc_len ^= frame[2] | (frame[3] << 8)
+            xor_into(self._acc_mv, memoryview(frame)[FEC_PARITY_HEADER_BYTES:], plen)
+        else:
+            plen = n - FEC_HEADER_BYTES
+            if index >= self.group_size or plen > self._max_payload:
+                self.invalid += 1
+                return
+            bit = 1 << index
+            if self._have & bit:
+                self.duplicates += 1
+                return
+            self._have |= bit
+            self._count += 1
+            payload = memoryview(frame)[FEC_HEADER_BYTES:]
+            self._acc_len ^= plen
+            xor_into(self._acc_mv, payload, plen)
+            if index == self._next:
+                emit(payload)
+                self._next += 1
+                self._release(emit)
+            else:
+                # Behind a gap: keep it until the gap is filled or given up
+                self._held_mv[index - 1][0:plen] = payload
+                self._held_len[index] = plen
+                self._held_mask |= bit
+
+        if self._parity and self._count == self.group_size - 1:
+            # The one missing packet is the first not yet passed on
+            length = self._acc_len
+            if length <= self._max_payload:
+                self._have |= 1 << self._next
+                self._count += 1
+                self.recovered += 1
+                emit(self._acc_mv[0:length])
+                self._next += 1
+                self._release(emit)
+
+    def _start(self):
+        """Begin receiving a group."""
+        self._next = 0          # First index not passed on yet
+        self._have = 0          # Bit per data packet received or rebuilt
+        self._count = 0
+        self._held_mask = 0
+        self._parity = False
+        self._acc_len = 0
+        self._acc_mv[:] = self._zeros
+
+    def _release(self, emit):
+        """Pass on held packets that now follow without a gap."""
+        held = self._held_mask
+        while held and held & (1 << self._next):
+            index = self._next
+            emit(self._held_mv[index - 1][0:self._held_len[index]])
+            held &= ~(1 << index)
+            self._next = index + 1
+        self._held_mask = held
+
+    def _finish(self, emit):
+        """Give up on the gaps of the current group and pass on what is held."""
+        if self._group < 0:
+            return
+        self.unrecovered += self.group_size - self._count
+        held = self._held_mask
+        index = self._next
+        while held:
+            bit = 1 << index
+            if held & bit:
+                emit(self._held_mv[index - 1][0:self._held_len[index]])
+                held &= ~bit
+            index += 1
+        self._held_mask = 0
+
+    def get_stats(self):
+        """Return decoder statistics."""
+        return {
+            'group_size': self.group_size,
+            'parity': self.parity_received,
+            'recovered': self.recovered,
+            'unrecovered': self.unrecovered,
+            'duplicates': self.duplicates,
+            'late': self.late,
+            'invalid': self.invalid,
+        }
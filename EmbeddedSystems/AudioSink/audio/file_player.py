@@ -0,0 +1,319 @@
+"""
+Flash File Player
+
+Streams a WAV or raw PCM file from the Pico filesystem into I2SDriver,
+the playback engine that BLE audio goes through, for local playback and
+for soak tests of the I2S path at full rate without the radio.
+
+- parse_wav() walks the RIFF chunks of a WAV file, reads the fmt chunk
+  and leaves the file positioned at the start of the PCM data. Raw
+  files are played with an explicit (rate, bits, channels) format.
+- PCM is read with readinto() into one buffer allocated with the
+  player, so streaming allocates nothing per chunk. Only whole frames
+  are passed on; a trailing partial frame at the end of a file is
+  dropped.
+- Writes wait for space in the driver's ring like the BLE ingest task,
+  so the file is played exactly at the I2S rate. A stopped driver is
+  started once its ring is full, so playback begins without an
+  underrun. 16-bit files at another supported rate go through the
+  polyphase resampler.
+- Time spent inside readinto() is measured on its own with
+  time.ticks_us, so filesystem throughput can be told apart from
+  playback; read_throughput() measures it with no playback at all.
+
+The driver's input format is shared by all of its sources, so a file
+should match the BLE stream's format when both play through the mixer.
+"""
+
+import os
+import struct
+import time
+import uasyncio as asyncio
+
+from audio.resampler import Resampler, SUPPORTED_RATES
+
+# WAV format tags accepted in the fmt chunk
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+DEFAULT_CHUNK_SIZE = 1024   # Bytes per readinto()
+
+
+def parse_wav(f):
+    """
+    Read a WAV header and seek to the PCM data.
+
+    Args:
+        f: File opened in binary mode, positioned at its start
+
+    Returns:
+        tuple: (sample rate, bits, channels, data bytes)
+    """
+    header = f.read(12)
+    if len(header) < 12 or header[0:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise ValueError("WAV file has no data chunk")
+        size = struct.unpack("<I", chunk[4:8])[0]
+        if chunk[0:4] == b"fmt ":
+            body = f.read(size + (size & 1))
+            if len(body) < 16:
+                raise ValueError("WAV fmt chunk too short")
+            tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[0:16])
+            if tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE):
+                raise ValueError("Unsupported WAV encoding 0x%04x" % tag)
+            fmt = (rate, bits, channels)
+        elif chunk[0:4] == b"data":
+            if fmt is None:
+                raise ValueError("WAV data before fmt chunk")
+            return fmt + (size,)
+        else:
+            # Chunks are padded to an even length
+            f.seek(size + (size & 1), 1)
+
+
+def wav_header(rate, bits, channels, data_bytes):
+    """
+    Build the 44-byte header of a PCM WAV file.
+
+    Args:
+        rate (int): Sample rate in Hz
+        bits (int): Bits per sample (8 or 16)
+        channels (int): Channel count
+        data_bytes (int): Size of the PCM data that follows
+
+    Returns:
+        bytes: RIFF, fmt and data chunk headers
+    """
+    align = bits // 8 * channels
+    return (b"RIFF" + struct.pack("<I", 36 + data_bytes) + b"WAVE" +
+            b"fmt " + struct.pack("<IHHIIHH", 16, WAVE_FORMAT_PCM, channels,
+                                  rate, rate * align, align, bits) +
+            b"data" + struct.pack("<I", data_bytes))
+
+
+def read_throughput(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Measure how fast a file can be read, with no playback.
+
+    Args:
+        path (str): File to read
+        chunk_size (int): Bytes per readinto()
+
+    Returns:
+        tuple: (bytes read, microseconds spent reading)
+    """
+    buf = bytearray(chunk_size)
+    total = 0
+    with open(path, "rb") as f:
+        start = time.ticks_us()
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            total += n
+        us = time.ticks_diff(time.ticks_us(), start)
+    return total, us
+
+
+class FilePlayer:
+    """
+    Streams PCM files from flash into an I2SDriver source.
+    """
+
+    def __init__(self, driver, chunk_size=DEFAULT_CHUNK_SIZE, source=0):
+        """
+        Initialize the player.
+
+        Args:
+            driver (I2SDriver): Driver the audio is played through
+            chunk_size (int): Bytes per filesystem read
+            source (int): Mixer source of the driver to write to
+        """
+        self.driver = driver
+        self.source = source
+        self._buf = bytearray(chunk_size)
+        self._view = memoryview(self._buf)
+        self._resampler = None
+        self._resampled = None
+        self.is_playing = False
+        self.format = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zero the read and playback counters."""
+        self.bytes_read = 0
+        self.reads = 0
+        self.read_us = 0
+        self.bytes_played = 0
+        self.buffer_waits = 0
+        self.loops = 0
+
+    def open_format(self, f, fmt=None):
+        """
+        Work out the format of an open file and set the driver up for it.
+
+        Args:
+            f: File opened in binary mode, positioned at its start
+            fmt (tuple): (rate, bits, channels) of a raw file, or None
+                to read a WAV header
+
+        Returns:
+            int: Bytes of PCM data from the current position
+        """
+        if fmt is None:
+            rate, bits, channels, data_bytes = parse_wav(f)
+        else:
+            rate, bits, channels = fmt
+            start = f.tell()
+            f.seek(0, 2)
+            data_bytes = f.tell() - start
+            f.seek(start)
+
+        self.driver.set_input_format(bits, channels)
+        out_rate = self.driver.sample_rate
+        frame_bytes = bits // 8 * channels
+        if rate == out_rate:
+            self._resampler = None
+            self._resampled = None
+        elif bits == 16 and rate in SUPPORTED_RATES:
+            max_frames = len(self._buf) // frame_bytes
+            self._resampler = Resampler(rate, out_rate, channels, max_frames)
+            self._resampled = bytearray(self._resampler.max_output(max_frames) * frame_bytes)
+        else:
+            raise ValueError("Cannot play %d Hz %d-bit audio at %d Hz" % (rate, bits, out_rate))
+        self.format = (rate, bits, channels)
+        return data_bytes
+
+    async def play(self, path, loops=1, fmt=None):
+        """
+        Stream a file into the driver.
+
+        Args:
+            path (str): WAV file, or raw PCM file when fmt is given
+            loops (int): Times to play the file (0 = until stop())
+            fmt (tuple): (rate, bits, channels) of a raw file
+
+        Returns:
+            int: Times the file was played to the end
+        """
+        self.is_playing = True
+        played = 0
+        with open(path, "rb") as f:
+            data_bytes = self.open_format(f, fmt)
+            start = f.tell()
+            frame_bytes = self.format[1] // 8 * self.format[2]
+            chunk = len(self._buf) - len(self._buf) % frame_bytes
+            view = self._view
+            while self.is_playing and (loops == 0 or played < loops):
+                remaining = data_bytes
+                while remaining >= frame_bytes and self.is_playing:
+                    n = min(chunk, remaining)
+                    t0 = time.ticks_us()
+                    got = f.readinto(view[:n])
+                    self.read_us += time.ticks_diff(time.ticks_us(), t0)
+                    if not got:
+                        break
+                    self.reads += 1
+                    self.bytes_read += got
+                    remaining -= got
+                    got -= got % frame_bytes
+                    if self._resampler:
+                        out = self._resampler.process(view[:got], got // frame_bytes,
+                                                      self._resampled)
+                        await self._write(memoryview(self._resampled)[:out * frame_bytes])
+                    else:
+                        await self._write(view[:got])
+                if not self.is_playing:
+                    break
+                played += 1
+                self.loops += 1
+                f.seek(start)
+        if self.is_playing and not self.driver.is_playing:
+            # A file shorter than the ring never filled it
+            await self.driver.start()
+        self.is_playing = False
+        return played
+
+    def stop(self):
+        """Stop play() after the chunk in progress."""
+        self.is_playing = False
+
+    async def _write(self, data):
+        """Write PCM to the driver, waiting while its buffer is full."""
+        size = len(data)
+        offset = 0
+        while offset < size and self.is_playing:
+            space = self.driver.space(self.source)
+            if not space:
+                if not self.driver.is_playing:
+                    # Ring primed: start the output
+                    await self.driver.start()
+                    continue
+                self.buffer_waits += 1
+                await asyncio.sleep_ms(5)
+                continue
+            n = min(size - offset, space)
+            await self.driver.write(data[offset:offset + n], self.source)
+            offset += n
+        self.bytes_played += offset
+
+    def get_stats(self):
+        """
+        Get read and playback statistics.
+
+        Returns:
+            dict: Bytes read and played, reads, filesystem read time and rate
+        """
+        kbps = self.bytes_read * 1000 // self.read_us if self.read_us else 0
+        return {
+            "format": self.format,
+            "loops": self.loops,
+            "bytes_read": self.bytes_read,
+            "bytes_played": self.bytes_played,
+            "reads": self.reads,
+            "read_us": self.read_us,
+            "read_kbytes_per_sec": kbps,
+            "buffer_waits": self.buffer_waits,
+        }
+
+
+def test_file_player(path, loops=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Play a file through the I2S pins in config.py and report throughput.
+
+    Measures the filesystem on its own first, then plays the file and
+    prints the player's and the playback engine's statistics.
+    """
+    from audio.i2s_driver import I2SDriver
+    from config import (I2S_BCK_PIN, I2S_WS_PIN, I2S_SD_PIN, AUDIO_SAMPLE_RATE,
+                        AUDIO_BUFFER_SIZE)
+
+    size = os.stat(path)[6]
+    total, us = read_throughput(path, chunk_size)
+    print(f"{path}: {size} bytes, read in {us} us "
+          f"({total * 1000 // max(us, 1)} KB/s with {chunk_size}-byte reads)")
+
+    driver = I2SDriver(I2S_BCK_PIN, I2S_WS_PIN, I2S_SD_PIN, AUDIO_SAMPLE_RATE,
+                       buffer_size=AUDIO_BUFFER_SIZE)
+    player = FilePlayer(driver, chunk_size)
+
+    async def run():
+        try:
+            await player.play(path, loops)
+            # Let the buffered tail play out
+            await asyncio.sleep_ms(100)
+        finally:
+            await driver.stop()
+            driver.deinit()
+
+    asyncio.run(run())
+    print(f"Player: {player.get_stats()}")
+    print(f"Engine: {driver.get_stats()}")
+
+
+if __name__ == "__main__":
+    test_file_player("test.wav")
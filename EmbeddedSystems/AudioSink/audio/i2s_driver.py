@@ -10,8 +10,20 @@ import machine
 import uasyncio as asyncio
 from machine import Pin
 import struct
+import time
 import gc
 
+from audio.ring_buffer import RingBuffer
+from audio.playback_engine import PlaybackEngine
+from audio.core1_engine import Core1PlaybackEngine
+from audio.mixer import Mixer
+from audio.dsp import DspChain
+from audio.sample_kernels import Q15_UNITY, volume_to_q15, select_kernel
+
+# The kernels always produce 16-bit stereo for the I2S peripheral
+OUTPUT_BITS = 16
+OUTPUT_FRAME_BYTES = OUTPUT_BITS // 8 * 2
+
 class I2SDriver:
     """
     I2S Audio Driver for Raspberry Pi Pico W to UDA1334A decoder.
@@ -19,7 +31,8 @@ class I2SDriver:
     """
     
     def __init__(self, bck_pin, ws_pin, sd_pin, sample_rate=22050, 
-                 bits=16, channels=2, buffer_size=1024):
+                 bits=16, channels=2, buffer_size=1024, dual_core=False, sources=1,
+                 dsp_bands=4, volume_ramp_ms=20):
         """
         Initialize the I2S audio driver.
         
@@ -28,9 +41,13 @@ class I2SDriver:
             ws_pin (int): I2S word select pin number
             sd_pin (int): I2S data pin number
             sample_rate (int): Audio sample rate in Hz (default: 22050)
-            bits (int): Bit depth (default: 16)
-            channels (int): Number of audio channels (default: 2 for stereo)
+            bits (int): Input bit depth, 8 or 16 (default: 16)
+            channels (int): Input channels, 1 or 2 (default: 2 for stereo)
             buffer_size (int): Audio buffer size in bytes (default: 1024)
+            dual_core (bool): Refill I2S from a loop on core 1 instead of the I2S IRQ
+            sources (int): Streams mixed into the output, each with its own buffer
+            dsp_bands (int): EQ bands in the DSP chain (default: 4)
+            volume_ramp_ms (int): Volume change ramp time, 0 for instant changes
         """
         self.bck_pin = bck_pin
         self.ws_pin = ws_pin
@@ -42,10 +59,20 @@ class I2SDriver:
         
         # Create audio buffer
         gc.collect()  # Force garbage collection before allocation
-        self.buffer = array.array('H', [0] * (self.buffer_size // 2))
-        self.buffer_index = 0
+        self.buffer = RingBuffer(self.buffer_size)
         self.buffer_full = False
         
+        # Further sources get a buffer each; self.buffer is source 0
+        self._buffers = [self.buffer]
+        for _ in range(sources - 1):
+            self._buffers.append(RingBuffer(self.buffer_size))
+        
+        # Sample conversion kernel for the input format
+        self.set_input_format(bits, channels)
+        
+        # Preallocated staging buffer for sample conversion
+        self._scratch = bytearray(self.buffer_size)
+        
         # Initialize I2S peripheral
         self.i2s = machine.I2S(
             0,                      # I2S peripheral ID
@@ -53,72 +80,159 @@ class I2SDriver:
             ws=Pin(ws_pin),         # Word select pin
             sd=Pin(sd_pin),         # Serial data pin
             mode=machine.I2S.TX,    # Transmit mode
-            bits=bits,              # Bit depth
+            bits=OUTPUT_BITS,       # Bit depth
             format=machine.I2S.STEREO,  # Audio format
             rate=sample_rate,       # Sample rate
             ibuf=self.buffer_size   # Internal buffer size
         )
         
+        # Output refilled straight from the ring buffer, by the I2S IRQ or by core 1;
+        # with several sources the mixer sums their buffers instead
+        block_size = max(64, (self.buffer_size // 4) & ~3)
+        self.mixer = None
+        fill = self.buffer.read_into
+        if sources > 1:
+            self.mixer = Mixer(self._buffers, block_size, prefill=2 * block_size)
+            fill = self.mixer.fill
+        self._source_fill = fill
+        self.dual_core = dual_core
+        bytes_per_sec = sample_rate * OUTPUT_FRAME_BYTES
+        if dual_core:
+            self.engine = Core1PlaybackEngine(self.i2s, fill, block_size, bytes_per_sec)
+        else:
+            self.engine = PlaybackEngine(self.i2s, fill, block_size, bytes_per_sec)
+        
+        # Silence written ahead of timestamped audio (pad)
+        self._silence = bytearray(block_size)
+        
         # State tracking
         self.is_playing = False
         self.volume = 1.0  # Volume scaling factor (1.0 = 100%)
+        self._gain = Q15_UNITY  # Volume as Q15 fixed-point gain
+        
+        # DSP stages on the output; the engine only goes through the chain
+        # while a stage is enabled, and the volume moves to the gain ramp
+        self.dsp = DspChain(sample_rate, dsp_bands, volume_ramp_ms)
+        self._volume_in_dsp = False
+        self.update_dsp()
         
         # Create lock for buffer access
         self.buffer_lock = asyncio.Lock()
+        
+        # Optional audio/latency_trace.LatencyTrace told about buffered bytes
+        self.trace = None
     
     async def start(self):
         """Start audio playback."""
         if not self.is_playing:
             self.is_playing = True
-            asyncio.create_task(self._playback_task())
+            self.engine.start()
     
     async def stop(self):
         """Stop audio playback."""
         self.is_playing = False
+        self.engine.stop()
         self.clear_buffer()
     
-    async def write(self, data):
+    async def write(self, data, source=0):
         """
         Write audio data to buffer.
         
         Args:
             data (bytes): PCM audio data
+            source (int): Source whose buffer takes the data (default: 0)
         
         Returns:
             bool: True if buffer is full, False otherwise
         """
+        buffer = self._buffers[source]
         async with self.buffer_lock:
-            bytes_written = 0
-            # Process only what fits in the remaining buffer
-            max_bytes = min(len(data), (len(self.buffer) - self.buffer_index) * 2)
+            # Process only whole input frames that fit in the remaining buffer
+            max_bytes = min(len(data), buffer.free() // self._expand)
+            max_bytes -= max_bytes % self._frame_bytes
+            out_bytes = max_bytes * self._expand
             
-            for i in range(0, max_bytes, 2):
-                if i + 1 < len(data):
-                    # Convert bytes to 16-bit sample and apply volume
-                    sample = struct.unpack('<h', data[i:i+2])[0]
-                    sample = int(sample * self.volume)
-                    
-                    # Write to buffer
-                    if self.buffer_index < len(self.buffer):
-                        self.buffer[self.buffer_index] = sample & 0xFFFF
-                        self.buffer_index += 1
-                        bytes_written += 2
-                    else:
-                        self.buffer_full = True
-                        break
+            if self._expand == 1 and self._gain == Q15_UNITY:
+                # No conversion needed, copy straight into the ring
+                buffer.write_into(data, max_bytes)
+            elif max_bytes:
+                # Convert the whole block into the staging buffer, then copy
+                self._kernel(data, self._scratch, max_bytes // self._sample_bytes, self._gain)
+                buffer.write_into(self._scratch, out_bytes)
             
-            # Mark buffer as full if we filled it completely
-            if self.buffer_index >= len(self.buffer):
-                self.buffer_full = True
+            if self.trace:
+                self.trace.wrote(out_bytes)
+            
+            # Mark buffer as full if the data did not fit or it is now full
+            self.buffer_full = max_bytes < len(data) or buffer.is_full()
                 
             return self.buffer_full
     
-    def clear_buffer(self):
-        """Clear the audio buffer."""
-        for i in range(len(self.buffer)):
-            self.buffer[i] = 0
-        self.buffer_index = 0
+    def space(self, source=0):
+        """
+        Get how much input data write() can accept without dropping any.
+        
+        Args:
+            source (int): Source whose buffer is checked (default: 0)
+        
+        Returns:
+            int: Input bytes (whole frames) that fit in the buffer
+        """
+        space = self._buffers[source].free() // self._expand
+        return space - space % self._frame_bytes
+    
+    def play_time_us(self, source=0):
+        """
+        Get the local time at which audio written to a source now plays.
+        
+        Args:
+            source (int): Source whose buffer is checked (default: 0)
+        
+        Returns:
+            int: ticks_us() of the next byte written, or None while stopped
+        """
+        if not self.engine.running:
+            return None
+        frames = self._buffers[source].count() // OUTPUT_FRAME_BYTES
+        return time.ticks_add(self.engine.due_us, frames * 1000000 // self.sample_rate)
+    
+    def pad(self, frames, source=0):
+        """
+        Write silence to a source's buffer, as much of it as fits.
+        
+        Args:
+            frames (int): Output frames of silence
+            source (int): Source whose buffer takes the silence (default: 0)
+        
+        Returns:
+            int: Frames written
+        """
+        buffer = self._buffers[source]
+        frames = min(frames, buffer.free() // OUTPUT_FRAME_BYTES)
+        left = frames * OUTPUT_FRAME_BYTES
+        while left:
+            left -= buffer.write_into(self._silence, min(left, len(self._silence)))
+        if self.trace:
+            self.trace.wrote(frames * OUTPUT_FRAME_BYTES)
+        return frames
+    
+    def clear_buffer(self, source=None):
+        """
+        Clear the audio buffer.
+        
+        Args:
+            source (int): Source whose buffer is cleared (default: all)
+        """
+        buffers = self._buffers if source is None else (self._buffers[source],)
+        for buffer in buffers:
+            if self.dual_core and self.engine.running:
+                # Core 1 owns the read index; let it skip the data
+                buffer.discard()
+            else:
+                buffer.clear()
         self.buffer_full = False
+        if self.trace:
+            self.trace.discarded()
     
     def set_volume(self, volume):
         """
@@ -129,30 +243,93 @@ class I2SDriver:
         """
         if 0.0 <= volume <= 1.0:
             self.volume = volume
+            self._apply_volume()
     
-    async def _playback_task(self):
-        """Background task for audio playback."""
-        try:
-            while self.is_playing:
-                if self.buffer_index > 0:
-                    async with self.buffer_lock:
-                        # Write buffer to I2S
-                        self.i2s.write(self.buffer[:self.buffer_index])
-                        self.buffer_index = 0
-                        self.buffer_full = False
-                        # Force garbage collection after each write
-                        gc.collect()
-                else:
-                    # No data, yield to other tasks
-                    await asyncio.sleep_ms(5)
-        except Exception as e:
-            print(f"I2S playback error: {e}")
-            self.is_playing = False
+    def _apply_volume(self):
+        """Apply the volume in the gain ramp if it runs, else on write."""
+        gain = volume_to_q15(self.volume)
+        if self._volume_in_dsp:
+            self.dsp.ramp.set_target(gain)
+            self._gain = Q15_UNITY
+        else:
+            self._gain = gain
+    
+    def configure_dsp(self, command):
+        """
+        Apply a CMD_DSP control command to the DSP chain.
+        
+        Args:
+            command (bytes): [CMD_DSP, sub-command, arguments...]
+        
+        Returns:
+            bool: True if the command was applied
+        """
+        if not self.dsp.configure(command):
+            return False
+        self.update_dsp()
+        return True
+    
+    def update_dsp(self):
+        """Put the DSP chain into the output path, or take it out when idle."""
+        self.engine.set_fill(self._dsp_fill if self.dsp.active else self._source_fill)
+        in_dsp = self.dsp.has_stage(self.dsp.ramp)
+        if in_dsp and not self._volume_in_dsp:
+            # Hand the volume over from the write path without a jump
+            self.dsp.ramp.jump_to(self._gain)
+        self._volume_in_dsp = in_dsp
+        self._apply_volume()
+    
+    def _dsp_fill(self, buf):
+        """Engine fill callback: source data, then the DSP chain in place."""
+        n = self._source_fill(buf)
+        self.dsp.process(buf, n)
+        return n
+    
+    def set_source_gain(self, source, volume):
+        """
+        Set the mixing gain of one source (with several sources).
+        
+        Args:
+            source (int): Source index
+            volume (float): Gain from 0.0 to 1.0
+        """
+        if self.mixer and 0.0 <= volume <= 1.0:
+            self.mixer.set_gain(source, volume_to_q15(volume))
+    
+    def set_input_format(self, bits=16, channels=2):
+        """
+        Set the format of data passed to write().
+        
+        Input is converted to 16-bit stereo before it reaches the buffer.
+        
+        Args:
+            bits (int): Input bit depth (8 = unsigned, 16 = signed)
+            channels (int): Input channels (1 = mono, 2 = stereo)
+        """
+        self._kernel, self._sample_bytes, self._expand = select_kernel(bits, channels)
+        self._frame_bytes = self._sample_bytes * channels
+        self.bits = bits
+        self.channels = channels
+    
+    def get_stats(self):
+        """
+        Get playback statistics.
+        
+        Returns:
+            dict: Blocks played, underruns, buffer level, mixer and DSP statistics
+        """
+        stats = self.engine.get_stats()
+        stats['buffer_level'] = self.buffer.level()
+        if self.mixer:
+            stats['mixer'] = self.mixer.get_stats()
+        stats['dsp'] = self.dsp.get_stats()
+        return stats
     
     def deinit(self):
         """Deinitialize the I2S driver."""
         try:
             self.is_playing = False
+            self.engine.stop()
             self.i2s.deinit()
         except:
             pass
@@ -163,53 +340,35 @@ def test_i2s_driver(bck_pin=18, ws_pin=19, sd_pin=20):
     Test function for I2S driver.
     Generates a simple sine wave and plays it.
     """
-    import math
-    import time
+    from audio.oscillator import Oscillator
     
     # Create I2S driver
     i2s = I2SDriver(bck_pin, ws_pin, sd_pin)
     
-    # Generate a simple sine wave (440 Hz tone) in smaller chunks
+    # Play a 440 Hz tone from the wavetable oscillator, one small chunk at a time
     async def play_test_tone(frequency=440, duration=1):
         print("Starting I2S test...")
         await i2s.start()
         
-        # Calculate parameters
-        chunk_samples = 256  # Small chunk to avoid large allocations
-        total_samples = int(i2s.sample_rate * duration)
-        chunks_needed = total_samples // chunk_samples
-        
-        # Generate and play each chunk separately
-        for chunk in range(chunks_needed):
-            # Generate this chunk of samples
-            chunk_data = array.array('h')
-            for i in range(chunk_samples):
-                t = (chunk * chunk_samples + i) / i2s.sample_rate
-                value = int(32767 * 0.5 * math.sin(2 * math.pi * frequency * t))  # Reduced amplitude
-                chunk_data.append(value)  # Left channel
-                chunk_data.append(value)  # Right channel
-            
-            # Convert to bytes and write
-            chunk_bytes = bytearray(2 * len(chunk_data))
-            for i, sample in enumerate(chunk_data):
-                struct.pack_into('<h', chunk_bytes, i*2, sample)
+        osc = Oscillator(i2s.sample_rate, freq=frequency, amplitude=0.5)  # Reduced amplitude
+        chunk_frames = 256  # Small chunk to avoid large allocations
+        chunk = bytearray(chunk_frames * 4)
+        view = memoryview(chunk)
+        chunks_needed = int(i2s.sample_rate * duration) // chunk_frames
+        
+        for _ in range(chunks_needed):
+            osc.fill(chunk, chunk_frames)
             
-            # Write to I2S (with back pressure)
-            buffer_full = False
-            while not buffer_full and len(chunk_bytes) > 0:
-                # Write in smaller pieces
-                write_size = min(len(chunk_bytes), 128)
-                buffer_full = await i2s.write(chunk_bytes[:write_size])
-                chunk_bytes = chunk_bytes[write_size:]
-                
-                if buffer_full:
+            # Write to I2S, waiting while the buffer is full
+            offset = 0
+            while offset < len(chunk):
+                space = i2s.space()
+                if not space:
                     await asyncio.sleep_ms(10)  # Wait for buffer to drain
-            
-            # Force garbage collection after each chunk
-            gc.collect()
-            
-            # Allow time for playback to catch up
-            await asyncio.sleep_ms(10)
+                    continue
+                n = min(len(chunk) - offset, space)
+                await i2s.write(view[offset:offset + n])
+                offset += n
         
         # Let it finish playing
         await asyncio.sleep(1)
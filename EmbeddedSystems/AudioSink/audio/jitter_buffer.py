@@ -0,0 +1,368 @@
+"""
+Adaptive Jitter Buffer
+
+Reorders incoming audio packets by their 16-bit sequence number and
+paces playout so that the amount of buffered audio stays close to a
+target latency.
+
+- Packets are stored in preallocated slots indexed by sequence number,
+  so late and out-of-order packets are put back in order.
+- Playout waits until the target depth is reached (prefill) and goes
+  back to prefill after an underrun.
+- Long-run clock drift between the sender and the sink is absorbed by
+  dropping or repeating single sample frames while the averaged depth
+  stays outside a deadband around the target.
+- Packets can carry a presentation timestamp. With timed set, the
+  caller schedules playout from the timestamps (next_pts) and the
+  depth-based prefill and drift compensation are left out.
+
+The producer (put) and the consumer (pop_into) each own their own
+counters, following the same single-producer/single-consumer rule as
+audio/ring_buffer.py. put() publishes a packet by storing its sequence
+number only after the payload and length, and counts it afterwards, so
+a consumer on the other core never takes a slot that is still being
+written.
+"""
+
+from array import array
+
+_SEQ_MOD = 0x10000
+_SEQ_HALF = 0x8000
+_EMPTY = -1
+
+# Playout results besides a byte count
+UNDERRUN = 0
+LOST = -1
+
+
+class JitterBuffer:
+    """
+    Sequence-indexed jitter buffer with drift compensation.
+    """
+
+    def __init__(self, slot_count, slot_size, sample_rate, frame_bytes,
+                 target_ms, adjust_interval=4):
+        """
+        Initialize the jitter buffer.
+
+        Args:
+            slot_count (int): Number of packet slots (power of two)
+            slot_size (int): Maximum payload bytes per packet
+            sample_rate (int): Playback sample rate in Hz
+            frame_bytes (int): Bytes per sample frame (all channels)
+            target_ms (int): Target buffered audio in milliseconds
+            adjust_interval (int): Minimum packets between drift corrections
+        """
+        if slot_count & (slot_count - 1):
+            raise ValueError("Slot count must be a power of two")
+
+        self._slot_count = slot_count
+        self._slot_mask = slot_count - 1
+        self._slot_size = slot_size
+        self._frame_bytes = frame_bytes
+        self._adjust_interval = adjust_interval
+
+        # Preallocated packet storage
+        self._slots = [bytearray(slot_size) for _ in range(slot_count)]
+        self._views = [memoryview(slot) for slot in self._slots]
+        self._lengths = array('H', [0] * slot_count)
+        self._pts = array('i', [0] * slot_count)
+        self._slot_seq = array('i', [_EMPTY] * slot_count)
+
+        # Playout times come from the caller (presentation timestamps)
+        self.timed = False
+
+        # Target depth in bytes, limited to what the slots can hold
+        self._bytes_per_sec = sample_rate * frame_bytes
+        self._max_packets = (slot_count * 3) // 4
+        self._max_target = self._max_packets * slot_size
+        self.set_target_ms(target_ms)
+
+        self.reset()
+
+    def reset(self):
+        """Discard all packets and wait for a new stream."""
+        for i in range(self._slot_count):
+            self._slot_seq[i] = _EMPTY
+        self._next_seq = _EMPTY
+        self._resync_seq = _EMPTY
+        self._prefill = True
+        self._target_bytes = self._config_target
+        self._avg_depth = 0
+        self._since_adjust = 0
+        self.last_length = 0
+
+        # Producer-owned counters
+        self._bytes_in = 0
+        self._packets_in = 0
+        self.received = 0
+        self.late = 0
+        self.duplicates = 0
+        self.overflows = 0
+
+        # Consumer-owned counters
+        self._bytes_out = 0
+        self._packets_out = 0
+        self.played = 0
+        self.lost = 0
+        self.underruns = 0
+        self.frames_dropped = 0
+        self.frames_inserted = 0
+
+    def set_target_ms(self, target_ms):
+        """Change the target buffered audio in milliseconds."""
+        target = (target_ms * self._bytes_per_sec) // 1000
+        if target > self._max_target:
+            target = self._max_target
+        self._config_target = target - target % self._frame_bytes
+        self._target_bytes = self._config_target
+        self._deadband = self._target_bytes // 4
+
+    def depth_bytes(self):
+        """Return the number of buffered payload bytes."""
+        return self._bytes_in - self._bytes_out
+
+    def depth_ms(self):
+        """Return the buffered audio in milliseconds."""
+        return (self.depth_bytes() * 1000) // self._bytes_per_sec
+
+    def level(self):
+        """Return buffered audio as a percentage of the target (0-100)."""
+        if not self._target_bytes:
+            return 0
+        return min(100, (self.depth_bytes() * 100) // self._target_bytes)
+
+    def ready(self):
+        """Return True once enough audio is buffered to start playout."""
+        return (self.depth_bytes() >= self._target_bytes
+                or self._packets_in - self._packets_out >= self._max_packets)
+
+    def put(self, seq, payload, pts=0):
+        """
+        Store a packet payload (producer side).
+
+        Args:
+            seq (int): 16-bit sequence number
+            payload: bytes-like payload (typically a memoryview)
+            pts (int): Presentation timestamp, returned by next_pts()
+
+        Returns:
+            bool: True if the packet was stored
+        """
+        self.received += 1
+        n = len(payload)
+        if n > self._slot_size:
+            n = self._slot_size
+
+        if self._next_seq == _EMPTY:
+            # First packet of a stream
+            self._next_seq = seq
+
+        delta = (seq - self._next_seq) % _SEQ_MOD
+        if delta >= _SEQ_HALF:
+            delta -= _SEQ_MOD
+
+        if delta < 0:
+            if delta < -self._slot_count:
+                # Far behind: the sender restarted its sequence
+                self._resync_seq = seq
+            else:
+                # Its playout time has already passed
+                self.late += 1
+            return False
+
+        if delta >= self._slot_count:
+            # Too far ahead to fit: ask the consumer to jump forward
+            self._resync_seq = seq
+            self.overflows += 1
+            return False
+
+        index = seq & self._slot_mask
+        if self._slot_seq[index] == seq:
+            self.duplicates += 1
+            return False
+        if self._slot_seq[index] != _EMPTY:
+            # Slot still holds an older packet that was never played
+            self.overflows += 1
+            return False
+
+        if n == len(payload):
+            self._views[index][0:n] = payload
+        else:
+            self._views[index][0:n] = payload[0:n]
+        self._lengths[index] = n
+        self._pts[index] = pts
+        self._slot_seq[index] = seq
+        self._bytes_in += n
+        self._packets_in += 1
+        return True
+
+    def pop_into(self, dst):
+        """
+        Take the next packet in sequence order (consumer side).
+
+        dst must hold slot_size plus one frame so that a frame can be
+        repeated for drift compensation.
+
+        Args:
+            dst: bytearray or byte memoryview to copy into
+
+        Returns:
+            int: Bytes copied, UNDERRUN (0) if there is nothing to play,
+                 or LOST (-1) if the next packet is missing. After LOST,
+                 last_length holds the size of the missing audio.
+        """
+        if self._resync_seq != _EMPTY:
+            self._resync()
+
+        if self._next_seq == _EMPTY:
+            return UNDERRUN
+
+        depth = self._bytes_in - self._bytes_out
+        if self._prefill and not self.timed:
+            if depth < self._target_bytes:
+                if self._packets_in - self._packets_out < self._max_packets:
+                    return UNDERRUN
+                # Packets smaller than a slot: the slots fill up before the
+                # target is reached, so aim for the depth they can hold
+                self._target_bytes = depth - depth % self._frame_bytes
+            self._prefill = False
+            self._avg_depth = depth
+
+        seq = self._next_seq
+        index = seq & self._slot_mask
+        if self._slot_seq[index] != seq:
+            if depth <= 0:
+                # Nothing left at all: rebuild the target depth first
+                self.underruns += 1
+                self._prefill = not self.timed
+                return UNDERRUN
+            # Deadline passed with later packets waiting: declare it lost
+            self.lost += 1
+            self._next_seq = (seq + 1) % _SEQ_MOD
+            return LOST
+
+        n = self._lengths[index]
+        dst[0:n] = self._views[index][0:n]
+        self._slot_seq[index] = _EMPTY
+        self._bytes_out += n
+        self._packets_out += 1
+        self._next_seq = (seq + 1) % _SEQ_MOD
+        self.played += 1
+        self.last_length = n
+
+        if self.timed:
+            return n
+        return self._compensate_drift(dst, n, depth)
+
+    def next_pts(self):
+        """
+        Return the presentation timestamp of the next packet (consumer side).
+
+        Returns:
+            int: Its PTS, or None if the next packet in sequence has not
+                 arrived
+        """
+        if self._resync_seq != _EMPTY:
+            self._resync()
+        seq = self._next_seq
+        index = seq & self._slot_mask
+        if seq == _EMPTY or self._slot_seq[index] != seq:
+            return None
+        return self._pts[index]
+
+    def _compensate_drift(self, dst, n, depth):
+        """Drop or repeat one frame when the averaged depth drifts."""
+        self._avg_depth += (depth - self._avg_depth) >> 5
+        self._since_adjust += 1
+        if self._since_adjust < self._adjust_interval:
+            return n
+
+        fb = self._frame_bytes
+        error = self._avg_depth - self._target_bytes
+        if error > self._deadband and n > fb:
+            # Sender runs fast: play one frame less
+            self._since_adjust = 0
+            self.frames_dropped += 1
+            return n - fb
+        if error < -self._deadband and n >= fb and n + fb <= len(dst):
+            # Sender runs slow: repeat the last frame
+            for k in range(fb):
+                dst[n + k] = dst[n - fb + k]
+            self._since_adjust = 0
+            self.frames_inserted += 1
+            return n + fb
+        return n
+
+    def _resync(self):
+        """Jump to the sequence number requested by the producer."""
+        for i in range(self._slot_count):
+            if self._slot_seq[i] != _EMPTY:
+                self._slot_seq[i] = _EMPTY
+                self.lost += 1
+        self._bytes_out = self._bytes_in
+        self._packets_out = self._packets_in
+        self._next_seq = self._resync_seq
+        self._resync_seq = _EMPTY
+        self._prefill = True
+
+    def get_stats(self):
+        """Return jitter buffer statistics."""
+        return {
+            'received': self.received,
+            'played': self.played,
+            'lost': self.lost,
+            'late': self.late,
+            'duplicates': self.duplicates,
+            'overflows': self.overflows,
+            'underruns': self.underruns,
+            'frames_dropped': self.frames_dropped,
+            'frames_inserted': self.frames_inserted,
+            'depth_ms': self.depth_ms(),
+        }
+
+
+def test_jitter_buffer():
+    """Test reordering, loss detection and drift compensation."""
+    print("Testing jitter buffer...")
+    jb = JitterBuffer(8, 8, 1000, 2, 16)    # 16ms = 32 bytes = 4 packets
+    out = bytearray(10)
+
+    # Deliver 0..5 out of order, with 3 missing
+    for seq in (0, 2, 1, 5, 4):
+        jb.put(seq, bytes([seq] * 8))
+    order = []
+    while True:
+        n = jb.pop_into(out)
+        if n == UNDERRUN:
+            break
+        order.append(out[0] if n > 0 else None)
+    assert order == [0, 1, 2, None, 4, 5], order
+    assert jb.lost == 1
+
+    # A packet arriving after its slot was played is dropped as late
+    assert not jb.put(3, bytes(8))
+    assert jb.late == 1
+
+    # A full buffer well above target drops frames
+    jb = JitterBuffer(8, 8, 1000, 2, 8, adjust_interval=1)
+    for seq in range(8):
+        jb.put(seq, bytes(8))
+    total = 0
+    for _ in range(8):
+        total += jb.pop_into(out)
+    assert jb.frames_dropped > 0 and total < 64
+
+    # Packets much smaller than a slot still end prefill once the slots fill
+    jb = JitterBuffer(8, 8, 1000, 2, 48)    # Target larger than 6 slots hold
+    for seq in range(6):
+        assert jb.put(seq, bytes([seq] * 2))
+    assert jb.ready()
+    assert jb.pop_into(out) == 2 and out[0] == 0
+
+    print("Jitter buffer test passed")
+    return True
+
+
+if __name__ == "__main__":
+    test_jitter_buffer()
@@ -0,0 +1,285 @@
+"""
+Packet Latency Trace
+
+Follows audio packets from the BLE IRQ to the I2S peripheral and keeps a
+latency histogram per stage:
+
+    IRQ receipt -> enqueue -> dequeue -> I2S submit
+
+Tracepoints stamp time.ticks_us() into a preallocated ring of per-packet
+records; nothing is allocated while tracing. The first three stamps are
+taken on the packet itself. I2S submit is found by stream position: the
+I2S driver reports every byte it buffers, the ingest task marks where
+each packet ends, and the playback engine reports the bytes of every
+block it submits, so a packet is submitted with the block that carries
+its last byte.
+
+Callers hold the trace in an attribute that is None while tracing is
+off, so a disabled tracepoint costs one test:
+
+    if self.trace:
+        self.trace.received()
+
+Histogram buckets are powers of two: bucket 0 counts latencies below
+BUCKET_BASE_US, bucket k counts [BUCKET_BASE_US << (k - 1),
+BUCKET_BASE_US << k) and the last bucket everything above.
+"""
+
+import struct
+import time
+from array import array
+
+# Stages
+STAGE_QUEUE = 0         # IRQ receipt -> enqueue
+STAGE_WAIT = 1          # Enqueue -> dequeue by the ingest task
+STAGE_OUTPUT = 2        # Dequeue -> I2S submit of its last byte
+STAGE_TOTAL = 3         # IRQ receipt -> I2S submit
+STAGES = 4
+STAGE_NAMES = ("irq->enqueue", "enqueue->dequeue", "dequeue->submit", "total")
+
+BUCKETS = 16
+BUCKET_BASE_US = 32
+
+# Control command arguments (CMD_LATENCY_TRACE)
+TRACE_OFF = 0
+TRACE_ON = 1
+TRACE_SNAPSHOT = 2
+TRACE_RESET = 3
+
+# Binary snapshot: header, then per stage count, min, max, average and
+# BUCKETS saturating 16-bit bucket counts, all little endian
+SNAPSHOT_VERSION = 1
+_HEADER = "<BBHI"       # version, stages, buckets, overflows
+_STAGE = "<IIII"
+SNAPSHOT_SIZE = struct.calcsize(_HEADER) + STAGES * (struct.calcsize(_STAGE) + 2 * BUCKETS)
+
+# Stream positions wrap like ticks so they stay small integers
+_POS_MASK = 0x3FFFFFFF
+_POS_HALF = 0x20000000
+
+# Stamps per record
+_IRQ = 0
+_ENQUEUE = 1
+_DEQUEUE = 2
+_FIELDS = 3
+
+
+class LatencyTrace:
+    """
+    Ring of per-packet timestamps with per-stage latency histograms.
+    """
+
+    def __init__(self, records=64):
+        """
+        Initialize the trace.
+
+        Args:
+            records (int): Packets in flight that can be followed (power of two)
+        """
+        if records & (records - 1):
+            raise ValueError("Record count must be a power of two")
+        self._records = records
+        self._mask = records - 1
+        self._stamps = array('i', [0] * (records * _FIELDS))
+        self._ends = array('i', [0] * records)
+        self._hist = array('I', [0] * (STAGES * BUCKETS))
+        self._count = array('I', [0] * STAGES)
+        self._avg = array('I', [0] * STAGES)
+        self._min = array('I', [0] * STAGES)
+        self._max = array('I', [0] * STAGES)
+        self._snapshot = bytearray(SNAPSHOT_SIZE)
+        self.reset()
+
+    def reset(self, backlog=0):
+        """
+        Forget packets in flight and clear the histograms.
+
+        Args:
+            backlog (int): Bytes already buffered by the I2S driver, which
+                           will be submitted before any traced packet
+        """
+        self._irq_us = 0
+        self._head = 0          # Next record to create (BLE IRQ)
+        self._deq = 0           # Next record to dequeue (ingest task)
+        self._sub = 0           # Next record waiting for submit (I2S IRQ)
+        self._written = backlog & _POS_MASK  # Bytes buffered by the I2S driver
+        self._played = 0        # Bytes submitted to the I2S peripheral
+        self.overflows = 0
+        for i in range(STAGES * BUCKETS):
+            self._hist[i] = 0
+        for s in range(STAGES):
+            self._count[s] = 0
+            self._avg[s] = 0
+            self._min[s] = 0xFFFFFFFF
+            self._max[s] = 0
+
+    # ---------- Tracepoints ----------
+
+    def received(self):
+        """BLE IRQ: a packet arrived (kept until it is enqueued)."""
+        self._irq_us = time.ticks_us()
+
+    def enqueued(self):
+        """BLE IRQ: the packet just received is in the ingest queue."""
+        head = self._head
+        if head - self._sub >= self._records:
+            # More packets in flight than records: the oldest is lost
+            self.overflows += 1
+        base = (head & self._mask) * _FIELDS
+        self._stamps[base + _IRQ] = self._irq_us
+        self._stamps[base + _ENQUEUE] = time.ticks_us()
+        self._head = head + 1
+
+    def dequeued(self):
+        """Ingest task: the oldest queued packet is being processed."""
+        if self._deq < self._head:
+            base = (self._deq & self._mask) * _FIELDS
+            self._stamps[base + _DEQUEUE] = time.ticks_us()
+
+    def wrote(self, nbytes):
+        """I2S driver: nbytes were added to its output buffer."""
+        self._written = (self._written + nbytes) & _POS_MASK
+
+    def buffered(self):
+        """Ingest task: all of the dequeued packet's audio is buffered."""
+        deq = self._deq
+        if deq < self._head:
+            self._ends[deq & self._mask] = self._written
+            self._deq = deq + 1
+
+    def submitted(self, nbytes):
+        """Playback engine: a block carrying nbytes of buffered audio was submitted."""
+        played = (self._played + nbytes) & _POS_MASK
+        self._played = played
+        sub = self._sub
+        if self._head - sub > self._records:
+            sub = self._head - self._records
+        now = 0
+        while sub < self._deq:
+            # Stop at the first packet whose last byte is still buffered
+            ahead = (self._ends[sub & self._mask] - played) & _POS_MASK
+            if ahead and ahead < _POS_HALF:
+                break
+            if not now:
+                now = time.ticks_us()
+            base = (sub & self._mask) * _FIELDS
+            irq = self._stamps[base + _IRQ]
+            enq = self._stamps[base + _ENQUEUE]
+            deq = self._stamps[base + _DEQUEUE]
+            self._add(STAGE_QUEUE, time.ticks_diff(enq, irq))
+            self._add(STAGE_WAIT, time.ticks_diff(deq, enq))
+            self._add(STAGE_OUTPUT, time.ticks_diff(now, deq))
+            self._add(STAGE_TOTAL, time.ticks_diff(now, irq))
+            sub += 1
+        self._sub = sub
+
+    def discarded(self):
+        """I2S driver: buffered audio was thrown away (stop, disconnect)."""
+        # Nothing in flight will reach the peripheral any more
+        self._played = self._written
+        self._sub = self._deq
+
+    # ---------- Readout ----------
+
+    def get_stage(self, stage):
+        """
+        Get the statistics of one stage.
+
+        Args:
+            stage (int): STAGE_QUEUE, STAGE_WAIT, STAGE_OUTPUT or STAGE_TOTAL
+
+        Returns:
+            dict: count, min/max/average in microseconds and bucket counts
+        """
+        count = self._count[stage]
+        start = stage * BUCKETS
+        return {
+            'count': count,
+            'min_us': self._min[stage] if count else 0,
+            'max_us': self._max[stage],
+            'avg_us': self._avg[stage],
+            'buckets': list(self._hist[start:start + BUCKETS]),
+        }
+
+    def snapshot(self):
+        """
+        Pack the histograms for the latency trace characteristic.
+
+        Returns:
+            bytearray: SNAPSHOT_SIZE bytes, reused on every call
+        """
+        buf = self._snapshot
+        struct.pack_into(_HEADER, buf, 0, SNAPSHOT_VERSION, STAGES, BUCKETS,
+                         self.overflows)
+        offset = struct.calcsize(_HEADER)
+        for stage in range(STAGES):
+            count = self._count[stage]
+            struct.pack_into(_STAGE, buf, offset, count,
+                             self._min[stage] if count else 0, self._max[stage],
+                             self._avg[stage])
+            offset += struct.calcsize(_STAGE)
+            start = stage * BUCKETS
+            for b in range(BUCKETS):
+                n = self._hist[start + b]
+                struct.pack_into("<H", buf, offset, n if n < 0xFFFF else 0xFFFF)
+                offset += 2
+        return buf
+
+    def report(self):
+        """Print the per-stage histograms (serial console)."""
+        print("Latency (us)        count      min      avg      max")
+        for stage in range(STAGES):
+            s = self.get_stage(stage)
+            print(f"{STAGE_NAMES[stage]:<17}{s['count']:>8}{s['min_us']:>9}"
+                  f"{s['avg_us']:>9}{s['max_us']:>9}")
+        print("Buckets: <%d us, then doubling" % BUCKET_BASE_US)
+        for stage in range(STAGES):
+            print(f"{STAGE_NAMES[stage]:<17}", self.get_stage(stage)['buckets'])
+        if self.overflows:
+            print(f"Trace overflows: {self.overflows}")
+
+    def _add(self, stage, us):
+        if us < 0:
+            us = 0
+        bucket = 0
+        limit = BUCKET_BASE_US
+        while us >= limit and bucket < BUCKETS - 1:
+            limit <<= 1
+            bucket += 1
+        self._hist[stage * BUCKETS + bucket] += 1
+        self._count[stage] += 1
+        if self._count[stage] == 1:
+            self._avg[stage] = us
+        else:
+            # Moving average over roughly the last 16 packets
+            avg = self._avg[stage]
+            self._avg[stage] = avg + ((us - avg) >> 4)
+        if us < self._min[stage]:
+            self._min[stage] = us
+        if us > self._max[stage]:
+            self._max[stage] = us
+
+
+def parse_snapshot(data):
+    """
+    Unpack a snapshot read from the latency trace characteristic.
+
+    Args:
+        data: bytes returned by LatencyTrace.snapshot()
+
+    Returns:
+        dict: overflows and a list of per-stage dicts as from get_stage()
+    """
+    version, stages, buckets, overflows = struct.unpack_from(_HEADER, data, 0)
+    if version != SNAPSHOT_VERSION:
+        raise ValueError("Unknown snapshot version %d" % version)
+    offset = struct.calcsize(_HEADER)
+    result = []
+    for _ in range(stages):
+        count, low, high, avg = struct.unpack_from(_STAGE, data, offset)
+        offset += struct.calcsize(_STAGE)
+        counts = list(struct.unpack_from("<%dH" % buckets, data, offset))
+        offset += 2 * buckets
+        result.append({'count': count, 'min_us': low, 'max_us': high,
+                       'avg_us': avg, 'buckets': counts})
+    return {'overflows': overflows, 'stages': result}
@@ -0,0 +1,137 @@
+"""
+Block Mixer
+
+Sums several 16-bit stereo streams into one I2S output block. Every
+source has its own ring buffer (audio/ring_buffer.py) that its producer
+fills at its own pace, and its own Q15 gain. fill(buf) has the same
+signature as RingBuffer.read_into, so the mixer drops in as the fill
+callback of the playback engine.
+
+Each ring is an elastic jitter buffer: a source only joins the mix once
+prefill bytes are buffered, and when it cannot fill a whole block it
+leaves the mix again (counted as an underrun) until it has refilled.
+A source that stops sending therefore fades out of the mix without
+stalling the others.
+
+The first playing source is read straight into the output block, and
+scaled in place if its gain is not unity; every further source is read
+into a preallocated scratch block and added with mix_q15 from
+audio/sample_kernels.py, which saturates to the int16 range. A single
+source at unity gain costs no more than reading its ring directly.
+
+As with the ring buffers, producers only write and the mixer (the I2S
+IRQ or core 1) only reads, so the two sides need no lock.
+"""
+
+from array import array
+
+from audio.sample_kernels import Q15_UNITY, gain_q15, mix_q15
+
+
+class Mixer:
+    """
+    Saturating sum of per-source ring buffers with per-source gain.
+    """
+
+    def __init__(self, inputs, block_size, prefill=0):
+        """
+        Initialize the mixer.
+
+        Args:
+            inputs (list): RingBuffer per source, of 16-bit stereo PCM
+            block_size (int): Bytes per fill() (the engine block size)
+            prefill (int): Bytes a source buffers before it joins the mix
+        """
+        self._inputs = inputs
+        self._count = len(inputs)
+        self._block_size = block_size
+        self._prefill = max(prefill, block_size)
+
+        # Preallocated staging block for every source after the first
+        self._scratch = bytearray(block_size)
+        self._zeros = memoryview(bytearray(block_size))
+
+        self._gains = array('i', [Q15_UNITY] * self._count)
+        self._playing = bytearray(self._count)
+
+        # Mixer-owned counters
+        self.underruns = array('I', [0] * self._count)
+        self.blocks = 0
+
+    @property
+    def sources(self):
+        """Number of sources."""
+        return self._count
+
+    def set_gain(self, source, gain):
+        """
+        Set the gain of one source.
+
+        Args:
+            source (int): Source index
+            gain (int): Q15 gain, Q15_UNITY = 1.0
+        """
+        self._gains[source] = gain
+
+    def get_gain(self, source):
+        """Return the Q15 gain of a source."""
+        return self._gains[source]
+
+    def is_playing(self, source):
+        """Return True while a source is part of the mix."""
+        return bool(self._playing[source])
+
+    def fill(self, buf):
+        """
+        Mix one block from every playing source.
+
+        Args:
+            buf: Writable block of block_size bytes
+
+        Returns:
+            int: Bytes of buf holding audio (0 if no source is playing)
+        """
+        size = self._block_size
+        scratch = self._scratch
+        out = 0
+        for i in range(self._count):
+            ring = self._inputs[i]
+            if not self._playing[i]:
+                if ring.count() < self._prefill:
+                    continue
+                self._playing[i] = 1
+            gain = self._gains[i]
+            if out:
+                n = ring.read_into(scratch, size)
+            else:
+                n = ring.read_into(buf, size)
+            if n < size:
+                # Ran dry: sit out until the prefill level is back
+                self._playing[i] = 0
+                self.underruns[i] += 1
+                n &= ~3
+                if not n:
+                    continue
+            if not out:
+                if gain != Q15_UNITY:
+                    gain_q15(buf, buf, n >> 1, gain)
+                if n < size:
+                    # Later sources add onto silence past this one's end
+                    buf[n:size] = self._zeros[n:size]
+                out = n
+            else:
+                mix_q15(scratch, buf, n >> 1, gain)
+                if n > out:
+                    out = n
+        if out:
+            self.blocks += 1
+        return out
+
+    def get_stats(self):
+        """Return mixer statistics."""
+        return {
+            'blocks': self.blocks,
+            'playing': [self._playing[i] for i in range(self._count)],
+            'underruns': list(self.underruns),
+            'gains': list(self._gains),
+        }
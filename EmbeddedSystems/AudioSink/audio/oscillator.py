@@ -0,0 +1,345 @@
+"""
+Wavetable Oscillator
+
+Test and calibration signals for the I2S path without math.sin per
+sample: a phase accumulator steps through precomputed 16-bit tables
+and fills caller-supplied buffers a block at a time, fast enough to
+run well ahead of real time on the Pico.
+
+Waveforms:
+
+- WAVE_SINE: a sine table, linearly interpolated
+- WAVE_SQUARE: a band-limited square (odd harmonics below Nyquist for
+  the chosen frequency, from a small set of harmonic counts)
+- WAVE_SWEEP: an exponential sine sweep from f0 to f1 over a set time,
+  repeated, for latency and frequency response measurements
+- WAVE_PINK: a loop of pink noise (Voss-McCartney), one table entry
+  per sample
+
+The phase is 24 bits: the top TABLE_BITS index the table, the rest
+interpolate between entries. At 22050 Hz that is 0.0013 Hz of frequency
+resolution. Tables are built on first use from the sine table with
+integer arithmetic where possible, kept in a module cache shared by all
+oscillators, and can be released with clear_tables(). Nothing is
+allocated per block.
+
+On ports with the viper code emitter the fill kernel comes from
+audio/_oscillator_viper.py; everywhere else the portable version below
+is used.
+"""
+
+import math
+import struct
+from array import array
+
+# Waveforms
+WAVE_SINE = 0
+WAVE_SQUARE = 1
+WAVE_SWEEP = 2
+WAVE_PINK = 3
+
+PHASE_BITS = 24
+TABLE_BITS = 10         # 1024-entry sine and square tables
+PINK_BITS = 12          # 4096-sample pink noise loop
+SWEEP_BLOCK = 32        # Frames between sweep frequency updates
+
+# Harmonic counts of the band-limited square tables
+SQUARE_HARMONICS = (1, 3, 7, 15, 31)
+
+_PHASE_MASK = (1 << PHASE_BITS) - 1
+_FULL_SCALE = 32767
+
+# Built tables, by waveform (and harmonic count for squares)
+_tables = {}
+
+
+def _wavetable_py(buf, nframes, channels, table, state):
+    """Fill frames with the interpolated table at the state's phase, advancing it."""
+    phase, inc, amp, shift = state[0], state[1], state[2], state[3]
+    mask = (1 << shift) - 1
+    out = []
+    for _ in range(nframes):
+        idx = phase >> shift
+        a = table[idx]
+        v = a + (((table[idx + 1] - a) * (phase & mask)) >> shift)
+        v = (v * amp) >> 15
+        out.extend((v,) * channels)
+        phase = (phase + inc) & _PHASE_MASK
+    state[0] = phase
+    struct.pack_into("<%dh" % len(out), buf, 0, *out)
+
+
+try:
+    from audio._oscillator_viper import wavetable
+    OSC_IMPL = "viper"
+except (ImportError, SyntaxError):
+    wavetable = _wavetable_py
+    OSC_IMPL = "python"
+
+
+def _with_guard(values):
+    """Return an array('h') of values with the first repeated at the end."""
+    table = array('h', values)
+    table.append(table[0])
+    return table
+
+
+def sine_table():
+    """Return the full-scale sine table (built once)."""
+    table = _tables.get(WAVE_SINE)
+    if table is None:
+        size = 1 << TABLE_BITS
+        step = 2 * math.pi / size
+        table = _with_guard([int(round(_FULL_SCALE * math.sin(i * step))) for i in range(size)])
+        _tables[WAVE_SINE] = table
+    return table
+
+
+def square_table(harmonics):
+    """
+    Return a band-limited square table (built once per harmonic count).
+
+    Args:
+        harmonics (int): Highest odd harmonic, one of SQUARE_HARMONICS
+
+    Returns:
+        array: Table normalised to full scale, Gibbs overshoot included
+    """
+    key = (WAVE_SQUARE, harmonics)
+    table = _tables.get(key)
+    if table is None:
+        sine = sine_table()
+        size = 1 << TABLE_BITS
+        mask = size - 1
+        acc = [0] * size
+        for k in range(1, harmonics + 1, 2):
+            for i in range(size):
+                # Integer 1/k weights: scale the sine up first
+                acc[i] += sine[(i * k) & mask] * 1024 // k
+        peak = max(max(acc), -min(acc)) or 1
+        table = _with_guard([v * _FULL_SCALE // peak for v in acc])
+        _tables[key] = table
+    return table
+
+
+def pink_table(seed=0x1234):
+    """Return a loop of full-scale pink noise (built once)."""
+    table = _tables.get(WAVE_PINK)
+    if table is None:
+        size = 1 << PINK_BITS
+        rows = [0] * PINK_BITS
+        total = 0
+        x = seed
+        acc = []
+        for n in range(size):
+            # Voss-McCartney: row k changes every 2**k samples
+            if n:
+                k = 0
+                while not (n >> k) & 1:
+                    k += 1
+                x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+                new = (x >> 15) - 0x8000
+                total += new - rows[k]
+                rows[k] = new
+            x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+            acc.append(total + (x >> 15) - 0x8000)
+        mean = sum(acc) // size
+        peak = max(abs(v - mean) for v in acc) or 1
+        table = _with_guard([(v - mean) * _FULL_SCALE // peak for v in acc])
+        _tables[WAVE_PINK] = table
+    return table
+
+
+def clear_tables():
+    """Release the cached tables; they are rebuilt on next use."""
+    _tables.clear()
+
+
+class Oscillator:
+    """
+    Phase-accumulator oscillator over cached 16-bit wavetables.
+    """
+
+    def __init__(self, sample_rate, wave=WAVE_SINE, freq=440, amplitude=0.5, channels=2):
+        """
+        Initialize the oscillator.
+
+        Args:
+            sample_rate (int): Output sample rate in Hz
+            wave (int): WAVE_SINE, WAVE_SQUARE, WAVE_SWEEP or WAVE_PINK
+            freq (float): Tone frequency in Hz (sine and square)
+            amplitude (float): Peak level, 0.0 to 1.0 of full scale
+            channels (int): Interleaved channels written per frame (1 or 2)
+        """
+        if channels not in (1, 2):
+            raise ValueError("Channels must be 1 or 2")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        # phase, phase increment, Q15 amplitude, phase to index shift
+        self._state = array('i', [0, 0, 0, PHASE_BITS - TABLE_BITS])
+        self._table = None
+        self.frequency = 0
+        self.sweeps = 0
+        self._sweep = None
+        self.set_amplitude(amplitude)
+        self.set_wave(wave, freq)
+
+    def set_wave(self, wave, freq=None):
+        """
+        Switch waveform, keeping the phase.
+
+        Args:
+            wave (int): WAVE_SINE, WAVE_SQUARE, WAVE_SWEEP or WAVE_PINK
+            freq (float): New frequency for sine and square, or None
+
+        Raises:
+            ValueError: If the waveform is unknown
+        """
+        if not WAVE_SINE <= wave <= WAVE_PINK:
+            raise ValueError("Unknown waveform")
+        self.wave = wave
+        if wave == WAVE_PINK:
+            self._table = pink_table()
+            self._state[3] = PHASE_BITS - PINK_BITS
+            # One table entry per sample
+            self._state[1] = 1 << (PHASE_BITS - PINK_BITS)
+            self._state[0] &= ~((1 << (PHASE_BITS - PINK_BITS)) - 1) & _PHASE_MASK
+            self.frequency = 0
+            return
+        self._state[3] = PHASE_BITS - TABLE_BITS
+        if wave == WAVE_SWEEP:
+            self._table = sine_table()
+            if self._sweep is None:
+                self.sweep(20, min(20000, self.sample_rate * 9 // 20), 1.0)
+            return
+        self.set_frequency(self.frequency if freq is None else freq)
+
+    def set_frequency(self, freq):
+        """
+        Set the tone frequency of a sine or square.
+
+        Args:
+            freq (float): Frequency in Hz, below half the sample rate
+
+        Raises:
+            ValueError: If the frequency is out of range
+        """
+        if not 0 < freq < self.sample_rate / 2:
+            raise ValueError("Frequency out of range")
+        self.frequency = freq
+        self._state[1] = int(freq * (1 << PHASE_BITS) / self.sample_rate + 0.5)
+        if self.wave == WAVE_SQUARE:
+            limit = self.sample_rate / 2 / freq
+            harmonics = SQUARE_HARMONICS[0]
+            for h in SQUARE_HARMONICS:
+                if h < limit:
+                    harmonics = h
+            self._table = square_table(harmonics)
+        elif self.wave == WAVE_SINE:
+            self._table = sine_table()
+
+    def set_amplitude(self, amplitude):
+        """Set the peak level, 0.0 to 1.0 of full scale."""
+        self._state[2] = int(max(0.0, min(1.0, amplitude)) * _FULL_SCALE + 0.5)
+
+    def sweep(self, f0, f1, seconds):
+        """
+        Configure and select an exponential sweep.
+
+        The frequency moves from f0 to f1 over the given time, updated
+        every SWEEP_BLOCK frames, then starts again at f0 with the phase
+        continuous.
+
+        Args:
+            f0 (float): Start frequency in Hz
+            f1 (float): End frequency in Hz, below half the sample rate
+            seconds (float): Length of one sweep
+
+        Raises:
+            ValueError: If a frequency or the length is out of range
+        """
+        nyquist = self.sample_rate / 2
+        if not (0 < f0 < nyquist and 0 < f1 < nyquist and seconds > 0):
+            raise ValueError("Sweep out of range")
+        steps = max(1, int(seconds * self.sample_rate) // SWEEP_BLOCK)
+        self._sweep = (f0, math.log(f1 / f0) / steps, steps)
+        self._sweep_step = 0
+        self.wave = WAVE_SWEEP
+        self._table = sine_table()
+        self._state[3] = PHASE_BITS - TABLE_BITS
+        self._set_sweep_step(0)
+
+    def _set_sweep_step(self, step):
+        f0, log_ratio, _ = self._sweep
+        freq = f0 * math.exp(log_ratio * step)
+        self.frequency = freq
+        self._state[1] = int(freq * (1 << PHASE_BITS) / self.sample_rate + 0.5)
+        self._sweep_frame = 0
+
+    def reset(self):
+        """Restart at phase zero (and at f0 for a sweep)."""
+        self._state[0] = 0
+        if self.wave == WAVE_SWEEP:
+            self._sweep_step = 0
+            self._set_sweep_step(0)
+
+    def fill(self, buf, nframes=None):
+        """
+        Write frames of 16-bit samples, the same on every channel.
+
+        Args:
+            buf: Writable buffer (bytearray or memoryview)
+            nframes (int): Frames to write (default: as many as fit)
+
+        Returns:
+            int: Frames written
+        """
+        frame_bytes = 2 * self.channels
+        if nframes is None:
+            nframes = len(buf) // frame_bytes
+        if self.wave != WAVE_SWEEP:
+            wavetable(buf, nframes, self.channels, self._table, self._state)
+            return nframes
+
+        view = memoryview(buf)
+        done = 0
+        steps = self._sweep[2]
+        while done < nframes:
+            n = min(nframes - done, SWEEP_BLOCK - self._sweep_frame)
+            wavetable(view[done * frame_bytes:], n, self.channels, self._table, self._state)
+            done += n
+            self._sweep_frame += n
+            if self._sweep_frame == SWEEP_BLOCK:
+                step = self._sweep_step + 1
+                if step >= steps:
+                    step = 0
+                    self.sweeps += 1
+                self._sweep_step = step
+                self._set_sweep_step(step)
+        return nframes
+
+
+def benchmark_oscillator(block_frames=256, rounds=50, sample_rate=22050):
+    """
+    Time each waveform on the device.
+
+    Prints microseconds per block of stereo frames and how many times
+    faster than real time that is, using time.ticks_us.
+    """
+    import time
+
+    buf = bytearray(4 * block_frames)
+    period_us = block_frames * 1000000 // sample_rate
+    print(f"Oscillator kernel: {OSC_IMPL}; {block_frames}-frame blocks ({period_us} us of audio)")
+    for name, wave in (("sine", WAVE_SINE), ("square", WAVE_SQUARE),
+                       ("sweep", WAVE_SWEEP), ("pink", WAVE_PINK)):
+        osc = Oscillator(sample_rate, wave, 1000)
+        start = time.ticks_us()
+        for _ in range(rounds):
+            osc.fill(buf, block_frames)
+        us = time.ticks_diff(time.ticks_us(), start) / rounds
+        print(f"  {name:<7}{us:8.1f} us/block ({period_us / us:.1f}x real time)")
+
+
+if __name__ == "__main__":
+    benchmark_oscillator()
@@ -0,0 +1,253 @@
+"""
+Packet Capture and Replay
+
+Records what reaches BLEAudioSink from the radio - audio packets as
+they arrive (before FEC), control writes, connects and disconnects -
+with their time.ticks_us() arrival time, so a field session can be
+played back into the same pipeline later, on the device or under
+CPython with the fakes in perf/.
+
+Log format, all little endian:
+
+    header:  b"APCP", version (H), record header size (H)
+    record:  ticks_us (I), payload length (H), kind (B), connection (B),
+             payload
+
+Recording happens in the BLE IRQ, so PacketCapture.record() only packs
+the record into one of two preallocated buffers and allocates nothing.
+A task flushes the filled buffer to flash once it is half full (the
+IRQ wakes it) or every flush_ms: the buffers are swapped first, so the
+IRQ never writes into the one being saved. Records that do not fit
+while a flush is behind are dropped and counted.
+
+Callers hold the capture in an attribute that is None while capturing
+is off, so a disabled capture point costs one test:
+
+    if self.capture:
+        self.capture.record(KIND_AUDIO, conn_handle, data)
+
+PacketReplayer reads the log back with readinto() into one reused
+buffer and hands every record to a handler, with the recorded spacing
+(to the millisecond) or as fast as the event loop runs.
+"""
+
+import struct
+import time
+import uasyncio as asyncio
+
+CAPTURE_MAGIC = b"APCP"
+CAPTURE_VERSION = 1
+_HEADER = "<4sHH"
+HEADER_SIZE = struct.calcsize(_HEADER)
+_RECORD = "<IHBB"       # ticks_us, payload length, kind, connection
+RECORD_SIZE = struct.calcsize(_RECORD)
+
+# Record kinds
+KIND_AUDIO = 0          # Audio packet as received, before FEC
+KIND_CONTROL = 1        # Write to the audio control characteristic
+KIND_CONNECT = 2        # Central connected (no payload)
+KIND_DISCONNECT = 3     # Central disconnected (no payload)
+
+# Control command arguments (CMD_CAPTURE)
+CAPTURE_OFF = 0
+CAPTURE_ON = 1
+
+
+class PacketCapture:
+    """
+    Double-buffered, length-prefixed packet log on flash.
+    """
+
+    def __init__(self, path, buffer_size=4096, flush_ms=500):
+        """
+        Initialize the capture and write the log header.
+
+        Args:
+            path (str): Log file to create (overwritten)
+            buffer_size (int): Bytes in each of the two write buffers
+            flush_ms (int): Longest time a record waits before being flushed
+        """
+        self.path = path
+        self._bufs = (bytearray(buffer_size), bytearray(buffer_size))
+        self._views = (memoryview(self._bufs[0]), memoryview(self._bufs[1]))
+        self._size = buffer_size
+        self._half = buffer_size // 2
+        self._used = [0, 0]
+        self._active = 0        # Buffer the IRQ records into
+        self._flush_ms = flush_ms
+        self._wake = asyncio.ThreadSafeFlag()
+        self._file = open(path, "wb")
+        self._file.write(struct.pack(_HEADER, CAPTURE_MAGIC, CAPTURE_VERSION, RECORD_SIZE))
+        self.is_open = True
+
+        self.records = 0
+        self.bytes = HEADER_SIZE
+        self.dropped = 0
+        self.flushes = 0
+        self.max_flush_us = 0
+
+    def record(self, kind, conn_handle, data=b""):
+        """
+        BLE IRQ: append one record to the active buffer.
+
+        Args:
+            kind (int): KIND_AUDIO, KIND_CONTROL, KIND_CONNECT or KIND_DISCONNECT
+            conn_handle (int): Connection the event belongs to
+            data: bytes-like payload
+        """
+        n = len(data)
+        i = self._active
+        pos = self._used[i]
+        end = pos + RECORD_SIZE + n
+        if end > self._size or not self.is_open:
+            self.dropped += 1
+            return
+        buf = self._views[i]
+        struct.pack_into(_RECORD, buf, pos, time.ticks_us(), n, kind, conn_handle & 0xFF)
+        buf[pos + RECORD_SIZE:end] = data
+        self._used[i] = end
+        self.records += 1
+        if pos < self._half <= end:
+            self._wake.set()
+
+    def pending(self):
+        """Return the bytes waiting in the active buffer."""
+        return self._used[self._active]
+
+    def flush(self):
+        """Swap the buffers and write the one the IRQ was filling."""
+        full = self._active
+        self._active = full ^ 1
+        n = self._used[full]
+        if not n:
+            return
+        start = time.ticks_us()
+        self._file.write(self._views[full][:n])
+        self._file.flush()
+        us = time.ticks_diff(time.ticks_us(), start)
+        self._used[full] = 0
+        self.bytes += n
+        self.flushes += 1
+        if us > self.max_flush_us:
+            self.max_flush_us = us
+
+    async def run(self):
+        """Flush when half a buffer is used or every flush_ms, until close()."""
+        while self.is_open:
+            try:
+                await asyncio.wait_for_ms(self._wake.wait(), self._flush_ms)
+            except asyncio.TimeoutError:
+                pass
+            if self.is_open:
+                self.flush()
+
+    def close(self):
+        """Stop recording, write what is buffered and close the log."""
+        if not self.is_open:
+            return
+        self.is_open = False
+        self.flush()
+        self._file.close()
+        self._wake.set()
+
+    def get_stats(self):
+        """
+        Get capture statistics.
+
+        Returns:
+            dict: Records, bytes written, drops and flush counters
+        """
+        return {
+            "path": self.path,
+            "records": self.records,
+            "bytes": self.bytes,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "max_flush_us": self.max_flush_us,
+        }
+
+
+class PacketReplayer:
+    """
+    Plays a capture log back through a handler.
+    """
+
+    def __init__(self, path, max_payload=512):
+        """
+        Initialize the replayer.
+
+        Args:
+            path (str): Capture log to read
+            max_payload (int): Largest payload expected in the log
+        """
+        self.path = path
+        self._buf = bytearray(RECORD_SIZE + max_payload)
+        self._view = memoryview(self._buf)
+        self.is_playing = False
+        self.records = 0
+        self.skipped = 0
+        self.late_us = 0        # Largest delay behind the recorded time
+
+    async def play(self, handler, realtime=True):
+        """
+        Hand every record of the log to handler(kind, conn_handle, payload).
+
+        The payload is a memoryview into the replayer's buffer, valid
+        until the handler returns.
+
+        Args:
+            handler (callable): Receives each record
+            realtime (bool): Keep the recorded spacing; False replays as
+                fast as possible, yielding to other tasks between records
+
+        Returns:
+            int: Records replayed
+        """
+        view = self._view
+        limit = len(self._buf) - RECORD_SIZE
+        self.is_playing = True
+        self.records = 0
+        with open(self.path, "rb") as f:
+            magic, version, record_size = struct.unpack(_HEADER, f.read(HEADER_SIZE))
+            if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION or record_size != RECORD_SIZE:
+                raise ValueError("Not a version %d capture log" % CAPTURE_VERSION)
+            # Recorded and local time since the first record, summed record
+            # to record so a long session does not wrap with the ticks
+            prev = None
+            elapsed = 0
+            last = time.ticks_us()
+            played = 0
+            while self.is_playing:
+                if f.readinto(view[:RECORD_SIZE]) < RECORD_SIZE:
+                    break
+                ticks, n, kind, conn = struct.unpack_from(_RECORD, self._buf, 0)
+                if n > limit:
+                    # Larger than any packet this replayer was sized for
+                    f.seek(n, 1)
+                    self.skipped += 1
+                    continue
+                if f.readinto(view[RECORD_SIZE:RECORD_SIZE + n]) < n:
+                    break
+                if prev is None:
+                    prev = ticks
+                if realtime:
+                    elapsed += time.ticks_diff(ticks, prev)
+                    prev = ticks
+                    now = time.ticks_us()
+                    played += time.ticks_diff(now, last)
+                    last = now
+                    wait = elapsed - played
+                    if wait >= 1000:
+                        await asyncio.sleep_ms(wait // 1000)
+                    elif -wait > self.late_us:
+                        self.late_us = -wait
+                else:
+                    await asyncio.sleep_ms(0)
+                handler(kind, conn, view[RECORD_SIZE:RECORD_SIZE + n])
+                self.records += 1
+        self.is_playing = False
+        return self.records
+
+    def stop(self):
+        """Stop play() before the next record."""
+        self.is_playing = False
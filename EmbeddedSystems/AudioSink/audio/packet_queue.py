@@ -0,0 +1,192 @@
+"""
+Packet Ingest Queue
+
+Bounded single-producer/single-consumer FIFO of audio packets held in
+preallocated slots. The BLE IRQ callback is the producer: put() copies
+the packet into the next free slot and never blocks or allocates. One
+long-lived consumer task reads packets in arrival order with peek() and
+frees each slot with release().
+
+As in audio/ring_buffer.py, the producer only moves the write index and
+its own counters and the consumer only moves the read index, so the two
+sides need no lock. Packets that arrive while every slot is in use are
+dropped and counted as overflows. Each packet can carry a small integer
+tag, such as the connection it arrived on.
+"""
+
+from array import array
+
+
+class PacketQueue:
+    """
+    Bounded SPSC queue of variable-length packets in fixed slots.
+    """
+
+    def __init__(self, slot_count, slot_size):
+        """
+        Initialize the packet queue.
+
+        Args:
+            slot_count (int): Maximum number of queued packets
+            slot_size (int): Maximum bytes per packet
+        """
+        self._slot_count = slot_count
+        self._slot_size = slot_size
+        self._wrap = 2 * slot_count  # Indices run 0..2n-1 so full != empty
+
+        # Preallocated packet storage
+        self._slots = [bytearray(slot_size) for _ in range(slot_count)]
+        self._views = [memoryview(slot) for slot in self._slots]
+        self._lengths = array('H', [0] * slot_count)
+        self._tags = array('H', [0] * slot_count)
+
+        self._read = 0
+        self._write = 0
+
+        # Producer-owned counters
+        self.enqueued = 0
+        self.overflows = 0
+        self.truncated = 0
+        self.high_water = 0
+
+        # Consumer-owned counters
+        self.dequeued = 0
+        self.dropped = 0
+
+    @property
+    def slot_size(self):
+        """Maximum bytes per packet."""
+        return self._slot_size
+
+    def count(self):
+        """Return the number of queued packets."""
+        return (self._write - self._read) % self._wrap
+
+    def is_empty(self):
+        """Return True if no packets are queued."""
+        return self._write == self._read
+
+    def is_full(self):
+        """Return True if every slot is in use."""
+        return self.count() == self._slot_count
+
+    def put(self, data, tag=0):
+        """
+        Copy a packet into the next free slot (producer side).
+
+        Packets longer than slot_size are cut to slot_size.
+
+        Args:
+            data: bytes-like packet
+            tag (int): Value from 0 to 65535 kept with the packet
+
+        Returns:
+            bool: True if queued, False if the queue was full
+        """
+        write = self._write
+        used = (write - self._read) % self._wrap
+        if used >= self._slot_count:
+            self.overflows += 1
+            return False
+
+        n = len(data)
+        if n > self._slot_size:
+            n = self._slot_size
+            self.truncated += 1
+            data = memoryview(data)[0:n]
+
+        index = write % self._slot_count
+        self._views[index][0:n] = data
+        self._lengths[index] = n
+        self._tags[index] = tag
+
+        # Publish the slot only after its contents are in place
+        self._write = (write + 1) % self._wrap
+        self.enqueued += 1
+        if used + 1 > self.high_water:
+            self.high_water = used + 1
+        return True
+
+    def peek(self):
+        """
+        Return the oldest packet without removing it (consumer side).
+
+        The view stays valid until release() is called.
+
+        Returns:
+            memoryview: Packet data, or None if the queue is empty
+        """
+        if self._write == self._read:
+            return None
+        index = self._read % self._slot_count
+        return self._views[index][0:self._lengths[index]]
+
+    def peek_tag(self):
+        """Return the tag of the oldest packet (consumer side), 0 if empty."""
+        if self._write == self._read:
+            return 0
+        return self._tags[self._read % self._slot_count]
+
+    def release(self):
+        """Free the slot of the packet returned by peek() (consumer side)."""
+        if self._write != self._read:
+            self._read = (self._read + 1) % self._wrap
+            self.dequeued += 1
+
+    def discard(self):
+        """Drop every queued packet (consumer side)."""
+        queued = (self._write - self._read) % self._wrap
+        self._read = (self._read + queued) % self._wrap
+        self.dropped += queued
+
+    def get_stats(self):
+        """Return queue statistics."""
+        return {
+            'queued': self.count(),
+            'enqueued': self.enqueued,
+            'dequeued': self.dequeued,
+            'overflows': self.overflows,
+            'dropped': self.dropped,
+            'truncated': self.truncated,
+            'high_water': self.high_water,
+        }
+
+
+def test_packet_queue():
+    """Test ordering, overflow and truncation."""
+    print("Testing packet queue...")
+    q = PacketQueue(4, 8)
+
+    # Fill past capacity: the extra packet is counted, not queued
+    for i in range(5):
+        q.put(bytes([i] * (i + 1)))
+    assert q.count() == 4 and q.overflows == 1
+
+    # Packets come out in arrival order with their own lengths
+    for i in range(4):
+        packet = q.peek()
+        assert len(packet) == i + 1 and packet[0] == i
+        q.release()
+    assert q.peek() is None
+
+    # Order is kept across many index wraps
+    expected = 0
+    for i in range(50):
+        q.put(bytes([i]))
+        if i % 3 == 0:
+            while not q.is_empty():
+                assert q.peek()[0] == expected
+                q.release()
+                expected += 1
+
+    # Oversized packets are cut to the slot size
+    q.discard()
+    q.put(bytes(12))
+    assert len(q.peek()) == 8 and q.truncated == 1
+
+    print("Packet queue test passed")
+    return True
+
+
+if __name__ == "__main__":
+    test_packet_queue()
@@ -0,0 +1,136 @@
+"""
+Interrupt-Driven I2S Playback Engine
+
+Feeds a machine.I2S instance in non-blocking mode. Two preallocated
+blocks are used as double buffers: while the I2S peripheral drains one
+block, the other is already filled and is submitted from the I2S IRQ
+callback the moment the previous write completes, so the output never
+waits on a polling loop.
+
+Data comes from a fill callback, fill(buf) -> bytes written, such as
+RingBuffer.read_into. When the source cannot fill a whole block, the
+rest of the block is padded with silence and counted as an underrun.
+Nothing on the refill path allocates memory or calls gc.collect().
+
+Given the output byte rate, the engine also keeps the output clock:
+due_us is the ticks_us() at which the block being filled starts to
+play, counted in whole blocks from start(), so a fill callback can put
+audio at a given local time.
+"""
+
+import time
+
+
+class PlaybackEngine:
+    """
+    Double-buffered I2S output driven by the I2S IRQ.
+    """
+
+    def __init__(self, i2s, fill, block_size=512, bytes_per_sec=0):
+        """
+        Initialize the playback engine.
+
+        Args:
+            i2s: machine.I2S instance configured for TX
+            fill (callable): fill(buf) -> int, copies audio into buf
+            block_size (int): Bytes per I2S write (one DMA block)
+            bytes_per_sec (int): Output byte rate; 0 leaves due_us unused
+        """
+        self._i2s = i2s
+        self._fill = fill
+        self._block_size = block_size
+
+        # Output clock: block length in whole microseconds and remainder
+        self._bytes_per_sec = bytes_per_sec
+        if bytes_per_sec:
+            self._block_us, self._block_rem = divmod(block_size * 1000000, bytes_per_sec)
+        self.due_us = 0
+        self._due_rem = 0
+
+        # Double buffers and their views (created once, reused forever)
+        self._blocks = (bytearray(block_size), bytearray(block_size))
+        self._views = (memoryview(self._blocks[0]), memoryview(self._blocks[1]))
+        self._zeros = memoryview(bytearray(block_size))
+        self._ready = 0  # Index of the block to submit next
+        self._filled = [0, 0]  # Source bytes in each block, kept while tracing
+
+        # Optional audio/latency_trace.LatencyTrace told about each submit
+        self.trace = None
+
+        self.running = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset playback statistics."""
+        self.blocks_played = 0
+        self.underruns = 0
+        self.underrun_bytes = 0
+
+    def set_fill(self, fill):
+        """Replace the fill callback; takes effect from the next block."""
+        self._fill = fill
+
+    def start(self):
+        """Prefill both blocks and start the IRQ-driven write chain."""
+        if self.running:
+            return
+        self.running = True
+        self.due_us = time.ticks_us()
+        self._due_rem = 0
+        self._refill(0)
+        self._refill(1)
+        self._i2s.irq(self._on_write_done)
+        self._ready = 1
+        self._i2s.write(self._views[0])
+        if self.trace:
+            self.trace.submitted(self._filled[0])
+
+    def stop(self):
+        """Stop submitting blocks; the block in flight finishes playing."""
+        self.running = False
+        self._i2s.irq(None)
+
+    def _on_write_done(self, i2s):
+        """I2S IRQ: the previous block was consumed by the DMA."""
+        if not self.running:
+            return
+        ready = self._ready
+        # Submit the prefilled block first so the DMA is never starved
+        i2s.write(self._views[ready])
+        self.blocks_played += 1
+        if self.trace:
+            self.trace.submitted(self._filled[ready])
+        # The block just released becomes the next one to fill
+        free = ready ^ 1
+        self._ready = free
+        self._refill(free)
+
+    def _refill(self, index):
+        """Fill one block from the source, padding any shortfall with silence."""
+        view = self._views[index]
+        n = self._fill(view)
+        if self.trace:
+            self._filled[index] = n
+        if n < self._block_size:
+            view[n:] = self._zeros[n:]
+            self.underruns += 1
+            self.underrun_bytes += self._block_size - n
+        if self._bytes_per_sec:
+            self._advance_clock()
+
+    def _advance_clock(self):
+        """Move due_us on by one block."""
+        step = self._block_us
+        self._due_rem += self._block_rem
+        if self._due_rem >= self._bytes_per_sec:
+            self._due_rem -= self._bytes_per_sec
+            step += 1
+        self.due_us = time.ticks_add(self.due_us, step)
+
+    def get_stats(self):
+        """Return playback statistics."""
+        return {
+            'blocks_played': self.blocks_played,
+            'underruns': self.underruns,
+            'underrun_bytes': self.underrun_bytes,
+        }
@@ -0,0 +1,154 @@
+"""
+Presentation Timestamp Playout Clock
+
+Maps the presentation timestamps (PTS) a sender puts in its audio
+packets to the local times at which they should play, so a stream comes
+out a fixed latency after it was produced however its packets were
+delayed on the way.
+
+A PTS is the sender's clock in microseconds with the period of
+time.ticks_us() on MicroPython (2**30), so a MicroPython sender can send
+ticks_us() as it is and both clocks are compared with ticks_diff().
+
+The clock offset is the transit delay of the fastest packets: every
+packet's arrival time is compared with its PTS plus the current offset,
+the smallest difference of each window of packets is kept for the last
+few windows, and at the end of each window the offset moves to the
+smallest of those, since queueing on the link only ever adds delay.
+After the first window a move is limited to slew_us, which is enough to
+follow the drift between two crystals without the playout point
+jumping. A difference of more than a second means the sender's clock
+restarted and the estimate starts again.
+
+A packet plays at PTS + offset + latency. The offset is one small
+integer, stored in one go after it is computed, so the consumer on the
+other core always reads a whole value.
+"""
+
+import time
+from array import array
+
+_RESTART_US = 1000000   # Arrival further than this from the estimate: new sender clock
+
+
+class PlayoutClock:
+    """
+    Clock offset estimate between a sender's timestamps and ticks_us().
+    """
+
+    def __init__(self, latency_ms, window=32, history=8, slew_us=200):
+        """
+        Initialize the playout clock.
+
+        Args:
+            latency_ms (int): Playout delay after the fastest packets arrive
+            window (int): Packets per offset update
+            history (int): Windows whose fastest packets the offset follows
+            slew_us (int): Largest offset move per window once settled
+        """
+        if window < 1 or history < 1:
+            raise ValueError("Window and history must be at least one")
+        self.latency_us = latency_ms * 1000
+        self._window = window
+        self._slew_us = slew_us
+        self._mins = array('i', [0] * history)
+        self.reset()
+
+    def reset(self):
+        """Forget the offset; the next packet starts a new estimate."""
+        self.offset = None
+        self._settled = False
+        self._count = 0
+        self._win_min = 0
+        self._filled = 0
+        self._next = 0
+        self.updates = 0
+        self.restarts = 0
+        self.max_delay_us = 0
+
+    def observe(self, pts, arrival_us=None):
+        """
+        Take the PTS of a packet as it arrives (producer side).
+
+        Args:
+            pts (int): Presentation timestamp of the packet
+            arrival_us (int): ticks_us() at arrival (default: now)
+        """
+        if arrival_us is None:
+            arrival_us = time.ticks_us()
+        offset = self.offset
+        if offset is None:
+            self._start(pts, arrival_us)
+            return
+
+        # Delay of this packet beyond the fastest ones so far
+        delay = time.ticks_diff(arrival_us, time.ticks_add(pts, offset))
+        if delay > _RESTART_US or delay < -_RESTART_US:
+            self.restarts += 1
+            self._settled = False
+            self._start(pts, arrival_us)
+            return
+        if delay > self.max_delay_us:
+            self.max_delay_us = delay
+
+        if delay < self._win_min:
+            self._win_min = delay
+        self._count += 1
+        if self._count < self._window:
+            return
+
+        # Keep the window's fastest packet and move to the fastest kept
+        mins = self._mins
+        mins[self._next] = self._win_min
+        self._next = (self._next + 1) % len(mins)
+        if self._filled < len(mins):
+            self._filled += 1
+        step = _RESTART_US
+        for k in range(self._filled):
+            if mins[k] < step:
+                step = mins[k]
+        if self._settled:
+            if step > self._slew_us:
+                step = self._slew_us
+            elif step < -self._slew_us:
+                step = -self._slew_us
+        self._settled = True
+        self._count = 0
+        self._win_min = _RESTART_US
+        if step:
+            for k in range(self._filled):
+                mins[k] -= step
+            self.offset = offset + step
+            self.updates += 1
+
+    def _start(self, pts, arrival_us):
+        """Take a packet as the first of a new estimate."""
+        self.offset = time.ticks_diff(arrival_us, pts)
+        self._count = 1
+        self._win_min = 0
+        self._filled = 0
+
+    def due_us(self, pts):
+        """
+        Return the ticks_us() at which a PTS should play (consumer side).
+
+        Args:
+            pts (int): Presentation timestamp
+
+        Returns:
+            int: Local playout time, or None before the first packet
+        """
+        offset = self.offset
+        if offset is None:
+            return None
+        return time.ticks_add(pts, offset + self.latency_us)
+
+    def get_stats(self):
+        """Return playout clock statistics."""
+        return {
+            'offset_us': self.offset,
+            'latency_us': self.latency_us,
+            'updates': self.updates,
+            'restarts': self.restarts,
+            'max_delay_us': self.max_delay_us,
+        }
@@ -0,0 +1,228 @@
+"""
+Polyphase Sample-Rate Converter
+
+Streaming fixed-point resampler that converts 16-bit interleaved PCM
+from one sample rate to another, so a sink can accept 8000, 16000,
+22050 or 44100 Hz input while the I2S clock stays fixed.
+
+- Windowed-sinc filter split into PHASES polyphase rows of int16 (Q15)
+  coefficients, computed once when the resampler is created.
+- Output positions advance by an exact rational step (integer part plus
+  a numerator over the reduced output rate), so there is no long-term
+  drift; each position uses the nearest polyphase row.
+- When downsampling the cutoff follows the output rate and the filter
+  grows so the anti-aliasing stays as sharp as when upsampling.
+- The last taps - 1 input frames are kept between blocks, so packets
+  can be fed one at a time.
+
+On ports with the viper code emitter the filter loop comes from
+audio/_resampler_viper.py; everywhere else the portable version below
+is used.
+"""
+
+import math
+import struct
+from array import array
+
+PHASES = 128            # Polyphase rows (fractional delay resolution)
+DEFAULT_TAPS = 16       # Filter taps per row when upsampling
+PASSBAND = 0.9          # Cutoff as a fraction of the lower Nyquist rate
+
+SUPPORTED_RATES = (8000, 16000, 22050, 44100)
+
+# State layout shared with the kernels:
+# [frames held, channels, taps, table length, position, fraction,
+#  step, fraction step, fraction modulus]
+_HAVE = 0
+_POS = 4
+_FRAC = 5
+
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+def design_table(in_rate, out_rate, taps, phases=PHASES):
+    """
+    Build the phase lookup and coefficient table for a conversion.
+
+    Layout: one entry per reduced fraction value giving the start of
+    its coefficient row, followed by phases + 1 rows of taps Q15
+    coefficients. Each row sums to 32768 (unity gain at DC).
+
+    Args:
+        in_rate (int): Input sample rate in Hz
+        out_rate (int): Output sample rate in Hz
+        taps (int): Coefficients per row
+        phases (int): Number of fractional positions
+
+    Returns:
+        array: int16 table
+    """
+    modulus = out_rate // _gcd(in_rate, out_rate)
+    cutoff = PASSBAND * min(1.0, out_rate / in_rate)
+    center = taps // 2 - 1
+    table = array('h', [0] * (modulus + (phases + 1) * taps))
+
+    # Nearest row for every fractional position
+    for frac in range(modulus):
+        row = (frac * phases * 2 + modulus) // (2 * modulus)
+        table[frac] = modulus + row * taps
+
+    for row in range(phases + 1):
+        delay = row / phases
+        values = []
+        for k in range(taps):
+            t = k - center - delay
+            x = math.pi * cutoff * t
+            sinc = math.sin(x) / x if x else 1.0
+            window = (0.42 + 0.5 * math.cos(2 * math.pi * t / taps)
+                      + 0.08 * math.cos(4 * math.pi * t / taps))
+            values.append(sinc * window)
+        scale = 32768 / sum(values)
+        coeffs = [int(round(v * scale)) for v in values]
+        # Put the rounding residue on the largest tap so the row sums exactly
+        peak = coeffs.index(max(coeffs))
+        coeffs[peak] += 32768 - sum(coeffs)
+        base = modulus + row * taps
+        for k in range(taps):
+            table[base + k] = coeffs[k]
+    return table
+
+
+def _resample_py(work, dst, table, state):
+    """Filter the frames held in work into dst; return samples written."""
+    have, channels, taps = state[0], state[1], state[2]
+    pos, frac, step, frac_step, modulus = state[4], state[5], state[6], state[7], state[8]
+    x = struct.unpack_from("<%dh" % (have * channels), work, 0)
+    out = []
+    append = out.append
+
+    while pos + taps <= have:
+        base = table[frac]
+        coeffs = table[base:base + taps]
+        start = pos * channels
+        end = start + taps * channels
+        for ch in range(channels):
+            acc = sum(v * c for v, c in zip(x[start + ch:end:channels], coeffs))
+            acc = (acc + 16384) >> 15
+            if acc > 32767:
+                acc = 32767
+            elif acc < -32768:
+                acc = -32768
+            append(acc)
+        pos += step
+        frac += frac_step
+        if frac >= modulus:
+            frac -= modulus
+            pos += 1
+
+    if out:
+        struct.pack_into("<%dh" % len(out), dst, 0, *out)
+    state[4] = pos
+    state[5] = frac
+    return len(out)
+
+
+try:
+    from audio._resampler_viper import resample_block
+    RESAMPLER_IMPL = "viper"
+except (ImportError, SyntaxError):
+    resample_block = _resample_py
+    RESAMPLER_IMPL = "python"
+
+
+class Resampler:
+    """
+    Block-based polyphase resampler for 16-bit interleaved PCM.
+    """
+
+    def __init__(self, in_rate, out_rate, channels=2, max_frames=256,
+                 taps=DEFAULT_TAPS):
+        """
+        Initialize the resampler.
+
+        Args:
+            in_rate (int): Input sample rate in Hz
+            out_rate (int): Output sample rate in Hz
+            channels (int): Interleaved channels (1 or 2)
+            max_frames (int): Largest input block passed to process()
+            taps (int): Filter taps per row when upsampling
+        """
+        if in_rate <= 0 or out_rate <= 0:
+            raise ValueError("Sample rates must be positive")
+        if out_rate < in_rate:
+            # Widen the filter with the decimation factor
+            taps = taps * -(-in_rate // out_rate)
+
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.max_frames = max_frames
+        self.taps = taps
+
+        g = _gcd(in_rate, out_rate)
+        modulus = out_rate // g
+        self._table = design_table(in_rate, out_rate, taps)
+        self._frame_bytes = 2 * channels
+
+        # History plus one block of input frames
+        self._work = bytearray((taps - 1 + max_frames) * self._frame_bytes)
+        self._work_mv = memoryview(self._work)
+        self._state = array('i', [0, channels, taps, modulus, 0, 0,
+                                  in_rate // out_rate, (in_rate % out_rate) // g,
+                                  modulus])
+        self.reset()
+
+    def reset(self):
+        """Forget buffered input and restart from silence."""
+        history = self.taps // 2
+        self._work_mv[0:history * self._frame_bytes] = bytes(history * self._frame_bytes)
+        self._state[_HAVE] = history
+        self._state[_POS] = 0
+        self._state[_FRAC] = 0
+
+    def max_output(self, nframes):
+        """Return the most output frames process() can return for nframes input."""
+        return nframes * self.out_rate // self.in_rate + 2
+
+    def latency_frames(self):
+        """Return the filter delay in input frames."""
+        return self.taps // 2
+
+    def process(self, src, nframes, dst):
+        """
+        Resample one block.
+
+        Args:
+            src: bytes-like 16-bit interleaved input
+            nframes (int): Input frames in src (at most max_frames)
+            dst: bytearray with room for max_output(nframes) frames
+
+        Returns:
+            int: Output frames written to dst
+        """
+        if nframes > self.max_frames:
+            raise ValueError("Block larger than max_frames")
+        fb = self._frame_bytes
+        state = self._state
+        have = state[_HAVE]
+
+        # Append the block after the history
+        self._work_mv[have * fb:(have + nframes) * fb] = src[0:nframes * fb]
+        have += nframes
+        state[_HAVE] = have
+
+        samples = resample_block(self._work, dst, self._table, state)
+
+        # Keep the frames the next block still needs
+        pos = state[_POS]
+        drop = pos if pos < have else have
+        if drop:
+            keep = have - drop
+            self._work_mv[0:keep * fb] = self._work_mv[drop * fb:have * fb]
+            state[_HAVE] = keep
+            state[_POS] = pos - drop
+        return samples // self.channels
@@ -0,0 +1,220 @@
+"""
+Audio Ring Buffer
+
+Preallocated byte ring buffer shared by every audio path (BLE input,
+adapter queues and I2S output). Data is moved with bulk slice copies
+through a memoryview instead of one byte or sample at a time, and
+wrap-around is handled by splitting a copy into at most two pieces.
+
+No storage is allocated after construction, so pushing a packet only
+costs the copy into the preallocated bytearray.
+
+The read and write positions are each owned by one side (the producer
+only moves the write index, the consumer only moves the read index),
+so one producer and one consumer may use the buffer concurrently, even
+from different cores. clear() moves the read index and is only safe
+while nothing reads; discard() is its producer-side equivalent.
+"""
+
+
+class RingBuffer:
+    """
+    Fixed-size circular byte buffer built on a memoryview.
+    """
+
+    def __init__(self, size):
+        """
+        Initialize the ring buffer.
+
+        Args:
+            size (int): Capacity in bytes
+        """
+        if size <= 0:
+            raise ValueError("Ring buffer size must be positive")
+
+        self._size = size
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+
+        # Indices run from 0 to 2*size - 1 so that a full buffer and an
+        # empty buffer can be told apart without a shared counter
+        self._wrap = 2 * size
+        self._read = 0
+        self._write = 0
+
+        # discard() requests: producer-owned position and count, and the
+        # count the consumer has acted on
+        self._discard_pos = 0
+        self._discards = 0
+        self._discards_seen = 0
+
+    @property
+    def size(self):
+        """Capacity of the buffer in bytes."""
+        return self._size
+
+    def count(self):
+        """Return the number of bytes waiting to be read."""
+        n = self._write - self._read
+        if n < 0:
+            n += self._wrap
+        return n
+
+    def free(self):
+        """Return the number of bytes that can still be written."""
+        return self._size - self.count()
+
+    def level(self):
+        """Return the fill level as a percentage (0-100)."""
+        return (self.count() * 100) // self._size
+
+    def is_empty(self):
+        """Return True if there is nothing to read."""
+        return self._write == self._read
+
+    def is_full(self):
+        """Return True if no more data can be written."""
+        return self.count() == self._size
+
+    def clear(self):
+        """Discard all buffered data."""
+        self._read = self._write
+
+    def discard(self):
+        """
+        Drop everything written so far (producer side).
+
+        The consumer skips to the current write position on its next
+        read_into(), so the read index is never touched from here.
+        """
+        self._discard_pos = self._write
+        self._discards += 1
+
+    def write_into(self, src, nbytes=-1):
+        """
+        Copy data from a buffer into the ring.
+
+        Only as much data as fits is copied; the caller decides what to
+        do with the remainder.
+
+        Args:
+            src: bytes, bytearray or byte memoryview to copy from
+            nbytes (int): Number of bytes to take from src (default: all)
+
+        Returns:
+            int: Number of bytes written
+        """
+        n = len(src) if nbytes < 0 else nbytes
+        free = self._size - self.count()
+        if n > free:
+            n = free
+        if n <= 0:
+            return 0
+
+        size = self._size
+        write = self._write
+        pos = write if write < size else write - size
+        first = size - pos
+
+        if n <= first:
+            if n == len(src):
+                self._mv[pos:pos + n] = src
+            else:
+                self._mv[pos:pos + n] = memoryview(src)[:n]
+        else:
+            # Split the copy at the end of the storage
+            view = memoryview(src)
+            self._mv[pos:size] = view[:first]
+            self._mv[0:n - first] = view[first:n]
+
+        write += n
+        if write >= self._wrap:
+            write -= self._wrap
+        self._write = write
+        return n
+
+    def read_into(self, dst, nbytes=-1):
+        """
+        Copy data out of the ring into a caller-supplied buffer.
+
+        Args:
+            dst: bytearray or byte memoryview to copy into
+            nbytes (int): Maximum number of bytes to read (default: len(dst))
+
+        Returns:
+            int: Number of bytes read
+        """
+        if self._discards != self._discards_seen:
+            self._apply_discard()
+        n = len(dst) if nbytes < 0 else nbytes
+        n = self._peek(dst, n)
+        if n:
+            self._advance(n)
+        return n
+
+    def peek_into(self, dst, nbytes=-1):
+        """
+        Copy data into dst without consuming it.
+
+        Args:
+            dst: bytearray or byte memoryview to copy into
+            nbytes (int): Maximum number of bytes to copy (default: len(dst))
+
+        Returns:
+            int: Number of bytes copied
+        """
+        n = len(dst) if nbytes < 0 else nbytes
+        return self._peek(dst, n)
+
+    def skip(self, nbytes):
+        """
+        Discard up to nbytes of buffered data.
+
+        Returns:
+            int: Number of bytes discarded
+        """
+        n = self.count()
+        if nbytes < n:
+            n = nbytes
+        if n > 0:
+            self._advance(n)
+            return n
+        return 0
+
+    def _peek(self, dst, n):
+        """Copy up to n bytes from the read position into dst."""
+        avail = self.count()
+        if n > avail:
+            n = avail
+        if n <= 0:
+            return 0
+
+        size = self._size
+        read = self._read
+        pos = read if read < size else read - size
+        first = size - pos
+
+        if n <= first:
+            dst[0:n] = self._mv[pos:pos + n]
+        else:
+            dst[0:first] = self._mv[pos:size]
+            dst[first:n] = self._mv[0:n - first]
+        return n
+
+    def _apply_discard(self):
+        """Consumer side of discard(): skip to the recorded position."""
+        self._discards_seen = self._discards
+        pos = self._discard_pos
+        ahead = pos - self._read
+        if ahead < 0:
+            ahead += self._wrap
+        # Skip unless already read past it before seeing the request
+        if ahead <= self.count():
+            self._read = pos
+
+    def _advance(self, n):
+        """Move the read index forward by n bytes."""
+        read = self._read + n
+        if read >= self._wrap:
+            read -= self._wrap
+        self._read = read
@@ -0,0 +1,125 @@
+"""
+Audio Sample Kernels
+
+Block-processing kernels for volume scaling, format conversion and
+mixing.
+Every kernel works on a whole packet at once and writes 16-bit
+little-endian PCM into a caller-supplied buffer, so no per-sample
+objects are created.
+
+Gain is a Q15 integer (Q15_UNITY = 1.0). On ports with the viper code
+emitter the kernels come from audio/_kernels_viper.py; everywhere else
+(including CPython on the host) the portable versions below are used,
+which unpack and pack a whole block with a single struct call.
+"""
+
+import struct
+
+# Q15 fixed-point gain
+Q15_SHIFT = 15
+Q15_UNITY = 1 << Q15_SHIFT
+
+_INT16_MIN = -32768
+_INT16_MAX = 32767
+
+# Used to emit each mono sample twice
+_STEREO = (0, 1)
+
+
+def volume_to_q15(volume):
+    """
+    Convert a float volume to a Q15 gain.
+
+    Args:
+        volume (float): Volume from 0.0 to 1.0
+
+    Returns:
+        int: Gain from 0 to Q15_UNITY
+    """
+    gain = int(volume * Q15_UNITY + 0.5)
+    return max(0, min(Q15_UNITY, gain))
+
+
+def _scale(values, gain):
+    """Scale a sequence of ints by a Q15 gain with saturation."""
+    if gain == Q15_UNITY:
+        return values
+    if gain <= Q15_UNITY:
+        # Cannot overflow below unity gain
+        return [(v * gain) >> Q15_SHIFT for v in values]
+    return [max(_INT16_MIN, min(_INT16_MAX, (v * gain) >> Q15_SHIFT))
+            for v in values]
+
+
+def _gain_q15_py(src, dst, nsamples, gain):
+    """Scale 16-bit samples by a Q15 gain."""
+    fmt = "<%dh" % nsamples
+    values = _scale(struct.unpack_from(fmt, src, 0), gain)
+    struct.pack_into(fmt, dst, 0, *values)
+
+
+def _mono_to_stereo_q15_py(src, dst, nsamples, gain):
+    """Duplicate 16-bit mono samples into interleaved stereo frames."""
+    values = _scale(struct.unpack_from("<%dh" % nsamples, src, 0), gain)
+    frames = [v for v in values for _ in _STEREO]
+    struct.pack_into("<%dh" % (2 * nsamples), dst, 0, *frames)
+
+
+def _mix_q15_py(src, dst, nsamples, gain):
+    """Add 16-bit samples scaled by a Q15 gain into dst with saturation."""
+    fmt = "<%dh" % nsamples
+    values = struct.unpack_from(fmt, src, 0)
+    if gain != Q15_UNITY:
+        values = [(v * gain) >> Q15_SHIFT for v in values]
+    mixed = [max(_INT16_MIN, min(_INT16_MAX, a + b))
+             for a, b in zip(struct.unpack_from(fmt, dst, 0), values)]
+    struct.pack_into(fmt, dst, 0, *mixed)
+
+
+def _u8_to_s16_q15_py(src, dst, nsamples, gain):
+    """Widen unsigned 8-bit samples to signed 16-bit."""
+    values = [(b - 128) << 8 for b in struct.unpack_from("%dB" % nsamples, src, 0)]
+    struct.pack_into("<%dh" % nsamples, dst, 0, *_scale(values, gain))
+
+
+def _u8_mono_to_stereo_q15_py(src, dst, nsamples, gain):
+    """Widen unsigned 8-bit mono samples to 16-bit stereo frames."""
+    values = [(b - 128) << 8 for b in struct.unpack_from("%dB" % nsamples, src, 0)]
+    frames = [v for v in _scale(values, gain) for _ in _STEREO]
+    struct.pack_into("<%dh" % (2 * nsamples), dst, 0, *frames)
+
+
+try:
+    from audio._kernels_viper import (
+        gain_q15, mix_q15, mono_to_stereo_q15, u8_to_s16_q15, u8_mono_to_stereo_q15
+    )
+    KERNEL_IMPL = "viper"
+except (ImportError, SyntaxError):
+    gain_q15 = _gain_q15_py
+    mix_q15 = _mix_q15_py
+    mono_to_stereo_q15 = _mono_to_stereo_q15_py
+    u8_to_s16_q15 = _u8_to_s16_q15_py
+    u8_mono_to_stereo_q15 = _u8_mono_to_stereo_q15_py
+    KERNEL_IMPL = "python"
+
+
+def select_kernel(bits, channels):
+    """
+    Pick the kernel that converts a source format to 16-bit stereo.
+
+    Args:
+        bits (int): Source bit depth (8 or 16)
+        channels (int): Source channel count (1 or 2)
+
+    Returns:
+        tuple: (kernel, input bytes per sample, output bytes per input byte)
+    """
+    if bits == 16 and channels == 2:
+        return gain_q15, 2, 1
+    if bits == 16 and channels == 1:
+        return mono_to_stereo_q15, 2, 2
+    if bits == 8 and channels == 2:
+        return u8_to_s16_q15, 1, 2
+    if bits == 8 and channels == 1:
+        return u8_mono_to_stereo_q15, 1, 4
+    raise ValueError("Unsupported input format: %d-bit, %d channel(s)" % (bits, channels))
@@ -4,6 +4,16 @@ BLE Audio Sink - Audio Processing Module
 This module handles the audio data processing and I2S output,
 including buffering, playback control, and communication with
 the I2S interface.
+
+Each packet starts with a 16-bit sequence number. With timestamps on
+(set_timestamps), the sequence number is followed by a 32-bit
+presentation timestamp: the sender's clock in microseconds modulo
+2**30, its ticks_us() if it runs MicroPython. The stream then plays at
+a fixed latency after the fastest packets arrive instead of as soon as
+the buffer is full. Each I2S block is filled for the local time the
+playback engine will play it: early packets wait behind silence, late
+ones are trimmed to their remaining time, and packets that have not
+arrived when they are due are concealed.
 """
 
 import struct
@@ -13,24 +23,74 @@ from machine import Pin, I2S
 from micropython import const
 
 from .ble_config import *
+from audio.jitter_buffer import JitterBuffer, UNDERRUN, LOST
+from audio.playback_engine import PlaybackEngine
+from audio.core1_engine import Core1PlaybackEngine
+from audio.concealment import Concealer
+from audio.fec import FecDecoder
+from audio.playout_clock import PlayoutClock
+
+_FRAME_BYTES = AUDIO_CHANNELS * AUDIO_BIT_DEPTH // 8
+_FRAME_US = (1000000 + AUDIO_SAMPLE_RATE - 1) // AUDIO_SAMPLE_RATE
+
+# Packet headers: sequence number, and the presentation timestamp with
+# timestamps on
+_HEADER = '<H'
+_HEADER_BYTES = 2
+_TS_HEADER = '<HI'
+_TS_HEADER_BYTES = 6
+_PTS_MASK = const(0x3FFFFFFF)
+
+# Timestamped playout errors up to this are corrected a frame per
+# packet; larger ones by waiting for an early packet or trimming a late one
+_SNAP_US = const(2000)
 
 # Audio state
 _is_playing = False
 _is_paused = False
 _buffer_underrun = False
 
-# I2S interface
+# I2S interface and the engine that feeds it (I2S IRQ or core 1 loop);
+# the jitter buffer is the handoff: BLE puts on core 0, _fill_block pops
 _i2s = None
+_engine = None
 
 # Audio buffers and statistics
-_audio_buffer = []
-_buffer_size = 0
-_buffer_target = AUDIO_BUFFER_TARGET_MS
+_jitter = JitterBuffer(JITTER_SLOT_COUNT, JITTER_SLOT_SIZE, AUDIO_SAMPLE_RATE,
+                       _FRAME_BYTES, AUDIO_BUFFER_TARGET_MS)
+_chunk = bytearray(JITTER_SLOT_SIZE + _FRAME_BYTES)  # Room for one repeated frame
+_chunk_mv = memoryview(_chunk)
+
+# Synthesises lost packets and fades real audio back in after a gap
+_plc = Concealer(AUDIO_PLC, AUDIO_SAMPLE_RATE, len(_chunk), AUDIO_CHANNELS)
+
+# XOR parity FEC ahead of the jitter buffer, off until set_fec_group()
+_fec = FecDecoder(FEC_MAX_GROUP, JITTER_SLOT_SIZE + _TS_HEADER_BYTES)
+
+# Presentation timestamps, off until set_timestamps(); _expect_pts is the
+# PTS the audio after the last packet played (or concealed) should have,
+# _lost_us the audio concealed since the last packet that arrived
+_timed = False
+_clock = PlayoutClock(PLAYOUT_LATENCY_MS, PLAYOUT_CLOCK_WINDOW)
+_expect_pts = None
+_lost_us = 0
+_zeros = memoryview(bytearray(AUDIO_CHUNK_SIZE))
+_playout_stats = {
+    'waits': 0,
+    'late': 0,
+    'concealed': 0,
+    'frames_trimmed': 0,
+    'frames_dropped': 0,
+    'frames_inserted': 0
+}
+
+# Packet in _chunk being copied into I2S blocks (offset, bytes left)
+_carry_off = 0
+_carry_len = 0
+
 _packet_count = 0
-_last_sequence = 0
 _buffer_stats = {
     'underruns': 0,
-    'overruns': 0,
     'packets_received': 0,
     'packets_played': 0,
     'last_timestamp': 0
@@ -38,7 +98,7 @@ _buffer_stats = {
 
 def init():
     """Initialize the audio subsystem"""
-    global _i2s
+    global _i2s, _engine
     
     # Configure I2S pins
     sck_pin = Pin(I2S_SCK_PIN)
@@ -57,6 +117,11 @@ def init():
         rate=AUDIO_SAMPLE_RATE, # Sample rate
         ibuf=AUDIO_I2S_BUFFER   # Internal buffer size
     )
+    bytes_per_sec = AUDIO_SAMPLE_RATE * _FRAME_BYTES
+    if AUDIO_DUAL_CORE:
+        _engine = Core1PlaybackEngine(_i2s, _fill_block, AUDIO_CHUNK_SIZE, bytes_per_sec)
+    else:
+        _engine = PlaybackEngine(_i2s, _fill_block, AUDIO_CHUNK_SIZE, bytes_per_sec)
     
     # Reset buffer
     reset_buffer()
@@ -66,80 +131,223 @@ def init():
 
 def process_audio_data(data):
     """Process incoming audio data from BLE"""
-    global _audio_buffer, _buffer_size, _last_sequence, _packet_count
-    global _buffer_stats
+    if _fec.group_size:
+        # FEC frames: packets come out in order, lost ones rebuilt if possible
+        _fec.feed(data, _process_packet)
+    else:
+        _process_packet(data)
+
+def _process_packet(data):
+    """Put one sequenced audio packet into the jitter buffer"""
+    global _packet_count
+    
+    header = _TS_HEADER_BYTES if _timed else _HEADER_BYTES
     
     # Validate data
-    if len(data) < 3:  # At least seq number + 1 sample
+    if len(data) <= header:  # At least the header + 1 sample
         return
     
-    # Extract sequence number (first 2 bytes)
-    sequence = struct.unpack('<H', data[0:2])[0]
-    
-    # Check for packet loss
-    if _packet_count > 0 and sequence != (_last_sequence + 1) % 65536:
-        # Calculate lost packets
-        if sequence > _last_sequence:
-            lost = sequence - _last_sequence - 1
-        else:
-            # Handle wrap-around
-            lost = (65536 - _last_sequence - 1) + sequence
-            
-        print(f"Packet loss detected: {lost} packets missing")
+    # Extract sequence number (first 2 bytes) and timestamp (next 4)
+    if _timed:
+        sequence, pts = struct.unpack_from(_TS_HEADER, data, 0)
+        pts &= _PTS_MASK
+        _clock.observe(pts)
+    else:
+        sequence = struct.unpack_from(_HEADER, data, 0)[0]
+        pts = 0
     
-    _last_sequence = sequence
     _packet_count += 1
     _buffer_stats['packets_received'] += 1
     _buffer_stats['last_timestamp'] = time.ticks_ms()
     
-    # Extract audio data (skip first 2 bytes which are sequence number)
-    audio_data = data[2:]
-    
-    # Add to buffer
-    _audio_buffer.append(audio_data)
-    _buffer_size += len(audio_data)
+    # Store audio data (skip the header) in its sequence slot; gaps and
+    # reordering are handled at playout
+    _jitter.put(sequence, memoryview(data)[header:], pts)
     
     # If paused or stopped, don't start automatically
     if not _is_playing and not _is_paused:
-        # If buffer is full enough, start playback
-        if _buffer_size >= _buffer_target:
+        # If buffer is full enough (or the first timestamped packet is
+        # in: the engine waits for its time), start playback
+        if _timed or _jitter.ready():
             start_playback()
 
-def _play_audio_task():
-    """Background task to play audio from buffer"""
-    global _audio_buffer, _buffer_size, _is_playing, _buffer_underrun
-    global _buffer_stats
-    
-    if not _is_playing or _is_paused:
-        return
+def _underrun():
+    """Nothing to play: the engine pads silence"""
+    global _buffer_underrun
+    _plc.silence()
+    if not _buffer_underrun:
+        _buffer_underrun = True
+        _buffer_stats['underruns'] += 1
+
+def _fill_block(buf):
+    """Fill one I2S block from the jitter buffer (I2S IRQ or core 1)"""
+    global _buffer_underrun, _carry_off, _carry_len
     
-    # If buffer is empty, handle underrun
-    if len(_audio_buffer) == 0:
-        if not _buffer_underrun:
-            print("Buffer underrun")
-            _buffer_underrun = True
-            _buffer_stats['underruns'] += 1
+    size = len(buf)
+    pos = 0
+    while pos < size:
+        if not _carry_len:
+            if _timed:
+                # Next packet at its playout time, or silence until then
+                n = _next_timed(buf, pos, size)
+                if n < 0:
+                    break
+                pos += n
+                continue
             
-            # Output silence for now
-            zeros = bytearray(AUDIO_CHUNK_SIZE)
-            _i2s.write(zeros)
-        return
+            # Get next packet in sequence order from the jitter buffer
+            chunk_len = _jitter.pop_into(_chunk)
+            
+            # Nothing to play (or refilling to target): the engine pads silence
+            if chunk_len == UNDERRUN:
+                _underrun()
+                break
+            _buffer_underrun = False
+            
+            if chunk_len == LOST:
+                # Missing packet: keep timing with concealment of the same length
+                _carry_len = _plc.conceal(_chunk_mv, _jitter.last_length)
+            else:
+                _buffer_stats['packets_played'] += 1
+                _plc.good(_chunk_mv, chunk_len)
+                _carry_len = chunk_len
+            _carry_off = 0
+            continue
+        
+        # Copy as much of the current packet as fits in the block
+        n = min(_carry_len, size - pos)
+        buf[pos:pos + n] = _chunk_mv[_carry_off:_carry_off + n]
+        pos += n
+        _carry_off += n
+        _carry_len -= n
+    
+    return pos
+
+def _next_timed(buf, pos, size):
+    """
+    Line the next timestamped packet up with the output clock
+    
+    Args:
+        buf: I2S block being filled
+        pos (int): Bytes of buf already filled
+        size (int): Bytes in buf
+    
+    Returns:
+        int: Bytes of silence written into buf while the next packet is
+             early, 0 with the next packet (or its concealment) in
+             _chunk, or -1 if there is nothing to play
+    """
+    global _buffer_underrun, _carry_off, _carry_len, _expect_pts, _lost_us
     
-    # Reset underrun flag
+    # Local time at which buf[pos] plays
+    at = time.ticks_add(_engine.due_us, (pos // _FRAME_BYTES) * 1000000 // AUDIO_SAMPLE_RATE)
+    pts = _jitter.next_pts()
+    present = pts is not None
+    if not present:
+        if _expect_pts is None:
+            _underrun()
+            return -1
+        # Missing: due straight after the audio before it
+        pts = _expect_pts
+    early = time.ticks_diff(_clock.due_us(pts), at)
+    
+    if early >= _SNAP_US or (_expect_pts is None and early >= _FRAME_US):
+        # Early (or the stream starting): silence until it is due, or to
+        # the end of the block
+        room = size - pos
+        if early < (room // _FRAME_BYTES) * 1000000 // AUDIO_SAMPLE_RATE:
+            room = (early * AUDIO_SAMPLE_RATE // 1000000) * _FRAME_BYTES
+        buf[pos:pos + room] = _zeros[0:room]
+        _plc.silence()
+        _playout_stats['waits'] += 1
+        return room
+    
+    if not present:
+        if _jitter.depth_bytes() > 0:
+            _jitter.pop_into(_chunk)    # LOST: moves past its sequence number
+        elif _lost_us >= _clock.latency_us:
+            # Nothing has arrived for a whole latency: the stream has stopped
+            _underrun()
+            return -1
+        n = _plc.conceal(_chunk_mv, _jitter.last_length)
+        duration = (n // _FRAME_BYTES) * 1000000 // AUDIO_SAMPLE_RATE
+        _expect_pts = time.ticks_add(pts, duration)
+        _lost_us += duration
+        _playout_stats['concealed'] += 1
+        _buffer_underrun = False
+        _carry_off = 0
+        _carry_len = n
+        return 0
+    
+    n = _jitter.pop_into(_chunk)
+    duration = (n // _FRAME_BYTES) * 1000000 // AUDIO_SAMPLE_RATE
+    _expect_pts = time.ticks_add(pts, duration)
+    _lost_us = 0
     _buffer_underrun = False
+    off = 0
+    if early <= -_SNAP_US:
+        # Late: the part whose time has passed is dropped
+        if -early >= duration:
+            _playout_stats['late'] += 1
+            return 0
+        off = (-early * AUDIO_SAMPLE_RATE // 1000000) * _FRAME_BYTES
+        _playout_stats['frames_trimmed'] += off // _FRAME_BYTES
+    elif early >= _FRAME_US and n + _FRAME_BYTES <= len(_chunk):
+        # A frame or more early: repeat the last frame
+        _chunk[n:n + _FRAME_BYTES] = _chunk_mv[n - _FRAME_BYTES:n]
+        n += _FRAME_BYTES
+        _playout_stats['frames_inserted'] += 1
+    elif early <= -_FRAME_US and n > _FRAME_BYTES:
+        # A frame or more late: play one frame less
+        n -= _FRAME_BYTES
+        _playout_stats['frames_dropped'] += 1
     
-    # Get next audio chunk from buffer
-    chunk = _audio_buffer.pop(0)
-    _buffer_size -= len(chunk)
     _buffer_stats['packets_played'] += 1
+    _plc.good(_chunk_mv[off:] if off else _chunk_mv, n - off)
+    _carry_off = off
+    _carry_len = n - off
+    return 0
+
+def set_fec_group(size):
+    """
+    Set the FEC group size the sender uses
     
-    # Write to I2S
-    try:
-        bytes_written = _i2s.write(chunk)
-        if bytes_written != len(chunk):
-            print(f"I2S write incomplete: {bytes_written}/{len(chunk)} bytes")
-    except Exception as e:
-        print(f"I2S write error: {e}")
+    Over BLE the group size is negotiated with CMD_SET_FEC (config.py),
+    which BLEAudioSink answers for each connection itself.
+    
+    Args:
+        size (int): Data packets per parity packet, 0 to turn FEC off
+    
+    Returns:
+        int: Group size accepted, to report back to the sender
+    """
+    accepted = _fec.set_group_size(size)
+    print(f"FEC group size {accepted}" if accepted else "FEC off")
+    return accepted
+
+def set_timestamps(on):
+    """
+    Turn presentation timestamps in the packet header on or off
+    
+    Over BLE a central turns them on with CMD_SET_TIMESTAMPS (config.py),
+    which BLEAudioAdapter handles for its stream. Here playback stops and
+    the next packet starts the stream again, with a new clock offset
+    estimate.
+    
+    Args:
+        on (bool): True if packets carry a timestamp after the sequence number
+    
+    Returns:
+        bool: The setting, to report back to the sender
+    """
+    global _timed
+    on = bool(on)
+    if on != _timed:
+        stop_playback()
+        _timed = on
+        _jitter.timed = on
+    print("Timestamped playout" if on else "Timestamps off")
+    return on
 
 def start_playback():
     """Start audio playback"""
@@ -152,18 +360,10 @@ def start_playback():
     _is_paused = False
     print("Audio playback started")
     
-    # Schedule the audio task to run regularly
-    import _thread
-    _thread.start_new_thread(_playback_thread, ())
-
-def _playback_thread():
-    """Background thread for audio playback"""
-    global _is_playing
-    
-    while _is_playing:
-        _play_audio_task()
-        # Sleep to yield CPU time (adjust as needed for performance)
-        time.sleep_ms(5)
+    # Blocks are refilled from the I2S IRQ as each write completes,
+    # or by the loop on core 1
+    if _engine:
+        _engine.start()
 
 def pause_playback():
     """Pause audio playback"""
@@ -173,6 +373,8 @@ def pause_playback():
         return
     
     _is_paused = True
+    if _engine:
+        _engine.stop()
     print("Audio playback paused")
 
 def stop_playback():
@@ -181,25 +383,27 @@ def stop_playback():
     
     _is_playing = False
     _is_paused = False
+    if _engine:
+        _engine.stop()
     reset_buffer()
     print("Audio playback stopped")
 
 def reset_buffer():
     """Reset audio buffer"""
-    global _audio_buffer, _buffer_size, _packet_count, _last_sequence
+    global _packet_count, _carry_len, _expect_pts
     
-    _audio_buffer = []
-    _buffer_size = 0
+    _jitter.reset()
+    _plc.reset()
+    _clock.reset()
+    _expect_pts = None
     _packet_count = 0
-    _last_sequence = 0
+    _carry_len = 0
     
     print("Audio buffer reset")
 
 def get_buffer_level():
     """Get current buffer fullness level (percent)"""
-    if _buffer_target == 0:
-        return 0
-    return min(100, int((_buffer_size * 100) / _buffer_target))
+    return _jitter.level()
 
 def get_stats():
     """Get audio statistics"""
@@ -207,16 +411,28 @@ def get_stats():
     stats['buffer_level'] = get_buffer_level()
     stats['is_playing'] = _is_playing
     stats['is_paused'] = _is_paused
-    stats['buffer_size'] = _buffer_size
+    stats['buffer_size'] = _jitter.depth_bytes()
+    stats['jitter'] = _jitter.get_stats()
+    stats['plc'] = _plc.get_stats()
+    stats['fec'] = _fec.get_stats()
+    stats['timestamps'] = _timed
+    if _timed:
+        stats['playout'] = _playout_stats.copy()
+        stats['playout'].update(_clock.get_stats())
+    if _engine:
+        stats['engine'] = _engine.get_stats()
     return stats
 
 def deinit():
     """Deinitialize the audio subsystem"""
-    global _i2s, _is_playing
+    global _i2s, _engine, _is_playing
     
-    # Stop playback
+    # Stop playback; stop() returns once no further block can be
+    # submitted (IRQ detached, or core 1 out of its loop)
     _is_playing = False
-    time.sleep_ms(50)  # Give playback thread time to stop
+    if _engine:
+        _engine.stop()
+        _engine = None
     
     # Deinitialize I2S
     if _i2s:
@@ -67,6 +67,15 @@ AUDIO_I2S_BUFFER = const(4096)    # I2S buffer size in bytes
 # Buffer configuration
 AUDIO_BUFFER_TARGET_MS = const(200)  # Target buffer size in milliseconds
 AUDIO_CHUNK_SIZE = const(512)        # Size of each audio chunk to output in bytes
+JITTER_SLOT_COUNT = const(64)        # Packet slots in the jitter buffer (power of two)
+JITTER_SLOT_SIZE = const(512)        # Maximum audio payload per packet in bytes
+AUDIO_DUAL_CORE = False              # Play out from a loop on core 1 instead of the I2S IRQ
+AUDIO_PLC = const(2)                 # Lost packets: 0=silence, 1=repeat, 2=WSOLA (audio/concealment.py)
+FEC_MAX_GROUP = const(8)             # Largest XOR parity FEC group accepted (audio/fec.py)
+PLAYOUT_LATENCY_MS = const(80)       # Timestamped packets play this long after the fastest arrive;
+                                     # covers the link jitter plus the I2S buffer and two blocks
+                                     # filled ahead, and must fit in the jitter slots
+PLAYOUT_CLOCK_WINDOW = const(32)     # Packets per clock offset update (audio/playout_clock.py)
 
 # Control commands (sent via CHAR_AUDIO_CONTROL)
 CMD_PLAY = const(0x01)    # Start playback
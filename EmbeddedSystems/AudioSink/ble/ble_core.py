@@ -3,6 +3,32 @@ BLE Audio Sink - Core Implementation
 
 This module implements the core Bluetooth Low Energy (BLE) functionality 
 for the audio sink application.
+
+Up to BLE_MAX_CONNECTIONS centrals can be connected at once, each
+streaming its own audio. Each connection has a slot of
+ble/conn_slots.py (MTU, connection parameters, packet counters) and the
+FEC decoder of that slot, all allocated at start-up and found by
+connection handle in constant time. The sink keeps advertising while a
+slot is free, negotiates FEC per connection and tells the audio source
+callback which connection every packet came from. Centrals that enable
+credit flow control (ble/flow_control.py) get the packets the sink has
+room for with every status notification.
+
+Other centrals get status notifications only once they have subscribed
+(written the CCCD), through ble/notify_scheduler.py: status changes
+within BLE_NOTIFY_WINDOW_MS are sent as one notification of the latest
+status, at most BLE_NOTIFY_BUDGET per connection every
+BLE_NOTIFY_PERIOD_MS, from the adapter's notify task (or poll_notify()).
+
+The link settings come from a ble/link_profile.py preset (streaming by
+default): the MTU is exchanged as each central connects, and the MTU
+and connection interval each link ends up with are passed to the link
+callback.
+
+Audio writes are passed on from the IRQ, since the callback only copies
+them into a preallocated queue. Control writes are copied into a slot
+of ble/deferred.py and handled once the IRQ has returned, so commands
+that print, configure the DSP or start tasks do not hold up the radio.
 """
 
 import bluetooth
@@ -14,34 +40,95 @@ from machine import Pin
 
 from config import (
     BLE_DEVICE_NAME, MANUFACTURER_NAME, MODEL_NUMBER, FIRMWARE_VERSION,
-    STATUS_LED_PIN, BLE_AUDIO_PACKET_SIZE, 
+    STATUS_LED_PIN, BLE_AUDIO_PACKET_SIZE, AUDIO_CHUNK_SIZE, BLE_L2CAP_ENABLED,
     BLE_DEVICE_INFO_SERVICE_UUID, BLE_AUDIO_SERVICE_UUID, BLE_AUDIO_CONTROL_SERVICE_UUID,
     BLE_MANUFACTURER_NAME_CHAR_UUID, BLE_MODEL_NUMBER_CHAR_UUID, BLE_FIRMWARE_REVISION_CHAR_UUID,
     BLE_AUDIO_DATA_CHAR_UUID, BLE_AUDIO_CONTROL_CHAR_UUID, BLE_AUDIO_STATUS_CHAR_UUID,
+    BLE_LATENCY_TRACE_CHAR_UUID, FEC_MAX_GROUP, BLE_MAX_CONNECTIONS,
+    BLE_NOTIFY_WINDOW_MS, BLE_NOTIFY_BUDGET, BLE_NOTIFY_PERIOD_MS,
+    BLE_DEFERRED_SLOTS, BLE_DEFERRED_SLOT_SIZE, BLE_MTU_SIZE, BLE_LINK_PROFILE,
     BLE_IRQ_CENTRAL_CONNECT, BLE_IRQ_CENTRAL_DISCONNECT, BLE_IRQ_GATTS_WRITE,
-    ADV_INTERVAL_MS, 
-    CMD_PLAY, CMD_PAUSE, CMD_STOP,
+    CMD_PLAY, CMD_PAUSE, CMD_STOP, CMD_SET_FEC, CMD_FLOW_CONTROL,
     STATUS_READY, STATUS_PLAYING, STATUS_PAUSED, STATUS_STOPPED, STATUS_ERROR
 )
+from ble.irq_dispatch import IRQDispatcher
+from ble.deferred import DeferredWork
+from ble.link_profile import LinkProfile
+from ble.conn_slots import ConnectionSlots
+from ble.notify_scheduler import NotifyScheduler
+from ble.l2cap_transport import L2CAPAudioTransport
+from ble.flow_control import CreditFlowControl, FLOW_ON
+from audio.fec import FecDecoder
+from audio.packet_capture import KIND_AUDIO, KIND_CONTROL, KIND_CONNECT, KIND_DISCONNECT
 
 class BLEAudioSink:
     def __init__(self, device_name=BLE_DEVICE_NAME):
         """Initialize BLE Audio Sink"""
         self._ble = bluetooth.BLE()
         self._ble.active(True)
-        self._ble.irq(self._irq_handler)
+        
+        # IRQs go straight to the handler of their event (and handle);
+        # slow work is deferred until the IRQ returns, and IRQs are timed
+        self._irq = IRQDispatcher()
+        self._irq.on(BLE_IRQ_CENTRAL_CONNECT, self._on_connect)
+        self._irq.on(BLE_IRQ_CENTRAL_DISCONNECT, self._on_disconnect)
+        self.deferred = DeferredWork(BLE_DEFERRED_SLOTS, BLE_DEFERRED_SLOT_SIZE, schedule=True)
+        self._ble.irq(self.deferred.timed(self._irq.dispatch))
         
         self._device_name = device_name
         self._reset_state()
         
         # Callbacks
         self._audio_callback = None
+        self._source_callback = None
         self._control_callback = None
         self._status_callback = None
+        self._connection_callback = None
+        self._credit_callback = None
+        
+        # Connection whose packet or control write is being handled
+        self._rx_conn = None
+        self.control_conn = None
+        
+        # Optional audio/latency_trace.LatencyTrace stamped on audio packet receipt
+        self.trace = None
+        
+        # Optional audio/packet_capture.PacketCapture logging what the radio delivers
+        self.capture = None
+        
+        # Per-connection state, in slots handed out as centrals connect
+        self.slots = ConnectionSlots(BLE_MAX_CONNECTIONS)
+        
+        # XOR parity FEC per connection slot, off until negotiated
+        self._fec = [FecDecoder(FEC_MAX_GROUP, AUDIO_CHUNK_SIZE)
+                     for _ in range(BLE_MAX_CONNECTIONS)]
+        
+        # Credit limits for the centrals that asked for them
+        self.flow = CreditFlowControl()
+        
+        # MTU, connection interval and advertising interval of the links
+        self.link = LinkProfile(self._ble, BLE_LINK_PROFILE, BLE_MTU_SIZE, self.slots)
+        self.link.register(self._irq)
+        
+        # Status notifications to subscribed connections, coalesced and rate limited
+        self.notify = NotifyScheduler(self._ble, self.slots, BLE_NOTIFY_WINDOW_MS,
+                                      BLE_NOTIFY_BUDGET, BLE_NOTIFY_PERIOD_MS)
+        self.notify.register(self._irq)
+        
+        # L2CAP audio channel, reading at most one ingest packet at a time
+        self.l2cap = None
+        if BLE_L2CAP_ENABLED:
+            self.l2cap = L2CAPAudioTransport(self._ble, read_size=AUDIO_CHUNK_SIZE)
+            self.l2cap.set_audio_data_callback(self._receive_l2cap)
+            self.l2cap.register(self._irq)
+            self.l2cap.listen()
         
         # Initialize status LED if available
         self._status_led = Pin(STATUS_LED_PIN, Pin.OUT, value=0)  # Onboard LED on Pico W
         
+        # Advertising while a slot is free, until disconnect()
+        self._discoverable = True
+        
         # Setup services and start advertising
         self._setup_services()
         self._start_advertising()
@@ -51,27 +138,85 @@ class BLEAudioSink:
     def _reset_state(self):
         """Reset internal state variables."""
         self._connected = False
-        self._conn_handle = None
         self._audio_buffer = bytearray()
         self._current_status = STATUS_READY
         self._last_packet_time = 0
         
     def set_audio_data_callback(self, callback):
-        """Set callback for audio data processing."""
+        """Set callback for audio data processing (GATT and L2CAP)."""
         self._audio_callback = callback
+    
+    def set_audio_source_callback(self, callback):
+        """
+        Set callback for audio data tagged with its connection.
+        
+        Called as callback(conn_handle, data) instead of the audio data
+        callback, so streams from several centrals can be told apart.
+        """
+        self._source_callback = callback
+    
+    def set_flow_control(self, can_receive):
+        """Set the callback that withholds L2CAP credits while the sink is full."""
+        if self.l2cap:
+            self.l2cap.set_flow_control(can_receive)
+        
+    def set_credit_callback(self, callback):
+        """
+        Set the callback that sizes credit flow control.
+        
+        Called as callback(conn_handle) and returns the audio packets
+        the sink can take from that connection right now.
+        """
+        self._credit_callback = callback
         
     def set_control_callback(self, callback):
         """Set callback for control command processing."""
         self._control_callback = callback
         
     def set_status_callback(self, callback):
-        """Set callback for status updates."""
+        """Set callback for status updates (first connect, last disconnect)."""
         self._status_callback = callback
     
+    def set_connection_callback(self, callback):
+        """Set callback(conn_handle, connected) called for every central."""
+        self._connection_callback = callback
+    
+    def set_link_callback(self, callback):
+        """Set callback(conn_handle, payload, interval_us) for negotiated link values."""
+        self.link.set_callback(callback)
+    
+    def set_link_profile(self, name):
+        """
+        Switch to another link profile (streaming, interactive or idle).
+        
+        Args:
+            name (str): Preset of ble/link_profile.py
+        """
+        if self.link.set_profile(name) and self.slots.free():
+            # Advertising again at the profile's interval
+            self._start_advertising()
+    
     def is_connected(self):
         """Return connection status."""
         return self._connected
     
+    def connection_count(self):
+        """Return the number of connected centrals."""
+        return len(self.slots)
+    
+    def get_fec(self, conn_handle):
+        """Return the FEC decoder of a connection, or None if not connected."""
+        s = self.slots.slot(conn_handle)
+        return self._fec[s] if s >= 0 else None
+    
+    def get_fec_stats(self):
+        """Return FEC statistics per connection handle."""
+        return {conn: self.get_fec(conn).get_stats() for conn in self.slots.handles()}
+    
+    def get_connection_stats(self):
+        """Return the slot state of every connection by handle."""
+        return self.slots.get_stats()
+    
     def get_status(self):
         """Return current status."""
         return self._current_status
@@ -109,6 +254,7 @@ class BLEAudioSink:
             (
                 (bluetooth.UUID(BLE_AUDIO_CONTROL_CHAR_UUID), bluetooth.FLAG_WRITE | bluetooth.FLAG_NOTIFY),
                 (bluetooth.UUID(BLE_AUDIO_STATUS_CHAR_UUID), bluetooth.FLAG_READ | bluetooth.FLAG_NOTIFY),
+                (bluetooth.UUID(BLE_LATENCY_TRACE_CHAR_UUID), bluetooth.FLAG_READ),
             ),
         )
         
@@ -126,16 +272,23 @@ class BLEAudioSink:
         self._handles['audio_data'] = audio_handles[0][0]
         self._handles['audio_control'] = control_handles[0][0]
         self._handles['audio_status'] = control_handles[0][1]
+        self._handles['latency_trace'] = control_handles[0][2]
+        self._irq.on_handle(BLE_IRQ_GATTS_WRITE, self._handles['audio_data'], self._on_audio_write)
+        self._irq.on_handle(BLE_IRQ_GATTS_WRITE, self._handles['audio_control'], self._on_control_write)
+        self.notify.add(self._handles['audio_status'])
         
         # Initialize status characteristic
         self._update_status(STATUS_READY)
     
     def start_advertising(self):
-        """Start BLE advertising."""
+        """Start BLE advertising, and advertise again as centrals leave."""
+        self._discoverable = True
         self._start_advertising()
     
     def _start_advertising(self):
-        """Start BLE advertising."""
+        """Start BLE advertising, unless disconnect() has turned it off."""
+        if not self._discoverable:
+            return
         # Advertising payload
         payload = bytearray()
         
@@ -155,7 +308,7 @@ class BLEAudioSink:
                                BLE_AUDIO_CONTROL_SERVICE_UUID)
         
         # Start advertising
-        self._ble.gap_advertise(ADV_INTERVAL_MS, payload)  # ADV_INTERVAL_MS * 625us
+        self._ble.gap_advertise(self.link.adv_interval_us, payload)
         print("BLE advertising started")
     
     def _stop_advertising(self):
@@ -164,75 +317,245 @@ class BLEAudioSink:
         print("BLE advertising stopped")
     
     def disconnect(self):
-        """Disconnect any connected device and stop advertising."""
+        """Disconnect any connected device and stop advertising until start_advertising()."""
+        self._discoverable = False
         if self._connected:
-            self._ble.gap_disconnect(self._conn_handle)
-        else:
-            self._stop_advertising()
-    
-    def _irq_handler(self, event, data):
-        """Handle BLE IRQ events."""
-        if event == BLE_IRQ_CENTRAL_CONNECT:
-            # Central device connected
-            conn_handle, addr_type, addr = data
-            self._conn_handle = conn_handle
-            self._connected = True
-            self._status_led.value(1)  # Turn on LED
-            print("BLE central connected")
+            for conn_handle in list(self.slots.handles()):
+                self._ble.gap_disconnect(conn_handle)
+        self._stop_advertising()
+    
+    def _on_connect(self, data):
+        """Handle a central connecting (CENTRAL_CONNECT IRQ)."""
+        conn_handle, addr_type, addr = data
+        first = not self._connected
+        if self.slots.open(conn_handle) < 0:
+            # Every slot is taken
+            self._ble.gap_disconnect(conn_handle)
+            return
+        self.link.on_connect(conn_handle)
+        self.notify.on_connect(conn_handle)
+        if self.capture:
+            self.capture.record(KIND_CONNECT, conn_handle)
+        self._connected = True
+        self._status_led.value(1)  # Turn on LED
+        print(f"BLE central connected ({len(self.slots)}/{BLE_MAX_CONNECTIONS})")
+        if self.slots.free():
+            # Stay discoverable for further sources
+            self._start_advertising()
+        if first:
             self._update_status(STATUS_READY)
-            if self._status_callback:
-                self._status_callback(True)
-        
-        elif event == BLE_IRQ_CENTRAL_DISCONNECT:
-            # Central device disconnected
-            conn_handle, addr_type, addr = data
-            self._conn_handle = None
-            self._connected = False
+        else:
+            self._update_status(self._current_status)
+        if first and self._status_callback:
+            self._status_callback(True)
+        if self._connection_callback:
+            self._connection_callback(conn_handle, True)
+    
+    def _on_disconnect(self, data):
+        """Handle a central disconnecting (CENTRAL_DISCONNECT IRQ)."""
+        conn_handle, addr_type, addr = data
+        s = self.slots.close(conn_handle)
+        if s < 0:
+            # Refused while every slot was taken
+            return
+        fec = self._fec[s]
+        self.link.on_disconnect(conn_handle)
+        self.notify.on_disconnect(conn_handle)
+        if self.capture:
+            self.capture.record(KIND_DISCONNECT, conn_handle)
+        fec.set_group_size(0)  # The next sender negotiates again
+        self.flow.remove(conn_handle)
+        fec.reset_stats()
+        if self.l2cap and self.l2cap.conn_handle == conn_handle:
+            self.l2cap.reset()
+        print("BLE central disconnected")
+        if self._connection_callback:
+            self._connection_callback(conn_handle, False)
+        if not self.slots:
             self._reset_state()
             self._status_led.value(0)  # Turn off LED
-            print("BLE central disconnected")
-            # Restart advertising
-            self._start_advertising()
-            if self._status_callback:
-                self._status_callback(False)
-        
-        elif event == BLE_IRQ_GATTS_WRITE:
-            # Write to a characteristic
-            conn_handle, attr_handle = data
-            
-            if attr_handle == self._handles['audio_data']:
-                # Audio data received
-                value = self._ble.gatts_read(attr_handle)
-                self._last_packet_time = time.ticks_ms()
-                if self._audio_callback:
-                    self._audio_callback(value)
-            
-            elif attr_handle == self._handles['audio_control']:
-                # Control command received
-                value = self._ble.gatts_read(attr_handle)
-                if value and self._control_callback:
-                    self._control_callback(value)
-                
-                # Update status based on command (if no callback provided)
-                if not self._control_callback and value:
-                    cmd = value[0]
-                    if cmd == CMD_PLAY:
-                        self._update_status(STATUS_PLAYING)
-                    elif cmd == CMD_PAUSE:
-                        self._update_status(STATUS_PAUSED)
-                    elif cmd == CMD_STOP:
-                        self._update_status(STATUS_STOPPED)
+        # Restart advertising
+        self._start_advertising()
+        if not self.slots and self._status_callback:
+            self._status_callback(False)
+    
+    def _on_audio_write(self, data):
+        """Handle a write to the audio data characteristic (GATTS_WRITE IRQ)."""
+        if self.trace:
+            self.trace.received()
+        conn_handle, attr_handle = data
+        value = self._ble.gatts_read(attr_handle)
+        self._last_packet_time = time.ticks_ms()
+        self._receive_audio(conn_handle, value)
+    
+    def _on_control_write(self, data):
+        """Queue a write to the audio control characteristic (GATTS_WRITE IRQ)."""
+        conn_handle, attr_handle = data
+        # Dropped, and counted, while BLE_DEFERRED_SLOTS writes are waiting
+        self.deferred.defer_read(self._ble, self._control_deferred, conn_handle, attr_handle)
+    
+    def _control_deferred(self, conn_handle, value):
+        """Handle a queued control write, after the IRQ."""
+        self._receive_control(conn_handle, bytes(value))
+    
+    def _receive_control(self, conn_handle, value):
+        """Handle a write to the audio control characteristic."""
+        if self.capture:
+            self.capture.record(KIND_CONTROL, conn_handle, value)
+        self.control_conn = conn_handle
+        if value and value[0] == CMD_SET_FEC:
+            # Transport setting, answered here
+            self._set_fec(conn_handle, value[1] if len(value) > 1 else 0)
+        elif value and value[0] == CMD_FLOW_CONTROL:
+            self._set_flow_control(conn_handle, len(value) > 1 and value[1] == FLOW_ON)
+        elif value and self._control_callback:
+            self._control_callback(value)
+        
+        # Update status based on command (if no callback provided)
+        if not self._control_callback and value:
+            cmd = value[0]
+            if cmd == CMD_PLAY:
+                self._update_status(STATUS_PLAYING)
+            elif cmd == CMD_PAUSE:
+                self._update_status(STATUS_PAUSED)
+            elif cmd == CMD_STOP:
+                self._update_status(STATUS_STOPPED)
+    
+    def replay(self, kind, conn_handle, data):
+        """
+        Feed a captured event back in as if the radio had delivered it.
+        
+        Handler for audio/packet_capture.PacketReplayer.play().
+        
+        Args:
+            kind (int): Record kind from the capture log
+            conn_handle (int): Connection of the event
+            data: Payload (copied before it is passed on)
+        """
+        if kind == KIND_AUDIO:
+            if self.trace:
+                self.trace.received()
+            self._receive_audio(conn_handle, bytes(data))
+        elif kind == KIND_CONTROL:
+            self._receive_control(conn_handle, bytes(data))
+        elif kind == KIND_CONNECT:
+            self._on_connect((conn_handle, 0, bytes(6)))
+        elif kind == KIND_DISCONNECT:
+            self._on_disconnect((conn_handle, 0, bytes(6)))
+    
+    def _receive_l2cap(self, data):
+        """Pass on a read from the L2CAP channel."""
+        self._receive_audio(self.l2cap.conn_handle, data)
+    
+    def _receive_audio(self, conn_handle, data):
+        """Pass an audio packet (GATT or L2CAP) on, through FEC if enabled."""
+        if self.capture:
+            self.capture.record(KIND_AUDIO, conn_handle, data)
+        self.flow.received(conn_handle)
+        s = self.slots.slot(conn_handle)
+        if s >= 0:
+            self.slots.rx_packets[s] += 1
+            self.slots.rx_bytes[s] += len(data)
+        if not (self._source_callback or self._audio_callback):
+            return
+        self._rx_conn = conn_handle
+        if s >= 0 and self._fec[s].group_size:
+            self._fec[s].feed(data, self._deliver)
+        else:
+            self._deliver(data)
+    
+    def _deliver(self, data):
+        """Hand a packet from connection _rx_conn to the audio callback."""
+        if self._source_callback:
+            self._source_callback(self._rx_conn, data)
+        else:
+            self._audio_callback(data)
+    
+    def _set_fec(self, conn_handle, group_size):
+        """
+        Answer an FEC request by notifying the accepted group size.
+        
+        Args:
+            conn_handle (int): Connection that asked
+            group_size (int): Data packets per parity packet asked for, 0 = off
+        """
+        fec = self.get_fec(conn_handle)
+        if fec is None:
+            return
+        accepted = fec.set_group_size(group_size)
+        self.reply_control(conn_handle, bytes([CMD_SET_FEC, accepted]))
+        print(f"FEC group size {accepted}" if accepted else "FEC off")
+    
+    def _set_flow_control(self, conn_handle, on):
+        """
+        Turn credit flow control on or off for a connection.
+        
+        The first credit limit is notified straight away.
+        
+        Args:
+            conn_handle (int): Connection that asked
+            on (bool): True to notify credit limits on the status characteristic
+        """
+        if self.slots.slot(conn_handle) < 0:
+            return
+        self.flow.enable(conn_handle, on)
+        if on:
+            self._notify_credits(conn_handle)
+        print("Flow control on" if on else "Flow control off")
+    
+    def _credits(self, conn_handle):
+        """Return the packets the sink can take from a connection now."""
+        if self._credit_callback:
+            return self._credit_callback(conn_handle)
+        return 0
+    
+    def _notify_credits(self, conn_handle):
+        """Notify the status and credit limit to a flow-controlled connection."""
+        data = self.flow.status(conn_handle, self._current_status, self._credits(conn_handle))
+        self._ble.gatts_notify(conn_handle, self._handles['audio_status'], data)
+        self._count_tx(conn_handle)
+    
+    def _count_tx(self, conn_handle):
+        """Count a notification sent to a connection."""
+        s = self.slots.slot(conn_handle)
+        if s >= 0:
+            self.slots.tx_packets[s] += 1
+    
+    def notify_credits(self):
+        """Notify every flow-controlled connection whose credit limit has moved."""
+        for conn_handle in self.flow.enabled():
+            if self.flow.changed(conn_handle, self._credits(conn_handle)):
+                self._notify_credits(conn_handle)
     
     def _update_status(self, status):
         """Update the status characteristic."""
         self._current_status = status
-        if self._connected and self._handles.get('audio_status'):
-            self._ble.gatts_write(self._handles['audio_status'], bytes([status]))
-            self._ble.gatts_notify(self._conn_handle, self._handles['audio_status'])
+        handle = self._handles.get('audio_status')
+        if self._connected and handle:
+            self.notify.update(handle, bytes([status]))
+            # Flow-controlled connections get the status with their credits, at once
+            for conn_handle in self.flow.enabled():
+                self.notify.cancel(conn_handle, handle)
+                self._notify_credits(conn_handle)
+        elif handle:
+            self._ble.gatts_write(handle, bytes([status]))
+    
+    def poll_notify(self):
+        """Send the status notifications whose window has ended (without the notify task)."""
+        return self.notify.poll()
     
     def set_status(self, status):
         """Update the status from external components."""
         self._update_status(status)
+    
+    def reply_control(self, conn_handle, data):
+        """Answer a control command by notifying data on the control characteristic."""
+        self._ble.gatts_write(self._handles['audio_control'], data)
+        self._ble.gatts_notify(conn_handle, self._handles['audio_control'])
+    
+    def set_latency_snapshot(self, data):
+        """Publish a latency histogram snapshot on the latency trace characteristic."""
+        self._ble.gatts_write(self._handles['latency_trace'], data)
 
 # Helper function for testing
 def test_ble_audio_sink():
@@ -260,6 +583,7 @@ def test_ble_audio_sink():
     
     try:
         loop = asyncio.get_event_loop()
+        loop.create_task(ble_sink.notify.run())
         loop.run_forever()
     except KeyboardInterrupt:
         print("Test terminated by user")
@@ -0,0 +1,207 @@
+"""
+BLE Connection Slots
+
+Per-connection state of a peripheral (or central) that serves several
+connections at once, kept in a fixed number of slots allocated at
+start-up: one entry per slot in each of a few arrays, so nothing is
+allocated as connections come and go, and applications index their own
+per-connection objects (decoders, buffers, ...) by slot too.
+
+    slots = ConnectionSlots(4)
+    ...
+    slot = slots.open(conn_handle)          # Connect IRQ; -1 when all are taken
+    ...
+    slot = slots.slot(conn_handle)          # Any later IRQ
+    slots.rx_packets[slot] += 1
+    ...
+    slots.close(conn_handle)                # Disconnect IRQ
+
+Connection handles are whatever the stack hands out (small integers on
+NimBLE, HCI handles on btstack), so they are not used as indices.
+slot() finds a handle's slot in a hash table of twice as many entries
+as slots, addressed by the low bits of the handle with linear probing:
+at most half full, a lookup takes a probe or two however many
+connections are open, against one per open connection for a scan.
+
+Per slot: the connection handle (-1 while free), the ATT MTU and the
+connection interval, latency and supervision timeout, the L2CAP
+channel, a byte of subscription flags for the application, and packet
+and byte counters.
+
+The LED peripheral and L2CAP demos import it as ble.conn_slots, and so
+do link_profile.py and notify_scheduler.py: copy this file to
+ble/conn_slots.py on the board with them.
+"""
+
+from array import array
+from micropython import const
+
+# MTU every link starts with
+_DEFAULT_MTU = const(23)
+
+
+class ConnectionSlots:
+    """
+    Fixed set of per-connection state slots, looked up by connection handle.
+    """
+
+    def __init__(self, count):
+        """
+        Initialize with every slot free.
+
+        Args:
+            count (int): Most connections at once
+        """
+        if count < 1:
+            raise ValueError("At least one slot is needed")
+        self.count = count
+
+        # Per slot state
+        self.conn = array('i', [-1] * count)
+        self.mtu = array('H', [_DEFAULT_MTU] * count)
+        self.interval_us = array('I', [0] * count)
+        self.latency = array('H', [0] * count)
+        self.timeout_ms = array('H', [0] * count)
+        self.cid = array('H', [0] * count)
+        self.subscribed = bytearray(count)
+        self.rx_packets = array('I', [0] * count)
+        self.rx_bytes = array('I', [0] * count)
+        self.tx_packets = array('I', [0] * count)
+
+        # Free slots, lowest on top
+        self._free = array('b', range(count - 1, -1, -1))
+        self._nfree = count
+
+        # Handle -> slot hash table, at most half full
+        size = 2
+        while size < 2 * count:
+            size <<= 1
+        self._mask = size - 1
+        self._table = array('b', [-1] * size)
+
+    def __len__(self):
+        """Return the number of open connections."""
+        return self.count - self._nfree
+
+    def free(self):
+        """Return the number of free slots."""
+        return self._nfree
+
+    def slot(self, conn_handle):
+        """
+        Find the slot of a connection.
+
+        Args:
+            conn_handle (int): Connection handle
+
+        Returns:
+            int: Slot index, or -1 if the connection has none
+        """
+        mask = self._mask
+        table = self._table
+        i = conn_handle & mask
+        while True:
+            s = table[i]
+            if s < 0:
+                return -1
+            if self.conn[s] == conn_handle:
+                return s
+            i = (i + 1) & mask
+
+    def open(self, conn_handle):
+        """
+        Give a new connection a slot, with its state reset.
+
+        Args:
+            conn_handle (int): Connection handle
+
+        Returns:
+            int: Slot index, or -1 if every slot is taken
+        """
+        if conn_handle < 0:
+            raise ValueError("Connection handle must not be negative")
+        s = self.slot(conn_handle)
+        if s >= 0:
+            return s  # Already open
+        if not self._nfree:
+            return -1
+        self._nfree -= 1
+        s = self._free[self._nfree]
+        self.conn[s] = conn_handle
+        self.mtu[s] = _DEFAULT_MTU
+        self.interval_us[s] = 0
+        self.latency[s] = 0
+        self.timeout_ms[s] = 0
+        self.cid[s] = 0
+        self.subscribed[s] = 0
+        self.rx_packets[s] = 0
+        self.rx_bytes[s] = 0
+        self.tx_packets[s] = 0
+        mask = self._mask
+        i = conn_handle & mask
+        while self._table[i] >= 0:
+            i = (i + 1) & mask
+        self._table[i] = s
+        return s
+
+    def close(self, conn_handle):
+        """
+        Free the slot of a connection.
+
+        Args:
+            conn_handle (int): Connection handle
+
+        Returns:
+            int: Slot index freed, or -1 if the connection had none
+        """
+        mask = self._mask
+        table = self._table
+        i = conn_handle & mask
+        while True:
+            s = table[i]
+            if s < 0:
+                return -1
+            if self.conn[s] == conn_handle:
+                break
+            i = (i + 1) & mask
+        table[i] = -1
+        # Shift later entries of the probe run back into the gap
+        j = i
+        while True:
+            j = (j + 1) & mask
+            t = table[j]
+            if t < 0:
+                break
+            home = self.conn[t] & mask
+            if (i < j and (home <= i or home > j)) or (i > j and home <= i and home > j):
+                table[i] = t
+                table[j] = -1
+                i = j
+        self.conn[s] = -1
+        self._free[self._nfree] = s
+        self._nfree += 1
+        return s
+
+    def handles(self):
+        """Yield the handle of every open connection, in slot order."""
+        for s in range(self.count):
+            if self.conn[s] >= 0:
+                yield self.conn[s]
+
+    def get_stats(self):
+        """Return the state of every open connection by handle."""
+        stats = {}
+        for s in range(self.count):
+            conn_handle = self.conn[s]
+            if conn_handle >= 0:
+                stats[conn_handle] = {
+                    'slot': s,
+                    'mtu': self.mtu[s],
+                    'interval_us': self.interval_us[s],
+                    'cid': self.cid[s],
+                    'subscribed': self.subscribed[s],
+                    'rx_packets': self.rx_packets[s],
+                    'rx_bytes': self.rx_bytes[s],
+                    'tx_packets': self.tx_packets[s],
+                }
+        return stats
@@ -0,0 +1,273 @@
+"""
+Deferred BLE IRQ Work
+
+Moves slow work (display refreshes, console prompts, task creation, ...)
+out of the BLE IRQ. The IRQ handler only copies the payload into a
+preallocated slot and queues the job; the job runs later, either from
+micropython.schedule() right after the IRQ returns, or from an asyncio
+task (run()) at the next turn of the event loop. A main loop that is
+not asyncio can call drain() itself, which is what work that blocks
+(input(), ...) needs, since scheduled callbacks hold up the ones the
+radio stack schedules. Either way the radio stack gets its IRQ back at
+once.
+
+    work = DeferredWork(slots=4, slot_size=64, schedule=True)
+    ble.irq(work.timed(irq.dispatch))
+    ...
+    def _on_display_write(self, data):      # In the IRQ
+        conn_handle, value_handle = data
+        work.defer_read(self._ble, self._show, conn_handle, value_handle)
+
+    def _show(self, conn_handle, value):    # Deferred
+        ...
+
+A job is a handler, a small integer tag (the connection, an action
+code, ...) and a payload of at most slot_size bytes (longer ones are cut
+and counted). The handler is called as handler(tag, view), where view is
+a memoryview of the slot that is only valid during the call, and must
+not be kept.
+
+The queue is bounded: a job that finds every slot taken is dropped and
+counted. The IRQ only moves the write index and the consumer only the
+read index, so the two sides need no lock.
+
+Metrics: timed() wraps the BLE IRQ handler to record how often and for
+how long it ran, and get_stats() reports them with the jobs queued,
+dropped and run, the depth of the queue (now and its high water mark)
+and the longest job. The average IRQ time is over the recent IRQs:
+its sum and count are halved when the count reaches IRQ_AVG_CALLS, so
+the sum stays a small int instead of growing into a heap-allocated one
+in the IRQ.
+
+The E-Ink and pairing demos import it as ble.deferred: copy this file
+to ble/deferred.py on their board.
+"""
+
+import time
+import micropython
+from array import array
+
+# IRQs the average IRQ time runs over before its sum and count are halved
+IRQ_AVG_CALLS = 64
+
+
+class DeferredWork:
+    """
+    Bounded queue of work deferred from the BLE IRQ.
+    """
+
+    def __init__(self, slots=8, slot_size=64, schedule=False):
+        """
+        Initialize the queue with every slot free.
+
+        Args:
+            slots (int): Most jobs waiting at once
+            slot_size (int): Largest payload per job in bytes
+            schedule (bool): Run jobs from micropython.schedule() instead
+                of the run() task (or drain() calls)
+        """
+        if slots < 1 or slot_size < 0:
+            raise ValueError("Need at least one slot")
+        self._count = slots
+        self._wrap = 2 * slots  # Indices run 0..2n-1 so full != empty
+        self._size = slot_size
+
+        # Preallocated jobs
+        self._slots = [bytearray(slot_size) for _ in range(slots)]
+        self._views = [memoryview(slot) for slot in self._slots]
+        self._lengths = array('H', [0] * slots)
+        self._tags = array('i', [0] * slots)
+        self._handlers = [None] * slots
+        self._read = 0
+        self._write = 0
+
+        self._schedule = schedule
+        self._scheduled = False
+        self._retry = False     # schedule() failed; timed() tries again
+        self._drain_cb = self._drain  # Bound once: schedule() must not allocate
+        self._flag = None
+        if not schedule:
+            import uasyncio as asyncio
+            self._flag = asyncio.ThreadSafeFlag()
+        self._running = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the metrics."""
+        # Producer (IRQ) side
+        self.queued = 0
+        self.dropped = 0
+        self.truncated = 0
+        self.high_water = 0
+        self.schedule_failures = 0
+        self.irq_calls = 0
+        self.irq_us = 0     # Sum over the last _irq_n IRQs
+        self._irq_n = 0
+        self.irq_max_us = 0
+        # Consumer side
+        self.ran = 0
+        self.errors = 0
+        self.job_max_us = 0
+
+    def depth(self):
+        """Return the number of jobs waiting."""
+        return (self._write - self._read) % self._wrap
+
+    def defer(self, handler, tag=0, data=None):
+        """
+        Queue a job (IRQ side).
+
+        Args:
+            handler: Callable taking (tag, view) to run later
+            tag (int): Small integer passed back to the handler
+            data: bytes-like payload copied into the job's slot
+
+        Returns:
+            bool: True if queued, False if every slot was taken
+        """
+        depth = (self._write - self._read) % self._wrap
+        if depth >= self._count:
+            self.dropped += 1
+            return False
+        i = self._write % self._count
+        n = 0
+        if data is not None:
+            n = len(data)
+            if n > self._size:
+                n = self._size
+                self.truncated += 1
+            self._views[i][:n] = data[:n] if n < len(data) else data
+        self._lengths[i] = n
+        self._tags[i] = tag
+        self._handlers[i] = handler
+        self._write = (self._write + 1) % self._wrap
+        self.queued += 1
+        if depth + 1 > self.high_water:
+            self.high_water = depth + 1
+        self._wake()
+        return True
+
+    def defer_read(self, ble, handler, conn_handle, value_handle):
+        """
+        Queue a job on the value just written to a characteristic (IRQ side).
+
+        Args:
+            ble: bluetooth.BLE object
+            handler: Callable taking (conn_handle, view) to run later
+            conn_handle (int): Connection that wrote
+            value_handle (int): Characteristic to read with gatts_read()
+
+        Returns:
+            bool: True if queued, False if every slot was taken
+        """
+        return self.defer(handler, conn_handle, ble.gatts_read(value_handle))
+
+    def _wake(self):
+        """Get the consumer to run the queue."""
+        if not self._schedule:
+            self._flag.set()
+            return
+        if self._scheduled:
+            return
+        try:
+            micropython.schedule(self._drain_cb, None)
+            self._scheduled = True
+            self._retry = False
+        except RuntimeError:
+            # Scheduler queue full: the next IRQ (or job) tries again
+            self._retry = True
+            self.schedule_failures += 1
+
+    def _drain(self, _):
+        """Scheduled callback."""
+        self._scheduled = False
+        self.drain()
+
+    def drain(self):
+        """
+        Run the jobs waiting (consumer side).
+
+        Returns:
+            int: Jobs run
+        """
+        ran = 0
+        while self._read != self._write:
+            i = self._read % self._count
+            handler = self._handlers[i]
+            self._handlers[i] = None
+            start = time.ticks_us()
+            try:
+                handler(self._tags[i], self._views[i][:self._lengths[i]])
+            except Exception as e:
+                self.errors += 1
+                print(f"Deferred job failed: {e}")
+            elapsed = time.ticks_diff(time.ticks_us(), start)
+            if elapsed > self.job_max_us:
+                self.job_max_us = elapsed
+            self._read = (self._read + 1) % self._wrap
+            ran += 1
+        self.ran += ran
+        return ran
+
+    async def run(self):
+        """Run jobs as they are queued (asyncio consumer task)."""
+        if self._flag is None:
+            raise ValueError("Jobs are run from micropython.schedule()")
+        self._running = True
+        while self._running:
+            await self._flag.wait()
+            if self._running:
+                self.drain()
+
+    def stop(self):
+        """Stop the run() task."""
+        self._running = False
+        if self._flag is not None:
+            self._flag.set()
+
+    def timed(self, irq):
+        """
+        Wrap a BLE IRQ handler to record the time spent in it.
+
+        After each IRQ the wrapper also schedules the queue again if
+        micropython.schedule() was full when a job was queued.
+
+        Args:
+            irq: Callable taking (event, data), as passed to ble.irq()
+
+        Returns:
+            Callable to pass to ble.irq() instead
+        """
+        def timed_irq(event, data):
+            start = time.ticks_us()
+            result = irq(event, data)
+            elapsed = time.ticks_diff(time.ticks_us(), start)
+            self.irq_calls += 1
+            self.irq_us += elapsed
+            self._irq_n += 1
+            if self._irq_n >= IRQ_AVG_CALLS:
+                self.irq_us >>= 1
+                self._irq_n >>= 1
+            if elapsed > self.irq_max_us:
+                self.irq_max_us = elapsed
+            if self._retry:
+                self._wake()
+            return result
+        return timed_irq
+
+    def get_stats(self):
+        """Return IRQ and deferred-work statistics."""
+        return {
+            'irq_calls': self.irq_calls,
+            'irq_avg_us': self.irq_us // self._irq_n if self._irq_n else 0,
+            'irq_max_us': self.irq_max_us,
+            'queued': self.queued,
+            'dropped': self.dropped,
+            'truncated': self.truncated,
+            'depth': self.depth(),
+            'high_water': self.high_water,
+            'ran': self.ran,
+            'errors': self.errors,
+            'job_max_us': self.job_max_us,
+            'schedule_failures': self.schedule_failures,
+        }
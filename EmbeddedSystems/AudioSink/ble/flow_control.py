@@ -0,0 +1,131 @@
+"""
+BLE Audio Sink - Credit Flow Control
+
+Tells each sender how many more audio packets the sink can take, so it
+never writes into a full ingest queue or I2S buffer however bursty the
+link is.
+
+A central enables it by writing [CMD_FLOW_CONTROL, FLOW_ON] to the
+control characteristic. From then on the audio status notifications it
+receives carry a credit limit after the status byte:
+
+    status (B), credit limit (H, little endian)
+
+The limit is cumulative: the number of audio packets (GATT writes or
+L2CAP SDUs, FEC parity included) the central may have sent since it
+enabled flow control, modulo 65536. The sink computes it as the packets
+received from that central so far plus the packets it has room for
+right now. A sender keeps its own count of packets sent and may send
+while that count is behind the latest limit. Packets still in flight
+when a notification is built are already inside the limit, and a lost
+notification is made good by the next one, so the scheme needs no
+acknowledgements.
+
+Notifications are sent when the limit has moved, at most every
+FLOW_CREDIT_INTERVAL_MS, and on every status change. Centrals that did
+not enable flow control keep getting the one-byte status.
+"""
+
+import struct
+
+# Control command arguments (CMD_FLOW_CONTROL)
+FLOW_OFF = 0
+FLOW_ON = 1
+
+# Status notification of a flow-controlled connection
+CREDIT_STATUS_FORMAT = "<BH"
+CREDIT_STATUS_SIZE = struct.calcsize(CREDIT_STATUS_FORMAT)
+
+_LIMIT_MASK = 0xFFFF
+
+
+class CreditFlowControl:
+    """
+    Per-connection packet counts and credit limits of the sink.
+    """
+
+    def __init__(self):
+        """Initialize with no flow-controlled connections."""
+        self._received = {}     # conn_handle -> packets since FLOW_ON
+        self._sent_limit = {}   # conn_handle -> last limit notified
+        self.notifications = 0
+
+    def is_enabled(self, conn_handle):
+        """Return True if the connection asked for credits."""
+        return conn_handle in self._received
+
+    def enabled(self):
+        """Return the flow-controlled connection handles."""
+        return self._received.keys()
+
+    def enable(self, conn_handle, on):
+        """
+        Start or stop counting a connection's packets.
+
+        Args:
+            conn_handle (int): Connection that wrote CMD_FLOW_CONTROL
+            on (bool): True for FLOW_ON; the count starts again at zero
+        """
+        if on:
+            self._received[conn_handle] = 0
+            self._sent_limit[conn_handle] = -1
+        else:
+            self.remove(conn_handle)
+
+    def remove(self, conn_handle):
+        """Forget a connection (FLOW_OFF or disconnect)."""
+        self._received.pop(conn_handle, None)
+        self._sent_limit.pop(conn_handle, None)
+
+    def received(self, conn_handle):
+        """BLE IRQ: count one audio packet from a connection."""
+        count = self._received.get(conn_handle)
+        if count is not None:
+            self._received[conn_handle] = count + 1
+
+    def limit(self, conn_handle, credits):
+        """
+        Return the credit limit of a connection.
+
+        Args:
+            conn_handle (int): Flow-controlled connection
+            credits (int): Packets the sink has room for now
+
+        Returns:
+            int: Packets the sender may have sent, modulo 65536
+        """
+        return (self._received[conn_handle] + max(0, credits)) & _LIMIT_MASK
+
+    def status(self, conn_handle, status, credits):
+        """
+        Build the status notification of a connection and note its limit.
+
+        Args:
+            conn_handle (int): Flow-controlled connection
+            status (int): Current STATUS_* value
+            credits (int): Packets the sink has room for now
+
+        Returns:
+            bytes: Status byte followed by the credit limit
+        """
+        limit = self.limit(conn_handle, credits)
+        self._sent_limit[conn_handle] = limit
+        self.notifications += 1
+        return struct.pack(CREDIT_STATUS_FORMAT, status, limit)
+
+    def changed(self, conn_handle, credits):
+        """Return True if the limit differs from the one last notified."""
+        return self.limit(conn_handle, credits) != self._sent_limit[conn_handle]
+
+    def get_stats(self):
+        """
+        Get flow control statistics.
+
+        Returns:
+            dict: Packets counted and last limit per connection, notifications
+        """
+        return {
+            "connections": {conn: (self._received[conn], self._sent_limit[conn])
+                            for conn in self._received},
+            "notifications": self.notifications,
+        }
@@ -0,0 +1,116 @@
+"""
+BLE IRQ Dispatcher
+
+Routes bluetooth.BLE IRQs to bound handlers through tables instead of
+an if/elif chain on the event and then on the attribute handle, so
+every event costs the same two lookups however many are handled and
+however far down a chain it would have been.
+
+Handlers are registered once, after the services are registered, and
+take the event data tuple:
+
+    irq = IRQDispatcher()
+    ble.irq(irq.dispatch)
+    irq.on(_IRQ_CENTRAL_CONNECT, self._on_connect)
+    irq.on_handle(_IRQ_GATTS_WRITE, self._handle_rx, self._on_rx_write)
+
+on_handle() routes an event on its second data item, which is the
+attribute handle of GATTS_WRITE, GATTS_READ_REQUEST, GATTC_NOTIFY and
+friends, or the channel of the L2CAP events. A handle without an entry
+falls back to the event's own handler, and an event without a handler
+to the on_unhandled() one.
+
+The tables are lists indexed by event number and by handle, grown only
+when a handler is registered, and handlers are stored already bound,
+so dispatch() allocates nothing. The value a handler returns is
+returned to the stack (L2CAP_ACCEPT, GET_SECRET, ...).
+
+The event codes are whatever the caller's _IRQ_* constants say; the
+default tables cover the MicroPython ones (1 to 31). An event beyond
+the tables is not looked for, so it raises IndexError.
+
+The standalone demos and the AudioController central import it as
+ble.irq_dispatch too: copy this file to ble/irq_dispatch.py on their
+board.
+"""
+
+
+class IRQDispatcher:
+    """
+    Table-driven bluetooth.BLE IRQ handler.
+    """
+
+    def __init__(self, events=32):
+        """
+        Initialize the dispatcher with no handlers.
+
+        Args:
+            events (int): Event numbers covered (0 to events - 1)
+        """
+        if events < 1:
+            raise ValueError("At least one event is needed")
+        self._handlers = [None] * events
+        self._tables = [None] * events
+        self._unhandled = None
+
+    def on(self, event, handler):
+        """
+        Set the handler of an event.
+
+        Args:
+            event (int): IRQ event code
+            handler: Callable taking the event data, or None to remove
+        """
+        self._handlers[event] = handler
+
+    def on_handle(self, event, handle, handler):
+        """
+        Set the handler of an event for one attribute handle (or channel).
+
+        Args:
+            event (int): IRQ event code whose second data item is the handle
+            handle (int): Attribute handle or channel ID
+            handler: Callable taking the event data, or None to remove
+        """
+        if handle < 0:
+            raise ValueError("Handle must not be negative")
+        table = self._tables[event]
+        if table is None:
+            table = self._tables[event] = []
+        if handle >= len(table):
+            table.extend([None] * (handle + 1 - len(table)))
+        table[handle] = handler
+
+    def on_unhandled(self, handler):
+        """
+        Set the handler of events that have none of their own.
+
+        Args:
+            handler: Callable taking (event, data), or None to ignore them
+        """
+        self._unhandled = handler
+
+    def dispatch(self, event, data):
+        """
+        Handle a BLE IRQ (pass this to ble.irq()).
+
+        Args:
+            event (int): IRQ event code
+            data (tuple): Event data
+
+        Returns:
+            The handler's result, or None without a handler
+        """
+        table = self._tables[event]
+        if table is None:
+            handler = self._handlers[event]
+        else:
+            handle = data[1]
+            handler = table[handle] if handle < len(table) else None
+            if handler is None:
+                handler = self._handlers[event]
+        if handler is not None:
+            return handler(data)
+        if self._unhandled is not None:
+            return self._unhandled(event, data)
+        return None
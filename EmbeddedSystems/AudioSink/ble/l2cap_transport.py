@@ -0,0 +1,178 @@
+"""
+BLE Audio Sink - L2CAP Transport
+
+Receives audio over an L2CAP connection-oriented channel (CoC) as an
+alternative to GATT writes. A central opens a channel on
+BLE_L2CAP_AUDIO_PSM and sends one audio packet per SDU.
+
+A RECV event reads the data with l2cap_recvinto() into a preallocated
+buffer and passes a view of it to the audio data callback, the same
+callback the GATT audio characteristic feeds. SDUs longer than the read
+buffer reach the callback in buffer-sized pieces, so PCM SDUs should
+hold whole sample frames and compressed packets should fit one piece.
+
+Flow control: the stack gives credits back to the sender only once the
+received data has been read. Before every read the transport asks the
+can_receive() callback whether the sink has room. If it has not, the
+data stays with the stack, the sender runs out of credits and stalls,
+and the consumer calls resume() after it has freed space.
+"""
+
+from config import (
+    BLE_L2CAP_AUDIO_PSM, BLE_L2CAP_AUDIO_MTU,
+    BLE_IRQ_L2CAP_ACCEPT, BLE_IRQ_L2CAP_CONNECT, BLE_IRQ_L2CAP_DISCONNECT,
+    BLE_IRQ_L2CAP_RECV
+)
+
+
+class L2CAPAudioTransport:
+    """
+    Single L2CAP audio channel with receive-side flow control.
+    """
+
+    def __init__(self, ble, psm=BLE_L2CAP_AUDIO_PSM, mtu=BLE_L2CAP_AUDIO_MTU,
+                 read_size=None):
+        """
+        Initialize the transport.
+
+        Args:
+            ble: Active bluetooth.BLE object
+            psm (int): Protocol/service multiplexer to listen on
+            mtu (int): Largest SDU accepted from the sender
+            read_size (int): Bytes per l2cap_recvinto() call (default: mtu)
+        """
+        self._ble = ble
+        self._psm = psm
+        self._mtu = mtu
+
+        # Preallocated receive buffer
+        self._buf = bytearray(read_size or mtu)
+        self._mv = memoryview(self._buf)
+
+        self._audio_callback = None
+        self._can_receive = None
+
+        # Optional audio/latency_trace.LatencyTrace stamped on every read
+        self.trace = None
+
+        self.reads = 0
+        self.bytes_received = 0
+        self.stalls = 0
+        self.rejected = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the open channel (disconnect)."""
+        self._conn_handle = None
+        self._cid = None
+        self.peer_mtu = 0
+        self._pending = False
+
+    def listen(self):
+        """Accept channels on the audio PSM."""
+        self._ble.l2cap_listen(self._psm, self._mtu)
+
+    def set_audio_data_callback(self, callback):
+        """Set callback for audio data, called with a view of each read."""
+        self._audio_callback = callback
+
+    def set_flow_control(self, can_receive):
+        """
+        Set the callback that gates reads.
+
+        Args:
+            can_receive: Callable returning True while the sink can take
+                         another read_size bytes, or None to always read
+        """
+        self._can_receive = can_receive
+
+    @property
+    def conn_handle(self):
+        """Connection the open channel belongs to, or None."""
+        return self._conn_handle
+
+    def is_connected(self):
+        """Return True while a channel is open."""
+        return self._cid is not None
+
+    def disconnect(self):
+        """Close the open channel."""
+        if self._cid is not None:
+            self._ble.l2cap_disconnect(self._conn_handle, self._cid)
+
+    def resume(self):
+        """Read data held back by flow control (consumer side)."""
+        if self._pending:
+            self._receive()
+
+    def register(self, irq):
+        """
+        Take the L2CAP IRQ events from a dispatcher.
+
+        Args:
+            irq: ble/irq_dispatch.IRQDispatcher the BLE IRQs go through
+        """
+        irq.on(BLE_IRQ_L2CAP_ACCEPT, self._on_accept)
+        irq.on(BLE_IRQ_L2CAP_CONNECT, self._on_connect)
+        irq.on(BLE_IRQ_L2CAP_DISCONNECT, self._on_disconnect)
+        irq.on(BLE_IRQ_L2CAP_RECV, self._on_recv)
+
+    def _on_recv(self, data):
+        conn_handle, cid = data
+        if cid == self._cid:
+            self._receive()
+
+    def _on_accept(self, data):
+        """Return nonzero to reject a channel."""
+        conn_handle, cid, psm, our_mtu, peer_mtu = data
+        if psm != self._psm or self._cid is not None:
+            # One audio channel at a time
+            self.rejected += 1
+            return 1
+        return 0
+
+    def _on_connect(self, data):
+        conn_handle, cid, psm, our_mtu, peer_mtu = data
+        if psm == self._psm:
+            self._conn_handle = conn_handle
+            self._cid = cid
+            self.peer_mtu = peer_mtu
+            self._pending = False
+            print(f"L2CAP audio channel open (cid {cid}, MTU {our_mtu})")
+
+    def _on_disconnect(self, data):
+        conn_handle, cid, psm, status = data
+        if cid == self._cid:
+            self.reset()
+            print("L2CAP audio channel closed")
+
+    def _receive(self):
+        """Read into the preallocated buffer while the sink has room."""
+        can_receive = self._can_receive
+        while self._cid is not None:
+            if can_receive is not None and not can_receive():
+                # Leave the data with the stack; no credits until it is read
+                if not self._pending:
+                    self._pending = True
+                    self.stalls += 1
+                return
+            n = self._ble.l2cap_recvinto(self._conn_handle, self._cid, self._buf)
+            if not n:
+                break
+            self.reads += 1
+            self.bytes_received += n
+            if self.trace:
+                self.trace.received()
+            if self._audio_callback:
+                self._audio_callback(self._mv if n == len(self._buf) else self._mv[:n])
+        self._pending = False
+
+    def get_stats(self):
+        """Return transport statistics."""
+        return {
+            'connected': self._cid is not None,
+            'reads': self.reads,
+            'bytes': self.bytes_received,
+            'stalls': self.stalls,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,231 @@
+"""
+BLE Link Profiles
+
+Named sets of link settings, applied to the radio as a whole and to
+every connection as it is made:
+
+- streaming: largest ATT MTU and the shortest connection interval, for
+  audio; slow advertising so it takes little air time from the streams
+- interactive: mid-size MTU and interval, for control traffic
+- idle: default MTU, long interval and slow advertising, to save power
+
+    link = LinkProfile(ble, "streaming")
+    link.register(irq)                      # MTU_EXCHANGED, CONNECTION_UPDATE
+    link.set_callback(self._on_link)        # (conn_handle, payload, interval_us)
+    ...
+    link.on_connect(conn_handle)            # From the connect IRQ
+
+set_profile() applies a profile: ble.config(mtu=...) and, on a
+peripheral, the advertising interval for the next gap_advertise(). On
+connect, on_connect() starts the MTU exchange (gattc_exchange_mtu()); a
+central passes the profile's connection interval to gap_connect() with
+connect(). The MicroPython bluetooth module has no call for a peripheral
+to ask for other connection parameters, nor for data length or PHY
+updates (the stack uses data length extension and 2M PHY where both
+sides support them), so a peripheral only reports what the central
+chose.
+
+The values the link ends up with (the exchanged MTU and the connection
+interval, latency and supervision timeout) are kept in the connection's
+slot (ble/conn_slots.py; the application's slots if it passes them,
+else the profile's own) and passed to the callback as they change, with
+the ATT payload the MTU leaves (MTU - 3), so packets can be sized to the
+real link rather than to a configured guess. An MTU exchange happens once per connection: a
+profile with another MTU set while connected applies from the next
+connection.
+
+The AudioController central imports it as ble.link_profile: copy this
+file and conn_slots.py to ble/ on its board.
+"""
+
+from micropython import const
+from ble.conn_slots import ConnectionSlots
+
+_IRQ_MTU_EXCHANGED = const(21)
+_IRQ_CONNECTION_UPDATE = const(27)
+
+# ATT header of a write or notification
+ATT_HEADER = const(3)
+# MTU every link starts with
+DEFAULT_MTU = const(23)
+
+# name: (ATT MTU, min connection interval us, max connection interval us,
+#        advertising interval us)
+PROFILES = {
+    "streaming": (247, 7500, 15000, 500000),
+    "interactive": (185, 15000, 30000, 250000),
+    "idle": (23, 100000, 200000, 1000000),
+}
+
+
+class LinkProfile:
+    """
+    Link settings of the radio, and the values negotiated per connection.
+    """
+
+    def __init__(self, ble, profile="streaming", max_mtu=None, slots=None, connections=4):
+        """
+        Initialize and apply a profile.
+
+        Args:
+            ble: bluetooth.BLE object
+            profile (str): Name in PROFILES
+            max_mtu (int): Largest MTU the application takes (default: the
+                profile's)
+            slots (ConnectionSlots): Slots the application opens and closes
+                itself (default: the profile's own)
+            connections (int): Number of slots of the profile's own
+        """
+        self._ble = ble
+        self._max_mtu = max_mtu
+        self._own_slots = slots is None
+        self.slots = ConnectionSlots(connections) if slots is None else slots
+        self._callback = None
+        self.name = None
+        self.mtu = DEFAULT_MTU
+        self.interval_us = (0, 0)
+        self.adv_interval_us = 0
+        self.mtu_exchanges = 0
+        self.updates = 0
+        self.set_profile(profile)
+
+    def set_profile(self, name):
+        """
+        Apply a profile to the radio.
+
+        Args:
+            name (str): Name in PROFILES
+
+        Returns:
+            bool: True if the profile changed
+        """
+        if name not in PROFILES:
+            raise ValueError(f"Unknown link profile: {name}")
+        if name == self.name:
+            return False
+        mtu, min_us, max_us, adv_us = PROFILES[name]
+        if self._max_mtu is not None and mtu > self._max_mtu:
+            mtu = self._max_mtu
+        self.name = name
+        self.mtu = mtu
+        self.interval_us = (min_us, max_us)
+        self.adv_interval_us = adv_us
+        self._ble.config(mtu=mtu)
+        return True
+
+    def set_callback(self, callback):
+        """
+        Set the function told of negotiated link values.
+
+        Args:
+            callback: Called as callback(conn_handle, payload, interval_us)
+                after an MTU exchange or connection update
+        """
+        self._callback = callback
+
+    def register(self, irq):
+        """
+        Route the link IRQs to this profile.
+
+        Args:
+            irq: irq_dispatch.IRQDispatcher of the radio
+        """
+        irq.on(_IRQ_MTU_EXCHANGED, self.on_mtu_exchanged)
+        irq.on(_IRQ_CONNECTION_UPDATE, self.on_connection_update)
+
+    def connect(self, addr_type, addr, scan_duration_ms=2000):
+        """
+        Connect to a peripheral at the profile's connection interval (central).
+
+        Args:
+            addr_type (int): Address type of the peripheral
+            addr (bytes): Address of the peripheral
+            scan_duration_ms (int): How long to look for it
+        """
+        min_us, max_us = self.interval_us
+        self._ble.gap_connect(addr_type, addr, scan_duration_ms, min_us, max_us)
+
+    def on_connect(self, conn_handle):
+        """
+        Start tracking a connection and exchange the MTU (connect IRQ).
+
+        Args:
+            conn_handle (int): New connection
+        """
+        if self._own_slots:
+            self.slots.open(conn_handle)
+        if self.mtu > DEFAULT_MTU:
+            try:
+                self._ble.gattc_exchange_mtu(conn_handle)
+            except OSError:
+                pass  # Gone again already; the link keeps DEFAULT_MTU
+
+    def on_disconnect(self, conn_handle):
+        """Forget a connection (disconnect IRQ)."""
+        if self._own_slots:
+            self.slots.close(conn_handle)
+
+    def on_mtu_exchanged(self, data):
+        """Record the MTU of a connection (MTU_EXCHANGED IRQ)."""
+        conn_handle, mtu = data
+        slots = self.slots
+        s = slots.slot(conn_handle)
+        if s < 0:
+            return
+        slots.mtu[s] = mtu
+        self.mtu_exchanges += 1
+        if self._callback:
+            self._callback(conn_handle, mtu - ATT_HEADER, slots.interval_us[s])
+
+    def on_connection_update(self, data):
+        """Record the parameters of a connection (CONNECTION_UPDATE IRQ)."""
+        conn_handle, interval, latency, timeout, status = data
+        slots = self.slots
+        s = slots.slot(conn_handle)
+        if s < 0 or status != 0:
+            return
+        slots.interval_us[s] = interval * 1250  # Units of 1.25 ms
+        slots.latency[s] = latency
+        slots.timeout_ms[s] = timeout * 10      # Units of 10 ms
+        self.updates += 1
+        if self._callback:
+            self._callback(conn_handle, slots.mtu[s] - ATT_HEADER, slots.interval_us[s])
+
+    def payload_size(self, conn_handle):
+        """
+        Return the largest ATT write or notification value of a connection.
+
+        Args:
+            conn_handle (int): Connection
+
+        Returns:
+            int: MTU - 3, or that of the default MTU for an unknown connection
+        """
+        s = self.slots.slot(conn_handle)
+        return (self.slots.mtu[s] if s >= 0 else DEFAULT_MTU) - ATT_HEADER
+
+    def get_link(self, conn_handle):
+        """
+        Return the negotiated values of a connection.
+
+        Returns:
+            tuple: (mtu, interval_us, latency, supervision_timeout_ms), with 0
+                for values not reported yet, or None if not connected
+        """
+        slots = self.slots
+        s = slots.slot(conn_handle)
+        if s < 0:
+            return None
+        return (slots.mtu[s], slots.interval_us[s], slots.latency[s], slots.timeout_ms[s])
+
+    def get_stats(self):
+        """Return the profile and the negotiated values per connection."""
+        return {
+            "profile": self.name,
+            "mtu": self.mtu,
+            "interval_us": self.interval_us,
+            "adv_interval_us": self.adv_interval_us,
+            "mtu_exchanges": self.mtu_exchanges,
+            "updates": self.updates,
+            "links": {conn: self.get_link(conn) for conn in self.slots.handles()},
+        }
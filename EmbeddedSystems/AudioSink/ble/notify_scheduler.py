@@ -0,0 +1,370 @@
+"""
+BLE Notification Scheduler
+
+Sends characteristic notifications in batches instead of on every state
+change. update() only writes the new value to the attribute and marks
+it pending for the connections subscribed to it; a flush at the end of
+a short window sends each pending characteristic once, with the value
+it has then, so a burst of changes costs one notification per
+connection rather than one per change.
+
+    notify = NotifyScheduler(ble, slots, window_ms=20, budget=4, period_ms=100)
+    notify.add(self._handle_status)
+    notify.register(irq)                    # CCCD writes
+    ...
+    notify.on_connect(conn_handle)          # From the connect IRQ
+    notify.update(self._handle_status, b"Playing")
+    ...
+    asyncio.create_task(notify.run())       # Or notify.poll() from a main loop
+
+gatts_notify() sends whether or not the client subscribed, so the
+scheduler keeps the subscriptions itself: the CCCD of a characteristic
+is the attribute after its value (value_handle + 1), and register()
+routes the central's writes to it here. A build whose stack does not
+report CCCD writes can call subscribe() itself, or add() a
+characteristic with cccd=False to notify every connection.
+
+Each connection has a budget of notifications per period; what a
+connection has no budget left for stays pending until the next period,
+still coalescing, and so does a notification the stack refuses (its
+queue to the controller is full). Subscriptions are bits of the
+connection slot's subscribed byte (ble/conn_slots.py; the application's
+slots if it passes them, else the scheduler's own), so at most 8
+characteristics are scheduled, and nothing is allocated per update.
+
+Metrics (get_stats()): updates, updates coalesced into a pending
+notification, updates no connection was subscribed to, notifications
+sent, flushes that left some for want of budget, and refused ones.
+
+The E-Ink and notify demos import it as ble.notify_scheduler: copy this
+file and conn_slots.py to ble/ on their board.
+"""
+
+import time
+from array import array
+from micropython import const
+from ble.conn_slots import ConnectionSlots
+
+_IRQ_GATTS_WRITE = const(3)
+
+# Characteristics per scheduler (bits of a slot's subscribed byte)
+MAX_CHARACTERISTICS = const(8)
+# CCCD bits: notifications, indications
+_CCCD_SUBSCRIBED = const(0x03)
+
+
+class NotifyScheduler:
+    """
+    Coalescing, rate limited notifications to subscribed connections.
+    """
+
+    def __init__(self, ble, slots=None, window_ms=20, budget=4, period_ms=100,
+                 connections=4):
+        """
+        Initialize with no characteristics.
+
+        Args:
+            ble: bluetooth.BLE object
+            slots (ConnectionSlots): Slots the application opens and closes
+                itself (default: the scheduler's own)
+            window_ms (int): How long updates are gathered before a flush
+                (0 = flush on every update)
+            budget (int): Notifications per connection per period (0 = no limit)
+            period_ms (int): Period of the budget
+            connections (int): Number of slots of the scheduler's own
+        """
+        if window_ms < 0 or budget < 0 or period_ms < 1:
+            raise ValueError("Invalid notification timing")
+        self._ble = ble
+        self._own_slots = slots is None
+        self.slots = ConnectionSlots(connections) if slots is None else slots
+        self.window_ms = window_ms
+        self.budget = budget
+        self.period_ms = period_ms
+
+        # Characteristics, by bit
+        self._handles = array('H')
+        self._always = 0            # Bits of those notified without a CCCD write
+        self._irq = None
+
+        # Per slot: pending bits and budget left
+        count = self.slots.count
+        self._pending = bytearray(count)
+        self._tokens = bytearray([min(budget, 255)] * count)
+        self._refill_at = time.ticks_add(time.ticks_ms(), period_ms)
+
+        # Flush time while anything is pending
+        self._armed = False
+        self._due = 0
+        self._flag = None
+        self._running = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the metrics."""
+        self.updates = 0
+        self.coalesced = 0
+        self.unsubscribed = 0
+        self.sent = 0
+        self.throttled = 0
+        self.refused = 0
+
+    def add(self, value_handle, cccd=True):
+        """
+        Schedule the notifications of a characteristic.
+
+        Args:
+            value_handle (int): Value handle of the characteristic
+            cccd (bool): Notify only connections that subscribed, else every one
+
+        Returns:
+            int: Bit of the characteristic in the slots' subscribed byte
+        """
+        bit = self._bit(value_handle)
+        if bit:
+            return bit
+        if len(self._handles) >= MAX_CHARACTERISTICS:
+            raise ValueError("Too many characteristics")
+        self._handles.append(value_handle)
+        bit = 1 << (len(self._handles) - 1)
+        if not cccd:
+            self._always |= bit
+        elif self._irq is not None:
+            self._irq.on_handle(_IRQ_GATTS_WRITE, value_handle + 1, self.on_cccd_write)
+        return bit
+
+    def register(self, irq):
+        """
+        Route CCCD writes to this scheduler, for characteristics added so far and later.
+
+        Args:
+            irq: irq_dispatch.IRQDispatcher of the radio
+        """
+        self._irq = irq
+        for i, value_handle in enumerate(self._handles):
+            if not self._always & (1 << i):
+                irq.on_handle(_IRQ_GATTS_WRITE, value_handle + 1, self.on_cccd_write)
+
+    def _bit(self, value_handle):
+        """Return the bit of a characteristic, or 0 if not added."""
+        for i, handle in enumerate(self._handles):
+            if handle == value_handle:
+                return 1 << i
+        return 0
+
+    def on_connect(self, conn_handle):
+        """Start a connection unsubscribed, with its full budget (connect IRQ)."""
+        if self._own_slots:
+            self.slots.open(conn_handle)
+        s = self.slots.slot(conn_handle)
+        if s >= 0:
+            self.slots.subscribed[s] = 0
+            self._pending[s] = 0
+            self._tokens[s] = min(self.budget, 255)
+
+    def on_disconnect(self, conn_handle):
+        """Drop what was pending for a connection (disconnect IRQ)."""
+        s = self.slots.slot(conn_handle)
+        if s >= 0:
+            self._pending[s] = 0
+        if self._own_slots:
+            self.slots.close(conn_handle)
+
+    def on_cccd_write(self, data):
+        """
+        Track a subscription from a write to a CCCD (GATTS_WRITE IRQ).
+
+        Returns:
+            bool: True if the handle is the CCCD of a scheduled characteristic
+        """
+        conn_handle, cccd_handle = data
+        bit = self._bit(cccd_handle - 1)
+        if not bit:
+            return False
+        value = self._ble.gatts_read(cccd_handle)
+        self.subscribe(conn_handle, cccd_handle - 1, bool(value and value[0] & _CCCD_SUBSCRIBED))
+        return True
+
+    def subscribe(self, conn_handle, value_handle, on=True):
+        """
+        Set whether a connection is subscribed to a characteristic.
+
+        Args:
+            conn_handle (int): Connection
+            value_handle (int): Value handle of an added characteristic
+            on (bool): True to subscribe, False to unsubscribe
+        """
+        s = self.slots.slot(conn_handle)
+        bit = self._bit(value_handle)
+        if s < 0 or not bit:
+            return
+        if on:
+            self.slots.subscribed[s] |= bit
+        else:
+            self.slots.subscribed[s] &= ~bit
+            self._pending[s] &= ~bit
+
+    def is_subscribed(self, conn_handle, value_handle):
+        """Return True if a connection is notified of a characteristic."""
+        s = self.slots.slot(conn_handle)
+        bit = self._bit(value_handle)
+        return s >= 0 and bool((self.slots.subscribed[s] | self._always) & bit)
+
+    def update(self, value_handle, data=None):
+        """
+        Set the value of a characteristic and schedule its notification.
+
+        Args:
+            value_handle (int): Value handle of an added characteristic
+            data: New value (default: the value already written)
+
+        Returns:
+            int: Connections the notification is pending for
+        """
+        bit = self._bit(value_handle)
+        if not bit:
+            raise ValueError("Characteristic not added")
+        if data is not None:
+            self._ble.gatts_write(value_handle, data)
+        self.updates += 1
+        slots = self.slots
+        pending = self._pending
+        always = self._always
+        waiting = 0
+        for s in range(slots.count):
+            if slots.conn[s] < 0 or not (slots.subscribed[s] | always) & bit:
+                continue
+            if pending[s] & bit:
+                self.coalesced += 1
+            pending[s] |= bit
+            waiting += 1
+        if not waiting:
+            self.unsubscribed += 1
+            return 0
+        if self.window_ms == 0:
+            self.flush()
+        elif not self._armed:
+            self._arm(self.window_ms)
+        return waiting
+
+    def cancel(self, conn_handle, value_handle):
+        """Drop a pending notification of a connection (sent another way)."""
+        s = self.slots.slot(conn_handle)
+        if s >= 0:
+            self._pending[s] &= ~self._bit(value_handle)
+
+    def pending(self):
+        """Return the number of notifications waiting."""
+        waiting = 0
+        for s in range(self.slots.count):
+            bits = self._pending[s]
+            while bits:
+                bits &= bits - 1
+                waiting += 1
+        return waiting
+
+    def _arm(self, delay_ms):
+        """Set the next flush."""
+        self._due = time.ticks_add(time.ticks_ms(), delay_ms)
+        self._armed = True
+        if self._flag is not None:
+            self._flag.set()
+
+    def poll(self):
+        """
+        Flush if the window has ended (main loop side).
+
+        Returns:
+            int: Notifications sent
+        """
+        if self._armed and time.ticks_diff(time.ticks_ms(), self._due) >= 0:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """
+        Send the pending notifications the budgets allow.
+
+        Returns:
+            int: Notifications sent
+        """
+        self._armed = False
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._refill_at) >= 0:
+            tokens = min(self.budget, 255)
+            for s in range(len(self._tokens)):
+                self._tokens[s] = tokens
+            self._refill_at = time.ticks_add(now, self.period_ms)
+        slots = self.slots
+        handles = self._handles
+        sent = 0
+        held = False
+        for s in range(slots.count):
+            bits = self._pending[s]
+            if not bits:
+                continue
+            conn_handle = slots.conn[s]
+            if conn_handle < 0:
+                self._pending[s] = 0
+                continue
+            for i in range(len(handles)):
+                bit = 1 << i
+                if not bits & bit:
+                    continue
+                if self.budget and not self._tokens[s]:
+                    held = True
+                    break
+                try:
+                    self._ble.gatts_notify(conn_handle, handles[i])
+                except OSError:
+                    # Controller queue full: try again next period
+                    self.refused += 1
+                    held = True
+                    break
+                bits &= ~bit
+                sent += 1
+                slots.tx_packets[s] += 1
+                if self.budget:
+                    self._tokens[s] -= 1
+            self._pending[s] = bits
+        self.sent += sent
+        if held:
+            self.throttled += 1
+            self._arm(max(0, time.ticks_diff(self._refill_at, now)))
+        return sent
+
+    async def run(self):
+        """Flush as windows end (asyncio task)."""
+        import uasyncio as asyncio
+        if self._flag is None:
+            self._flag = asyncio.ThreadSafeFlag()
+        self._running = True
+        while self._running:
+            if not self._armed:
+                await self._flag.wait()
+                continue
+            wait = time.ticks_diff(self._due, time.ticks_ms())
+            if wait > 0:
+                await asyncio.sleep_ms(wait)
+            if self._running:
+                self.poll()
+
+    def stop(self):
+        """Stop the run() task."""
+        self._running = False
+        if self._flag is not None:
+            self._flag.set()
+
+    def get_stats(self):
+        """Return the notification counts and what is pending."""
+        return {
+            'updates': self.updates,
+            'coalesced': self.coalesced,
+            'unsubscribed': self.unsubscribed,
+            'sent': self.sent,
+            'throttled': self.throttled,
+            'refused': self.refused,
+            'pending': self.pending(),
+            'subscribed': {conn: self.slots.subscribed[self.slots.slot(conn)]
+                           for conn in self.slots.handles()},
+        }
@@ -27,13 +27,51 @@ AUDIO_BIT_DEPTH = const(16)         # 16-bit audio
 AUDIO_CHANNELS = const(2)           # Stereo
 AUDIO_BUFFER_SIZE = const(2048)     # Reduced from 8192 to 2048 bytes
 AUDIO_CHUNK_SIZE = const(256)       # Reduced from 512 to 256 bytes
+AUDIO_INGEST_SLOTS = const(16)      # Packets queued between BLE IRQ and I2S task
+AUDIO_DUAL_CORE = False             # Refill I2S from a loop on core 1 instead of the I2S IRQ
+
+# Fixed-point DSP chain on the output (audio/dsp.py), configured with CMD_DSP
+DSP_EQ_BANDS = const(4)             # Parametric EQ bands
+DSP_VOLUME_RAMP_MS = const(20)      # Volume changes ramp over this time, 0 = instant
 
 # ========== BLE Configuration ==========
 BLE_AUDIO_PACKET_SIZE = const(240)  # Reduced from 512 to 240 bytes
-BLE_MTU_SIZE = const(240)           # Reduced from 512 to 240 bytes
+BLE_MTU_SIZE = const(247)           # Largest ATT MTU taken: 244-byte writes carry a 240-byte packet
+BLE_LINK_PROFILE = "streaming"      # ble/link_profile.py preset applied at start
+
+# L2CAP connection-oriented channel for audio data (alongside GATT writes)
+BLE_L2CAP_ENABLED = True
+BLE_L2CAP_AUDIO_PSM = const(0x0081) # Dynamic LE PSM range is 0x0080-0x00FF
+BLE_L2CAP_AUDIO_MTU = const(512)    # Largest SDU the sink accepts
+
+# XOR parity FEC on audio packets (audio/fec.py), enabled with CMD_SET_FEC
+FEC_MAX_GROUP = const(8)            # Largest group size the sink accepts
+
+# Presentation timestamps on audio packets (audio/playout_clock.py), enabled
+# per central with CMD_SET_TIMESTAMPS
+PLAYOUT_LATENCY_MS = const(80)      # Played this long after the fastest packets arrive; covers
+                                    # the link jitter, the I2S DMA buffer and two blocks filled
+                                    # ahead, the rest must fit in the ingest queue and I2S buffer
+PLAYOUT_CLOCK_WINDOW = const(32)    # Packets per clock offset update
+
+# Credit flow control on the audio status characteristic (ble/flow_control.py),
+# enabled per central with CMD_FLOW_CONTROL
+FLOW_CREDIT_INTERVAL_MS = const(20) # Credit limits are notified at most this often
+
+# Centrals streaming at once, each mixed in as its own source (audio/mixer.py)
+BLE_MAX_CONNECTIONS = const(3)      # Further centrals are disconnected
+
+# Control writes are handled after the BLE IRQ, from micropython.schedule() (ble/deferred.py)
+BLE_DEFERRED_SLOTS = const(4)       # Control writes waiting at once; further ones are dropped
+BLE_DEFERRED_SLOT_SIZE = const(32)  # Longest control command kept
+
+# Status notifications are coalesced and rate limited per connection (ble/notify_scheduler.py)
+BLE_NOTIFY_WINDOW_MS = const(20)    # Status changes within this window share a notification
+BLE_NOTIFY_BUDGET = const(4)        # Notifications per connection per period
+BLE_NOTIFY_PERIOD_MS = const(100)
 
 # Advertising parameters
-ADV_INTERVAL_MS = const(250)        # Advertising interval in milliseconds
+ADV_INTERVAL_MS = const(250)        # Advertising interval in milliseconds (BLEAudioSink uses the link profile's)
 SCAN_WINDOW_MS = const(1000)        # Scan window in milliseconds
 
 # ========== BLE IRQ Event Codes ==========
@@ -81,6 +119,7 @@ BLE_FIRMWARE_REVISION_CHAR_UUID = const(0x2A26)
 BLE_AUDIO_DATA_CHAR_UUID = const(0x2A3D)  # Audio data characteristic
 BLE_AUDIO_CONTROL_CHAR_UUID = const(0x2A3E)  # Control commands characteristic
 BLE_AUDIO_STATUS_CHAR_UUID = const(0x2A3F)  # Status notifications characteristic
+BLE_LATENCY_TRACE_CHAR_UUID = const(0x2A40)  # Latency histogram snapshot (read)
 
 # ========== Control Commands ==========
 # Commands that can be sent via BLE
@@ -92,6 +131,14 @@ CMD_VOLUME_DOWN = const(0x05)
 CMD_MUTE = const(0x06)
 CMD_UNMUTE = const(0x07)
 CMD_SET_SAMPLE_RATE = const(0x08)
+CMD_SET_CODEC = const(0x09)         # Argument: CODEC_PCM or CODEC_IMA_ADPCM (audio/adpcm.py)
+CMD_LATENCY_TRACE = const(0x0A)     # Argument: TRACE_OFF/ON/SNAPSHOT/RESET (audio/latency_trace.py)
+CMD_SET_FEC = const(0x0B)           # Argument: FEC group size, 0 = off; accepted size notified back
+CMD_SET_SOURCE_GAIN = const(0x0C)   # Argument: mixing gain 0-255 of the writing central's stream
+CMD_DSP = const(0x0D)               # Sub-command and arguments for audio/dsp.py DspChain.configure()
+CMD_CAPTURE = const(0x0E)           # Argument: CAPTURE_OFF/ON (audio/packet_capture.py)
+CMD_FLOW_CONTROL = const(0x0F)      # Argument: FLOW_OFF/ON, credit limits on the status characteristic
+CMD_SET_TIMESTAMPS = const(0x10)    # Argument: 1 = packets start with <HI sequence and PTS, 0 = off
 
 # ========== Status Codes ==========
 STATUS_READY = const(0x00)
@@ -102,4 +149,9 @@ STATUS_ERROR = const(0xFF)
 
 # ========== Debug Configuration ==========
 DEBUG_MODE = True
-DEBUG_PRINT_INTERVAL = const(5)  # Seconds between debug prints 
\ No newline at end of file
+DEBUG_PRINT_INTERVAL = const(5)  # Seconds between debug prints
+LATENCY_TRACE_ENABLED = False    # Trace packet latency from startup
+LATENCY_TRACE_RECORDS = const(64)  # Packets in flight the trace can follow (power of two)
+CAPTURE_PATH = "capture.apc"     # Packet capture log written on CMD_CAPTURE (audio/packet_capture.py)
+CAPTURE_BUFFER_SIZE = const(4096)  # Bytes in each of the two capture write buffers
+CAPTURE_FLUSH_MS = const(500)    # Longest time a captured packet waits for the flash write 
\ No newline at end of file
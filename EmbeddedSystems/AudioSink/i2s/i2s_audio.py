@@ -9,30 +9,38 @@ import uasyncio as asyncio
 from machine import Pin, PWM, I2S
 from micropython import const
 import time
-from ble_config import *
+from ble.ble_config import *
+from audio.ring_buffer import RingBuffer
+from audio.resampler import Resampler
 
 # I2S configuration
 I2S_ID = 0  # I2S peripheral ID
-SCK_PIN = GPIO_I2S_SCK
-WS_PIN = GPIO_I2S_WS
-SD_PIN = GPIO_I2S_SD
-MUTE_PIN = GPIO_MUTE  # UDA1334A mute pin
+SCK_PIN = I2S_SCK_PIN
+WS_PIN = I2S_WS_PIN
+SD_PIN = I2S_SD_PIN
+MUTE_PIN = UDA_MUTE_PIN  # UDA1334A mute pin
 
 # Audio format
 BITS_PER_SAMPLE = 16
 BITS_PER_FRAME = BITS_PER_SAMPLE * 2  # stereo = 2 channels
+FRAME_BYTES = BITS_PER_FRAME // 8
 SAMPLE_BUFFER_SIZE = 1024  # Number of audio samples in the buffer
+RESAMPLE_BLOCK_FRAMES = 128  # Input frames converted per resampler call
 
 class I2SAudio:
     def __init__(self, 
                  sample_rate=AUDIO_SAMPLE_RATE,
                  buffer_size=SAMPLE_BUFFER_SIZE):
         """Initialize I2S audio interface."""
-        self._sample_rate = sample_rate
+        self._sample_rate = sample_rate  # I2S clock, fixed after init
+        self._input_rate = sample_rate   # Rate of data passed to add_audio_data
+        self._resampler = None
+        self._resampled = None
         self._buffer_size = buffer_size
         self._is_playing = False
         self._is_paused = False
-        self._audio_buffer = bytearray()
+        self._audio_buffer = RingBuffer(buffer_size * 4)
+        self._chunk = bytearray(buffer_size)
         self._buffer_lock = asyncio.Lock()
         
         # Configure mute pin
@@ -71,25 +79,32 @@ class I2SAudio:
         self._status_callback = callback
     
     def set_sample_rate(self, sample_rate):
-        """Change the sample rate."""
-        was_playing = self._is_playing and not self._is_paused
+        """
+        Set the sample rate of incoming audio.
         
-        # Stop playing if active
-        if was_playing:
-            self.stop()
-        
-        # Deinitialize and reinitialize with new rate
-        if self._i2s:
-            self._i2s.deinit()
-        
-        self._sample_rate = sample_rate
-        success = self._initialize_i2s()
+        The I2S clock keeps the rate it was initialized with; other input
+        rates are converted by a polyphase resampler, so playback does
+        not have to stop and the peripheral is not reinitialized.
+        """
+        if sample_rate == self._input_rate:
+            return True
         
-        # Resume playback if it was active
-        if was_playing and success:
-            self.play()
+        if sample_rate == self._sample_rate:
+            resampler = None
+        else:
+            try:
+                resampler = Resampler(sample_rate, self._sample_rate, 2,
+                                      max_frames=RESAMPLE_BLOCK_FRAMES)
+            except ValueError as e:
+                print(f"Unsupported sample rate {sample_rate}: {e}")
+                return False
+            self._resampled = bytearray(
+                resampler.max_output(RESAMPLE_BLOCK_FRAMES) * FRAME_BYTES)
         
-        return success
+        self._resampler = resampler
+        self._input_rate = sample_rate
+        print(f"Input rate {sample_rate}Hz, I2S rate {self._sample_rate}Hz")
+        return True
     
     def _set_mute(self, mute):
         """Set the mute state of the UDA1334A."""
@@ -99,13 +114,37 @@ class I2SAudio:
             self._mute_pin.value(0)  # Unmuted
     
     async def add_audio_data(self, data):
-        """Add audio data to the buffer."""
-        async with self._buffer_lock:
-            self._audio_buffer.extend(data)
+        """Add audio data to the buffer, converting it to the I2S rate."""
+        view = memoryview(data)
+        resampler = self._resampler
+        if resampler is None:
+            await self._write_buffer(view)
+            return
         
-        # Start playback if not already playing and buffer has enough data
-        if not self._is_playing and len(self._audio_buffer) >= self._buffer_size * 2:
-            self.play()
+        # Convert whole frames in blocks the resampler was sized for
+        frames = len(view) // FRAME_BYTES
+        offset = 0
+        while offset < frames:
+            n = min(frames - offset, RESAMPLE_BLOCK_FRAMES)
+            start = offset * FRAME_BYTES
+            out = resampler.process(view[start:start + n * FRAME_BYTES], n, self._resampled)
+            await self._write_buffer(memoryview(self._resampled)[:out * FRAME_BYTES])
+            offset += n
+    
+    async def _write_buffer(self, view):
+        """Copy data into the ring buffer, waiting for space while it is full."""
+        offset = 0
+        while offset < len(view):
+            async with self._buffer_lock:
+                offset += self._audio_buffer.write_into(view[offset:])
+            
+            # Start playback if not already playing and buffer has enough data
+            if not self._is_playing and self._audio_buffer.count() >= self._buffer_size * 2:
+                self.play()
+            
+            if offset < len(view):
+                # Buffer is full, give playback a chance to drain it
+                await asyncio.sleep_ms(5)
     
     def play(self):
         """Start or resume audio playback."""
@@ -148,11 +187,7 @@ class I2SAudio:
             self._set_mute(True)
             
             # Clear buffer
-            async def clear_buffer():
-                async with self._buffer_lock:
-                    self._audio_buffer = bytearray()
-            
-            asyncio.create_task(clear_buffer())
+            self._audio_buffer.clear()
             
             if self._status_callback:
                 self._status_callback(STATUS_STOPPED)
@@ -172,10 +207,7 @@ class I2SAudio:
         if not self._buffer_size:
             return 0
         
-        buffer_len = len(self._audio_buffer)
-        max_buffer = self._buffer_size * 4  # Maximum buffer size (bytes)
-        
-        return min(100, int(buffer_len * 100 / max_buffer))
+        return self._audio_buffer.level()
     
     async def _playback_task(self):
         """Background task for continuous playback."""
@@ -187,17 +219,15 @@ class I2SAudio:
                     continue
                 
                 # Get data chunk from buffer
-                data_chunk = None
+                chunk_len = 0
                 async with self._buffer_lock:
-                    if len(self._audio_buffer) >= self._buffer_size:
-                        # Get a chunk of data
-                        data_chunk = self._audio_buffer[:self._buffer_size]
-                        # Remove the chunk from buffer
-                        self._audio_buffer = self._audio_buffer[self._buffer_size:]
+                    if self._audio_buffer.count() >= self._buffer_size:
+                        # Copy a chunk into the preallocated output buffer
+                        chunk_len = self._audio_buffer.read_into(self._chunk)
                 
-                if data_chunk:
+                if chunk_len:
                     # Write data to I2S
-                    self._i2s.write(data_chunk)
+                    self._i2s.write(self._chunk)
                 else:
                     # Buffer underrun
                     if self._is_playing:
@@ -206,7 +236,7 @@ class I2SAudio:
                         await asyncio.sleep(0.01)
                         
                         # If buffer is completely empty, stop playback
-                        if len(self._audio_buffer) == 0:
+                        if self._audio_buffer.is_empty():
                             self.stop()
                             break
                 
@@ -236,30 +266,15 @@ class I2SAudio:
 # Test function for the I2S audio interface
 async def test_i2s_audio():
     """Test the I2S audio interface with a sine wave."""
-    import math
+    from audio.oscillator import Oscillator
     
     audio = I2SAudio()
     
-    # Create a simple sine wave for testing (1kHz tone)
+    # Create a sine wave for testing from the wavetable oscillator
     def generate_sine_wave(freq=1000, duration_ms=1000):
-        samples = []
-        sample_count = (AUDIO_SAMPLE_RATE * duration_ms) // 1000
-        for i in range(sample_count):
-            # Calculate sine wave value between -1.0 and 1.0
-            value = math.sin(2 * math.pi * freq * i / AUDIO_SAMPLE_RATE)
-            # Convert to 16-bit signed int (-32768 to 32767)
-            int_value = int(value * 32767)
-            # Add sample for left and right channel
-            samples.append(int_value)
-            samples.append(int_value)
-        
-        # Convert to byte array
-        result = bytearray(len(samples) * 2)
-        for i, sample in enumerate(samples):
-            # Convert 16-bit signed ints to bytes (little endian)
-            result[i*2] = sample & 0xFF
-            result[i*2+1] = (sample >> 8) & 0xFF
-        
+        frames = (AUDIO_SAMPLE_RATE * duration_ms) // 1000
+        result = bytearray(frames * FRAME_BYTES)
+        Oscillator(AUDIO_SAMPLE_RATE, freq=freq, amplitude=1.0).fill(result, frames)
         return result
     
     # Generate a test tone
@@ -0,0 +1,68 @@
+"""
+IMA-ADPCM Decode Benchmark (host-side)
+
+Measures decode throughput of audio/adpcm.py in samples/sec for mono
+and stereo 240-byte packets, and compares the link bit rate of ADPCM
+with raw 16-bit PCM. Under CPython the portable decoder is measured; on
+device the same call resolves to the viper version.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_adpcm.py
+"""
+
+import math
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.adpcm import DECODER_IMPL, decode_block, decoded_size
+from tools.adpcm_encode import encode_pcm
+
+PACKET_SIZE = 240               # BLE_AUDIO_PACKET_SIZE
+TOTAL_SAMPLES = 500000          # Samples decoded per case
+RATE = 22050
+
+
+def make_packets(channels):
+    """Encode a short two-tone signal into packets."""
+    count = RATE // 4 * channels
+    samples = [int(10000 * math.sin(i * 0.0627) + 4000 * math.sin(i * 0.31))
+               for i in range(count)]
+    pcm = struct.pack("<%dh" % count, *samples)
+    return [p for p in encode_pcm(pcm, channels, PACKET_SIZE) if len(p) == PACKET_SIZE]
+
+
+def measure(channels):
+    """Return decode throughput in samples/sec."""
+    packets = make_packets(channels)
+    dst = bytearray(decoded_size(PACKET_SIZE, channels))
+    per_packet = decoded_size(PACKET_SIZE, channels) // 2
+    rounds = max(1, TOTAL_SAMPLES // (per_packet * len(packets)))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for packet in packets:
+            decode_block(packet, dst, channels)
+    elapsed = time.perf_counter() - start
+    return rounds * len(packets) * per_packet / elapsed
+
+
+def main():
+    """Print decode throughput and the link budget for each mode."""
+    print(f"Decoder implementation: {DECODER_IMPL}")
+    print(f"Packet size: {PACKET_SIZE} bytes\n")
+    print(f"  {'mode':<8}{'samples/sec':>14}{'real-time x':>14}{'ADPCM kbit/s':>15}{'PCM kbit/s':>13}")
+    for channels, name in ((1, "mono"), (2, "stereo")):
+        rate = measure(channels)
+        needed = RATE * channels
+        frames = decoded_size(PACKET_SIZE, channels) // (2 * channels)
+        adpcm_kbps = RATE / frames * PACKET_SIZE * 8 / 1000
+        pcm_kbps = needed * 16 / 1000
+        print(f"  {name:<8}{rate:>14,.0f}{rate / needed:>14.1f}{adpcm_kbps:>15.1f}{pcm_kbps:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Packet Loss Concealment Benchmark (host-side)
+
+Measures the CPU cost of audio/concealment.py per packet for each
+strategy and compares it with decoding the same number of frames with
+audio/adpcm.py, the work a lost packet no longer needs:
+
+- pass:   good() on a packet with no loss around it (history update)
+- lost:   conceal() for the first packet of a loss (includes the WSOLA
+          pitch search)
+- burst:  conceal() for each further packet of the same loss
+- resume: good() on the first packet after a loss (cross-fade)
+
+Figures are microseconds per packet and per 1000 output frames. Under
+CPython the portable kernels are measured; on device the same calls
+resolve to the viper versions.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_concealment.py
+"""
+
+import math
+import os
+import struct
+import sys
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+from audio.adpcm import decode_block, decoded_size
+from audio.concealment import Concealer, PLC_IMPL, PLC_NAMES
+from bench_adpcm import make_packets
+
+ROUNDS = 300
+ADPCM_PACKET = 240              # BLE_AUDIO_PACKET_SIZE
+
+# (sample rate, frames per packet): ADPCM packets on the adapter path,
+# and the PCM packets ble/ble_audio.py receives
+CASES = ((22050, decoded_size(ADPCM_PACKET, 2) // 4), (44100, 60))
+
+
+def tone_packets(rate, frames, count):
+    """Stereo packets of a voiced-like tone (fundamental and harmonics)."""
+    packets = []
+    for k in range(count):
+        samples = []
+        for i in range(k * frames, (k + 1) * frames):
+            x = 2 * math.pi * 150 * i / rate
+            value = int(6000 * math.sin(x) + 3000 * math.sin(2 * x + 1) + 1500 * math.sin(3 * x + 2))
+            samples.extend((value, value))
+        packets.append(struct.pack("<%dh" % len(samples), *samples))
+    return packets
+
+
+def time_us(func, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1000000 / rounds
+
+
+def measure(mode, rate, frames):
+    """Return microseconds per packet for each operation."""
+    size = frames * 4
+    packets = tone_packets(rate, frames, 20)
+    plc = Concealer(mode, rate, size)
+    buf = bytearray(size)
+    out = bytearray(size)
+    for packet in packets:
+        buf[:] = packet
+        plc.good(buf, size)
+
+    def passthrough():
+        buf[:] = packets[-1]
+        plc.good(buf, size)
+
+    def lost():
+        plc.conceal(out, size)
+        # Back to the start of a loss without a resume in between
+        plc._active = False
+
+    def burst():
+        # Second packet of a loss, still above the end of the fade
+        plc._lost = frames
+        plc.conceal(out, size)
+
+    result = {"pass": time_us(passthrough), "lost": time_us(lost)}
+    plc.conceal(out, size)
+    result["burst"] = time_us(burst)
+
+    # Only the good() call is timed
+    elapsed = 0.0
+    for _ in range(ROUNDS):
+        plc._active = False
+        plc.conceal(out, size)
+        buf[:] = packets[-1]
+        start = time.perf_counter()
+        plc.good(buf, size)
+        elapsed += time.perf_counter() - start
+    result["resume"] = elapsed * 1000000 / ROUNDS
+    return result
+
+
+def decode_us(frames):
+    """Microseconds to decode frames of stereo ADPCM."""
+    packet = make_packets(2)[0]
+    dst = bytearray(decoded_size(ADPCM_PACKET, 2))
+    per_packet = time_us(lambda: decode_block(packet, dst, 2))
+    return per_packet * frames / (len(dst) // 4)
+
+
+def main():
+    """Print the per-packet cost of each strategy."""
+    print(f"Concealment kernels: {PLC_IMPL}\n")
+    for rate, frames in CASES:
+        decode = decode_us(frames)
+        print(f"{rate} Hz, {frames} frames per packet; ADPCM decode of the same "
+              f"frames: {decode:.1f} us ({decode * 1000 / frames:.0f} us/kframe)")
+        print(f"  {'mode':<9}{'pass us':>9}{'lost us':>9}{'burst us':>10}{'resume us':>11}"
+              f"{'lost/decode':>13}")
+        for mode, name in enumerate(PLC_NAMES):
+            r = measure(mode, rate, frames)
+            print(f"  {name:<9}{r['pass']:>9.1f}{r['lost']:>9.1f}{r['burst']:>10.1f}"
+                  f"{r['resume']:>11.1f}{r['lost'] / decode:>13.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+DSP Chain Benchmark (host-side)
+
+Times every stage of audio/dsp.py on one I2S engine block of stereo
+audio at 22050 Hz, and the whole output fill of I2SDriver with the chain
+bypassed and with every stage enabled. Figures are microseconds per
+block and the share of the time the block plays for.
+
+Under CPython the portable kernels are measured. For the figures on the
+device, with the viper kernels, run the in-module benchmark there:
+
+    mpremote run audio/dsp.py
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_dsp.py [--block-size B] [--rounds N]
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from audio.dsp import DSP_IMPL, DspChain, EQ_PEAK, EQ_LOW_SHELF, EQ_HIGH_PASS
+from audio.sample_kernels import Q15_UNITY
+
+RATE = 22050
+
+
+def loud_block(block_size):
+    """A loud, broadband block of stereo samples."""
+    n = block_size // 2
+    return struct.pack("<%dh" % n, *[(i * 997 % 40000) - 20000 for i in range(n)])
+
+
+def time_us(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1000000 / rounds
+
+
+def full_chain(bands=4):
+    """A chain with every stage running."""
+    chain = DspChain(RATE, bands)
+    chain.set_dc_blocker(True)
+    chain.set_eq(0, EQ_HIGH_PASS, 40, q=0.7)
+    chain.set_eq(1, EQ_LOW_SHELF, 120, 4, 0.7)
+    for band in range(2, bands):
+        chain.set_eq(band, EQ_PEAK, 1000 * band, -3, 1.4)
+    chain.set_limiter(True, -6)
+    return chain
+
+
+def stage_costs(block_size, rounds):
+    """Return (name, us per block) for each stage on its own."""
+    nframes = block_size // 4
+    block = loud_block(block_size)
+    buf = bytearray(block)
+    chain = full_chain()
+    chain.ramp.jump_to(Q15_UNITY // 2)
+    chain.ramp.set_target(Q15_UNITY)
+    chain.ramp._step = 1    # Keep ramping for the whole run
+    cases = (("dc blocker", chain.dc), ("eq band", chain.eq[0]),
+             ("gain ramp", chain.ramp), ("limiter", chain.limiter))
+    results = []
+    for name, stage in cases:
+        def run(stage=stage):
+            buf[:] = block
+            stage.process(buf, nframes)
+        results.append((name, time_us(run, rounds)))
+
+    def copy():
+        buf[:] = block
+    # Subtract from the stage figures for the stage alone
+    results.append(("block copy", time_us(copy, rounds)))
+    return results
+
+
+def output_costs(block_size, rounds):
+    """Return us per engine fill through I2SDriver, bypassed and full."""
+    harness.install()
+    from audio.i2s_driver import I2SDriver
+    from audio.dsp import DSP_BYPASS
+    from config import CMD_DSP
+
+    with harness.quiet():
+        driver = I2SDriver(16, 17, 18, RATE, buffer_size=4 * block_size)
+    block = loud_block(block_size)
+    out = bytearray(driver.engine._block_size)
+
+    def fill():
+        driver.buffer.write_into(block)
+        driver.engine._fill(out)
+
+    results = []
+    driver.configure_dsp(bytes([CMD_DSP, DSP_BYPASS, 1]))
+    results.append(("bypass", time_us(fill, rounds)))
+    driver.dsp = full_chain()
+    driver.update_dsp()
+    results.append(("all stages", time_us(fill, rounds)))
+    return results
+
+
+def main():
+    """Print the per-stage report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--block-size", type=int, default=512, help="bytes per block")
+    parser.add_argument("--rounds", type=int, default=200, help="blocks per measurement")
+    args = parser.parse_args()
+
+    period_us = args.block_size // 4 * 1000000 / RATE
+    print(f"DSP kernels: {DSP_IMPL}; {args.block_size}-byte blocks, "
+          f"{period_us:.0f} us of audio at {RATE} Hz\n")
+    print(f"  {'stage':<13}{'us/block':>10}{'% of period':>13}")
+    for name, us in stage_costs(args.block_size, args.rounds):
+        print(f"  {name:<13}{us:>10.1f}{100 * us / period_us:>13.1f}")
+    print(f"\n  {'output fill':<13}{'us/block':>10}{'% of period':>13}")
+    for name, us in output_costs(args.block_size, args.rounds):
+        print(f"  {name:<13}{us:>10.1f}{100 * us / period_us:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+XOR Parity FEC Loss Benchmark (host-side)
+
+Sends a packet stream framed by tools/fec_encode.py through a lossy
+link into BLEAudioSink on the fake radio, with FEC negotiated over the
+control characteristic, and counts the packets that reach the audio
+callback. Every frame (data or parity) is dropped independently with
+the given probability, drawn from a seeded generator so runs repeat
+exactly.
+
+Reported per link loss rate and group size:
+
+- effective loss: data packets that never reached the callback
+- overhead: extra bytes on air for parity and headers
+- us/frame: host time in the sink's receive path per frame
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_fec.py [--packets N] [--seed S]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+from tools.fec_encode import encode_packets
+
+PACKET_SIZE = 236               # Parity frames (4-byte header) stay within 240
+LOSS_RATES = (0.01, 0.02, 0.05, 0.10)
+GROUP_SIZES = (0, 8, 4, 2)      # 0 = FEC off
+
+
+def make_packets(count, size=PACKET_SIZE):
+    """Numbered packets, so every one that arrives can be identified."""
+    return [i.to_bytes(4, "little") * (size // 4) for i in range(count)]
+
+
+def run_link(loss, group_size, packets, seed=1):
+    """
+    Stream packets through a lossy link into BLEAudioSink.
+
+    Args:
+        loss (float): Probability that a frame is lost on the link
+        group_size (int): FEC group size to negotiate, 0 for none
+        packets (list): Packets as sent without FEC
+        seed (int): Loss pattern seed
+
+    Returns:
+        dict: Delivery and cost figures
+    """
+    harness.install()
+    import bluetooth
+    from ble.ble_core import BLEAudioSink
+    from config import CMD_SET_FEC
+
+    with harness.quiet():
+        sink = BLEAudioSink()
+    received = set()
+    sink.set_audio_data_callback(lambda data: received.add(bytes(data[:4])))
+    ble = bluetooth.BLE()
+    control = sink._handles['audio_control']
+    with harness.quiet():
+        ble.central_connect()
+        if group_size:
+            ble.central_write(control, bytes([CMD_SET_FEC, group_size]))
+    accepted = ble.gatts_read(control)[1] if group_size else 0
+
+    frames = encode_packets(packets, accepted) if accepted else packets
+    rng = random.Random(seed)
+    handle = sink._handles['audio_data']
+    sent = 0
+    elapsed = 0.0
+    for frame in frames:
+        sent += len(frame)
+        if rng.random() < loss:
+            continue
+        start = time.perf_counter()
+        ble.central_write(handle, frame)
+        elapsed += time.perf_counter() - start
+
+    payload = sum(len(p) for p in packets)
+    return {
+        "group_size": accepted,
+        "effective_loss": 1 - len(received) / len(packets),
+        "overhead": sent / payload - 1,
+        "us_per_frame": elapsed * 1000000 / len(frames),
+        "fec": sink.get_fec(0).get_stats(),
+    }
+
+
+def main():
+    """Print effective loss against link loss for each group size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--packets", type=int, default=20000, help="data packets per run")
+    parser.add_argument("--seed", type=int, default=1, help="loss pattern seed")
+    args = parser.parse_args()
+
+    packets = make_packets(args.packets)
+    print(f"{args.packets} packets of {PACKET_SIZE} bytes, independent frame loss\n")
+    header = "".join(f"{'N=' + str(n) if n else 'no FEC':>12}" for n in GROUP_SIZES)
+    print(f"  {'link loss':<11}{header}")
+    costs = {}
+    for loss in LOSS_RATES:
+        cells = []
+        for n in GROUP_SIZES:
+            r = run_link(loss, n, packets, args.seed)
+            cells.append(f"{100 * r['effective_loss']:>11.2f}%")
+            costs[n] = r
+        print(f"  {100 * loss:>8.0f}%  " + "".join(cells))
+    print(f"\n  {'overhead':<11}" + "".join(f"{100 * costs[n]['overhead']:>11.1f}%" for n in GROUP_SIZES))
+    print(f"  {'us/frame':<11}" + "".join(f"{costs[n]['us_per_frame']:>12.1f}" for n in GROUP_SIZES))
+
+
+if __name__ == "__main__":
+    main()
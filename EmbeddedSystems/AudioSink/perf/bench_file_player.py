@@ -0,0 +1,153 @@
+"""
+Flash File Player Benchmark (host-side)
+
+Two measurements of audio/file_player.py, kept apart so the filesystem
+and the playback path can be judged separately:
+
+- read: read_throughput() over a generated WAV file for several chunk
+  sizes, with no playback, in MB/s of the host filesystem. On the Pico
+  W the same function reports the flash filesystem's rate (see the
+  in-module test_file_player).
+- soak: FilePlayer looping the file into I2SDriver on simulated time
+  at the full I2S rate. Reports bytes played against the bytes the
+  I2S clock consumed, engine underruns, I2S starvations and host time
+  per second of audio.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_file_player.py [--seconds S] [--file-seconds S]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+from bench_pipeline import tone_packet
+
+RATE = 22050
+CHUNK_SIZES = (256, 512, 1024, 4096)
+
+
+def write_test_wav(path, seconds, rate=RATE, bits=16, channels=2):
+    """
+    Write a WAV file of a sine tone.
+
+    Args:
+        path (str): File to create
+        seconds (float): Length of the audio
+        rate (int): Sample rate in Hz
+        bits (int): 16 for signed samples, 8 for unsigned
+        channels (int): Channel count
+
+    Returns:
+        bytes: The PCM data written after the header
+    """
+    harness.install()
+    from audio.file_player import wav_header
+
+    frames = int(seconds * rate)
+    pcm = tone_packet(frames * 2 * channels, channels, rate=rate)
+    if bits == 8:
+        pcm = bytes((pcm[i + 1] + 128) & 0xFF for i in range(0, len(pcm), 2))
+    with open(path, "wb") as f:
+        f.write(wav_header(rate, bits, channels, len(pcm)))
+        f.write(pcm)
+    return pcm
+
+
+def time_reads(path, chunk_size, rounds=5):
+    """Return MB/s reading the whole file with chunk_size reads."""
+    harness.install()
+    from audio.file_player import read_throughput
+
+    total = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        total += read_throughput(path, chunk_size)[0]
+    return total / (time.perf_counter() - start) / 1000000
+
+
+def run_file_soak(path, seconds=1.0, warmup=0.2, chunk_size=1024):
+    """
+    Loop a file through FilePlayer and I2SDriver at the I2S rate.
+
+    Args:
+        path (str): WAV file to play
+        seconds (float): Measured simulated time
+        warmup (float): Simulated time before measuring
+        chunk_size (int): Bytes per filesystem read
+
+    Returns:
+        dict: Playback, underrun and timing figures
+    """
+    harness.install()
+    from audio.i2s_driver import I2SDriver
+    from audio.file_player import FilePlayer
+
+    async def main():
+        driver = I2SDriver(16, 17, 18, RATE, buffer_size=2048)
+        player = FilePlayer(driver, chunk_size)
+        task = asyncio.create_task(player.play(path, loops=0))
+        await asyncio.sleep(warmup)
+
+        i2s = driver.i2s
+        i2s.reset_stats()
+        driver.engine.reset_stats()
+        played = player.bytes_played
+        i2s.capture = bytearray()
+        start_cpu = time.perf_counter()
+        await asyncio.sleep(seconds)
+        cpu = time.perf_counter() - start_cpu
+
+        result = {
+            "format": player.format,
+            "bytes_played": player.bytes_played - played,
+            "bytes_out": len(i2s.capture),
+            "loops": player.loops,
+            "underruns": driver.engine.underruns,
+            "starvations": i2s.starvations,
+            "reads": player.reads,
+            "cpu_ms_per_sec": cpu * 1000 / seconds,
+        }
+        player.stop()
+        await task
+        await driver.stop()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def main():
+    """Print the read rates and the soak run."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0, help="simulated seconds of soak")
+    parser.add_argument("--file-seconds", type=float, default=2.0, help="length of the test file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "soak.wav")
+        write_test_wav(path, args.file_seconds)
+        size = os.path.getsize(path)
+        print(f"Test file: {size} bytes, {args.file_seconds:.1f} s at {RATE} Hz\n")
+        print(f"  {'read chunk':<12}{'MB/s':>9}")
+        for chunk in CHUNK_SIZES:
+            print(f"  {chunk:<12}{time_reads(path, chunk):>9.1f}")
+
+        print(f"\n  {'read chunk':<12}{'played':>9}{'out':>9}{'loops':>7}{'underrun':>10}"
+              f"{'starved':>9}{'cpu ms/s':>10}")
+        for chunk in CHUNK_SIZES:
+            r = run_file_soak(path, args.seconds, chunk_size=chunk)
+            print(f"  {chunk:<12}{r['bytes_played']:>9}{r['bytes_out']:>9}{r['loops']:>7}"
+                  f"{r['underruns']:>10}{r['starvations']:>9}{r['cpu_ms_per_sec']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
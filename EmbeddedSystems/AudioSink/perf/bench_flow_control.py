@@ -0,0 +1,197 @@
+"""
+Credit Flow Control Benchmark (host-side)
+
+Streams PCM into BLEAudioAdapter from a simulated central over a bursty
+link, with and without the credit flow control of ble/flow_control.py
+(the central paces itself with tools/credit_sender.py's CreditPacer):
+
+- live: audio produced at the I2S rate; the link drops out for stall_ms
+  now and then, and the central sends its backlog when it comes back
+- file: a file streamed as fast as the link allows
+
+Connection events every 7.5 ms carry up to 6 writes. Reported per case:
+packets sent, packets the sink dropped from a full ingest queue, ingest
+waits on a full I2S buffer, engine underruns after the warmup, the
+ingest queue high water mark, the largest backlog on the central and
+the credit notifications sent.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_flow_control.py [--seconds S] [--stall-ms M]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from bench_pipeline import PACKET_AUDIO_BYTES, tone_packet
+from tools.credit_sender import CreditPacer
+
+
+class BurstyCentral:
+    """
+    Virtual-clock central writing audio over a link with dropouts.
+
+    Packets become due at rate_hz (or are always available when rate_hz
+    is None). At each connection event outside a dropout, the central
+    reads the status notifications that reached it and sends up to
+    writes_per_event due packets, no more than its pacer allows.
+    """
+
+    def __init__(self, ble, handle, packet, rate_hz=None, pacer=None, conn_handle=0,
+                 interval_us=7500, writes_per_event=6, stall_ms=0, stall_every_ms=400,
+                 seed=1):
+        self._ble = ble
+        self._handle = handle
+        self._packet = packet
+        self._rate_hz = rate_hz
+        self.pacer = pacer
+        self._conn = conn_handle
+        self._interval_us = interval_us
+        self._writes = writes_per_event
+        self._stall_us = stall_ms * 1000
+        # Chance that a connection event starts a dropout
+        self._stall_p = interval_us / (stall_every_ms * 1000) if stall_ms else 0
+        self._rng = random.Random(seed)
+        self._clock = harness.virtual_clock
+        self._start_us = self._clock.now_us()
+        self._next_us = self._start_us
+        self._stalled_until = 0
+        self._seen = len(ble.notifications)
+        self.sent = 0
+        self.max_backlog = 0
+        self.stalls = 0
+        self.running = True
+        self._clock.register(self)
+
+    def stop(self):
+        self.running = False
+        self._clock.unregister(self)
+
+    def next_event_us(self):
+        return self._next_us if self.running else None
+
+    def run_until(self, t):
+        while self.running and self._next_us <= t:
+            self._connection_event(self._next_us)
+            self._next_us += self._interval_us
+
+    def _connection_event(self, now):
+        if now < self._stalled_until:
+            return
+        if self._rng.random() < self._stall_p:
+            self._stalled_until = now + self._stall_us
+            self.stalls += 1
+            return
+        notifications = self._ble.notifications
+        if self.pacer:
+            for conn, handle, data in notifications[self._seen:]:
+                if conn == self._conn:
+                    self.pacer.on_status(data)
+        self._seen = len(notifications)
+
+        if self._rate_hz:
+            due = int((now - self._start_us) * self._rate_hz / 1000000) + 1
+            backlog = due - self.sent
+        else:
+            backlog = self._writes
+        self.max_backlog = max(self.max_backlog, backlog)
+        n = min(backlog, self._writes)
+        if self.pacer:
+            n = min(n, self.pacer.available())
+        for _ in range(n):
+            self._ble.central_write(self._handle, self._packet, self._conn)
+            self.sent += 1
+            if self.pacer:
+                self.pacer.on_sent()
+
+
+def run_stream(paced, live=True, seconds=3.0, warmup=0.5, stall_ms=60, seed=1):
+    """
+    Stream into BLEAudioAdapter from a BurstyCentral.
+
+    Args:
+        paced (bool): Enable credits and pace the central to them
+        live (bool): Produce audio at the I2S rate; False streams a file
+            as fast as the link allows
+        seconds (float): Measured simulated time
+        warmup (float): Simulated time before measuring
+        stall_ms (int): Length of each link dropout (0 = none)
+        seed (int): Random seed for the dropouts
+
+    Returns:
+        dict: Sink drop, wait and underrun figures and the central's backlog
+    """
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from config import AUDIO_SAMPLE_RATE, AUDIO_CHANNELS
+
+    ble = bluetooth.BLE()
+    packet = tone_packet(PACKET_AUDIO_BYTES, AUDIO_CHANNELS, rate=AUDIO_SAMPLE_RATE)
+    rate_hz = AUDIO_SAMPLE_RATE * AUDIO_CHANNELS * 2 / PACKET_AUDIO_BYTES
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        ble.central_connect(0)
+        handles = adapter.ble_sink._handles
+        pacer = CreditPacer() if paced else None
+        central = BurstyCentral(ble, handles["audio_data"], packet, rate_hz if live else None,
+                                pacer, stall_ms=stall_ms, seed=seed)
+        if paced:
+            ble.central_write(handles["audio_control"], pacer.enable_command())
+        await asyncio.sleep(warmup)
+
+        engine = adapter.i2s_driver.engine
+        engine.reset_stats()
+        before = dict(adapter.stats)
+        sent = central.sent
+        await asyncio.sleep(seconds)
+        after = dict(adapter.stats)
+        result = {
+            "sent": central.sent - sent,
+            "dropped": after["queue_overflows"] - before["queue_overflows"],
+            "waits": after["buffer_overruns"] - before["buffer_overruns"],
+            "underruns": engine.underruns,
+            "queue_high": adapter.get_stats()["queue"]["high_water"],
+            "backlog": central.max_backlog,
+            "stalls": central.stalls,
+            "notifications": adapter.ble_sink.flow.notifications,
+        }
+        central.stop()
+        await adapter.stop()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def main():
+    """Print the paced and unpaced figures for both traffic patterns."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=3.0, help="measured simulated time")
+    parser.add_argument("--stall-ms", type=int, default=60, help="length of link dropouts")
+    args = parser.parse_args()
+
+    print(f"{args.seconds:.1f} s, {PACKET_AUDIO_BYTES}-byte writes, "
+          f"{args.stall_ms} ms dropouts every ~400 ms\n")
+    print(f"  {'traffic':<8}{'credits':<9}{'sent':>7}{'dropped':>9}{'waits':>7}"
+          f"{'underrun':>10}{'queue hw':>10}{'backlog':>9}{'notify':>8}")
+    for live in (True, False):
+        for paced in (False, True):
+            r = run_stream(paced, live, args.seconds, stall_ms=args.stall_ms)
+            print(f"  {'live' if live else 'file':<8}{'on' if paced else 'off':<9}{r['sent']:>7}"
+                  f"{r['dropped']:>9}{r['waits']:>7}{r['underruns']:>10}{r['queue_high']:>10}"
+                  f"{r['backlog']:>9}{r['notifications']:>8}")
+
+
+if __name__ == "__main__":
+    main()
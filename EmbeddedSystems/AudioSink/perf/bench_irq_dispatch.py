@@ -0,0 +1,212 @@
+"""
+IRQ Dispatch Benchmark (host-side)
+
+Times the routing of BLE IRQs to their handlers, registered with the
+fake radio (perf/fakes/bluetooth.py), for the if/elif chains the
+peripherals used and for ble/irq_dispatch.py's tables, with handlers
+that do nothing so only the routing is measured:
+
+- kitchen_sink: every MicroPython event in the order of
+  BLESimplePeripheral's chain, GATTS_WRITE fourth and then four
+  characteristic handles
+- audio_sink: BLEAudioSink's chain (connect, disconnect, GATTS_WRITE on
+  the audio data and control handles, the L2CAP range)
+
+For each event the time per IRQ is the median of several rounds, raw:
+it includes the call into the handler, whose cost alone (a handler
+that returns at once) is printed as "call" for reference. The gain
+grows with the position of an event in the chain; events near its head
+or behind a single handle test, such as connect and audio control,
+are not routed faster by the tables and may come out slightly slower.
+The chains compare integer literals, as const() leaves them on MicroPython,
+and load the handles from the object like the peripherals do. Host
+figures only show how the two scale with the position of an event in
+the chain; absolute times on the Pico are several times longer.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_irq_dispatch.py [--calls N] [--rounds R]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+
+# MicroPython IRQ event codes
+CENTRAL_CONNECT = 1
+CENTRAL_DISCONNECT = 2
+GATTS_WRITE = 3
+GATTS_READ_REQUEST = 4
+L2CAP_ACCEPT = 22
+L2CAP_RECV = 25
+L2CAP_SEND_READY = 26
+CONNECTION_UPDATE = 27
+ENCRYPTION_UPDATE = 28
+PASSKEY_ACTION = 31
+
+# Event order of the chains
+KITCHEN_SINK_ORDER = (1, 2, 27, 3, 17, 4, 15, 16, 5, 6, 18, 19, 20, 9, 10, 11, 12, 13, 14,
+                      22, 23, 24, 25, 26, 29, 30, 28, 31)
+AUDIO_SINK_ORDER = (1, 2, 3, 22, 23, 24, 25, 26)
+
+# Attribute handles of the characteristics the chains test for on GATTS_WRITE
+KITCHEN_SINK_HANDLES = (6, 20, 22, 49)
+AUDIO_SINK_HANDLES = (12, 15)
+
+# (label, event, data) per scenario
+CASES = {
+    "kitchen_sink": (
+        ("connect", CENTRAL_CONNECT, (0, 0, b"\x00" * 6)),
+        ("write rx", GATTS_WRITE, (0, 6)),
+        ("write rgb", GATTS_WRITE, (0, 49)),
+        ("write other", GATTS_WRITE, (0, 32)),
+        ("read request", GATTS_READ_REQUEST, (0, 9)),
+        ("l2cap recv", L2CAP_RECV, (0, 0x40)),
+        ("encryption", ENCRYPTION_UPDATE, (0, 1, 0, 0, 16)),
+        ("passkey", PASSKEY_ACTION, (0, 1, 0)),
+    ),
+    "audio_sink": (
+        ("connect", CENTRAL_CONNECT, (0, 0, b"\x00" * 6)),
+        ("audio data", GATTS_WRITE, (0, 12)),
+        ("audio control", GATTS_WRITE, (0, 15)),
+        ("l2cap recv", L2CAP_RECV, (0, 0x40)),
+        ("send ready", L2CAP_SEND_READY, (0, 0x40, 0)),
+    ),
+}
+
+SCENARIOS = {
+    "kitchen_sink": (KITCHEN_SINK_ORDER, KITCHEN_SINK_HANDLES),
+    "audio_sink": (AUDIO_SINK_ORDER, AUDIO_SINK_HANDLES),
+}
+
+
+class Target:
+    """Peripheral stand-in: characteristic handles and do-nothing handlers."""
+
+    def __init__(self, handles):
+        for k, handle in enumerate(handles):
+            setattr(self, f"h{k}", handle)
+        self.calls = 0
+
+    def handle(self, data):
+        self.calls += 1
+
+
+def chain_handler(target, order, handles):
+    """
+    Build an if/elif IRQ handler like the peripherals' _irq methods.
+
+    Args:
+        target (Target): Object holding the handles and the handler
+        order (tuple): Event codes in the order they are tested
+        handles (tuple): Characteristic handles tested on GATTS_WRITE
+
+    Returns:
+        function: handler(event, data)
+    """
+    lines = ["def irq(event, data):"]
+    for i, event in enumerate(order):
+        lines.append(f"    {'elif' if i else 'if'} event == {event}:")
+        if event == GATTS_WRITE:
+            lines.append("        conn_handle, attr_handle = data")
+            for k in range(len(handles)):
+                lines.append(f"        {'elif' if k else 'if'} attr_handle == target.h{k}:")
+                lines.append("            return target.handle(data)")
+        else:
+            lines.append("        return target.handle(data)")
+    scope = {"target": target}
+    exec("\n".join(lines), scope)
+    return scope["irq"]
+
+
+def table_handler(target, order, handles):
+    """Build the same routing with ble/irq_dispatch.IRQDispatcher."""
+    from ble.irq_dispatch import IRQDispatcher
+    irq = IRQDispatcher()
+    for event in order:
+        if event != GATTS_WRITE:
+            irq.on(event, target.handle)
+    for k in range(len(handles)):
+        irq.on_handle(GATTS_WRITE, getattr(target, f"h{k}"), target.handle)
+    return irq.dispatch
+
+
+def time_case(ble, handler, event, data, calls=20000, rounds=15):
+    """
+    Time one event through the handler registered with the fake radio.
+
+    The IRQs are raised in a timed loop, since timing each IRQ on its
+    own costs more than the routing.
+
+    Returns:
+        float: Median per-IRQ time over the rounds, in nanoseconds
+    """
+    ble.irq(handler)
+    irq = ble._handler
+    loop = range(calls)
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in loop:
+            irq(event, data)
+        times.append((time.perf_counter() - start) / calls * 1e9)
+    return statistics.median(times)
+
+
+def _empty(event, data):
+    return None
+
+
+def run_scenario(name, calls=20000, rounds=15):
+    """
+    Time every case of a scenario with the chain and the table.
+
+    Returns:
+        list: (label, chain ns, table ns) per case
+    """
+    harness.install()
+    import bluetooth
+    order, handles = SCENARIOS[name]
+    ble = bluetooth.BLE()
+    target = Target(handles)
+    chain = chain_handler(target, order, handles)
+    table = table_handler(target, order, handles)
+    results = []
+    for label, event, data in CASES[name]:
+        results.append((label,
+                        time_case(ble, chain, event, data, calls, rounds),
+                        time_case(ble, table, event, data, calls, rounds)))
+    ble.irq(None)
+    return results
+
+
+def main():
+    """Print chain and table routing costs for both scenarios."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=20000, help="IRQs per round")
+    parser.add_argument("--rounds", type=int, default=15,
+                        help="rounds per case (median is kept)")
+    args = parser.parse_args()
+
+    harness.install()
+    import bluetooth
+    ble = bluetooth.BLE()
+    call = time_case(ble, _empty, 0, None, args.calls, args.rounds)
+    ble.irq(None)
+    for name in SCENARIOS:
+        print(f"{name}: ns per IRQ (call: {call:.0f})")
+        print(f"  {'event':<15}{'chain':>8}{'table':>8}{'speedup':>9}")
+        for label, chain, table in run_scenario(name, args.calls, args.rounds):
+            print(f"  {label:<15}{chain:>8.0f}{table:>8.0f}{chain / table:>8.2f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+GATT vs L2CAP Transport Benchmark (host-side)
+
+Compares the two ways audio reaches the sink over the same simulated
+link (perf/fakes/bluetooth.py SimulatedLink: 7.5 ms connection
+interval, 6 PDUs of 251 bytes per event by default):
+
+- gatt:  writes without response to the audio data characteristic, one
+         IRQ, gatts_read() and callback per write
+- l2cap: SDUs on the L2CAP audio channel, read with l2cap_recvinto()
+         into the transport's preallocated buffer
+
+Two scenarios:
+
+- transport: the sender saturates the link and BLEAudioSink hands the
+  data to a callback that only counts it. Reports sustained goodput
+  (payload bytes per simulated second), IRQs per KiB and host time per
+  KiB in the IRQ handler.
+- adapter: BLEAudioAdapter plays the stream while the sender runs at
+  load times the playback rate. GATT has no flow control, so excess
+  packets are dropped from the ingest queue; L2CAP withholds credits
+  and the surplus waits in the sender's backlog. Reports delivered
+  rate, drops, underruns and host time per KiB for the whole loop.
+
+With --alloc, heap bytes per KiB on the IRQ path are added from a
+tracemalloc pass.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_l2cap.py [--seconds S] [--load L] [--alloc]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness
+from bench_pipeline import _Run, measure, tone_packet
+
+MODES = ("gatt", "l2cap")
+
+# Payload per message: an MTU-247 write (244 bytes) fills one PDU; a
+# 488-byte SDU fills two K-frames exactly
+TRANSPORT_SIZE = {"gatt": 244, "l2cap": 488}
+
+# Whole stereo frames that fit the adapter's ingest slots per read
+ADAPTER_SIZE = {"gatt": 240, "l2cap": 480}
+
+
+def _link(ble, sink, mode, size, **kwargs):
+    """Open the transport and start a SimulatedLink sending on it."""
+    import bluetooth
+    from config import BLE_L2CAP_AUDIO_PSM
+    if mode == "gatt":
+        return ble.simulate_link(sink._handles["audio_data"], size, **kwargs)
+    cid = ble.central_l2cap_connect(BLE_L2CAP_AUDIO_PSM)
+    return ble.simulate_link(cid, size, mode=bluetooth.SimulatedLink.L2CAP, **kwargs)
+
+
+def run_transport(mode="gatt", seconds=2.0, warmup=0.1, **link):
+    """
+    Saturate the link and count what the audio callback receives.
+
+    Args:
+        mode (str): "gatt" or "l2cap"
+        seconds (float): Measured simulated time
+        warmup (float): Simulated time before measuring
+        **link: SimulatedLink arguments (interval_us, pdus_per_event, ...)
+
+    Returns:
+        dict: Measured figures
+    """
+    harness.install()
+    import bluetooth
+    from ble.ble_core import BLEAudioSink
+
+    ble = bluetooth.BLE()
+    size = TRANSPORT_SIZE[mode]
+    received = [0]
+
+    def on_audio(data):
+        received[0] += len(data)
+
+    async def main():
+        sink = BLEAudioSink()
+        sink.set_audio_data_callback(on_audio)
+        ble.central_connect()
+        sender = _link(ble, sink, mode, size, payload=lambda i: bytes(size), **link)
+        await asyncio.sleep(warmup)
+
+        ble.reset_stats()
+        pdus_before = sender.pdus
+        received[0] = 0
+        window = _Run()
+        await asyncio.sleep(seconds)
+
+        nbytes = received[0]
+        kib = max(nbytes, 1) / 1024
+        result = {
+            "goodput_bytes_per_sec": nbytes / seconds,
+            "irqs_per_kib": ble.irq_calls / kib,
+            "irq_us_per_kib": ble.irq_time_s * 1000000 / kib,
+            "pdus": sender.pdus - pdus_before,
+            "stalled_events": sender.stalled_events,
+        }
+        if mode == "l2cap":
+            result["stalls"] = sink.l2cap.stalls
+        window.finish(result, ble.irq_calls, ble.irq_time_s,
+                      ble.irq_alloc_bytes, ble.irq_alloc_max)
+        if "alloc_bytes_per_packet" in result:
+            result["alloc_bytes_per_kib"] = ble.irq_alloc_bytes / kib
+        sender.stop()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def run_adapter_link(mode="gatt", seconds=2.0, load=1.0, warmup=0.5, **link):
+    """
+    Stream PCM into BLEAudioAdapter over the simulated link.
+
+    Args:
+        mode (str): "gatt" or "l2cap"
+        seconds (float): Measured simulated time
+        load (float): Sender rate relative to the I2S consumption rate
+        warmup (float): Simulated time before measuring
+        **link: SimulatedLink arguments
+
+    Returns:
+        dict: Measured figures
+    """
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from config import AUDIO_SAMPLE_RATE, AUDIO_CHANNELS
+
+    ble = bluetooth.BLE()
+    size = ADAPTER_SIZE[mode]
+    packet = tone_packet(size, AUDIO_CHANNELS, rate=AUDIO_SAMPLE_RATE)
+    rate_hz = AUDIO_SAMPLE_RATE * AUDIO_CHANNELS * 2 / size * load
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        ble.central_connect()
+        sender = _link(ble, adapter.ble_sink, mode, size, rate_hz=rate_hz,
+                       payload=lambda i: packet, **link)
+        await asyncio.sleep(warmup)
+
+        driver = adapter.i2s_driver
+        driver.engine.reset_stats()
+        driver.i2s.reset_stats()
+        ble.reset_stats()
+        before = dict(adapter.stats)
+        window = _Run()
+        await asyncio.sleep(seconds)
+        after = dict(adapter.stats)
+        cpu = time.perf_counter() - window.start_cpu
+
+        nbytes = after["audio_bytes_processed"] - before["audio_bytes_processed"]
+        kib = max(nbytes, 1) / 1024
+        result = {
+            "sent": sender.sent,
+            "backlog": sender.backlog(),
+            "underruns": driver.engine.underruns,
+            "starvations": driver.i2s.starvations,
+            "dropped": after["queue_overflows"] - before["queue_overflows"],
+            "goodput_bytes_per_sec": nbytes / seconds,
+            "irqs_per_kib": ble.irq_calls / kib,
+            "total_us_per_kib": cpu * 1000000 / kib,
+        }
+        window.finish(result, after["packets_received"] - before["packets_received"],
+                      ble.irq_time_s, ble.irq_alloc_bytes, ble.irq_alloc_max)
+        sender.stop()
+        await adapter.stop()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def main():
+    """Print the transport report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0, help="simulated seconds measured")
+    parser.add_argument("--load", type=float, default=1.25, help="sender rate / playback rate")
+    parser.add_argument("--alloc", action="store_true", help="add a tracemalloc pass")
+    args = parser.parse_args()
+
+    print(f"Saturated link, {args.seconds:.1f} s simulated\n")
+    print(f"  {'transport':<10}{'bytes':>7}{'goodput B/s':>13}{'IRQ/KiB':>9}{'IRQ us/KiB':>12}")
+    for mode in MODES:
+        r = run_transport(mode, seconds=args.seconds)
+        print(f"  {mode:<10}{TRANSPORT_SIZE[mode]:>7}{r['goodput_bytes_per_sec']:>13.0f}"
+              f"{r['irqs_per_kib']:>9.2f}{r['irq_us_per_kib']:>12.1f}")
+
+    print(f"\nBLEAudioAdapter, load {args.load:.2f}\n")
+    print(f"  {'transport':<10}{'goodput B/s':>13}{'dropped':>9}{'backlog':>9}"
+          f"{'underrun':>10}{'total us/KiB':>14}")
+    for mode in MODES:
+        r = run_adapter_link(mode, seconds=args.seconds, load=args.load)
+        print(f"  {mode:<10}{r['goodput_bytes_per_sec']:>13.0f}{r['dropped']:>9}"
+              f"{r['backlog']:>9}{r['underruns']:>10}{r['total_us_per_kib']:>14.1f}")
+
+    if args.alloc:
+        print(f"\n  {'transport':<10}{'IRQ alloc B/KiB':>17}")
+        for mode in MODES:
+            r = measure(run_transport, alloc=True, mode=mode, seconds=min(args.seconds, 1.0))
+            print(f"  {mode:<10}{r['alloc_bytes_per_kib']:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Multi-Source Mixer Benchmark (host-side)
+
+Two measurements of audio/mixer.py:
+
+- fill: Mixer.fill() for one I2S engine block with 1 to --max-sources
+  sources playing, against the time the block lasts at 22050 Hz. The
+  cost of each additional stream is the slope between source counts,
+  and dividing the --budget share of a block period by it gives how
+  many streams fit (the first stream is a plain ring read). Under
+  CPython the portable kernels are measured; on device the same calls
+  resolve to the viper versions, so run the figures there for the Pico
+  W's own answer.
+- adapter: BLEAudioAdapter with several centrals on the fake radio,
+  each writing a tone to the audio data characteristic at the playback
+  rate. Reports delivered packets, engine and per-source underruns,
+  ingest queue drops and host time per second of audio.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_mixer.py [--max-sources N] [--budget PCT] [--seconds S]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+from bench_pipeline import PACKET_AUDIO_BYTES, tone_packet
+
+from audio.mixer import Mixer
+from audio.ring_buffer import RingBuffer
+from audio.sample_kernels import KERNEL_IMPL, Q15_UNITY
+
+RATE = 22050
+BLOCK_SIZE = 512                # I2SDriver block for a 2048-byte buffer
+ROUNDS = 300
+
+
+def time_fill(sources, rounds=ROUNDS, gain=Q15_UNITY):
+    """
+    Time Mixer.fill() with every source playing.
+
+    Args:
+        sources (int): Playing sources
+        rounds (int): Blocks mixed
+        gain (int): Q15 gain of every source
+
+    Returns:
+        float: Microseconds per block
+    """
+    block = tone_packet(BLOCK_SIZE, rate=RATE)
+    rings = [RingBuffer(4 * BLOCK_SIZE) for _ in range(sources)]
+    mixer = Mixer(rings, BLOCK_SIZE)
+    for i in range(sources):
+        mixer.set_gain(i, gain)
+    out = bytearray(BLOCK_SIZE)
+    elapsed = 0.0
+    for _ in range(rounds):
+        for ring in rings:
+            while ring.free() >= BLOCK_SIZE:
+                ring.write_into(block)
+        start = time.perf_counter()
+        mixer.fill(out)
+        elapsed += time.perf_counter() - start
+    return elapsed * 1000000 / rounds
+
+
+def run_adapter_sources(sources, seconds=1.0, warmup=0.5, load=1.0):
+    """
+    Stream a tone from several centrals into BLEAudioAdapter.
+
+    Args:
+        sources (int): Connected centrals, each sending at the playback rate
+        seconds (float): Measured simulated time
+        warmup (float): Simulated time before measuring
+        load (float): Sender rate relative to the I2S consumption rate
+
+    Returns:
+        dict: Delivery, underrun and timing figures
+    """
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from config import AUDIO_SAMPLE_RATE, AUDIO_CHANNELS
+
+    ble = bluetooth.BLE()
+    packet = tone_packet(PACKET_AUDIO_BYTES, AUDIO_CHANNELS, rate=AUDIO_SAMPLE_RATE)
+    rate_hz = AUDIO_SAMPLE_RATE * AUDIO_CHANNELS * 2 / PACKET_AUDIO_BYTES * load
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        handle = adapter.ble_sink._handles["audio_data"]
+        injectors = []
+        for conn in range(sources):
+            ble.central_connect(conn)
+            injectors.append(ble.inject_writes(handle, rate_hz, payload=lambda i: packet,
+                                               conn_handle=conn))
+        await asyncio.sleep(warmup)
+
+        driver = adapter.i2s_driver
+        driver.engine.reset_stats()
+        mixer_before = list(driver.mixer.underruns)
+        before = dict(adapter.stats)
+        start_cpu = time.perf_counter()
+        await asyncio.sleep(seconds)
+        cpu = time.perf_counter() - start_cpu
+        after = dict(adapter.stats)
+
+        result = {
+            "sources": sources,
+            "connected": adapter.ble_sink.connection_count(),
+            "packets": after["packets_received"] - before["packets_received"],
+            "underruns": driver.engine.underruns,
+            "source_underruns": [a - b for a, b in zip(driver.mixer.underruns, mixer_before)],
+            "playing": sum(driver.mixer.is_playing(i) for i in range(driver.mixer.sources)),
+            "dropped": after["queue_overflows"] - before["queue_overflows"],
+            "cpu_ms_per_sec": cpu * 1000 / seconds,
+        }
+        for injector in injectors:
+            injector.stop()
+        await adapter.stop()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def main():
+    """Print the mixing cost per stream and the adapter runs."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-sources", type=int, default=6, help="most sources mixed")
+    parser.add_argument("--budget", type=float, default=50.0,
+                        help="share of a block period allowed for mixing, in percent")
+    parser.add_argument("--seconds", type=float, default=2.0, help="simulated seconds per adapter run")
+    args = parser.parse_args()
+
+    period_us = BLOCK_SIZE // 4 * 1000000 / RATE
+    print(f"Mixer kernels: {KERNEL_IMPL}; {BLOCK_SIZE}-byte blocks, "
+          f"{period_us:.0f} us of audio at {RATE} Hz\n")
+    print(f"  {'sources':<9}{'us/block':>10}{'% of period':>13}{'+us/stream':>12}")
+    costs = []
+    for n in range(1, args.max_sources + 1):
+        costs.append(time_fill(n))
+        step = costs[-1] - costs[-2] if n > 1 else costs[0]
+        print(f"  {n:<9}{costs[-1]:>10.1f}{100 * costs[-1] / period_us:>13.1f}{step:>12.1f}")
+
+    if len(costs) > 1:
+        per_stream = (costs[-1] - costs[0]) / (len(costs) - 1)
+        room = period_us * args.budget / 100 - costs[0]
+        fits = 1 + max(0, int(room // per_stream))
+        print(f"\n  {per_stream:.1f} us per additional stream: {fits} streams fit in "
+              f"{args.budget:.0f}% of the block period on this machine")
+
+    harness.install()
+    from config import BLE_MAX_CONNECTIONS
+    print(f"\n  {'centrals':<10}{'packets':>9}{'underrun':>10}{'per source':>14}"
+          f"{'dropped':>9}{'cpu ms/s':>10}")
+    for n in range(1, BLE_MAX_CONNECTIONS + 1):
+        r = run_adapter_sources(n, seconds=args.seconds)
+        per_source = ",".join(str(u) for u in r["source_underruns"])
+        print(f"  {n:<10}{r['packets']:>9}{r['underruns']:>10}{per_source:>14}"
+              f"{r['dropped']:>9}{r['cpu_ms_per_sec']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Wavetable Oscillator Benchmark (host-side)
+
+Measures stereo frames/sec for each waveform of audio/oscillator.py and
+for the per-sample math.sin and struct.pack_into loop the test tone
+generators used before, and how many times faster than real time each
+runs at 22050 Hz. Table build times are reported separately: they are
+paid once, on first use.
+
+Under CPython the portable kernel is measured. For the figures on the
+device, with the viper kernel, run the in-module benchmark there:
+
+    mpremote run audio/oscillator.py
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_oscillator.py [--block-frames F] [--seconds S]
+"""
+
+import argparse
+import math
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.oscillator import (OSC_IMPL, Oscillator, WAVE_SINE, WAVE_SQUARE, WAVE_SWEEP,
+                              WAVE_PINK, SQUARE_HARMONICS, clear_tables, sine_table,
+                              square_table, pink_table)
+
+RATE = 22050
+
+
+def legacy_tone(buf, nframes, start, frequency=440, amplitude=0.5):
+    """Per-sample generation from the original test tone functions."""
+    for i in range(nframes):
+        t = (start + i) / RATE
+        value = int(32767 * amplitude * math.sin(2 * math.pi * frequency * t))
+        struct.pack_into("<hh", buf, i * 4, value, value)
+
+
+def table_build_ms():
+    """Return (name, ms) for building each table from an empty cache."""
+    clear_tables()
+    results = []
+    for name, build in (("sine", sine_table),
+                        ("square x%d" % SQUARE_HARMONICS[-1],
+                         lambda: square_table(SQUARE_HARMONICS[-1])),
+                        ("pink", pink_table)):
+        start = time.perf_counter()
+        build()
+        results.append((name, (time.perf_counter() - start) * 1000))
+    return results
+
+
+def measure(fill, block_frames, seconds):
+    """Return the frames/sec of fill(buf, nframes, start) over seconds of audio."""
+    buf = bytearray(4 * block_frames)
+    blocks = max(1, int(seconds * RATE) // block_frames)
+    start = time.perf_counter()
+    for b in range(blocks):
+        fill(buf, block_frames, b * block_frames)
+    elapsed = time.perf_counter() - start
+    return blocks * block_frames / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    """Print table build times and the generator throughput table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--block-frames", type=int, default=256, help="frames per fill")
+    parser.add_argument("--seconds", type=float, default=5.0, help="audio generated per case")
+    args = parser.parse_args()
+
+    print(f"Oscillator kernel: {OSC_IMPL}")
+    print("\nTable build (once)")
+    for name, ms in table_build_ms():
+        print(f"  {name:<14}{ms:>8.1f} ms")
+
+    cases = [("legacy math.sin", legacy_tone)]
+    for name, wave in (("sine", WAVE_SINE), ("square", WAVE_SQUARE),
+                       ("sweep", WAVE_SWEEP), ("pink", WAVE_PINK)):
+        osc = Oscillator(RATE, wave, 440)
+        cases.append((name, lambda buf, n, start, osc=osc: osc.fill(buf, n)))
+
+    print(f"\n{args.block_frames}-frame stereo blocks at {RATE} Hz")
+    print(f"  {'generator':<18}{'frames/sec':>14}{'x real time':>13}")
+    for name, fill in cases:
+        rate = measure(fill, args.block_frames, args.seconds)
+        print(f"  {name:<18}{rate:>14,.0f}{rate / RATE:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
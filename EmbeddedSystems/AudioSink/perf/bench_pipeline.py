@@ -0,0 +1,344 @@
+"""
+End-to-End Pipeline Benchmark (host-side)
+
+Drives the three playback paths of the firmware on simulated time
+through perf/harness.py and the fakes in perf/fakes:
+
+- adapter:   BLEAudioAdapter, packets written to the audio data
+             characteristic by the fake radio at a fixed rate
+- adapter+trace: the same with the latency tracepoints enabled over the
+             control characteristic; the per-stage latencies are read
+             back from the latency trace characteristic
+- i2s_audio: I2SAudio.add_audio_data() called by a paced producer
+- ble_audio: ble_audio.process_audio_data() from a GATT write IRQ, with
+             the 16-bit sequence header
+
+The sender runs at load times the rate the I2S output consumes. After a
+warmup the following are measured over the run:
+
+- packets/sec delivered, underruns (engine blocks padded with silence,
+  or the I2S DMA running dry) and overruns (packets that had to wait for
+  or were dropped from a full buffer)
+- host time per packet spent in ingest (the IRQ handler, or the
+  add_audio_data call) and in total (the whole event loop)
+- with --alloc, heap bytes allocated per packet on the ingest path and
+  the heap growth over the run, traced with tracemalloc in a separate
+  pass so timings stay clean
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_pipeline.py [--seconds S] [--load L] [--alloc]
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import struct
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness
+
+PACKET_AUDIO_BYTES = 240        # Audio payload per BLE write, whole frames
+
+
+def tone_packet(size, channels=2, freq=441, rate=22050):
+    """One packet of interleaved 16-bit sine, phase-continuous across packets."""
+    frames = size // (2 * channels)
+    samples = []
+    for i in range(frames):
+        value = int(12000 * math.sin(2 * math.pi * freq * i / rate))
+        samples.extend([value] * channels)
+    return struct.pack("<%dh" % len(samples), *samples)
+
+
+class _Run:
+    """Counters sampled at the start of the measured window."""
+
+    def __init__(self):
+        self.start_us = harness.virtual_clock.now_us()
+        self.start_cpu = time.perf_counter()
+        self.start_heap = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+    def finish(self, result, packets, ingest_s, alloc_bytes=0, alloc_max=0):
+        """Add rate, timing and allocation figures to result."""
+        seconds = (harness.virtual_clock.now_us() - self.start_us) / 1000000
+        cpu = time.perf_counter() - self.start_cpu
+        per = max(packets, 1)
+        result["seconds"] = seconds
+        result["packets"] = packets
+        result["packets_per_sec"] = packets / seconds
+        result["ingest_us_per_packet"] = ingest_s * 1000000 / per
+        result["total_us_per_packet"] = cpu * 1000000 / per
+        if tracemalloc.is_tracing():
+            result["alloc_bytes_per_packet"] = alloc_bytes / per
+            result["alloc_max_bytes"] = alloc_max
+            result["heap_growth_bytes"] = tracemalloc.get_traced_memory()[0] - self.start_heap
+        return result
+
+
+def run_adapter(seconds=2.0, load=1.0, warmup=0.5, trace=False):
+    """
+    Stream PCM packets into BLEAudioAdapter through the fake radio.
+
+    Args:
+        seconds (float): Measured simulated time
+        load (float): Sender rate relative to the I2S consumption rate
+        warmup (float): Simulated time before measuring
+        trace (bool): Enable latency tracing and add its snapshot as "latency"
+
+    Returns:
+        dict: Measured figures
+    """
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from audio.latency_trace import TRACE_ON, TRACE_SNAPSHOT, parse_snapshot
+    from config import AUDIO_SAMPLE_RATE, AUDIO_CHANNELS, CMD_LATENCY_TRACE
+
+    ble = bluetooth.BLE()
+    packet = tone_packet(PACKET_AUDIO_BYTES, AUDIO_CHANNELS, rate=AUDIO_SAMPLE_RATE)
+    rate_hz = AUDIO_SAMPLE_RATE * AUDIO_CHANNELS * 2 / PACKET_AUDIO_BYTES * load
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        ble.central_connect()
+        handles = adapter.ble_sink._handles
+        injector = ble.inject_writes(handles["audio_data"], rate_hz,
+                                     payload=lambda i: packet)
+        await asyncio.sleep(warmup)
+        if trace:
+            ble.central_write(handles["audio_control"], bytes((CMD_LATENCY_TRACE, TRACE_ON)))
+
+        driver = adapter.i2s_driver
+        driver.engine.reset_stats()
+        driver.i2s.reset_stats()
+        ble.reset_stats()
+        before = dict(adapter.stats)
+        window = _Run()
+        await asyncio.sleep(seconds)
+        after = dict(adapter.stats)
+
+        received = after["packets_received"] - before["packets_received"]
+        result = {
+            "sent": injector.sent,
+            "underruns": driver.engine.underruns,
+            "starvations": driver.i2s.starvations,
+            "overruns": after["buffer_overruns"] - before["buffer_overruns"],
+            "dropped": after["queue_overflows"] - before["queue_overflows"],
+        }
+        window.finish(result, received, ble.irq_time_s, ble.irq_alloc_bytes, ble.irq_alloc_max)
+        if trace:
+            ble.central_write(handles["audio_control"], bytes((CMD_LATENCY_TRACE, TRACE_SNAPSHOT)))
+            result["latency"] = parse_snapshot(ble.gatts_read(handles["latency_trace"]))
+        injector.stop()
+        await adapter.stop()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def run_i2s_audio(seconds=2.0, load=1.0, warmup=0.5):
+    """
+    Feed I2SAudio.add_audio_data() from a producer paced to the I2S rate.
+
+    Args:
+        seconds (float): Measured simulated time
+        load (float): Producer rate relative to the I2S consumption rate
+        warmup (float): Simulated time before measuring
+
+    Returns:
+        dict: Measured figures
+    """
+    harness.install()
+    from i2s.i2s_audio import I2SAudio, FRAME_BYTES
+    from ble.ble_config import AUDIO_SAMPLE_RATE
+
+    packet = tone_packet(PACKET_AUDIO_BYTES, rate=AUDIO_SAMPLE_RATE)
+    interval = PACKET_AUDIO_BYTES / (AUDIO_SAMPLE_RATE * FRAME_BYTES) / load
+    meter = harness.CallMeter()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        audio = I2SAudio()
+        state = {"stalls": 0, "window": None}
+
+        async def producer():
+            due = loop.time()
+            while True:
+                begin = harness.virtual_clock.now_us()
+                meter.begin()
+                await audio.add_audio_data(packet)
+                meter.end()
+                if harness.virtual_clock.now_us() != begin:
+                    state["stalls"] += 1    # Waited for a full buffer
+                due += interval
+                await asyncio.sleep(max(0.0, due - loop.time()))
+
+        task = asyncio.create_task(producer())
+        await asyncio.sleep(warmup)
+        audio._i2s.reset_stats()
+        meter.reset()
+        state["stalls"] = 0
+        window = _Run()
+        await asyncio.sleep(seconds)
+
+        result = {
+            "sent": meter.calls,
+            "underruns": 0,
+            "starvations": audio._i2s.starvations,
+            "overruns": state["stalls"],
+            "dropped": 0,
+        }
+        window.finish(result, meter.calls, meter.time_s, meter.alloc_bytes, meter.alloc_max)
+        task.cancel()
+        audio.deinit()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def run_ble_audio(seconds=2.0, load=1.0, warmup=0.5, skip=0):
+    """
+    Deliver sequenced packets to ble_audio.process_audio_data() from a
+    GATT write IRQ on the fake radio.
+
+    Args:
+        seconds (float): Measured simulated time
+        load (float): Sender rate relative to the I2S consumption rate
+        warmup (float): Simulated time before measuring
+        skip (int): Lose every skip-th packet on the link (0 = none)
+
+    Returns:
+        dict: Measured figures
+    """
+    harness.install()
+    import bluetooth
+    from ble import ble_audio
+    from ble.ble_config import (AUDIO_SAMPLE_RATE, AUDIO_CHANNELS, SVC_AUDIO,
+                                CHAR_AUDIO_DATA)
+
+    ble = bluetooth.BLE()
+    audio = tone_packet(PACKET_AUDIO_BYTES, AUDIO_CHANNELS, rate=AUDIO_SAMPLE_RATE)
+    rate_hz = AUDIO_SAMPLE_RATE * AUDIO_CHANNELS * 2 / PACKET_AUDIO_BYTES * load
+
+    async def main():
+        ble_audio.init()
+        ((handle,),) = ble.gatts_register_services((
+            (bluetooth.UUID(SVC_AUDIO),
+             ((bluetooth.UUID(CHAR_AUDIO_DATA),
+               bluetooth.FLAG_WRITE | bluetooth.FLAG_WRITE_NO_RESPONSE),)),
+        ))
+
+        def irq(event, data):
+            if event == bluetooth.IRQ_GATTS_WRITE:
+                ble_audio.process_audio_data(ble.gatts_read(data[1]))
+
+        def payload(i):
+            # A lost packet still uses up its sequence number
+            seq = i + i // (skip - 1) if skip else i
+            return struct.pack("<H", seq & 0xFFFF) + audio
+
+        ble.irq(irq)
+        injector = ble.inject_writes(handle, rate_hz * (skip - 1) / skip if skip else rate_hz,
+                                     payload=payload)
+        await asyncio.sleep(warmup)
+
+        engine = ble_audio._engine
+        engine.reset_stats()
+        ble_audio._i2s.reset_stats()
+        ble.reset_stats()
+        jitter_before = ble_audio._jitter.get_stats()
+        plc_before = ble_audio._plc.get_stats()
+        window = _Run()
+        await asyncio.sleep(seconds)
+        jitter = ble_audio._jitter.get_stats()
+        plc = ble_audio._plc.get_stats()
+
+        result = {
+            "sent": injector.sent,
+            "underruns": engine.underruns,
+            "starvations": ble_audio._i2s.starvations,
+            "overruns": jitter["frames_dropped"] - jitter_before["frames_dropped"],
+            "dropped": jitter["overflows"] - jitter_before["overflows"],
+            "lost": jitter["lost"] - jitter_before["lost"],
+            "concealed": plc["concealed"] - plc_before["concealed"],
+        }
+        window.finish(result, ble.irq_calls, ble.irq_time_s, ble.irq_alloc_bytes, ble.irq_alloc_max)
+        injector.stop()
+        ble_audio.deinit()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def run_adapter_traced(**kwargs):
+    """run_adapter() with the latency tracepoints enabled."""
+    return run_adapter(trace=True, **kwargs)
+
+
+SCENARIOS = (
+    ("adapter", run_adapter),
+    ("adapter+trace", run_adapter_traced),
+    ("i2s_audio", run_i2s_audio),
+    ("ble_audio", run_ble_audio),
+)
+
+
+def measure(scenario, alloc=False, **kwargs):
+    """Run a scenario, with tracemalloc tracing if alloc is set."""
+    if not alloc:
+        return scenario(**kwargs)
+    tracemalloc.start()
+    try:
+        return scenario(**kwargs)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    """Print the pipeline report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0, help="simulated seconds measured")
+    parser.add_argument("--load", type=float, default=1.0, help="sender rate / playback rate")
+    parser.add_argument("--alloc", action="store_true", help="add a tracemalloc pass")
+    args = parser.parse_args()
+
+    print(f"{PACKET_AUDIO_BYTES}-byte packets, load {args.load:.2f}, "
+          f"{args.seconds:.1f} s simulated\n")
+    print(f"  {'pipeline':<14}{'pkt/s':>9}{'underrun':>10}{'starved':>9}{'overrun':>9}"
+          f"{'dropped':>9}{'ingest us':>11}{'total us':>10}")
+    latency = None
+    for name, scenario in SCENARIOS:
+        r = measure(scenario, seconds=args.seconds, load=args.load)
+        latency = r.get("latency", latency)
+        print(f"  {name:<14}{r['packets_per_sec']:>9.1f}{r['underruns']:>10}{r['starvations']:>9}"
+              f"{r['overruns']:>9}{r['dropped']:>9}{r['ingest_us_per_packet']:>11.1f}"
+              f"{r['total_us_per_packet']:>10.1f}")
+
+    if latency:
+        from audio.latency_trace import STAGE_NAMES
+        print(f"\n  {'adapter stage':<20}{'count':>8}{'min us':>9}{'avg us':>9}{'max us':>9}"
+              "  (simulated time)")
+        for stage_name, stage in zip(STAGE_NAMES, latency["stages"]):
+            print(f"  {stage_name:<20}{stage['count']:>8}{stage['min_us']:>9}"
+                  f"{stage['avg_us']:>9}{stage['max_us']:>9}")
+
+    if args.alloc:
+        print(f"\n  {'pipeline':<14}{'alloc B/pkt':>13}{'max B':>9}{'heap growth B':>15}")
+        for name, scenario in SCENARIOS:
+            r = measure(scenario, alloc=True, seconds=min(args.seconds, 2.0), load=args.load)
+            print(f"  {name:<14}{r['alloc_bytes_per_packet']:>13.1f}{r['alloc_max_bytes']:>9}"
+                  f"{r['heap_growth_bytes']:>15}")
+
+
+if __name__ == "__main__":
+    main()
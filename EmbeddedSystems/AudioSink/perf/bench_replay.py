@@ -0,0 +1,268 @@
+"""
+Capture Replay Benchmark (host-side)
+
+Plays packet captures (audio/packet_capture.py) back into the firmware
+on simulated time, so buffer policies and the jitter and concealment
+logic can be compared on the same recorded traffic:
+
+- adapter: BLEAudioAdapter through BLEAudioSink.replay(), with the
+  recorded timing and as fast as possible. Reports packets, ingest
+  queue drops, engine underruns and host time.
+- ble_audio: the sequenced jitter buffer path of ble/ble_audio.py, for
+  several jitter buffer targets and concealment modes. Reports
+  underruns, lost, late and concealed packets and host time.
+
+Without a log on the command line, sessions are recorded first through
+the fake radio and the real capture path: a tone from one central with
+bursty arrival times and random loss, plain for the adapter and with the
+16-bit sequence header for ble_audio.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_replay.py [--adapter-log F] [--sequenced-log F]
+                                 [--seconds S] [--jitter-ms J] [--loss P]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+from bench_pipeline import PACKET_AUDIO_BYTES, tone_packet
+
+TARGETS_MS = (40, 100, 200)
+PLC_NAMES = ("silence", "repeat", "wsola")
+
+
+def record_session(path, seconds=2.0, jitter_ms=0, loss=0.0, sequenced=False, seed=1,
+                   sample_rate=None):
+    """
+    Record a session through BLEAudioAdapter's capture mode.
+
+    Capture starts before a central connects and writes a tone at the
+    playback rate, and stops after it disconnects. Each packet is
+    delayed by up to jitter_ms (in order, so late packets arrive in
+    bursts) and lost with probability loss.
+
+    Args:
+        path (str): Capture log to write
+        seconds (float): Simulated length of the session
+        jitter_ms (float): Largest extra delay of a packet
+        loss (float): Share of packets lost on the link
+        sequenced (bool): Prefix packets with a 16-bit sequence number
+        seed (int): Random seed for delays and loss
+        sample_rate (int): Rate the packets are sent for (default: the
+            adapter's AUDIO_SAMPLE_RATE)
+
+    Returns:
+        dict: Capture statistics and the packets sent
+    """
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from config import AUDIO_SAMPLE_RATE, AUDIO_CHANNELS
+
+    ble = bluetooth.BLE()
+    rng = random.Random(seed)
+    rate = sample_rate or AUDIO_SAMPLE_RATE
+    audio = tone_packet(PACKET_AUDIO_BYTES, AUDIO_CHANNELS, rate=rate)
+    period_us = PACKET_AUDIO_BYTES * 1000000 // (rate * AUDIO_CHANNELS * 2)
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        adapter.start_capture(path)
+        await adapter.start()
+        handles = adapter.ble_sink._handles
+        ble.central_connect(0)
+
+        clock = harness.virtual_clock
+        start = clock.now_us()
+        arrive = start
+        sent = 0
+        for seq in range(int(seconds * 1000000 // period_us)):
+            due = start + seq * period_us + int(rng.uniform(0, jitter_ms) * 1000)
+            arrive = max(arrive, due)
+            if rng.random() < loss:
+                continue
+            if arrive > clock.now_us():
+                await asyncio.sleep((arrive - clock.now_us()) / 1000000)
+            packet = struct.pack("<H", seq & 0xFFFF) + audio if sequenced else audio
+            ble.central_write(handles["audio_data"], packet)
+            sent += 1
+        ble.central_disconnect(0)
+        capture = adapter.capture
+        await adapter.stop()
+        result = capture.get_stats()
+        result["sent"] = sent
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def replay_adapter(path, realtime=True, tail=0.3):
+    """
+    Replay a capture into BLEAudioAdapter.
+
+    Args:
+        path (str): Capture log
+        realtime (bool): Keep the recorded timing
+        tail (float): Simulated time to keep playing after the last record
+
+    Returns:
+        dict: Delivery, drop and underrun figures
+    """
+    harness.install()
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from audio.packet_capture import PacketReplayer
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        adapter.i2s_driver.engine.reset_stats()
+        replayer = PacketReplayer(path)
+        clock = harness.virtual_clock
+        start_us = clock.now_us()
+        start_cpu = time.perf_counter()
+        records = await replayer.play(adapter.ble_sink.replay, realtime)
+        sim_s = (clock.now_us() - start_us) / 1000000
+        cpu = time.perf_counter() - start_cpu
+        # Underruns while the stream was on; the tail only drains it
+        underruns = adapter.i2s_driver.engine.underruns
+        stats = dict(adapter.stats)
+        await asyncio.sleep(tail)
+        await adapter.stop()
+        return {
+            "records": records,
+            "packets": stats["packets_received"],
+            "dropped": stats["queue_overflows"],
+            "waits": stats["buffer_overruns"],
+            "underruns": underruns,
+            "late_us": replayer.late_us,
+            "sim_s": sim_s,
+            "cpu_ms": cpu * 1000,
+        }
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def replay_ble_audio(path, target_ms=200, plc=2, tail=0.5):
+    """
+    Replay the audio packets of a sequenced capture into ble/ble_audio.py.
+
+    Args:
+        path (str): Capture log with sequence-numbered packets
+        target_ms (int): Jitter buffer target
+        plc (int): Concealment mode (0 = silence, 1 = repeat, 2 = WSOLA)
+        tail (float): Simulated time to keep playing after the last record
+
+    Returns:
+        dict: Jitter buffer, concealment and host time figures
+    """
+    harness.install()
+    from ble import ble_audio
+    from ble.ble_config import (AUDIO_SAMPLE_RATE, AUDIO_CHANNELS, JITTER_SLOT_COUNT,
+                                JITTER_SLOT_SIZE)
+    from audio.jitter_buffer import JitterBuffer
+    from audio.concealment import Concealer
+    from audio.packet_capture import PacketReplayer, KIND_AUDIO
+
+    frame_bytes = 2 * AUDIO_CHANNELS
+    ble_audio._jitter = JitterBuffer(JITTER_SLOT_COUNT, JITTER_SLOT_SIZE, AUDIO_SAMPLE_RATE,
+                                     frame_bytes, target_ms)
+    ble_audio._plc = Concealer(plc, AUDIO_SAMPLE_RATE, len(ble_audio._chunk), AUDIO_CHANNELS)
+
+    def handler(kind, conn_handle, data):
+        if kind == KIND_AUDIO:
+            ble_audio.process_audio_data(bytes(data))
+
+    async def main():
+        ble_audio.init()
+        replayer = PacketReplayer(path)
+        start_cpu = time.perf_counter()
+        await replayer.play(handler)
+        cpu = time.perf_counter() - start_cpu
+        jitter = ble_audio._jitter.get_stats()
+        engine = ble_audio._engine.get_stats()
+        await asyncio.sleep(tail)
+        result = {
+            "target_ms": target_ms,
+            "plc": PLC_NAMES[plc],
+            "received": jitter["received"],
+            "underruns": engine["underruns"],
+            "lost": jitter["lost"],
+            "late": jitter["late"],
+            "concealed": ble_audio._plc.get_stats()["concealed"],
+            "cpu_ms": cpu * 1000,
+        }
+        ble_audio.deinit()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def ble_audio_rate():
+    """Return the playback rate of ble/ble_audio.py."""
+    harness.install()
+    from ble.ble_config import AUDIO_SAMPLE_RATE
+    return AUDIO_SAMPLE_RATE
+
+
+def main():
+    """Record sessions if needed and print the replay figures."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--adapter-log", help="capture to replay into BLEAudioAdapter")
+    parser.add_argument("--sequenced-log", help="capture with sequence numbers for ble_audio")
+    parser.add_argument("--seconds", type=float, default=3.0, help="length of recorded sessions")
+    parser.add_argument("--jitter-ms", type=float, default=30.0, help="arrival jitter of recorded sessions")
+    parser.add_argument("--loss", type=float, default=0.02, help="packet loss of recorded sessions")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        adapter_log = args.adapter_log
+        sequenced_log = args.sequenced_log
+        for name, sequenced in (("adapter", False), ("sequenced", True)):
+            if (sequenced_log if sequenced else adapter_log):
+                continue
+            log = os.path.join(tmp, name + ".apc")
+            r = record_session(log, args.seconds, args.jitter_ms, args.loss, sequenced,
+                               sample_rate=ble_audio_rate() if sequenced else None)
+            print(f"Recorded {name} session: {r['sent']} packets sent, {r['records']} records "
+                  f"({r['dropped']} dropped), {r['bytes']} bytes in {r['flushes']} flushes "
+                  f"({args.seconds:.1f} s, jitter {args.jitter_ms:.0f} ms, loss {args.loss:.0%})")
+            if sequenced:
+                sequenced_log = log
+            else:
+                adapter_log = log
+
+        print(f"\nBLEAudioAdapter <- {os.path.basename(adapter_log)}")
+        print(f"  {'timing':<10}{'packets':>9}{'dropped':>9}{'waits':>7}{'underrun':>10}"
+              f"{'sim s':>8}{'cpu ms':>9}")
+        for realtime in (True, False):
+            r = replay_adapter(adapter_log, realtime)
+            name = "recorded" if realtime else "fast"
+            print(f"  {name:<10}{r['packets']:>9}{r['dropped']:>9}{r['waits']:>7}"
+                  f"{r['underruns']:>10}{r['sim_s']:>8.2f}{r['cpu_ms']:>9.1f}")
+
+        print(f"\nble_audio <- {os.path.basename(sequenced_log)}")
+        print(f"  {'target ms':<11}{'plc':<9}{'received':>9}{'underrun':>10}{'lost':>6}"
+              f"{'late':>6}{'concealed':>11}{'cpu ms':>9}")
+        for target in TARGETS_MS:
+            for plc in range(len(PLC_NAMES)):
+                r = replay_ble_audio(sequenced_log, target, plc)
+                print(f"  {target:<11}{r['plc']:<9}{r['received']:>9}{r['underruns']:>10}"
+                      f"{r['lost']:>6}{r['late']:>6}{r['concealed']:>11}{r['cpu_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Resampler Benchmark (host-side)
+
+Measures the CPU cost of audio/resampler.py for each supported input
+rate converted to the 22050 Hz I2S rate, as the fraction of one second
+of wall time needed per second of stereo audio. The multiply-accumulate
+rate is printed too, since that is what scales to the device: under
+CPython the portable kernel is measured; on device the same call
+resolves to the viper version.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_resampler.py
+"""
+
+import math
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.resampler import RESAMPLER_IMPL, SUPPORTED_RATES, Resampler
+
+OUT_RATE = 22050
+CHANNELS = 2
+BLOCK = 120                     # Input frames per call, like one packet
+SECONDS = 1
+
+
+def measure(in_rate):
+    """Return (seconds of CPU per second of audio, taps) for one rate."""
+    resampler = Resampler(in_rate, OUT_RATE, CHANNELS, max_frames=BLOCK)
+    samples = [int(12000 * math.sin(i * 0.05)) for i in range(BLOCK * CHANNELS)]
+    block = struct.pack("<%dh" % len(samples), *samples)
+    dst = bytearray(resampler.max_output(BLOCK) * 2 * CHANNELS)
+    calls = in_rate * SECONDS // BLOCK
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        resampler.process(block, BLOCK, dst)
+    elapsed = time.perf_counter() - start
+    return elapsed / SECONDS, resampler.taps
+
+
+def main():
+    """Print the CPU cost per conversion ratio."""
+    print(f"Resampler implementation: {RESAMPLER_IMPL}")
+    print(f"Output: {OUT_RATE} Hz, {CHANNELS} channels, {BLOCK}-frame blocks\n")
+    print(f"  {'input':>8}{'ratio':>10}{'taps':>6}{'MAC/s':>14}{'CPU %':>9}")
+    for in_rate in SUPPORTED_RATES:
+        cost, taps = measure(in_rate)
+        macs = OUT_RATE * CHANNELS * taps
+        print(f"  {in_rate:>8}{OUT_RATE / in_rate:>10.3f}{taps:>6}{macs:>14,}{cost * 100:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
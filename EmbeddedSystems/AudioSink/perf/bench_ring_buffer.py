@@ -0,0 +1,179 @@
+"""
+Ring Buffer Benchmark (host-side)
+
+Compares the buffering strategies that used to live on each audio path
+against the shared RingBuffer. Every case streams the same amount of
+data through a producer (one packet at a time) and a consumer (one
+output chunk at a time) and reports the sustained bytes/sec.
+
+CPython implements bytearray slicing and list.pop(0) in C and hides
+the per-packet heap allocations that dominate on the Pico, so the
+bytearray/list cases look better here than they do on device. The
+per-byte and per-sample loops are representative of their relative
+cost on MicroPython.
+
+Run from the AudioSink directory with CPython:
+
+    python3 perf/bench_ring_buffer.py
+"""
+
+import os
+import struct
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.ring_buffer import RingBuffer
+
+PACKET_SIZES = (240, 512)
+TOTAL_BYTES = 256 * 1024    # Data streamed per case
+CHUNK_SIZE = 1024           # Consumer read size in bytes
+CAPACITY = 4096             # Buffer capacity in bytes
+
+
+# ---------- Previous implementations ----------
+
+def legacy_i2s_driver(packet, total):
+    """I2SDriver: per-sample struct.unpack into an array('H')."""
+    buffer = array('H', [0] * (CAPACITY // 2))
+    index = 0
+    moved = 0
+    while moved < total:
+        max_bytes = min(len(packet), (len(buffer) - index) * 2)
+        for i in range(0, max_bytes, 2):
+            sample = struct.unpack('<h', packet[i:i+2])[0]
+            sample = int(sample * 1.0)
+            buffer[index] = sample & 0xFFFF
+            index += 1
+        moved += max_bytes
+        if index * 2 >= CHUNK_SIZE:
+            out = buffer[:index]
+            index = 0
+    return moved
+
+
+def legacy_audio_config(packet, total):
+    """AudioBuffer: fixed slots filled byte by byte."""
+    count = CAPACITY // CHUNK_SIZE
+    buffers = [bytearray(CHUNK_SIZE) for _ in range(count)]
+    sizes = [0] * count
+    write_index = read_index = used = 0
+    moved = 0
+    while moved < total:
+        if used < count:
+            buffer = buffers[write_index]
+            copy_len = min(len(packet), len(buffer))
+            for i in range(copy_len):
+                buffer[i] = packet[i]
+            sizes[write_index] = copy_len
+            write_index = (write_index + 1) % count
+            used += 1
+            moved += copy_len
+        if used == count:
+            while used:
+                out = buffers[read_index]
+                read_index = (read_index + 1) % count
+                used -= 1
+    return moved
+
+
+def legacy_i2s_audio(packet, total):
+    """I2SAudio: bytearray.extend and re-slicing on every chunk."""
+    buffer = bytearray()
+    moved = 0
+    while moved < total:
+        buffer.extend(packet)
+        moved += len(packet)
+        while len(buffer) >= CHUNK_SIZE:
+            out = buffer[:CHUNK_SIZE]
+            buffer = buffer[CHUNK_SIZE:]
+    return moved
+
+
+def legacy_ble_audio(packet, total):
+    """ble_audio: list of payload slices drained with pop(0)."""
+    buffer = []
+    size = 0
+    moved = 0
+    while moved < total:
+        payload = packet[2:]
+        buffer.append(payload)
+        size += len(payload)
+        moved += len(payload)
+        while size >= CAPACITY:
+            chunk = buffer.pop(0)
+            size -= len(chunk)
+    return moved
+
+
+def legacy_controller(packet, total):
+    """AudioController bridges: per-byte copy with modulo indices."""
+    buffer = array('B', [0] * CAPACITY)
+    write_ptr = read_ptr = count = 0
+    moved = 0
+    while moved < total:
+        for byte in packet:
+            if count < CAPACITY:
+                buffer[write_ptr] = byte
+                write_ptr = (write_ptr + 1) % CAPACITY
+                count += 1
+        moved += len(packet)
+        if count >= CHUNK_SIZE:
+            data = bytearray(CHUNK_SIZE)
+            for i in range(CHUNK_SIZE):
+                data[i] = buffer[read_ptr]
+                read_ptr = (read_ptr + 1) % CAPACITY
+                count -= 1
+    return moved
+
+
+# ---------- Shared ring buffer ----------
+
+def ring_buffer(packet, total):
+    """RingBuffer: bulk write_into/read_into through a memoryview."""
+    ring = RingBuffer(CAPACITY)
+    out = bytearray(CHUNK_SIZE)
+    moved = 0
+    while moved < total:
+        n = ring.write_into(packet)
+        moved += n
+        if n < len(packet) or ring.count() >= CHUNK_SIZE:
+            ring.read_into(out)
+    return moved
+
+
+CASES = (
+    ("i2s_driver (before)", legacy_i2s_driver),
+    ("audio_config (before)", legacy_audio_config),
+    ("i2s_audio (before)", legacy_i2s_audio),
+    ("ble_audio (before)", legacy_ble_audio),
+    ("controller (before)", legacy_controller),
+    ("RingBuffer (after)", ring_buffer),
+)
+
+
+def measure(func, packet, total=TOTAL_BYTES):
+    """Return the throughput of func in bytes/sec."""
+    start = time.perf_counter()
+    moved = func(packet, total)
+    elapsed = time.perf_counter() - start
+    return moved / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    """Run every case at each packet size and print a table."""
+    print(f"Streaming {TOTAL_BYTES // 1024}KB per case, "
+          f"{CAPACITY} byte buffer, {CHUNK_SIZE} byte reads")
+    for packet_size in PACKET_SIZES:
+        packet = bytes(i & 0xFF for i in range(packet_size))
+        print(f"\n{packet_size}-byte packets")
+        print(f"  {'implementation':<24}{'bytes/sec':>16}")
+        for name, func in CASES:
+            rate = measure(func, packet)
+            print(f"  {name:<24}{rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
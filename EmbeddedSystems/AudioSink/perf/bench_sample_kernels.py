@@ -0,0 +1,75 @@
+"""
+Sample Kernel Benchmark (host-side)
+
+Measures samples/sec for each block kernel in audio/sample_kernels.py
+and for the per-sample struct.unpack loop I2SDriver.write used before.
+Under CPython the portable fallback kernels are measured; on device
+the same kernels resolve to the viper versions.
+
+Run from the AudioSink directory:
+
+    python3 perf/bench_sample_kernels.py
+"""
+
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.sample_kernels import (
+    KERNEL_IMPL, Q15_UNITY, volume_to_q15,
+    gain_q15, mono_to_stereo_q15, u8_to_s16_q15, u8_mono_to_stereo_q15
+)
+
+PACKET_SAMPLES = (120, 256)     # 240-byte and 512-byte 16-bit packets
+TOTAL_SAMPLES = 500000          # Samples processed per case
+GAIN = volume_to_q15(0.75)
+
+
+def legacy_write(src, dst, nsamples, gain):
+    """Per-sample conversion from the original I2SDriver.write."""
+    volume = gain / Q15_UNITY
+    for i in range(0, nsamples * 2, 2):
+        sample = struct.unpack('<h', src[i:i+2])[0]
+        sample = int(sample * volume)
+        struct.pack_into('<H', dst, i, sample & 0xFFFF)
+
+
+# name, kernel, input bytes per sample, output bytes per sample
+CASES = (
+    ("legacy per-sample", legacy_write, 2, 2),
+    ("gain_q15", gain_q15, 2, 2),
+    ("mono_to_stereo_q15", mono_to_stereo_q15, 2, 4),
+    ("u8_to_s16_q15", u8_to_s16_q15, 1, 2),
+    ("u8_mono_to_stereo_q15", u8_mono_to_stereo_q15, 1, 4),
+)
+
+
+def measure(kernel, in_width, out_width, nsamples, total=TOTAL_SAMPLES):
+    """Return the throughput of kernel in input samples/sec."""
+    src = bytes((i * 37) & 0xFF for i in range(nsamples * in_width))
+    dst = bytearray(nsamples * out_width)
+    blocks = max(1, total // nsamples)
+    start = time.perf_counter()
+    for _ in range(blocks):
+        kernel(src, dst, nsamples, GAIN)
+    elapsed = time.perf_counter() - start
+    return blocks * nsamples / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    """Run every kernel at each packet size and print a table."""
+    print(f"Kernel implementation: {KERNEL_IMPL}")
+    print("Real-time requirement at 22050 Hz stereo: 44,100 samples/sec")
+    for nsamples in PACKET_SAMPLES:
+        print(f"\n{nsamples}-sample blocks")
+        print(f"  {'kernel':<24}{'samples/sec':>16}")
+        for name, kernel, in_width, out_width in CASES:
+            rate = measure(kernel, in_width, out_width, nsamples)
+            print(f"  {name:<24}{rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
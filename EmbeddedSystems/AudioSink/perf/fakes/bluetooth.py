@@ -0,0 +1,560 @@
+"""
+Host Stand-in for the MicroPython bluetooth Module
+
+BLE() returns one shared radio, like the firmware. GATT server calls
+keep attribute values in a dict and record notifications; the host
+side of a test plays the central with central_connect(),
+central_write() and central_disconnect(), each of which raises the IRQ
+the firmware would. An MTU exchange settles on the smaller of the
+configured MTU and peer_mtu, and central_connection_update() reports the
+connection parameters a central chose. Like the controller, the radio
+takes at most max_connections centrals, refusing further ones, and a
+connection ends advertising until the application advertises again.
+central_subscribe() writes the CCCD, the handle after a characteristic's
+value, as a central enabling notifications does.
+
+inject_writes() registers a packet source on the virtual clock that
+writes to a characteristic at a fixed packet rate and size. Every IRQ
+dispatch is timed (and, while tracemalloc is tracing, its peak heap
+use is recorded) so the harness can report per-packet cost; callbacks
+the handler passes to micropython.schedule() run after it returns and
+are not counted.
+
+L2CAP connection-oriented channels follow the firmware API
+(l2cap_listen, l2cap_recvinto, ...). The receiving side buffers up to
+l2cap_rx_sdus SDUs; a central can only send while the application has
+drained enough of them, which is how credits reach the peer. SimulatedLink
+carries GATT writes or L2CAP SDUs over connection events with a fixed
+number of link-layer PDUs each, so both transports can be compared on
+the same link.
+"""
+
+import io
+import math
+import time
+import tracemalloc
+
+import micropython
+import virtual_clock
+
+FLAG_BROADCAST = 0x0001
+FLAG_READ = 0x0002
+FLAG_WRITE_NO_RESPONSE = 0x0004
+FLAG_WRITE = 0x0008
+FLAG_NOTIFY = 0x0010
+FLAG_INDICATE = 0x0020
+
+IRQ_CENTRAL_CONNECT = 1
+IRQ_CENTRAL_DISCONNECT = 2
+IRQ_GATTS_WRITE = 3
+IRQ_GATTS_READ_REQUEST = 4
+IRQ_SCAN_RESULT = 5
+IRQ_SCAN_DONE = 6
+IRQ_PERIPHERAL_CONNECT = 7
+IRQ_PERIPHERAL_DISCONNECT = 8
+IRQ_GATTC_SERVICE_RESULT = 9
+IRQ_GATTC_SERVICE_DONE = 10
+IRQ_GATTC_CHARACTERISTIC_RESULT = 11
+IRQ_GATTC_CHARACTERISTIC_DONE = 12
+IRQ_GATTC_DESCRIPTOR_RESULT = 13
+IRQ_GATTC_DESCRIPTOR_DONE = 14
+IRQ_GATTC_READ_RESULT = 15
+IRQ_GATTC_READ_DONE = 16
+IRQ_GATTC_WRITE_DONE = 17
+IRQ_GATTC_NOTIFY = 18
+IRQ_GATTC_INDICATE = 19
+IRQ_GATTS_INDICATE_DONE = 20
+IRQ_MTU_EXCHANGED = 21
+IRQ_L2CAP_ACCEPT = 22
+IRQ_L2CAP_CONNECT = 23
+IRQ_L2CAP_DISCONNECT = 24
+IRQ_L2CAP_RECV = 25
+IRQ_L2CAP_SEND_READY = 26
+IRQ_CONNECTION_UPDATE = 27
+IRQ_ENCRYPTION_UPDATE = 28
+IRQ_GET_SECRET = 29
+IRQ_SET_SECRET = 30
+
+
+class UUID:
+    def __init__(self, value):
+        if isinstance(value, UUID):
+            value = value._value
+        self._value = value
+
+    def __eq__(self, other):
+        return isinstance(other, UUID) and self._value == other._value
+
+    def __hash__(self):
+        return hash(self._value)
+
+    def __repr__(self):
+        if isinstance(self._value, int):
+            return "UUID(0x%04x)" % self._value
+        return "UUID(%r)" % (self._value,)
+
+
+class BLE:
+    """Shared fake radio; BLE() always returns the same instance."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self._active = False
+        self._handler = None
+        self._next_handle = 1
+        self._values = {}
+        self._config = {'mtu': 23, 'gap_name': b'MPY', 'mac': (0, b'\x28\xcd\xc1\x00\x00\x01')}
+        self.advertising = None
+        self.adv_interval_us = None
+        self.notifications = []
+        self.connections = set()
+        self.max_connections = 4
+
+        # Link: MTU the peer offers in an exchange, parameters gap_connect() asked for
+        self.peer_mtu = 247
+        self.connect_params = None
+
+        # L2CAP: listening PSM/MTU and open channels by CID
+        self.l2cap_rx_sdus = 2
+        self._l2cap_psm = None
+        self._l2cap_mtu = 0
+        self._channels = {}
+        self._next_cid = 0x40
+
+        # Dispatch statistics
+        self.irq_calls = 0
+        self.irq_time_s = 0.0
+        self.irq_max_s = 0.0
+        self.irq_alloc_bytes = 0
+        self.irq_alloc_max = 0
+
+    # ---------- bluetooth.BLE API ----------
+
+    def active(self, state=None):
+        if state is not None:
+            self._active = bool(state)
+        return self._active
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self._config.get(args[0])
+        for key, value in kwargs.items():
+            self._config[key] = value
+
+    def irq(self, handler):
+        self._handler = handler
+
+    def gap_advertise(self, interval_us, adv_data=None, resp_data=None, connectable=True):
+        self.advertising = None if interval_us is None else bytes(adv_data or b'')
+        self.adv_interval_us = interval_us
+
+    def gap_connect(self, addr_type, addr, scan_duration_ms=2000,
+                    min_conn_interval_us=None, max_conn_interval_us=None):
+        self.connect_params = (addr_type, bytes(addr), scan_duration_ms,
+                               min_conn_interval_us, max_conn_interval_us)
+
+    def gap_disconnect(self, conn_handle):
+        if conn_handle not in self.connections:
+            return False
+        self.central_disconnect(conn_handle)
+        return True
+
+    def gatts_register_services(self, services):
+        result = []
+        for service in services:
+            self._next_handle += 1                  # Service declaration
+            handles = []
+            for characteristic in service[1]:
+                flags = characteristic[1]
+                self._next_handle += 1              # Characteristic declaration
+                handles.append(self._new_value_handle())
+                if flags & (FLAG_NOTIFY | FLAG_INDICATE):
+                    self._next_handle += 1          # CCCD
+                for _ in (characteristic[2] if len(characteristic) > 2 else ()):
+                    handles.append(self._new_value_handle())
+            result.append(tuple(handles))
+        return tuple(result)
+
+    def gatts_read(self, value_handle):
+        return bytes(self._values.get(value_handle, b''))
+
+    def gatts_write(self, value_handle, data, send_update=False):
+        self._values[value_handle] = bytes(data)
+        if send_update:
+            for conn_handle in self.connections:
+                self.gatts_notify(conn_handle, value_handle)
+
+    def gatts_notify(self, conn_handle, value_handle, data=None):
+        if data is None:
+            data = self._values.get(value_handle, b'')
+        self.notifications.append((conn_handle, value_handle, bytes(data)))
+
+    def gatts_indicate(self, conn_handle, value_handle, data=None):
+        self.gatts_notify(conn_handle, value_handle, data)
+        self._dispatch(IRQ_GATTS_INDICATE_DONE, (conn_handle, value_handle, 0))
+
+    def gatts_set_buffer(self, value_handle, size, append=False):
+        pass
+
+    def gattc_exchange_mtu(self, conn_handle):
+        mtu = min(self._config['mtu'], self.peer_mtu)
+        self._dispatch(IRQ_MTU_EXCHANGED, (conn_handle, mtu))
+
+    def l2cap_listen(self, psm, mtu):
+        self._l2cap_psm = psm
+        self._l2cap_mtu = mtu
+
+    def l2cap_recvinto(self, conn_handle, cid, buf):
+        channel = self._channels.get(cid)
+        if channel is None or channel.conn_handle != conn_handle:
+            raise OSError("invalid L2CAP channel")
+        if not channel.rx:
+            return 0
+        sdu, size = channel.rx[0]
+        if buf is None:
+            return size - sdu.tell()
+        # readinto copies without allocating, like the firmware
+        n = sdu.readinto(buf)
+        if sdu.tell() == size:
+            # SDU consumed: its credits go back to the sender
+            channel.rx.pop(0)
+        return n
+
+    def l2cap_send(self, conn_handle, cid, buf):
+        channel = self._channels.get(cid)
+        if channel is None:
+            raise OSError("invalid L2CAP channel")
+        channel.sent.append(bytes(buf))
+        return True
+
+    def l2cap_disconnect(self, conn_handle, cid):
+        channel = self._channels.pop(cid, None)
+        if channel is not None:
+            self._dispatch(IRQ_L2CAP_DISCONNECT, (conn_handle, cid, channel.psm, 0))
+
+    # ---------- Host-side central ----------
+
+    def central_connect(self, conn_handle=0, addr_type=0, addr=b'\x00\x11\x22\x33\x44\x55'):
+        """
+        Connect a simulated central.
+
+        Returns:
+            bool: False if the radio already has max_connections
+        """
+        if len(self.connections) >= self.max_connections:
+            return False
+        self.connections.add(conn_handle)
+        self.advertising = None
+        self._dispatch(IRQ_CENTRAL_CONNECT, (conn_handle, addr_type, memoryview(addr)))
+        return True
+
+    def central_disconnect(self, conn_handle=0, addr_type=0, addr=b'\x00\x11\x22\x33\x44\x55'):
+        """Disconnect a simulated central, closing its L2CAP channels first."""
+        for cid, channel in list(self._channels.items()):
+            if channel.conn_handle == conn_handle:
+                del self._channels[cid]
+                self._dispatch(IRQ_L2CAP_DISCONNECT, (conn_handle, cid, channel.psm, 0))
+        self.connections.discard(conn_handle)
+        self._dispatch(IRQ_CENTRAL_DISCONNECT, (conn_handle, addr_type, memoryview(addr)))
+
+    def central_subscribe(self, value_handle, conn_handle=0, notify=True):
+        """Enable (or disable) notifications of a characteristic from the simulated central."""
+        self.central_write(value_handle + 1, b'\x01\x00' if notify else b'\x00\x00', conn_handle)
+
+    def central_connection_update(self, conn_handle=0, interval_us=7500, latency=0,
+                                  timeout_ms=4000, status=0):
+        """Report new connection parameters, as chosen by the simulated central."""
+        self._dispatch(IRQ_CONNECTION_UPDATE,
+                       (conn_handle, interval_us // 1250, latency, timeout_ms // 10, status))
+
+    def central_write(self, value_handle, data, conn_handle=0):
+        """Write a characteristic value from the simulated central."""
+        self._values[value_handle] = bytes(data)
+        self._dispatch(IRQ_GATTS_WRITE, (conn_handle, value_handle))
+
+    def central_l2cap_connect(self, psm, mtu=512, conn_handle=0):
+        """
+        Open an L2CAP channel from the simulated central.
+
+        Returns:
+            int: Channel ID, or None if nothing listens on psm or the
+                 application rejected the channel
+        """
+        if psm != self._l2cap_psm:
+            return None
+        cid = self._next_cid
+        self._next_cid += 1
+        info = (conn_handle, cid, psm, self._l2cap_mtu, mtu)
+        if self._dispatch(IRQ_L2CAP_ACCEPT, info):
+            return None
+        self._channels[cid] = _Channel(conn_handle, psm)
+        self._dispatch(IRQ_L2CAP_CONNECT, info)
+        return cid
+
+    def central_l2cap_send(self, cid, sdu):
+        """
+        Deliver one SDU from the simulated central.
+
+        Returns:
+            bool: False if the receiver has no room (no credits)
+        """
+        channel = self._channels[cid]
+        if len(channel.rx) >= self.l2cap_rx_sdus:
+            return False
+        channel.rx.append((io.BytesIO(sdu), len(sdu)))
+        if len(channel.rx) == 1:
+            self._dispatch(IRQ_L2CAP_RECV, (channel.conn_handle, cid))
+        return True
+
+    def l2cap_credits(self, cid):
+        """SDUs the central may send before the application reads more."""
+        channel = self._channels.get(cid)
+        if channel is None:
+            return 0
+        return self.l2cap_rx_sdus - len(channel.rx)
+
+    def inject_writes(self, value_handle, rate_hz, size=240, payload=None,
+                      count=None, conn_handle=0):
+        """
+        Write packets to a characteristic at a fixed rate.
+
+        Args:
+            value_handle (int): Characteristic to write
+            rate_hz (float): Packets per second
+            size (int): Packet size when payload is None
+            payload (callable): payload(index) -> bytes for each packet
+            count (int): Packets to send (None = until stopped)
+            conn_handle (int): Connection the writes arrive on
+
+        Returns:
+            PacketInjector: Registered packet source
+        """
+        return PacketInjector(self, value_handle, rate_hz, size, payload, count, conn_handle)
+
+    def simulate_link(self, target, size, mode=None, **kwargs):
+        """
+        Send messages over a SimulatedLink.
+
+        Args:
+            target (int): Characteristic value handle (GATT) or channel ID (L2CAP)
+            size (int): Message size when no payload callable is given
+            mode (int): SimulatedLink.GATT (default) or SimulatedLink.L2CAP
+            **kwargs: Further SimulatedLink arguments
+
+        Returns:
+            SimulatedLink: Registered link
+        """
+        if mode is None:
+            mode = SimulatedLink.GATT
+        return SimulatedLink(self, target, size, mode, **kwargs)
+
+    def reset_stats(self):
+        """Reset dispatch statistics."""
+        self.irq_calls = 0
+        self.irq_time_s = 0.0
+        self.irq_max_s = 0.0
+        self.irq_alloc_bytes = 0
+        self.irq_alloc_max = 0
+
+    def _new_value_handle(self):
+        handle = self._next_handle
+        self._next_handle += 1
+        self._values[handle] = b''
+        return handle
+
+    def _dispatch(self, event, data):
+        if self._handler is None:
+            return None
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        micropython.irq_enter()
+        try:
+            start = time.perf_counter()
+            result = self._handler(event, data)
+            elapsed = time.perf_counter() - start
+            if tracing:
+                used = tracemalloc.get_traced_memory()[1] - base
+        finally:
+            micropython.irq_exit()  # Scheduled callbacks run after the IRQ
+        self.irq_calls += 1
+        self.irq_time_s += elapsed
+        if elapsed > self.irq_max_s:
+            self.irq_max_s = elapsed
+        if tracing:
+            self.irq_alloc_bytes += used
+            if used > self.irq_alloc_max:
+                self.irq_alloc_max = used
+        return result
+
+
+class _Channel:
+    """Receive side of one L2CAP channel."""
+
+    def __init__(self, conn_handle, psm):
+        self.conn_handle = conn_handle
+        self.psm = psm
+        self.rx = []            # (BytesIO, size) of SDUs not yet drained
+        self.sent = []          # SDUs sent by the application
+
+
+class PacketInjector:
+    """Virtual-clock device that writes packets at a fixed rate."""
+
+    def __init__(self, ble, value_handle, rate_hz, size, payload, count, conn_handle):
+        self._ble = ble
+        self._handle = value_handle
+        self._interval_ns = int(1e9 / rate_hz)
+        self._size = size
+        self._payload = payload
+        self._count = count
+        self._conn = conn_handle
+        self._start_us = virtual_clock.now_us()
+        self.sent = 0
+        self.running = True
+        virtual_clock.register(self)
+
+    def stop(self):
+        self.running = False
+        virtual_clock.unregister(self)
+
+    def next_event_us(self):
+        if not self.running:
+            return None
+        return self._start_us + self.sent * self._interval_ns // 1000
+
+    def run_until(self, t):
+        while self.running and self.next_event_us() <= t:
+            if self._payload is not None:
+                data = self._payload(self.sent)
+            else:
+                data = bytes((self.sent + i) & 0xFF for i in range(self._size))
+            self.sent += 1
+            if self._count is not None and self.sent >= self._count:
+                self.stop()
+            self._ble.central_write(self._handle, data, self._conn)
+
+
+class SimulatedLink:
+    """
+    Virtual-clock device that carries messages over connection events.
+
+    Every connection event moves up to pdus_per_event link-layer PDUs
+    of at most ll_payload bytes. A GATT write without response is one
+    ATT PDU (3-byte header) in a basic L2CAP frame (4-byte header). An
+    L2CAP SDU is split into K-frames of ll_payload - 4 bytes, the first
+    of which starts with the 2-byte SDU length, and is only started
+    while the receiving channel has credits.
+
+    Messages are sent as fast as the link allows, or made available at
+    rate_hz; a message not sent by then waits in the sender's backlog.
+    """
+
+    GATT = 0
+    L2CAP = 1
+
+    def __init__(self, ble, target, size, mode, rate_hz=None, payload=None,
+                 count=None, interval_us=7500, pdus_per_event=6, ll_payload=251,
+                 conn_handle=0):
+        self._ble = ble
+        self._target = target
+        self._size = size
+        self._mode = mode
+        self._interval_ns = int(1e9 / rate_hz) if rate_hz else 0
+        self._payload = payload
+        self._count = count
+        self._interval_us = interval_us
+        self._pdus_per_event = pdus_per_event
+        self._ll_payload = ll_payload
+        self._conn = conn_handle
+        self._start_us = virtual_clock.now_us()
+        self._next_us = self._start_us
+        self._message = None
+        self._remaining = 0
+        self.started = 0            # Messages taken from the source
+        self.sent = 0               # Messages delivered to the receiver
+        self.bytes = 0              # Payload bytes delivered
+        self.pdus = 0               # Link-layer PDUs used
+        self.stalled_events = 0     # Connection events lost waiting for credits
+        self.running = True
+        virtual_clock.register(self)
+
+    def pdus_for(self, size):
+        """Link-layer PDUs needed for one message of size payload bytes."""
+        if self._mode == SimulatedLink.GATT:
+            return math.ceil((size + 7) / self._ll_payload)
+        return math.ceil((size + 2) / (self._ll_payload - 4))
+
+    def backlog(self):
+        """Messages due at rate_hz but not sent yet."""
+        if not self._interval_ns:
+            return 0
+        elapsed_ns = (virtual_clock.now_us() - self._start_us) * 1000
+        due = elapsed_ns // self._interval_ns + 1
+        if self._count is not None:
+            due = min(due, self._count)
+        return due - self.sent
+
+    def stop(self):
+        self.running = False
+        virtual_clock.unregister(self)
+
+    def next_event_us(self):
+        if not self.running:
+            return None
+        return self._next_us
+
+    def run_until(self, t):
+        while self.running and self._next_us <= t:
+            self._connection_event()
+            self._next_us += self._interval_us
+
+    def _connection_event(self):
+        budget = self._pdus_per_event
+        while budget:
+            if self._message is None:
+                if self._count is not None and self.started >= self._count:
+                    self.stop()
+                    return
+                if self._interval_ns and (
+                        self._start_us + self.started * self._interval_ns // 1000 > self._next_us):
+                    return
+                if self._mode == SimulatedLink.L2CAP and self._ble.l2cap_credits(self._target) <= 0:
+                    self.stalled_events += 1
+                    return
+                if self._payload is not None:
+                    self._message = self._payload(self.started)
+                else:
+                    self._message = bytes((self.started + i) & 0xFF for i in range(self._size))
+                self._remaining = self.pdus_for(len(self._message))
+                self.started += 1
+            n = min(budget, self._remaining)
+            budget -= n
+            self._remaining -= n
+            self.pdus += n
+            if self._remaining:
+                return
+            message = self._message
+            self._message = None
+            self.sent += 1
+            self.bytes += len(message)
+            if self._mode == SimulatedLink.GATT:
+                self._ble.central_write(self._target, message, self._conn)
+            elif self._target in self._ble._channels:
+                self._ble.central_l2cap_send(self._target, message)
+            else:
+                self.stop()
+                return
+
+
+def reset():
+    """Forget the shared radio so the next BLE() starts clean."""
+    BLE._instance = None
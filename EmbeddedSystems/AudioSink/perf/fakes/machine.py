@@ -0,0 +1,203 @@
+"""
+Host Stand-in for the MicroPython machine Module
+
+Only the parts used by the AudioSink code are provided. Time is taken
+from virtual_clock, so everything is deterministic.
+
+I2S models the rp2 driver: written data goes into an internal DMA
+buffer of ibuf bytes that drains at the configured sample rate. In
+non-blocking mode (after irq(handler)) write() returns at once and the
+handler runs when the whole user buffer has been moved into the DMA
+buffer; in blocking mode write() advances the clock until there is
+room. Time the DMA spends with nothing to play is recorded as
+starved_us.
+"""
+
+import virtual_clock
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    def __init__(self, id, mode=IN, pull=None, value=None):
+        self.id = id
+        self.mode = mode
+        self._value = value or 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def toggle(self):
+        self._value ^= 1
+
+
+class PWM:
+    def __init__(self, pin, freq=1000, duty_u16=0):
+        self.pin = pin
+        self._freq = freq
+        self._duty = duty_u16
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+
+    def deinit(self):
+        pass
+
+
+_freq_hz = 125000000
+
+
+def freq(hz=None):
+    """Get or set the CPU clock."""
+    global _freq_hz
+    if hz is None:
+        return _freq_hz
+    _freq_hz = hz
+
+
+def unique_id():
+    return b'\xe6\x61\x41\x04\x03\x55\x21\x2f'
+
+
+class I2S:
+    TX = 0
+    RX = 1
+    MONO = 0
+    STEREO = 1
+
+    def __init__(self, id, sck=None, ws=None, sd=None, mode=TX, bits=16,
+                 format=STEREO, rate=22050, ibuf=4096):
+        self.id = id
+        self.bits = bits
+        self.format = format
+        self.rate = rate
+        self.ibuf = ibuf
+        self._bytes_per_sec = rate * (bits // 8) * (2 if format == I2S.STEREO else 1)
+        self._handler = None
+        self._pending_us = None     # When the in-flight user buffer is released
+
+        # Output stream: total bytes queued since playback (re)started
+        self._stream_start_us = None
+        self._stream_bytes = 0
+
+        # Statistics
+        self.capture = None         # Set to a bytearray to record output
+        self.writes = 0
+        self.bytes_written = 0
+        self.starved_us = 0
+        self.starvations = 0
+        virtual_clock.register(self)
+
+    # ---------- machine.I2S API ----------
+
+    def irq(self, handler):
+        """Set the write-done callback (None restores blocking mode)."""
+        self._handler = handler
+
+    def write(self, buf):
+        """Queue audio data for output."""
+        if self._pending_us is not None:
+            raise OSError("non-blocking write already in progress")
+        n = len(buf)
+        now = virtual_clock.now_us()
+        self._restart_if_starved(now)
+
+        if self._handler is None:
+            # Blocking: wait until the DMA buffer has room for the data
+            room_at = self._time_at(self._stream_bytes + n - self.ibuf)
+            if room_at > now:
+                virtual_clock.advance_us(room_at - now)
+
+        self._stream_bytes += n
+        self.writes += 1
+        self.bytes_written += n
+        if self.capture is not None:
+            self.capture.extend(buf)
+
+        if self._handler is not None:
+            # Released once its last byte has entered the DMA buffer
+            self._pending_us = max(virtual_clock.now_us(),
+                                   self._time_at(self._stream_bytes - self.ibuf))
+        return n
+
+    def deinit(self):
+        """Stop the peripheral."""
+        self._handler = None
+        self._pending_us = None
+        virtual_clock.unregister(self)
+
+    # ---------- virtual_clock device interface ----------
+
+    def next_event_us(self):
+        return self._pending_us
+
+    def run_until(self, t):
+        if self._pending_us is not None and self._pending_us <= t:
+            self._pending_us = None
+            if self._handler is not None:
+                self._handler(self)
+
+    # ---------- Host-side helpers ----------
+
+    def queued_bytes(self):
+        """Bytes queued in the DMA buffer that have not been played."""
+        if self._stream_start_us is None:
+            return 0
+        return self._stream_bytes - self._played_at(virtual_clock.now_us())
+
+    def idle_us(self):
+        """Time since the DMA ran out of data (0 while playing)."""
+        if self._stream_start_us is None:
+            return 0
+        end = self._time_at(self._stream_bytes)
+        return max(0, virtual_clock.now_us() - end)
+
+    def reset_stats(self):
+        """Reset output statistics."""
+        self.writes = 0
+        self.bytes_written = 0
+        self.starved_us = 0
+        self.starvations = 0
+
+    def _time_at(self, stream_bytes):
+        """Time at which the stream will have played stream_bytes."""
+        if self._stream_start_us is None:
+            return virtual_clock.now_us()
+        if stream_bytes <= 0:
+            return self._stream_start_us
+        return self._stream_start_us - (-stream_bytes * 1000000 // self._bytes_per_sec)
+
+    def _played_at(self, t):
+        played = (t - self._stream_start_us) * self._bytes_per_sec // 1000000
+        return min(self._stream_bytes, played)
+
+    def _restart_if_starved(self, now):
+        """Account for time with nothing to play and restart the stream."""
+        if self._stream_start_us is None:
+            self._stream_start_us = now
+            self._stream_bytes = 0
+            return
+        end = self._time_at(self._stream_bytes)
+        if end < now:
+            self.starved_us += now - end
+            self.starvations += 1
+            self._stream_start_us = now
+            self._stream_bytes = 0
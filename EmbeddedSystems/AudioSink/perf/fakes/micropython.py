@@ -0,0 +1,78 @@
+"""
+Host Stand-in for the MicroPython micropython Module
+
+const() is the identity. The native emitter decorator leaves functions
+as plain Python; the viper decorator raises ImportError, which is what
+the repo's viper modules are guarded against, so every module falls
+back to its portable implementation.
+
+schedule() runs the callback at once, as the scheduler would when
+called from the main program. Inside an IRQ (between irq_enter() and
+irq_exit(), which the fake radio calls around each dispatch) callbacks
+are queued instead and run when the IRQ returns, up to SCHEDULE_DEPTH
+pending like the firmware's queue, beyond which RuntimeError is raised.
+"""
+
+SCHEDULE_DEPTH = 8
+
+_pending = []
+_irq_depth = 0
+
+
+def const(value):
+    return value
+
+
+def native(func):
+    return func
+
+
+def viper(func):
+    raise ImportError("viper code emitter not available on the host")
+
+
+def schedule(func, arg):
+    if not _irq_depth:
+        func(arg)
+        return True
+    if len(_pending) >= SCHEDULE_DEPTH:
+        raise RuntimeError("schedule queue full")
+    _pending.append((func, arg))
+    return True
+
+
+def irq_enter():
+    """Start of an IRQ: schedule() queues from here on."""
+    global _irq_depth
+    _irq_depth += 1
+
+
+def irq_exit():
+    """End of an IRQ: run what was scheduled during it."""
+    global _irq_depth
+    _irq_depth -= 1
+    if _irq_depth:
+        return
+    while _pending:
+        func, arg = _pending.pop(0)
+        func(arg)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def heap_lock():
+    return 0
+
+
+def heap_unlock():
+    return 0
+
+
+def mem_info(verbose=None):
+    print("mem_info: not available on the host")
+
+
+def opt_level(level=None):
+    return 0
@@ -0,0 +1,36 @@
+"""
+Host Stand-in for the MicroPython uasyncio Module
+
+Maps uasyncio onto CPython's asyncio and adds the MicroPython-only
+pieces used by the AudioSink code (sleep_ms, wait_for_ms and
+ThreadSafeFlag). Under
+perf/harness.py the event loop runs on the virtual clock.
+"""
+
+import asyncio as _asyncio
+from asyncio import *  # noqa: F401,F403
+
+
+async def sleep_ms(ms):
+    await _asyncio.sleep(ms / 1000)
+
+
+async def wait_for_ms(aw, timeout):
+    return await _asyncio.wait_for(aw, timeout / 1000)
+
+
+class ThreadSafeFlag:
+    """Flag that can be set from an IRQ and awaited by one task."""
+
+    def __init__(self):
+        self._event = _asyncio.Event()
+
+    def set(self):
+        self._event.set()
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self):
+        await self._event.wait()
+        self._event.clear()
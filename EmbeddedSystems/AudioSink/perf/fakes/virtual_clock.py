@@ -0,0 +1,67 @@
+"""
+Virtual Clock for Hardware Fakes
+
+Shared simulated time used by the host-side hardware fakes. Time only
+moves when advance_us() is called, so runs are fully deterministic.
+Fakes that need to act at a given time (such as the I2S DMA finishing a
+buffer) register themselves as devices and are stepped in time order.
+"""
+
+_now_us = 0
+_devices = []
+
+
+def now_us():
+    """Return the current simulated time in microseconds."""
+    return _now_us
+
+
+def register(device):
+    """Register a device with next_event_us() and run_until(t) methods."""
+    if device not in _devices:
+        _devices.append(device)
+
+
+def unregister(device):
+    """Stop stepping a device."""
+    if device in _devices:
+        _devices.remove(device)
+
+
+def next_event_us():
+    """Return the time of the earliest pending device event, or None."""
+    earliest = None
+    for device in _devices:
+        t = device.next_event_us()
+        if t is not None and (earliest is None or t < earliest):
+            earliest = t
+    return earliest
+
+
+def advance_us(delta_us):
+    """Advance simulated time, running device events in time order."""
+    global _now_us
+    target = _now_us + delta_us
+    while True:
+        # Find the earliest pending device event before the target
+        next_device = None
+        next_time = target
+        for device in _devices:
+            t = device.next_event_us()
+            if t is not None and t <= next_time:
+                next_device = device
+                next_time = t
+        if next_device is None:
+            break
+        _now_us = next_time
+        next_device.run_until(next_time)
+    for device in _devices:
+        device.run_until(target)
+    _now_us = target
+
+
+def reset():
+    """Reset time to zero and forget all devices."""
+    global _now_us
+    _now_us = 0
+    del _devices[:]
@@ -0,0 +1,202 @@
+"""
+Host Pipeline Harness
+
+Runs the AudioSink firmware modules under CPython against the fakes in
+perf/fakes, on simulated time:
+
+- install() puts the fakes ahead of the firmware on sys.path, adds the
+  MicroPython time functions (ticks_ms, ticks_us, ticks_diff, ticks_add,
+  sleep_ms, sleep_us) on top of virtual_clock, fills in gc.mem_free and
+  gc.mem_alloc, and drops cached firmware modules so every run starts
+  from fresh module state.
+- run() executes a coroutine on VirtualEventLoop, an asyncio loop whose
+  clock is virtual_clock. When every task is waiting, the loop jumps
+  straight to the next timer or device event (a BLE packet, an I2S
+  write completing) instead of sleeping, so a minute of audio takes as
+  long as the code under test needs and results are deterministic.
+- quiet() silences the firmware's progress prints during a run.
+
+Only the packet counters are deterministic; host CPU times depend on the
+machine and are for comparison between runs on the same host.
+"""
+
+import asyncio
+import contextlib
+import gc
+import io
+import math
+import os
+import selectors
+import sys
+import time
+import tracemalloc
+
+PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+FAKES_DIR = os.path.join(PERF_DIR, "fakes")
+SINK_DIR = os.path.dirname(PERF_DIR)
+
+# Firmware packages and top-level modules reloaded by install()
+_FIRMWARE_PREFIXES = ("audio", "ble", "i2s", "config")
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+
+def _ticks_ms():
+    return (virtual_clock.now_us() // 1000) & _TICKS_MAX
+
+
+def _ticks_us():
+    return virtual_clock.now_us() & _TICKS_MAX
+
+
+def _ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def _ticks_diff(end, start):
+    return ((end - start + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+def _sleep_ms(ms):
+    virtual_clock.advance_us(int(ms) * 1000)
+
+
+def _sleep_us(us):
+    virtual_clock.advance_us(int(us))
+
+
+def install():
+    """
+    Prepare the interpreter to import the firmware against the fakes.
+
+    Safe to call before every run: the virtual clock, the fake radio
+    and all firmware modules are reset each time.
+    """
+    global virtual_clock
+    for path in (SINK_DIR, FAKES_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+
+    import virtual_clock
+    import bluetooth
+    virtual_clock.reset()
+    bluetooth.reset()
+
+    time.ticks_ms = _ticks_ms
+    time.ticks_us = _ticks_us
+    time.ticks_cpu = _ticks_us
+    time.ticks_add = _ticks_add
+    time.ticks_diff = _ticks_diff
+    time.sleep_ms = _sleep_ms
+    time.sleep_us = _sleep_us
+    if not hasattr(gc, "mem_free"):
+        gc.mem_free = lambda: 200 * 1024
+        gc.mem_alloc = lambda: 0
+
+    for name in list(sys.modules):
+        if name.split(".")[0] in _FIRMWARE_PREFIXES:
+            module = sys.modules[name]
+            path = getattr(module, "__file__", None) or ""
+            if not path or path.startswith(SINK_DIR) and not path.startswith(PERF_DIR):
+                del sys.modules[name]
+
+
+class _VirtualSelector(selectors.SelectSelector):
+    """Selector that advances virtual time instead of blocking."""
+
+    def select(self, timeout=None):
+        now = virtual_clock.now_us()
+        event = virtual_clock.next_event_us()
+        if timeout is None:
+            if event is None:
+                raise RuntimeError("all tasks are waiting and no device event is pending")
+            target = event
+        else:
+            target = now + math.ceil(timeout * 1000000)
+            if event is not None and event < target:
+                target = event
+        virtual_clock.advance_us(max(0, target - now))
+        return []
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """asyncio event loop running on virtual_clock time."""
+
+    def __init__(self):
+        super().__init__(_VirtualSelector())
+
+    def time(self):
+        return virtual_clock.now_us() / 1000000
+
+
+def run(main):
+    """
+    Run a coroutine to completion on simulated time.
+
+    Tasks still pending afterwards (status loops and the like) are
+    cancelled before the loop is closed.
+
+    Args:
+        main: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    loop = VirtualEventLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        result = loop.run_until_complete(main)
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        return result
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def quiet():
+    """Context manager that discards prints from the code under test."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+class CallMeter:
+    """
+    Host time and heap use of a repeated call, for code paths that are
+    not dispatched through the fake radio.
+
+    Heap use is only recorded while tracemalloc is tracing.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget all measured calls."""
+        self.calls = 0
+        self.time_s = 0.0
+        self.alloc_bytes = 0
+        self.alloc_max = 0
+
+    def begin(self):
+        """Mark the start of a measured call."""
+        self._tracing = tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+
+    def end(self):
+        """Mark the end of the call started by begin()."""
+        self.time_s += time.perf_counter() - self._start
+        self.calls += 1
+        if self._tracing:
+            used = tracemalloc.get_traced_memory()[1] - self._base
+            self.alloc_bytes += used
+            if used > self.alloc_max:
+                self.alloc_max = used
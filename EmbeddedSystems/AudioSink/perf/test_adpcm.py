@@ -0,0 +1,117 @@
+"""
+IMA-ADPCM Round-Trip Tests (host-side)
+
+Encodes test signals with tools/adpcm_encode.py, decodes them with
+audio/adpcm.py and checks the reconstruction quality.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_adpcm.py
+"""
+
+import math
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.adpcm import decode_block, decoded_size
+from tools.adpcm_encode import AdpcmEncoder, encode_pcm
+
+RATE = 22050
+
+
+def tone(freq, count, amplitude=12000, phase=0.0):
+    """Return count int16 samples of a sine tone."""
+    return [int(amplitude * math.sin(2 * math.pi * freq * i / RATE + phase))
+            for i in range(count)]
+
+
+def interleave(left, right):
+    return [v for pair in zip(left, right) for v in pair]
+
+
+def decode_all(packets, channels):
+    """Decode packets back into a list of int16 samples."""
+    out = []
+    for packet in packets:
+        dst = bytearray(decoded_size(len(packet), channels))
+        n = decode_block(packet, dst, channels)
+        out.extend(struct.unpack("<%dh" % (n // 2), dst[:n]))
+    return out
+
+
+def snr_db(reference, decoded):
+    signal = sum(v * v for v in reference)
+    noise = sum((a - b) ** 2 for a, b in zip(reference, decoded))
+    return 10 * math.log10(signal / noise) if noise else float("inf")
+
+
+def test_stereo_round_trip():
+    left = tone(440, 4000)
+    right = tone(1000, 4000, amplitude=8000)
+    samples = interleave(left, right)
+    pcm = struct.pack("<%dh" % len(samples), *samples)
+    packets = encode_pcm(pcm, 2, 240)
+
+    assert all(len(p) == 240 for p in packets[:-1])
+    decoded = decode_all(packets, 2)
+    assert len(decoded) == len(samples)
+    # Skip the first packet while the step size adapts
+    assert snr_db(left[232:], decoded[464::2]) > 25
+    assert snr_db(right[232:], decoded[465::2]) > 25
+
+
+def test_mono_round_trip():
+    samples = tone(300, 5000)
+    pcm = struct.pack("<%dh" % len(samples), *samples)
+    packets = encode_pcm(pcm, 1, 240)
+
+    assert len(packets[0]) == 240
+    decoded = decode_all(packets, 1)
+    assert len(decoded) == len(samples)
+    assert snr_db(samples[472:], decoded[472:]) > 25
+
+
+def test_packets_decode_independently():
+    samples = interleave(tone(440, 2000), tone(660, 2000))
+    pcm = struct.pack("<%dh" % len(samples), *samples)
+    packets = encode_pcm(pcm, 2, 240)
+
+    # Losing a packet must not affect the decoding of the next one
+    full = decode_all(packets, 2)
+    partial = decode_all(packets[:2] + packets[3:], 2)
+    per_packet = 232 * 2
+    assert partial[2 * per_packet:] == full[3 * per_packet:]
+
+
+def test_decoder_matches_encoder_state():
+    # The encoder's own reconstruction is what the decoder must produce
+    encoder = AdpcmEncoder(1)
+    packet = encoder.encode_packet(tone(500, 100))
+    dst = bytearray(decoded_size(len(packet), 1))
+    n = decode_block(packet, dst, 1)
+    last = struct.unpack_from("<h", dst, n - 2)[0]
+    assert last == encoder.preds[0]
+
+
+def test_extremes_saturate():
+    samples = [32767, -32768] * 200
+    pcm = struct.pack("<%dh" % len(samples), *samples)
+    decoded = decode_all(encode_pcm(pcm, 1, 240), 1)
+    assert max(decoded) <= 32767 and min(decoded) >= -32768
+
+
+def test_malformed_packets():
+    dst = bytearray(16)
+    assert decode_block(b"\x00\x00\x00", dst, 1) == 0
+    assert decode_block(bytes(8), dst, 2) == 0
+    assert decode_block(bytes(5), dst, 3) == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
@@ -0,0 +1,148 @@
+"""
+Packet Loss Concealment Tests (host-side)
+
+Checks audio/concealment.py on synthetic tones: the silence fade-in,
+repetition and its fade-out, the WSOLA pitch search and how closely it
+continues a periodic signal, and the cross-fade when real packets
+resume. Also streams ble/ble_audio.py with packets missing on the link
+through perf/bench_pipeline.py and checks every loss is concealed.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_concealment.py
+"""
+
+import math
+import os
+import struct
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+from audio.concealment import Concealer, PLC_SILENCE, PLC_REPEAT, PLC_WSOLA
+from bench_pipeline import run_ble_audio
+
+RATE = 22050
+FRAMES = 60                     # 240-byte stereo packets
+PACKET = FRAMES * 4
+
+
+def tone(start, frames=FRAMES, freq=200.0, amplitude=10000):
+    """Stereo frames of a tone with a harmonic, continuing from frame start."""
+    samples = []
+    for i in range(start, start + frames):
+        x = 2 * math.pi * freq * i / RATE
+        value = int(amplitude * (0.7 * math.sin(x) + 0.3 * math.sin(2 * x + 1)))
+        samples.extend((value, value))
+    return bytearray(struct.pack("<%dh" % len(samples), *samples))
+
+
+def left(buf, n=PACKET):
+    return struct.unpack("<%dh" % (n // 2), buf[:n])[::2]
+
+
+def rms_error(a, b):
+    return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)) / len(a))
+
+
+def feed(plc, packets, freq=200.0):
+    for k in range(packets):
+        plc.good(tone(k * FRAMES, freq=freq), PACKET)
+
+
+def test_silence_mode_fades_the_next_packet_in():
+    plc = Concealer(PLC_SILENCE, RATE, PACKET)
+    feed(plc, 4)
+    out = bytearray(PACKET)
+    assert plc.conceal(out, PACKET) == PACKET
+    assert not any(out)
+    resumed = tone(5 * FRAMES)
+    plc.good(resumed, PACKET)
+    ramp = [abs(v) for v in left(resumed)]
+    expected = left(tone(5 * FRAMES))
+    # Starts from zero and is untouched after the 2 ms overlap
+    assert ramp[0] == 0
+    assert left(resumed)[50:] == expected[50:]
+
+
+def test_repeat_plays_the_last_packet_and_fades_out():
+    plc = Concealer(PLC_REPEAT, RATE, PACKET, fade_ms=10)
+    feed(plc, 4)
+    last = left(tone(3 * FRAMES))
+    out = bytearray(PACKET)
+    plc.conceal(out, PACKET)
+    got = left(out)
+    # The last packet again under a linear fade from unity
+    assert got[0] == last[0]
+    assert all(abs(g) <= abs(v) for g, v in zip(got, last))
+    fade = RATE * 10 // 1000
+    for _ in range(fade // FRAMES + 1):
+        plc.conceal(out, PACKET)
+    assert not any(out)
+    assert plc.get_stats()['concealed'] == fade // FRAMES + 2
+
+
+def test_wsola_finds_the_pitch_period():
+    for freq in (90.0, 147.0, 200.0, 350.0):
+        plc = Concealer(PLC_WSOLA, RATE, PACKET)
+        feed(plc, 12, freq)
+        plc.conceal(bytearray(PACKET), PACKET)
+        period = RATE / freq
+        # The period or a multiple of it, within a frame
+        multiple = round(plc._period / period)
+        assert multiple >= 1
+        assert abs(plc._period - multiple * period) <= 1.0, (freq, plc._period)
+
+
+def test_wsola_continues_the_waveform_better_than_repeat():
+    reference = left(tone(12 * FRAMES))
+    errors = {}
+    for mode in (PLC_REPEAT, PLC_WSOLA):
+        plc = Concealer(mode, RATE, PACKET, fade_ms=1000)
+        feed(plc, 12)
+        out = bytearray(PACKET)
+        plc.conceal(out, PACKET)
+        errors[mode] = rms_error(left(out), reference)
+    assert errors[PLC_WSOLA] < errors[PLC_REPEAT] / 4
+    assert errors[PLC_WSOLA] < 500
+
+
+def test_resume_cross_fade_has_no_jump():
+    for mode in (PLC_REPEAT, PLC_WSOLA):
+        plc = Concealer(mode, RATE, PACKET)
+        feed(plc, 12)
+        out = bytearray(PACKET)
+        plc.conceal(out, PACKET)
+        # The stream resumes one packet later than the synthetic signal
+        resumed = tone(14 * FRAMES)
+        plc.good(resumed, PACKET)
+        played = left(out) + left(resumed)
+        steps = [abs(b - a) for a, b in zip(played, played[1:])]
+        # No step much larger than the tone's own slope
+        slope = 2 * math.pi * 200.0 * 2 * 10000 / RATE
+        assert max(steps) < 1.5 * slope, mode
+
+
+def test_conceal_keeps_whole_frames():
+    plc = Concealer(PLC_WSOLA, RATE, PACKET + 4)
+    feed(plc, 12)
+    out = bytearray(PACKET + 4)
+    assert plc.conceal(out, PACKET + 3) == PACKET
+    # Longer than the buffer: clipped to it
+    assert plc.conceal(out, 4 * PACKET) == PACKET + 4
+
+
+def test_ble_audio_conceals_every_lost_packet():
+    r = run_ble_audio(seconds=1.0, skip=10)
+    assert r["lost"] > 0
+    assert r["concealed"] == r["lost"]
+    assert r["underruns"] == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
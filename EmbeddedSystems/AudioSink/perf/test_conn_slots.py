@@ -0,0 +1,170 @@
+"""
+Connection Slot Tests (host-side)
+
+Checks ble/conn_slots.py: slots are handed out and taken back without
+allocating, a full set refuses further connections, handles whose hash
+entries collide are still found after others in their probe run close,
+and a slot's state is reset when it is reused. Then ramps BLEAudioSink
+and the LED peripheral demo from one central to the radio's maximum:
+every packet is counted in its own slot, advertising goes on while a
+slot is free, the central beyond the slots is refused, and the LED
+peripheral only reports "Ready" once the last central has gone.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_conn_slots.py
+"""
+
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SINK = os.path.dirname(_HERE)
+_DEMOS = os.path.dirname(_SINK)
+sys.path.insert(0, _HERE)
+sys.path.insert(0, _SINK)
+
+import harness
+
+
+def test_slots_open_and_close():
+    harness.install()
+    from ble.conn_slots import ConnectionSlots
+
+    slots = ConnectionSlots(3)
+    assert (len(slots), slots.free()) == (0, 3)
+    assert [slots.open(h) for h in (7, 64, 2)] == [0, 1, 2]
+    assert slots.open(64) == 1              # Already open
+    assert slots.open(9) == -1              # Full
+    assert slots.slot(9) == -1
+    assert list(slots.handles()) == [7, 64, 2]
+
+    slots.mtu[1] = 247
+    slots.rx_packets[1] = 5
+    assert slots.close(64) == 1
+    assert slots.close(64) == -1
+    assert slots.free() == 1
+
+    # The freed slot is reused, with its state reset
+    assert slots.open(300) == 1
+    assert (slots.mtu[1], slots.rx_packets[1]) == (23, 0)
+    assert slots.get_stats()[300]["slot"] == 1
+
+    try:
+        slots.open(-1)
+    except ValueError:
+        pass
+    else:
+        assert False, "negative handle accepted"
+    try:
+        ConnectionSlots(0)
+    except ValueError:
+        pass
+    else:
+        assert False, "no slots accepted"
+
+
+def test_colliding_handles_survive_closes():
+    harness.install()
+    from ble.conn_slots import ConnectionSlots
+
+    slots = ConnectionSlots(4)
+    size = slots._mask + 1
+    # Every handle has the same home entry in the table
+    handles = [1 + k * size for k in range(4)]
+    for h in handles:
+        assert slots.open(h) >= 0
+    for closed in (handles[1], handles[0]):
+        slots.close(closed)
+        for h in handles:
+            if h in (handles[0], handles[1]):
+                continue
+            assert slots.conn[slots.slot(h)] == h
+    # The table is back to holding only the open handles
+    assert sum(1 for t in slots._table if t >= 0) == len(slots) == 2
+    assert slots.open(handles[0]) >= 0 and slots.slot(handles[1]) == -1
+
+
+def test_sink_scales_to_the_radio_maximum():
+    harness.install()
+    import bluetooth
+    ble = bluetooth.BLE()
+
+    for n in range(1, ble.max_connections + 1):
+        harness.install()
+        import config
+        config.BLE_MAX_CONNECTIONS = n
+        from ble.ble_core import BLEAudioSink
+
+        ble = bluetooth.BLE()
+        ble.max_connections = n + 1     # Room for one central too many
+        with harness.quiet():
+            sink = BLEAudioSink()
+        sources = []
+        sink.set_audio_source_callback(lambda conn, data: sources.append((conn, data[0])))
+        handles = [10 + 17 * k for k in range(n)]
+        with harness.quiet():
+            for k, conn in enumerate(handles):
+                assert ble.central_connect(conn)
+                # Still discoverable while a slot is free
+                assert (ble.advertising is not None) == (k < n - 1)
+            for rounds in range(3):
+                for k, conn in enumerate(handles):
+                    ble.central_write(sink._handles["audio_data"], bytes([k]) * 8, conn)
+        assert sources == [(conn, k) for _ in range(3) for k, conn in enumerate(handles)]
+
+        stats = sink.get_connection_stats()
+        assert sorted(stats) == sorted(handles)
+        assert all(s["rx_packets"] == 3 and s["rx_bytes"] == 24 for s in stats.values())
+        assert len({s["slot"] for s in stats.values()}) == n
+
+        # One central too many is refused and the rest keep their slots
+        with harness.quiet():
+            ble.central_connect(999)
+        assert 999 not in ble.connections
+        assert sink.connection_count() == n
+
+        # A central leaving frees its slot for the next one
+        with harness.quiet():
+            ble.central_disconnect(handles[0])
+            assert ble.advertising is not None
+            assert ble.central_connect(999)
+        assert sink.get_connection_stats()[999]["rx_packets"] == 0
+        ble.irq(None)
+
+
+def test_led_peripheral_ready_after_the_last_central():
+    harness.install()
+    sys.path.insert(0, os.path.join(_DEMOS, "AudioController"))
+    sys.path.insert(0, _DEMOS)
+    try:
+        import bluetooth
+        sys.modules.pop("ble_led_peripheral", None)
+        from ble_led_peripheral import BLELEDPeripheral, _MAX_CONNECTIONS
+
+        ble = bluetooth.BLE()
+        peripheral = BLELEDPeripheral()
+        status = lambda: ble.gatts_read(peripheral._handle_status)
+        for conn in range(_MAX_CONNECTIONS):
+            assert ble.central_connect(conn)
+            assert status() == "Connected ({})".format(conn + 1).encode()
+        assert ble.advertising is None      # Every slot is taken
+
+        for conn in range(_MAX_CONNECTIONS - 1):
+            ble.central_disconnect(conn)
+            assert peripheral.is_connected()
+            assert ble.advertising is not None
+        assert status() == b"Connected (1)"
+        ble.central_disconnect(_MAX_CONNECTIONS - 1)
+        assert status() == b"Ready" and not peripheral.is_connected()
+        ble.irq(None)
+    finally:
+        sys.path.remove(_DEMOS)
+        sys.path.remove(os.path.join(_DEMOS, "AudioController"))
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
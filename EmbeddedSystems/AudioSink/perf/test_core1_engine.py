@@ -0,0 +1,226 @@
+"""
+Dual-Core Handoff Stress Tests (host-side)
+
+Runs audio/core1_engine.py on a real second thread (CPython's _thread)
+with a producer on the main thread, the way core 0 and core 1 share the
+ring and jitter buffers on the RP2040. The thread switch interval is
+cut to a few microseconds so the two sides interleave inside the copy
+and index updates. Every byte or packet is numbered, so any loss,
+duplication or reordering shows up in the output. Switches between two
+adjacent stores are too rare to rely on, so the jitter buffer is also
+checked with the consumer run before every line of put().
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_core1_engine.py
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+
+from audio.core1_engine import Core1PlaybackEngine
+from audio.jitter_buffer import JitterBuffer, LOST, UNDERRUN
+from audio.ring_buffer import RingBuffer
+
+BLOCK = 256
+STREAM_BYTES = 400000
+PACKETS = 4000
+
+
+class RecordingI2S:
+    """Blocking I2S stand-in that counts writes and yields the core."""
+
+    def __init__(self):
+        self.writes = 0
+        self.in_write = False
+
+    def irq(self, handler):
+        pass
+
+    def write(self, buf):
+        self.in_write = True
+        self.writes += 1
+        if self.writes % 8 == 0:
+            time.sleep(0)
+        self.in_write = False
+        return len(buf)
+
+
+class fast_switching:
+    """Context manager that makes the interpreter switch threads often."""
+
+    def __enter__(self):
+        self._saved = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def __exit__(self, *exc):
+        sys.setswitchinterval(self._saved)
+
+
+def pattern(start, n):
+    return bytes((start + i) * 7 & 0xFF for i in range(n))
+
+
+def drain(engine, done, timeout=20.0):
+    """Wait until done() holds or the timeout passes, then stop the engine."""
+    deadline = time.monotonic() + timeout
+    while not done() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    engine.stop()
+    assert engine.error is None, engine.error
+
+
+def test_ring_handoff_keeps_every_byte_in_order():
+    ring = RingBuffer(1024)
+    out = bytearray()
+
+    def fill(buf):
+        n = ring.read_into(buf)
+        out.extend(buf[:n])
+        return n
+
+    engine = Core1PlaybackEngine(RecordingI2S(), fill, BLOCK)
+    data = pattern(0, STREAM_BYTES)
+    rng = random.Random(1)
+    with fast_switching():
+        engine.start()
+        pos = 0
+        while pos < len(data):
+            n = rng.randint(1, 300)
+            pos += ring.write_into(memoryview(data)[pos:pos + n])
+        drain(engine, lambda: len(out) >= len(data))
+    assert bytes(out) == data
+    assert engine.blocks_played > 0
+
+
+def test_jitter_handoff_keeps_every_packet_in_order():
+    jb = JitterBuffer(16, 64, 1000, 2, 8)
+    played = []
+    chunk = bytearray(64 + 2)
+
+    def fill(buf):
+        n = jb.pop_into(chunk)
+        if n == UNDERRUN:
+            return 0
+        if n == LOST:
+            played.append(None)
+            return 0
+        played.append(bytes(chunk[:n]))
+        return n
+
+    engine = Core1PlaybackEngine(RecordingI2S(), fill, BLOCK)
+    # Drift correction changes packet lengths; keep it out of this test
+    jb._adjust_interval = PACKETS * 2
+    with fast_switching():
+        engine.start()
+        seq = 0
+        while seq < PACKETS:
+            # Producer-side view of the depth, as the BLE IRQ would see it
+            if jb._packets_in - jb._packets_out >= 12:
+                time.sleep(0)
+                continue
+            assert jb.put(seq & 0xFFFF, seq.to_bytes(4, "little") * 16)
+            seq += 1
+        drain(engine, lambda: len(played) >= PACKETS - 8)
+    expected = [i.to_bytes(4, "little") * 16 for i in range(len(played))]
+    assert played == expected
+    assert jb.lost == 0 and jb.late == 0
+
+
+def test_put_can_be_interrupted_at_any_line():
+    # Thread switches rarely land between two stores, so run the
+    # consumer deterministically before every line of put()
+    jb = JitterBuffer(8, 8, 1000, 2, 2)
+    out = bytearray(10)
+    results = []
+
+    def tracer(frame, event, arg):
+        if frame.f_code is not JitterBuffer.put.__code__:
+            return None
+        if event == "line":
+            results.append(jb.pop_into(out))
+        return tracer
+
+    for seq in range(64):
+        sys.settrace(tracer)
+        try:
+            jb.put(seq, bytes([seq]) * 8)
+        finally:
+            sys.settrace(None)
+    while jb.pop_into(out) != UNDERRUN:
+        pass
+    assert LOST not in results
+    assert jb.lost == 0 and jb.played == 64
+
+
+def test_discard_from_the_producer_skips_stale_audio():
+    ring = RingBuffer(4096)
+    out = bytearray()
+
+    def fill(buf):
+        n = ring.read_into(buf)
+        out.extend(buf[:n])
+        return n
+
+    engine = Core1PlaybackEngine(RecordingI2S(), fill, BLOCK)
+    stale = b"\xAA" * 4000
+    fresh = pattern(1, 20000)
+    with fast_switching():
+        ring.write_into(stale)
+        engine.start()
+        ring.discard()
+        pos = 0
+        while pos < len(fresh):
+            pos += ring.write_into(memoryview(fresh)[pos:pos + 200])
+        drain(engine, lambda: out.endswith(fresh[-200:]))
+    # Some stale audio may have played before the discard, then all of
+    # the fresh stream and nothing else
+    cut = len(out) - len(fresh)
+    assert out[:cut] == stale[:cut]
+    assert bytes(out[cut:]) == fresh
+
+
+def test_stop_waits_for_core1_to_leave_the_loop():
+    i2s = RecordingI2S()
+    engine = Core1PlaybackEngine(i2s, lambda buf: 0, BLOCK)
+    engine.start()
+    while i2s.writes < 10:
+        time.sleep(0.001)
+    engine.stop()
+    writes = i2s.writes
+    assert not i2s.in_write
+    time.sleep(0.01)
+    assert i2s.writes == writes
+    assert engine.underruns == engine.blocks_played
+
+    # And it can be started again
+    engine.start()
+    while i2s.writes < writes + 10:
+        time.sleep(0.001)
+    engine.stop()
+
+
+def test_fill_error_does_not_hang_stop():
+    def fill(buf):
+        raise ValueError("bad source")
+
+    engine = Core1PlaybackEngine(RecordingI2S(), fill, BLOCK)
+    engine.start()
+    stopper = threading.Thread(target=engine.stop)
+    stopper.start()
+    stopper.join(5)
+    assert not stopper.is_alive()
+    assert isinstance(engine.error, ValueError)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
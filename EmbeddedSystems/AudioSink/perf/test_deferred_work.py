@@ -0,0 +1,245 @@
+"""
+Deferred IRQ Work Tests (host-side)
+
+Checks ble/deferred.py: jobs run in order with their tag and a copy of
+their payload, the queue drops (and counts) jobs beyond its slots and
+payloads beyond its slot size, scheduled jobs run once the IRQ has
+returned and asyncio ones from the run() task, a job whose
+micropython.schedule() call failed is scheduled again after the next
+IRQ, and the queue depth and IRQ time are reported, the latter as an
+average over the recent IRQs whose sum stays bounded. Checks that
+BLEAudioSink handles control writes after the IRQ while audio writes
+are still passed on from it.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_deferred_work.py
+"""
+
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+
+
+def test_bounded_queue_in_order():
+    harness.install()
+    from ble.deferred import DeferredWork
+
+    work = DeferredWork(slots=2, slot_size=4)
+    jobs = []
+
+    def job(tag, view):
+        jobs.append((tag, bytes(view)))
+
+    assert work.defer(job, 1, b"\x01\x02")
+    assert work.defer(job, 2, b"\x03\x04\x05\x06\x07")   # Cut to the slot
+    assert not work.defer(job, 3, b"\x08")               # No slot left
+    assert work.depth() == 2
+    assert jobs == []
+
+    assert work.drain() == 2
+    assert jobs == [(1, b"\x01\x02"), (2, b"\x03\x04\x05\x06")]
+    assert work.depth() == 0
+
+    # The slots are reused once drained, across the index wrap
+    for k in range(5):
+        assert work.defer(job, k)
+        work.drain()
+    assert jobs[-1] == (4, b"")
+
+    stats = work.get_stats()
+    assert (stats["queued"], stats["dropped"], stats["truncated"]) == (7, 1, 1)
+    assert (stats["ran"], stats["high_water"], stats["depth"]) == (7, 2, 0)
+
+
+def test_failed_job_does_not_stop_the_queue():
+    harness.install()
+    from ble.deferred import DeferredWork
+
+    work = DeferredWork(slots=4, slot_size=0)
+    ran = []
+
+    def fail(tag, view):
+        raise ValueError("boom")
+
+    work.defer(fail)
+    work.defer(lambda tag, view: ran.append(tag), 9)
+    with harness.quiet():
+        assert work.drain() == 2
+    assert ran == [9]
+    assert work.get_stats()["errors"] == 1
+
+    try:
+        DeferredWork(slots=0)
+    except ValueError:
+        pass
+    else:
+        assert False, "empty queue accepted"
+
+
+def test_scheduled_jobs_run_after_the_irq():
+    harness.install()
+    import bluetooth
+    import micropython
+    from ble.deferred import DeferredWork
+
+    ble = bluetooth.BLE()
+    work = DeferredWork(slots=4, slot_size=16, schedule=True)
+    seen = []
+
+    def job(conn_handle, view):
+        seen.append((conn_handle, bytes(view), micropython._irq_depth))
+
+    def irq(event, data):
+        conn_handle, value_handle = data
+        before = len(seen)
+        work.defer_read(ble, job, conn_handle, value_handle)
+        assert len(seen) == before      # Not while the IRQ runs
+
+    ble.irq(work.timed(irq))
+    ble.central_write(7, b"hello", conn_handle=2)
+    ble.central_write(7, b"again", conn_handle=3)
+    assert seen == [(2, b"hello", 0), (3, b"again", 0)]
+
+    stats = work.get_stats()
+    assert stats["irq_calls"] == 2
+    assert stats["ran"] == 2 and stats["depth"] == 0
+    assert stats["schedule_failures"] == 0
+    ble.irq(None)
+
+
+def test_failed_schedule_is_retried_after_the_next_irq():
+    harness.install()
+    import bluetooth
+    import micropython
+    from ble.deferred import DeferredWork
+
+    ble = bluetooth.BLE()
+    work = DeferredWork(slots=4, slot_size=16, schedule=True)
+    seen = []
+    schedule = micropython.schedule
+    full = [True]
+
+    def schedule_unless_full(func, arg):
+        if full[0]:
+            raise RuntimeError("schedule queue full")
+        return schedule(func, arg)
+
+    def irq(event, data):
+        if event == bluetooth.IRQ_GATTS_WRITE:
+            conn_handle, value_handle = data
+            work.defer_read(ble, lambda conn, view: seen.append(bytes(view)),
+                            conn_handle, value_handle)
+
+    micropython.schedule = schedule_unless_full
+    try:
+        ble.irq(work.timed(irq))
+        # Full for the whole IRQ: the job and the retry after it both fail
+        ble.central_write(7, b"hello")
+        assert seen == [] and work.depth() == 1     # Left queued
+        # Any IRQ will do once there is room: a connect queues nothing
+        full[0] = False
+        ble.central_connect(1)
+        assert seen == [b"hello"] and work.depth() == 0
+    finally:
+        micropython.schedule = schedule
+        ble.irq(None)
+    stats = work.get_stats()
+    assert stats["schedule_failures"] == 2 and stats["ran"] == 1
+
+
+def test_run_task_drains_the_queue():
+    harness.install()
+    import uasyncio as asyncio
+    from ble.deferred import DeferredWork
+
+    work = DeferredWork(slots=4, slot_size=8)
+    seen = []
+
+    async def main():
+        task = asyncio.create_task(work.run())
+        await asyncio.sleep_ms(1)
+        work.defer(lambda tag, view: seen.append(bytes(view)), 0, b"abc")
+        work.defer(lambda tag, view: seen.append(bytes(view)), 0, b"def")
+        assert seen == []               # Left to the task
+        await asyncio.sleep_ms(1)
+        assert seen == [b"abc", b"def"]
+        work.stop()
+        await task
+
+    harness.run(main())
+    assert work.get_stats()["high_water"] == 2
+
+
+def test_irq_time_sum_stays_bounded():
+    harness.install()
+    from ble.deferred import DeferredWork, IRQ_AVG_CALLS
+
+    work = DeferredWork()
+    durations = [500]
+
+    def irq(event, data):
+        harness.virtual_clock.advance_us(durations[0])
+
+    timed = work.timed(irq)
+    for _ in range(10 * IRQ_AVG_CALLS):
+        timed(0, None)
+    stats = work.get_stats()
+    assert stats["irq_calls"] == 10 * IRQ_AVG_CALLS
+    assert stats["irq_avg_us"] == 500
+    assert work.irq_us < IRQ_AVG_CALLS * 500
+
+    # The average follows the recent IRQs
+    durations[0] = 100
+    for _ in range(4 * IRQ_AVG_CALLS):
+        timed(0, None)
+    assert 100 <= work.get_stats()["irq_avg_us"] < 110
+    assert work.get_stats()["irq_max_us"] == 500
+
+
+def test_sink_handles_control_writes_after_the_irq():
+    harness.install()
+    import bluetooth
+    import micropython
+    from ble.ble_core import BLEAudioSink
+    from config import BLE_DEFERRED_SLOTS, CMD_PLAY
+
+    ble = bluetooth.BLE()
+    with harness.quiet():
+        sink = BLEAudioSink()
+    audio_depths = []
+    control = []
+    sink.set_audio_data_callback(lambda data: audio_depths.append(micropython._irq_depth))
+    sink.set_control_callback(lambda value: control.append((bytes(value), micropython._irq_depth)))
+    handles = sink._handles
+    with harness.quiet():
+        ble.central_connect(0)
+        ble.central_write(handles["audio_data"], bytes(8))
+        ble.central_write(handles["audio_control"], bytes([CMD_PLAY, 1]))
+    assert audio_depths == [1]          # From the IRQ
+    assert control == [(bytes([CMD_PLAY, 1]), 0)]
+    assert sink.control_conn == 0
+
+    # Writes that arrive in one IRQ burst wait in the slots
+    def burst(event, data):
+        for k in range(BLE_DEFERRED_SLOTS + 1):
+            sink._on_control_write((0, handles["audio_control"]))
+
+    ble.irq(burst)
+    ble.central_write(handles["audio_control"], bytes([CMD_PLAY, 0]))
+    stats = sink.deferred.get_stats()
+    assert len(control) == 1 + BLE_DEFERRED_SLOTS
+    assert stats["dropped"] == 1 and stats["high_water"] == BLE_DEFERRED_SLOTS
+    assert stats["irq_calls"] == 4      # connect, its MTU exchange and the first two writes
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
@@ -0,0 +1,224 @@
+"""
+DSP Chain Tests (host-side)
+
+Checks the stages of audio/dsp.py on synthetic signals: EQ bands have
+the designed gain at their frequency and match a floating-point biquad
+to within a couple of LSB, the DC blocker removes an offset and passes
+audio, the gain ramp moves volume without steps, and the limiter holds
+loud blocks under its ceiling and releases afterwards. Then checks
+CMD_DSP decoding, that bypass takes the chain out of the I2S engine's
+fill path, and that a volume command through BLEAudioAdapter ramps
+instead of jumping.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_dsp.py
+"""
+
+import asyncio
+import math
+import os
+import struct
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from audio.dsp import (DspChain, Biquad, GainRamp, Limiter, DcBlocker,
+                       DSP_BYPASS, DSP_EQ, DSP_LIMITER, DSP_RAMP, DSP_DC,
+                       EQ_OFF, EQ_PEAK, EQ_LOW_PASS, EQ_HIGH_SHELF)
+from audio.sample_kernels import Q15_UNITY
+
+RATE = 22050
+FRAMES = 128
+
+
+def sine_blocks(freq, amplitude, blocks, offset=0):
+    """Stereo blocks of a sine (same on both channels)."""
+    out = []
+    for b in range(blocks):
+        samples = []
+        for i in range(b * FRAMES, (b + 1) * FRAMES):
+            v = int(offset + amplitude * math.sin(2 * math.pi * freq * i / RATE))
+            samples.extend((v, v))
+        out.append(bytearray(struct.pack("<%dh" % len(samples), *samples)))
+    return out
+
+
+def left(buf):
+    return list(struct.unpack("<%dh" % (len(buf) // 2), buf))[0::2]
+
+
+def run_stage(stage, blocks):
+    out = []
+    for block in blocks:
+        stage.process(block, FRAMES)
+        out.extend(left(block))
+    return out
+
+
+def peak(samples):
+    return max(abs(v) for v in samples)
+
+
+def test_peak_band_has_its_gain_at_the_centre():
+    for gain_db in (6, -6):
+        band = Biquad(RATE)
+        band.set(EQ_PEAK, 1000, gain_db, 1.0)
+        out = run_stage(band, sine_blocks(1000, 8000, 40))
+        measured = 20 * math.log10(peak(out[-FRAMES * 10:]) / 8000)
+        assert abs(measured - gain_db) < 0.2, measured
+        # Far from the centre the level is unchanged
+        band.reset()
+        out = run_stage(band, sine_blocks(60, 8000, 40))
+        assert abs(peak(out[-FRAMES * 20:]) - 8000) < 150
+
+
+def test_biquad_matches_floating_point():
+    band = Biquad(RATE)
+    band.set(EQ_HIGH_SHELF, 4000, 9, 0.7)
+    coefs = [c / (1 << 13) for c in band._coefs]
+    blocks = sine_blocks(5000, 5000, 10)
+    x = [v for block in blocks for v in left(block)]
+    out = run_stage(band, blocks)
+    x1 = x2 = y1 = y2 = 0.0
+    worst = 0
+    for xn, yn in zip(x, out):
+        y = coefs[0] * xn + coefs[1] * x1 + coefs[2] * x2 - coefs[3] * y1 - coefs[4] * y2
+        x2, x1, y2, y1 = x1, xn, y1, y
+        worst = max(worst, abs(y - yn))
+    assert worst <= 2.5, worst
+
+
+def test_low_pass_attenuates_above_the_corner():
+    band = Biquad(RATE)
+    band.set(EQ_LOW_PASS, 500, q=0.7)
+    out = run_stage(band, sine_blocks(5000, 10000, 20))
+    assert peak(out[-FRAMES * 5:]) < 150
+
+
+def test_dc_blocker_removes_offset_and_passes_audio():
+    dc = DcBlocker()
+    out = run_stage(dc, sine_blocks(440, 6000, 200, offset=4000))
+    tail = out[-FRAMES * 20:]
+    assert abs(sum(tail) / len(tail)) < 30
+    assert 5800 < peak(tail) < 6200
+
+
+def test_gain_ramp_moves_without_steps():
+    ramp = GainRamp(RATE, ramp_ms=20)
+    ramp.set_target(Q15_UNITY // 4)
+    blocks = [bytearray(struct.pack("<256h", *([16000] * 256))) for _ in range(6)]
+    out = run_stage(ramp, blocks)
+    # Full scale in 20 ms: 3/4 of it takes ~331 frames
+    steps = [a - b for a, b in zip(out, out[1:])]
+    assert max(steps) <= 16000 * ramp._step // Q15_UNITY + 1
+    assert out[0] > 15900 and out[-1] == 4000
+    assert 320 < out.index(4000) < 340
+    assert ramp.gain == ramp.target
+
+
+def test_limiter_holds_the_ceiling_and_releases():
+    limiter = Limiter(RATE, threshold_db=-6, release_ms=50)
+    limiter.enabled = True
+    ceiling = limiter._threshold
+    loud = run_stage(limiter, sine_blocks(440, 30000, 20))
+    # The first block ramps down; later ones stay under the ceiling
+    assert peak(loud[FRAMES:]) <= ceiling + 1
+    assert limiter.blocks_limited >= 1 and limiter.gain < Q15_UNITY
+    quiet = run_stage(limiter, sine_blocks(440, 8000, 40))
+    assert limiter.gain == Q15_UNITY
+    assert abs(peak(quiet[-FRAMES:]) - 8000) < 20
+
+
+def test_configure_decodes_commands():
+    chain = DspChain(RATE, bands=2, ramp_ms=0)
+    assert not chain.active
+    assert chain.configure(bytes([0x0D, DSP_EQ, 1, EQ_PEAK, 0xE8, 0x03, 0xFA, 14]))
+    band = chain.eq[1]
+    assert (band.kind, band.freq, band.gain_db, band.q) == (EQ_PEAK, 1000, -6, 1.4)
+    assert chain.configure(bytes([0x0D, DSP_LIMITER, 1, 3, 100, 0]))
+    assert chain.limiter.enabled and chain.limiter.threshold_db == -3
+    assert chain.limiter.release_ms == 100
+    assert chain.configure(bytes([0x0D, DSP_RAMP, 30, 0]))
+    assert chain.configure(bytes([0x0D, DSP_DC, 1]))
+    assert chain.stages() == [chain.dc] + chain.eq + [chain.ramp, chain.limiter]
+    assert [chain.has_stage(s) for s in chain.stages()] == [True, False, True, True, True]
+
+    assert chain.configure(bytes([0x0D, DSP_BYPASS, 1])) and not chain.active
+    assert chain.configure(bytes([0x0D, DSP_BYPASS, 0])) and chain.active
+    with harness.quiet():
+        assert not chain.configure(bytes([0x0D, DSP_EQ, 5, EQ_PEAK, 0xE8, 0x03, 0, 10]))
+        assert not chain.configure(bytes([0x0D, DSP_EQ, 0, EQ_PEAK, 0xFF, 0xFF, 0, 10]))
+        assert not chain.configure(bytes([0x0D, 0x7F, 0]))
+    assert chain.eq[0].kind == EQ_OFF
+
+
+def test_bypass_leaves_the_engine_reading_the_ring():
+    harness.install()
+    from audio.i2s_driver import I2SDriver
+    from config import CMD_DSP
+    with harness.quiet():
+        driver = I2SDriver(16, 17, 18, RATE, volume_ramp_ms=0)
+    assert not driver.dsp.active
+    assert driver.engine._fill == driver.buffer.read_into
+    driver.configure_dsp(bytes([CMD_DSP, DSP_DC, 1]))
+    assert driver.engine._fill == driver._dsp_fill
+    driver.configure_dsp(bytes([CMD_DSP, DSP_BYPASS, 1]))
+    assert driver.engine._fill == driver.buffer.read_into
+
+
+def test_volume_moves_between_write_path_and_ramp():
+    harness.install()
+    from audio.i2s_driver import I2SDriver
+    from config import CMD_DSP
+    with harness.quiet():
+        driver = I2SDriver(16, 17, 18, RATE, volume_ramp_ms=20)
+    driver.set_volume(0.5)
+    assert driver._gain == Q15_UNITY and driver.dsp.ramp.target == Q15_UNITY // 2
+    driver.configure_dsp(bytes([CMD_DSP, DSP_BYPASS, 1]))
+    assert driver._gain == Q15_UNITY // 2
+    driver.configure_dsp(bytes([CMD_DSP, DSP_BYPASS, 0]))
+    assert driver._gain == Q15_UNITY and driver.dsp.ramp.gain == Q15_UNITY // 2
+
+
+def test_adapter_volume_change_ramps():
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from config import AUDIO_SAMPLE_RATE
+
+    ble = bluetooth.BLE()
+    rate_hz = AUDIO_SAMPLE_RATE * 4 / 240
+    packet = struct.pack("<120h", *([12000] * 120))
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        handles = adapter.ble_sink._handles
+        ble.central_connect()
+        injector = ble.inject_writes(handles["audio_data"], rate_hz, payload=lambda i: packet)
+        await asyncio.sleep(0.3)
+        i2s = adapter.i2s_driver.i2s
+        i2s.capture = bytearray()
+        ble.central_write(handles["audio_control"], bytes([0x02, 64]))
+        await asyncio.sleep(0.2)
+        injector.stop()
+        await adapter.stop()
+        return left(i2s.capture)
+
+    with harness.quiet():
+        out = harness.run(main())
+    assert out[0] == 12000
+    steps = [abs(a - b) for a, b in zip(out, out[1:])]
+    assert max(steps) < 100
+    assert abs(out[-1] - 12000 * 64 / 255) < 50
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
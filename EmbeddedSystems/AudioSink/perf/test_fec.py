@@ -0,0 +1,171 @@
+"""
+XOR Parity FEC Tests (host-side)
+
+Checks audio/fec.py against frames from tools/fec_encode.py: single
+losses anywhere in a group are rebuilt, packets always come out in
+order, double losses are given up at the next group, and duplicates,
+late frames and a lost parity packet do no harm. Then checks the
+negotiation over the control characteristic of BLEAudioSink, FEC in
+ble/ble_audio.py ahead of the jitter buffer, and the loss figures of
+perf/bench_fec.py.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_fec.py
+"""
+
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from audio.fec import FecDecoder
+from bench_fec import make_packets, run_link
+from tools.fec_encode import FecEncoder, encode_packets
+
+
+def packets_of(count, start=0):
+    # Different lengths, so the length of a rebuilt packet is checked too
+    return [bytes([i & 0xFF]) * (20 + i % 7) for i in range(start, start + count)]
+
+
+def decode(frames, group_size=4, drop=()):
+    """Feed frames (except the dropped indices) and return what comes out."""
+    fec = FecDecoder(8, 64)
+    fec.set_group_size(group_size)
+    out = []
+    for i, frame in enumerate(frames):
+        if i not in drop:
+            fec.feed(frame, lambda p: out.append(bytes(p)))
+    return fec, out
+
+
+def test_no_loss_passes_packets_through_in_order():
+    packets = packets_of(12)
+    fec, out = decode(encode_packets(packets, 4))
+    assert out == packets
+    assert fec.parity_received == 3 and fec.recovered == 0
+
+
+def test_any_single_loss_in_a_group_is_rebuilt():
+    packets = packets_of(8)
+    frames = encode_packets(packets, 4)
+    # Frames 0-3 are group 0's data, 4 its parity
+    for lost in range(4):
+        fec, out = decode(frames, drop=(lost, 5 + lost))
+        assert out == packets, lost
+        assert fec.recovered == 2 and fec.unrecovered == 0
+
+
+def test_packets_behind_a_gap_wait_for_the_rebuild():
+    packets = packets_of(4)
+    frames = encode_packets(packets, 4)
+    fec = FecDecoder(8, 64)
+    fec.set_group_size(4)
+    out = []
+    for frame in frames[2:4]:
+        fec.feed(frame, lambda p: out.append(bytes(p)))
+    assert out == []
+    fec.feed(frames[0], lambda p: out.append(bytes(p)))
+    assert out == packets[:1]
+    fec.feed(frames[4], lambda p: out.append(bytes(p)))
+    assert out == packets
+
+
+def test_double_loss_is_given_up_at_the_next_group():
+    packets = packets_of(8)
+    frames = encode_packets(packets, 4)
+    fec, out = decode(frames, drop=(0, 2))
+    # Held packets 1 and 3 come out when group 1 starts, then group 1
+    assert out == [packets[1], packets[3]] + packets[4:]
+    assert fec.unrecovered == 2 and fec.recovered == 0
+
+
+def test_lost_parity_and_duplicates_do_no_harm():
+    packets = packets_of(8)
+    frames = encode_packets(packets, 4)
+    frames = frames[:3] + frames[2:4] + frames[5:]       # Parity lost, one duplicate
+    fec, out = decode(frames)
+    assert out == packets
+    assert fec.duplicates == 1
+
+
+def test_frames_from_a_finished_group_are_late():
+    packets = packets_of(8)
+    frames = encode_packets(packets, 4)
+    fec, out = decode(frames[:1] + frames[5:] + frames[1:2])
+    assert out == packets[:1] + packets[4:]
+    assert fec.late == 1
+
+
+def test_group_numbers_wrap():
+    encoder = FecEncoder(2)
+    encoder.group = 254
+    packets = packets_of(8)
+    frames = [f for p in packets for f in encoder.encode(p)]
+    # One loss in each group, across the wrap from 255 to 0
+    fec, out = decode(frames, group_size=2, drop=(0, 4, 6, 10))
+    assert out == packets
+    assert fec.recovered == 4
+
+
+def test_sink_negotiates_over_the_control_characteristic():
+    harness.install()
+    import bluetooth
+    from ble.ble_core import BLEAudioSink
+    from config import CMD_SET_FEC, FEC_MAX_GROUP
+    with harness.quiet():
+        sink = BLEAudioSink()
+        ble = bluetooth.BLE()
+        ble.central_connect()
+        control = sink._handles['audio_control']
+        for asked, accepted in ((4, 4), (FEC_MAX_GROUP + 5, FEC_MAX_GROUP), (1, 0), (0, 0)):
+            ble.central_write(control, bytes([CMD_SET_FEC, asked]))
+            assert ble.notifications[-1] == (0, control, bytes([CMD_SET_FEC, accepted]))
+            assert sink.get_fec(0).group_size == accepted
+        ble.central_write(control, bytes([CMD_SET_FEC, 4]))
+        ble.central_disconnect()
+        assert sink.get_fec(0) is None
+        # A new connection starts without FEC
+        ble.central_connect()
+    assert sink.get_fec(0).group_size == 0
+
+
+def test_ble_audio_rebuilds_before_the_jitter_buffer():
+    harness.install()
+    import struct
+    from ble import ble_audio
+    with harness.quiet():
+        ble_audio.reset_buffer()
+        assert ble_audio.set_fec_group(4) == 4
+    packets = [struct.pack("<H", seq) + bytes(240) for seq in range(16)]
+    frames = encode_packets(packets, 4)
+    for i, frame in enumerate(frames):
+        if i % 5 != 2:      # One data packet lost in every group
+            ble_audio.process_audio_data(frame)
+    stats = ble_audio.get_stats()
+    assert stats['fec']['recovered'] == 4
+    assert stats['packets_received'] == 16
+    assert stats['jitter']['received'] == 16
+    with harness.quiet():
+        ble_audio.set_fec_group(0)
+
+
+def test_fec_lowers_effective_loss():
+    packets = make_packets(4000)
+    plain = run_link(0.05, 0, packets)
+    fec = run_link(0.05, 4, packets)
+    assert 0.03 < plain["effective_loss"] < 0.07
+    # One loss per group of five frames is rebuilt: ~1% left of 5%
+    assert fec["effective_loss"] < plain["effective_loss"] / 3
+    assert 0.25 < fec["overhead"] < 0.28
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
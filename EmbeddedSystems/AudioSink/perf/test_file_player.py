@@ -0,0 +1,182 @@
+"""
+Flash File Player Tests (host-side)
+
+Checks audio/file_player.py: WAV headers are parsed past unknown and
+odd-sized chunks and bad files are refused, a WAV file reaches the I2S
+output sample for sample, 8-bit mono raw files are expanded by the
+driver, files at another rate go through the resampler, and looping
+playback at the full I2S rate runs without underruns. The read counters
+only count time inside readinto().
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_file_player.py
+"""
+
+import asyncio
+import io
+import os
+import struct
+import sys
+import tempfile
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from bench_file_player import RATE, run_file_soak, write_test_wav
+
+
+def play_file(path, loops=1, fmt=None, chunk_size=1000, tail=0.1):
+    """Play a file through I2SDriver; return (player, captured output)."""
+    harness.install()
+    from audio.i2s_driver import I2SDriver
+    from audio.file_player import FilePlayer
+
+    async def main():
+        driver = I2SDriver(16, 17, 18, RATE, buffer_size=2048)
+        driver.i2s.capture = bytearray()
+        player = FilePlayer(driver, chunk_size)
+        await player.play(path, loops, fmt)
+        await asyncio.sleep(tail)
+        await driver.stop()
+        return player, driver.i2s.capture
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def test_parse_wav_skips_other_chunks():
+    harness.install()
+    from audio.file_player import parse_wav, wav_header
+
+    header = wav_header(16000, 16, 1, 6)
+    # Insert an odd-sized LIST chunk (padded to even) between fmt and data
+    extra = b"LIST" + struct.pack("<I", 3) + b"abc\x00"
+    data = header[:36] + extra + header[36:] + b"\x01\x02\x03\x04\x05\x06"
+    f = io.BytesIO(data)
+    assert parse_wav(f) == (16000, 16, 1, 6)
+    assert f.read() == b"\x01\x02\x03\x04\x05\x06"
+
+    for bad in (b"RIFX" + header[4:], header[:20] + b"\x03\x00" + header[22:], header[:36]):
+        try:
+            parse_wav(io.BytesIO(bad))
+        except ValueError:
+            continue
+        raise AssertionError("accepted %r" % bad[:24])
+
+
+def test_wav_reaches_the_output_unchanged():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tone.wav")
+        pcm = write_test_wav(path, 0.25)
+        player, out = play_file(path)
+    assert player.format == (RATE, 16, 2) and player.loops == 1
+    assert player.bytes_read == player.bytes_played == len(pcm)
+    # Odd chunk size: reads are cut to whole frames of 1000 bytes
+    assert player.reads == -(-len(pcm) // 1000)
+    # The ring was primed before the output started: no leading silence
+    assert bytes(out[:len(pcm)]) == pcm
+
+
+def test_raw_8bit_mono_is_expanded():
+    samples = bytes((i * 7) & 0xFF for i in range(2001))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tone.raw")
+        with open(path, "wb") as f:
+            f.write(samples)
+        player, out = play_file(path, fmt=(RATE, 8, 1), chunk_size=512)
+    assert player.format == (RATE, 8, 1)
+    assert player.bytes_played == len(samples)
+    expected = []
+    for s in samples[:200]:
+        expected.extend(((s - 128) << 8,) * 2)
+    expected = struct.pack("<%dh" % len(expected), *expected)
+    assert bytes(out[:len(expected)]) == expected
+
+
+def test_other_rates_are_resampled():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tone16k.wav")
+        pcm = write_test_wav(path, 0.5, rate=16000)
+        player, out = play_file(path, tail=0.3)
+    assert player.format == (16000, 16, 2)
+    # Upsampling 16000 -> 22050 Hz plays about 22050/16000 as many frames
+    nonzero = len(bytes(out).rstrip(b"\x00"))
+    assert abs(nonzero / len(pcm) - RATE / 16000) < 0.02
+
+    harness.install()
+    from audio.i2s_driver import I2SDriver
+    from audio.file_player import FilePlayer
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tone8bit.wav")
+        write_test_wav(path, 0.01, rate=16000, bits=8)
+        with harness.quiet():
+            player = FilePlayer(I2SDriver(16, 17, 18, RATE))
+        with open(path, "rb") as f:
+            try:
+                player.open_format(f)
+            except ValueError:
+                return
+    raise AssertionError("8-bit audio at another rate was accepted")
+
+
+def test_soak_at_full_rate_without_underruns():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "soak.wav")
+        write_test_wav(path, 0.3)
+        r = run_file_soak(path, seconds=1.0, chunk_size=512)
+    assert r["underruns"] == 0 and r["starvations"] == 0
+    assert r["loops"] >= 3
+    # The file keeps pace with the I2S clock: one second of audio played
+    assert abs(r["bytes_played"] - RATE * 4) <= 2048
+    assert abs(r["bytes_out"] - RATE * 4) <= 512
+
+
+class SlowFile(io.FileIO):
+    """A file whose reads take 200 us of simulated time."""
+
+    def readinto(self, buf):
+        harness.virtual_clock.advance_us(200)
+        return super().readinto(buf)
+
+
+def test_read_time_is_counted_apart_from_playback():
+    harness.install()
+    import audio.file_player as file_player
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tone.wav")
+        pcm = write_test_wav(path, 0.1)
+        file_player.open = SlowFile
+        try:
+            total, us = file_player.read_throughput(path, 256)
+            assert total == len(pcm) + 44
+            # One extra read finds the end of the file
+            assert us == 200 * (-(-total // 256) + 1)
+
+            from audio.i2s_driver import I2SDriver
+
+            async def main():
+                driver = I2SDriver(16, 17, 18, RATE)
+                player = file_player.FilePlayer(driver, 512)
+                await player.play(path)
+                await driver.stop()
+                return player
+
+            with harness.quiet():
+                player = harness.run(main())
+        finally:
+            del file_player.open
+    # Only the time inside readinto() counts, not waiting for the I2S clock
+    assert player.read_us == 200 * player.reads
+    stats = player.get_stats()
+    assert stats["read_kbytes_per_sec"] == len(pcm) * 1000 // (200 * player.reads)
+    assert player.buffer_waits > 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
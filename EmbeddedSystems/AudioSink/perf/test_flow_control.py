@@ -0,0 +1,131 @@
+"""
+Credit Flow Control Tests (host-side)
+
+Checks ble/flow_control.py and its use by BLEAudioSink and
+BLEAudioAdapter: a central that writes [CMD_FLOW_CONTROL, FLOW_ON] gets
+its first credit limit straight away and the status byte with a limit
+from then on, while other centrals keep the one-byte status; the limit
+counts the packets received and wraps at 65536 on both sides. Then
+checks that a sender paced by tools/credit_sender.py never has a packet
+dropped over a link with dropouts, where an unpaced one does.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_flow_control.py
+"""
+
+import asyncio
+import os
+import struct
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from bench_flow_control import run_stream
+from tools.credit_sender import CreditPacer
+
+
+def test_status_carries_limit_only_when_enabled():
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from ble.flow_control import CREDIT_STATUS_FORMAT, FLOW_OFF
+    from config import BLE_NOTIFY_WINDOW_MS, CMD_FLOW_CONTROL, STATUS_PAUSED
+
+    ble = bluetooth.BLE()
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        sink = adapter.ble_sink
+        handles = sink._handles
+        ble.central_connect(0)
+        ble.central_connect(1)
+        ble.central_subscribe(handles["audio_status"], conn_handle=0)
+        pacer = CreditPacer()
+        del ble.notifications[:]
+        ble.central_write(handles["audio_control"], pacer.enable_command(), conn_handle=1)
+        # The first limit does not wait for the credit task
+        first = [n for n in ble.notifications if n[1] == handles["audio_status"]]
+        assert [n[0] for n in first] == [1]
+        pacer.on_status(first[0][2])
+        assert pacer.available() > 0
+
+        for _ in range(3):
+            ble.central_write(handles["audio_data"], bytes(240), conn_handle=1)
+        ble.central_write(handles["audio_data"], bytes(240), conn_handle=0)
+        assert sink.flow.get_stats()["connections"][1][0] == 3
+        await asyncio.sleep(0.1)
+
+        del ble.notifications[:]
+        sink.set_status(STATUS_PAUSED)
+        # The subscribed connection is notified once the window ends
+        await asyncio.sleep((BLE_NOTIFY_WINDOW_MS + 10) / 1000)
+        status = {n[0]: n[2] for n in ble.notifications if n[1] == handles["audio_status"]}
+        assert status[0] == bytes([STATUS_PAUSED])
+        assert struct.unpack(CREDIT_STATUS_FORMAT, status[1])[0] == STATUS_PAUSED
+        pacer.on_status(status[1])
+        assert pacer.status == STATUS_PAUSED
+        # The three packets sent are inside the new limit
+        pacer.on_sent(3)
+        assert pacer.limit >= 3
+
+        ble.central_write(handles["audio_control"], bytes([CMD_FLOW_CONTROL, FLOW_OFF]),
+                          conn_handle=1)
+        assert not sink.flow.is_enabled(1)
+        ble.central_disconnect(0)
+        ble.central_write(handles["audio_control"], pacer.enable_command(), conn_handle=0)
+        assert not sink.flow.is_enabled(0)
+        await adapter.stop()
+
+    with harness.quiet():
+        harness.run(main())
+
+
+def test_limit_wraps():
+    from ble.flow_control import CreditFlowControl
+
+    flow = CreditFlowControl()
+    flow.enable(5, True)
+    for _ in range(65530):
+        flow.received(5)
+    data = flow.status(5, 0, 10)
+    assert not flow.changed(5, 10) and flow.changed(5, 11)
+
+    pacer = CreditPacer()
+    pacer.enable_command()
+    assert pacer.available() == 0
+    pacer.on_sent(65530)
+    pacer.on_status(data)
+    assert pacer.limit == 4 and pacer.available() == 10
+    pacer.on_sent(10)
+    assert pacer.sent == 4 and pacer.available() == 0
+    # A limit lowered behind the count allows nothing rather than 65535
+    pacer.on_status(struct.pack("<BH", 0, 2))
+    assert pacer.available() == 0
+    # A short status leaves the limit alone
+    pacer.on_status(b"\x02")
+    assert pacer.status == 2 and pacer.limit == 2
+
+
+def test_paced_sender_is_never_dropped():
+    unpaced = run_stream(False, live=False, seconds=1.0, stall_ms=60)
+    paced = run_stream(True, live=False, seconds=1.0, stall_ms=60)
+    assert unpaced["dropped"] > 0
+    assert paced["dropped"] == 0 and paced["notifications"] > 0
+    # What the sink took is what the unpaced sender got through
+    assert paced["sent"] > 0.8 * (unpaced["sent"] - unpaced["dropped"])
+
+    # Without dropouts a paced live stream plays without a gap
+    live = run_stream(True, live=True, seconds=1.0, stall_ms=0)
+    assert live["dropped"] == 0 and live["underruns"] == 0 and live["waits"] == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
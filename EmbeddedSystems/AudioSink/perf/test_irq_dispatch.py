@@ -0,0 +1,98 @@
+"""
+IRQ Dispatcher Tests (host-side)
+
+Checks ble/irq_dispatch.py: events go to their handler, and those with
+a handle table to the handler of their attribute handle first, falling
+back to the event's handler and then to the unhandled one; handlers'
+results go back to the stack. Checks that BLEAudioSink routes its
+writes and L2CAP events through it. Routing times against the former
+if/elif chains are reported by perf/bench_irq_dispatch.py.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_irq_dispatch.py
+"""
+
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+
+
+def test_routes_by_event_and_handle():
+    from ble.irq_dispatch import IRQDispatcher
+
+    calls = []
+    irq = IRQDispatcher()
+    irq.on(1, lambda data: calls.append(("connect", data[0])))
+    irq.on(3, lambda data: calls.append(("write", data[1])))
+    irq.on_handle(3, 12, lambda data: calls.append(("audio", data[0])))
+    irq.on_handle(3, 40, lambda data: calls.append(("control", data[0])))
+    irq.on(22, lambda data: 1)
+
+    irq.dispatch(1, (5, 0, b""))
+    irq.dispatch(3, (5, 12))
+    irq.dispatch(3, (5, 40))
+    irq.dispatch(3, (5, 13))       # No entry: the event's handler
+    irq.dispatch(3, (5, 99))       # Beyond the table: the same
+    assert calls == [("connect", 5), ("audio", 5), ("control", 5), ("write", 13), ("write", 99)]
+    assert irq.dispatch(22, (5, 64, 0x80, 512, 512)) == 1
+
+    # Nothing for the event: the unhandled handler, else ignored
+    assert irq.dispatch(31, (0, 1, 0)) is None
+    irq.on_unhandled(lambda event, data: event)
+    assert irq.dispatch(31, (0, 1, 0)) == 31
+    irq.on(3, None)
+    irq.on_handle(3, 12, None)
+    assert irq.dispatch(3, (5, 12)) == 3
+
+    try:
+        irq.on_handle(3, -1, print)
+    except ValueError:
+        pass
+    else:
+        assert False, "negative handle accepted"
+
+
+def test_sink_routes_through_the_tables():
+    harness.install()
+    import bluetooth
+    from ble.ble_core import BLEAudioSink
+    from config import BLE_L2CAP_AUDIO_PSM, CMD_PLAY, STATUS_PLAYING
+
+    ble = bluetooth.BLE()
+    with harness.quiet():
+        sink = BLEAudioSink()
+    packets = []
+    sink.set_audio_data_callback(packets.append)
+    handles = sink._handles
+    with harness.quiet():
+        ble.central_connect(0)
+        ble.central_write(handles["audio_data"], b"\x01\x02\x03\x04")
+        ble.central_write(handles["latency_trace"], b"ignored")
+        ble.central_write(handles["audio_control"], bytes([CMD_PLAY]))
+    assert packets == [b"\x01\x02\x03\x04"]
+    assert sink.get_status() == STATUS_PLAYING
+
+    if sink.l2cap:
+        with harness.quiet():
+            cid = ble.central_l2cap_connect(BLE_L2CAP_AUDIO_PSM)
+            ble.central_l2cap_send(cid, b"\x05\x06\x07\x08")
+            # One audio channel at a time
+            assert ble.central_l2cap_connect(BLE_L2CAP_AUDIO_PSM) is None
+        assert packets[-1] == b"\x05\x06\x07\x08"
+        assert sink.l2cap.rejected == 1
+    with harness.quiet():
+        ble.central_disconnect(0)
+    assert not sink.is_connected()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
@@ -0,0 +1,89 @@
+"""
+Jitter Buffer Tests (host-side)
+
+Checks audio/jitter_buffer.py: reordered packets play in sequence
+order, a missing packet is reported as lost at its playout deadline,
+packets whose deadline has passed are dropped as late, and a stream of
+packets much smaller than a slot still ends prefill.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_jitter_buffer.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.jitter_buffer import JitterBuffer, LOST, UNDERRUN
+
+# 8 slots of 8 bytes, 1 kHz mono 16-bit (2 bytes per ms), 10 ms target;
+# drift compensation kept out of the way
+SLOTS = 8
+SLOT_SIZE = 8
+
+
+def _buffer(target_ms=10):
+    return JitterBuffer(SLOTS, SLOT_SIZE, 1000, 2, target_ms, adjust_interval=1000)
+
+
+def _packet(seq):
+    return bytes([seq]) * SLOT_SIZE
+
+
+def _drain(jb):
+    """Pop until underrun; return the first byte of each packet, None when lost."""
+    out = bytearray(SLOT_SIZE + 2)
+    played = []
+    while True:
+        n = jb.pop_into(out)
+        if n == UNDERRUN:
+            return played
+        played.append(None if n == LOST else out[0])
+
+
+def test_reordered_packets_play_in_order():
+    jb = _buffer()
+    for seq in (0, 3, 1, 2):       # The first packet starts the stream
+        assert jb.put(seq, _packet(seq))
+    assert jb.ready()
+    assert _drain(jb) == [0, 1, 2, 3]
+    assert jb.get_stats()["lost"] == 0
+
+
+def test_missing_packet_is_lost_at_its_deadline():
+    jb = _buffer()
+    for seq in (0, 2, 3):
+        assert jb.put(seq, _packet(seq))
+    assert _drain(jb) == [0, None, 2, 3]
+    assert jb.last_length == SLOT_SIZE
+    stats = jb.get_stats()
+    assert (stats["played"], stats["lost"]) == (3, 1)
+
+
+def test_late_and_duplicate_packets_are_dropped():
+    jb = _buffer()
+    for seq in (0, 1, 2):
+        assert jb.put(seq, _packet(seq))
+    assert not jb.put(2, _packet(2))        # Duplicate
+    assert _drain(jb)[:2] == [0, 1]
+    assert not jb.put(1, _packet(1))        # Already played
+    stats = jb.get_stats()
+    assert (stats["late"], stats["duplicates"]) == (1, 1)
+
+
+def test_small_packets_end_prefill():
+    # Target larger than the 6 slots prefill may use can hold
+    jb = _buffer(target_ms=48)
+    for seq in range(6):
+        assert jb.put(seq, bytes([seq] * 2))
+    assert jb.ready()
+    assert _drain(jb) == [0, 1, 2, 3, 4, 5]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
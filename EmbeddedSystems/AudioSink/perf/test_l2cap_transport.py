@@ -0,0 +1,126 @@
+"""
+L2CAP Transport Tests (host-side)
+
+Checks ble/l2cap_transport.py through BLEAudioSink on the fake radio:
+channel setup, SDU reads into the preallocated buffer, credits withheld
+while the sink is full, and the GATT vs L2CAP comparison from
+perf/bench_l2cap.py.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_l2cap_transport.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness
+from bench_l2cap import run_adapter_link, run_transport
+from bench_pipeline import measure
+
+
+def open_sink():
+    """BLEAudioSink with a connected central and a list of received reads."""
+    harness.install()
+    import bluetooth
+    from ble.ble_core import BLEAudioSink
+    with harness.quiet():
+        sink = BLEAudioSink()
+    reads = []
+    sink.set_audio_data_callback(lambda data: reads.append(bytes(data)))
+    ble = bluetooth.BLE()
+    with harness.quiet():
+        ble.central_connect()
+    return ble, sink, reads
+
+
+def connect(ble):
+    from config import BLE_L2CAP_AUDIO_PSM
+    with harness.quiet():
+        return ble.central_l2cap_connect(BLE_L2CAP_AUDIO_PSM)
+
+
+def test_one_channel_on_the_audio_psm():
+    ble, sink, reads = open_sink()
+    from config import BLE_L2CAP_AUDIO_PSM
+    assert ble.central_l2cap_connect(BLE_L2CAP_AUDIO_PSM + 2) is None
+    assert connect(ble) is not None
+    assert sink.l2cap.is_connected()
+    # A second channel is rejected while the first is open
+    assert connect(ble) is None
+    assert sink.l2cap.rejected == 1
+
+
+def test_sdu_is_read_in_slot_sized_pieces():
+    ble, sink, reads = open_sink()
+    from config import AUDIO_CHUNK_SIZE
+    cid = connect(ble)
+    sdu = bytes(i & 0xFF for i in range(AUDIO_CHUNK_SIZE + 100))
+    assert ble.central_l2cap_send(cid, sdu)
+    assert [len(r) for r in reads] == [AUDIO_CHUNK_SIZE, 100]
+    assert b"".join(reads) == sdu
+    assert ble.l2cap_credits(cid) == ble.l2cap_rx_sdus
+
+
+def test_full_sink_withholds_credits():
+    ble, sink, reads = open_sink()
+    room = [False]
+    sink.set_flow_control(lambda: room[0])
+    cid = connect(ble)
+
+    for i in range(ble.l2cap_rx_sdus):
+        assert ble.central_l2cap_send(cid, bytes([i]) * 8)
+    assert not reads
+    assert sink.l2cap.stalls == 1
+    # Nothing read, so the sender has no credits left
+    assert ble.l2cap_credits(cid) == 0
+    assert not ble.central_l2cap_send(cid, b"x" * 8)
+
+    room[0] = True
+    sink.l2cap.resume()
+    assert reads == [bytes([0]) * 8, bytes([1]) * 8]
+    assert ble.l2cap_credits(cid) == ble.l2cap_rx_sdus
+
+
+def test_disconnect_closes_the_channel():
+    ble, sink, reads = open_sink()
+    cid = connect(ble)
+    with harness.quiet():
+        ble.central_disconnect()
+    assert not sink.l2cap.is_connected()
+    with harness.quiet():
+        ble.central_connect()
+    assert connect(ble) not in (None, cid)
+
+
+def test_saturated_link_goodput():
+    gatt = run_transport("gatt", seconds=0.5)
+    l2cap = run_transport("l2cap", seconds=0.5)
+    # Both fill the link; L2CAP needs half the IRQs for the same bytes
+    assert l2cap["goodput_bytes_per_sec"] >= gatt["goodput_bytes_per_sec"] * 0.95
+    assert l2cap["irqs_per_kib"] <= gatt["irqs_per_kib"] / 2 + 0.1
+
+
+def test_overload_is_lossless_with_credits():
+    gatt = run_adapter_link("gatt", seconds=1.0, load=1.25)
+    l2cap = run_adapter_link("l2cap", seconds=1.0, load=1.25)
+    assert gatt["dropped"] > 0
+    assert l2cap["dropped"] == 0
+    assert l2cap["underruns"] == 0
+    # The surplus waits at the sender instead
+    assert l2cap["backlog"] > 0
+
+
+def test_l2cap_reads_allocate_less():
+    gatt = measure(run_transport, alloc=True, mode="gatt", seconds=0.25)
+    l2cap = measure(run_transport, alloc=True, mode="l2cap", seconds=0.25)
+    assert l2cap["alloc_bytes_per_kib"] < gatt["alloc_bytes_per_kib"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
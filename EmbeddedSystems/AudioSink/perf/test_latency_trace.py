@@ -0,0 +1,131 @@
+"""
+Latency Trace Tests (host-side)
+
+Checks audio/latency_trace.py on the virtual clock, so every stamp is
+exact, and follows traced packets through BLEAudioAdapter with
+perf/harness.py, reading the histograms back from the latency trace
+characteristic.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_latency_trace.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness
+from bench_pipeline import measure, run_adapter
+
+
+def fresh_trace(records=8):
+    harness.install()
+    from audio import latency_trace
+    return latency_trace, latency_trace.LatencyTrace(records)
+
+
+def send(trace, nbytes, queue_us=0, wait_us=0):
+    """Take one packet through receipt, enqueue, dequeue and buffering."""
+    trace.received()
+    harness.virtual_clock.advance_us(queue_us)
+    trace.enqueued()
+    harness.virtual_clock.advance_us(wait_us)
+    trace.dequeued()
+    trace.wrote(nbytes)
+    trace.buffered()
+
+
+def test_stage_latencies():
+    lt, trace = fresh_trace()
+    send(trace, 240, queue_us=10, wait_us=490)
+    harness.virtual_clock.advance_us(1000)
+    trace.submitted(100)                # Packet not fully submitted yet
+    assert trace.get_stage(lt.STAGE_TOTAL)["count"] == 0
+    harness.virtual_clock.advance_us(500)
+    trace.submitted(140)
+
+    assert trace.get_stage(lt.STAGE_QUEUE)["max_us"] == 10
+    assert trace.get_stage(lt.STAGE_WAIT)["max_us"] == 490
+    assert trace.get_stage(lt.STAGE_OUTPUT)["max_us"] == 1500
+    total = trace.get_stage(lt.STAGE_TOTAL)
+    assert total["count"] == 1 and total["min_us"] == 2000
+    # 2000 us falls in [1024, 2048): bucket 6 with a 32 us base
+    assert total["buckets"][6] == 1
+
+
+def test_one_block_completes_several_packets():
+    lt, trace = fresh_trace()
+    for _ in range(3):
+        send(trace, 100)
+    harness.virtual_clock.advance_us(300)
+    trace.submitted(512)
+    assert trace.get_stage(lt.STAGE_TOTAL)["count"] == 3
+
+
+def test_discarded_audio_is_not_measured():
+    lt, trace = fresh_trace()
+    send(trace, 240)
+    trace.discarded()
+    send(trace, 240)
+    harness.virtual_clock.advance_us(700)
+    trace.submitted(240)
+    total = trace.get_stage(lt.STAGE_TOTAL)
+    assert total["count"] == 1 and total["max_us"] == 700
+
+
+def test_backlog_is_played_first():
+    lt, trace = fresh_trace()
+    trace.reset(backlog=1000)
+    send(trace, 240)
+    trace.submitted(1000)
+    assert trace.get_stage(lt.STAGE_TOTAL)["count"] == 0
+    trace.submitted(240)
+    assert trace.get_stage(lt.STAGE_TOTAL)["count"] == 1
+
+
+def test_overflow_is_counted():
+    lt, trace = fresh_trace(records=4)
+    for _ in range(6):
+        send(trace, 10)
+    assert trace.overflows == 2
+    trace.submitted(60)
+    assert trace.get_stage(lt.STAGE_TOTAL)["count"] == 4
+
+
+def test_snapshot_round_trip():
+    lt, trace = fresh_trace()
+    for i in range(5):
+        send(trace, 240, wait_us=100 * i)
+        trace.submitted(240)
+    snap = trace.snapshot()
+    assert len(snap) == lt.SNAPSHOT_SIZE <= 240
+    parsed = lt.parse_snapshot(bytes(snap))
+    for stage in range(lt.STAGES):
+        expected = trace.get_stage(stage)
+        assert parsed["stages"][stage] == expected
+
+
+def test_adapter_tracing_end_to_end():
+    r = run_adapter(seconds=1.0, trace=True)
+    assert r["underruns"] == 0
+    stages = r["latency"]["stages"]
+    total = stages[3]
+    # Every packet but the few still buffered reached the I2S peripheral
+    assert r["packets"] - 32 <= total["count"] <= r["packets"] + 32
+    # Bounded by the driver's ring buffer and one engine block or two
+    assert 0 < total["min_us"] <= total["max_us"] < 30000
+
+
+def test_tracing_adds_no_allocation():
+    plain = measure(run_adapter, alloc=True, seconds=0.5)
+    traced = measure(run_adapter, alloc=True, seconds=0.5, trace=True)
+    assert traced["alloc_bytes_per_packet"] <= plain["alloc_bytes_per_packet"] + 8
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
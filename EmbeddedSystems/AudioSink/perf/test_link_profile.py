@@ -0,0 +1,160 @@
+"""
+Link Profile Tests (host-side)
+
+Checks ble/link_profile.py: a profile sets the radio's MTU (capped by
+the application's) and its intervals, a central connects at the
+profile's connection interval, and the MTU each connection exchanges
+and the parameters it is updated to are kept and reported. Checks that
+BLEAudioSink exchanges the MTU on connect, advertises at the profile's interval and
+switches profile with playback without advertising once stopped.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_link_profile.py
+"""
+
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+
+
+def test_profiles_configure_the_radio():
+    harness.install()
+    import bluetooth
+    from ble.link_profile import LinkProfile, PROFILES
+
+    ble = bluetooth.BLE()
+    link = LinkProfile(ble, "streaming")
+    assert ble.config("mtu") == PROFILES["streaming"][0]
+    assert link.interval_us == PROFILES["streaming"][1:3]
+
+    assert link.set_profile("idle")
+    assert not link.set_profile("idle")
+    assert ble.config("mtu") == 23
+    assert link.adv_interval_us == PROFILES["idle"][3]
+
+    capped = LinkProfile(ble, "streaming", max_mtu=200)
+    assert ble.config("mtu") == 200 and capped.mtu == 200
+
+    link.connect(0, b"\x01\x02\x03\x04\x05\x06")
+    assert ble.connect_params[3:] == (100000, 200000)
+
+    try:
+        link.set_profile("turbo")
+    except ValueError:
+        pass
+    else:
+        assert False, "unknown profile accepted"
+
+
+def test_negotiated_values_are_reported():
+    harness.install()
+    import bluetooth
+    from ble.irq_dispatch import IRQDispatcher
+    from ble.link_profile import LinkProfile
+
+    ble = bluetooth.BLE()
+    irq = IRQDispatcher()
+    ble.irq(irq.dispatch)
+    link = LinkProfile(ble, "streaming")
+    link.register(irq)
+    reports = []
+    link.set_callback(lambda *report: reports.append(report))
+
+    assert link.payload_size(4) == 20
+    ble.peer_mtu = 185
+    link.on_connect(4)
+    assert reports == [(4, 182, 0)]
+    assert link.payload_size(4) == 182
+
+    ble.central_connection_update(4, interval_us=15000, latency=2, timeout_ms=5000)
+    ble.central_connection_update(4, interval_us=7500, status=0x3B)    # Rejected
+    assert reports[-1] == (4, 182, 15000)
+    assert link.get_link(4) == (185, 15000, 2, 5000)
+
+    # Nothing is kept for connections that are not tracked
+    ble.central_connection_update(9)
+    link.on_disconnect(4)
+    assert link.get_link(4) is None
+    stats = link.get_stats()
+    assert (stats["mtu_exchanges"], stats["updates"], stats["links"]) == (1, 1, {})
+    ble.irq(None)
+
+
+def test_sink_exchanges_the_mtu_on_connect():
+    harness.install()
+    import bluetooth
+    from ble.ble_core import BLEAudioSink
+    from ble.link_profile import PROFILES
+    from config import BLE_MTU_SIZE, BLE_AUDIO_PACKET_SIZE
+
+    ble = bluetooth.BLE()
+    with harness.quiet():
+        sink = BLEAudioSink()
+    assert ble.config("mtu") == BLE_MTU_SIZE
+    assert ble.adv_interval_us == PROFILES["streaming"][3]
+    reports = []
+    sink.set_link_callback(lambda *report: reports.append(report))
+    with harness.quiet():
+        ble.central_connect(0)
+        ble.central_connect(1)
+        ble.central_connection_update(1, interval_us=7500)
+    assert reports == [(0, BLE_MTU_SIZE - 3, 0), (1, BLE_MTU_SIZE - 3, 0),
+                       (1, BLE_MTU_SIZE - 3, 7500)]
+    assert sink.link.payload_size(0) >= BLE_AUDIO_PACKET_SIZE
+
+    # A slot is still free, so advertising follows the profile
+    with harness.quiet():
+        sink.set_link_profile("idle")
+    assert ble.adv_interval_us == PROFILES["idle"][3]
+    with harness.quiet():
+        ble.central_disconnect(0)
+    assert sink.link.get_link(0) is None
+
+
+def test_adapter_switches_profile_with_playback():
+    harness.install()
+    import bluetooth
+    import uasyncio as asyncio
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from ble.link_profile import PROFILES
+    from config import CMD_PLAY
+
+    ble = bluetooth.BLE()
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        sink = adapter.ble_sink
+        handles = sink._handles
+        ble.central_connect(0)
+        ble.central_write(handles["audio_control"], bytes([CMD_PLAY, 0]))
+        await asyncio.sleep_ms(10)
+        assert sink.link.name == "interactive"
+        ble.central_write(handles["audio_control"], bytes([CMD_PLAY, 1]))
+        await asyncio.sleep_ms(10)
+        assert sink.link.name == "streaming"
+        assert adapter.get_stats()["link"]["links"][0][0] == ble.config("mtu")
+        await adapter.stop()
+        assert sink.link.name == "idle"
+        # Stopped: no centrals and no advertising, whatever the profile
+        assert not ble.connections and ble.advertising is None
+        sink.set_link_profile("streaming")
+        assert ble.advertising is None
+        sink.start_advertising()
+        assert ble.adv_interval_us == PROFILES["streaming"][3]
+
+    with harness.quiet():
+        harness.run(main())
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
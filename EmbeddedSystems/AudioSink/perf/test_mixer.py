@@ -0,0 +1,213 @@
+"""
+Multi-Source Mixer Tests (host-side)
+
+Checks audio/mixer.py and the saturating mix kernel: sources are summed
+with their own gains and clipped to the int16 range, a lone source at
+unity gain is read straight through, and a source only joins the mix
+once its buffer holds the prefill and leaves it when it runs dry. Then
+checks several centrals through BLEAudioSink (connection slots, FEC per
+connection) and BLEAudioAdapter, whose I2S output is the sum of the
+streams, and the figures of perf/bench_mixer.py.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_mixer.py
+"""
+
+import asyncio
+import os
+import struct
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from audio.mixer import Mixer
+from audio.ring_buffer import RingBuffer
+from audio.sample_kernels import Q15_UNITY, _mix_q15_py, mix_q15
+from bench_mixer import run_adapter_sources
+
+BLOCK = 64
+
+
+def pcm(*values):
+    return struct.pack("<%dh" % len(values), *values)
+
+
+def constant(value, size=BLOCK):
+    return pcm(*([value] * (size // 2)))
+
+
+def samples(buf, n=None):
+    n = len(buf) // 2 if n is None else n
+    return list(struct.unpack_from("<%dh" % n, buf, 0))
+
+
+def mixer_with(*blocks, prefill=0):
+    rings = [RingBuffer(4 * BLOCK) for _ in blocks]
+    for ring, block in zip(rings, blocks):
+        ring.write_into(block)
+    return Mixer(rings, BLOCK, prefill), rings
+
+
+def test_mix_kernel_adds_with_saturation():
+    for kernel in (_mix_q15_py, mix_q15):
+        dst = bytearray(pcm(1000, -1000, 30000, -30000))
+        kernel(pcm(500, 500, 5000, -5000), dst, 4, Q15_UNITY)
+        assert samples(dst) == [1500, -500, 32767, -32768]
+        dst = bytearray(pcm(100, 100))
+        kernel(pcm(1000, -1000), dst, 2, Q15_UNITY // 2)
+        assert samples(dst) == [600, -400]
+
+
+def test_single_unity_source_is_read_straight_through():
+    block = pcm(*range(-16, 16))
+    mixer, rings = mixer_with(block)
+    out = bytearray(BLOCK)
+    assert mixer.fill(out) == BLOCK
+    assert bytes(out) == block
+
+
+def test_sources_are_summed_with_their_gains():
+    mixer, rings = mixer_with(constant(1000), constant(2000), constant(-400))
+    mixer.set_gain(0, Q15_UNITY // 2)
+    out = bytearray(BLOCK)
+    assert mixer.fill(out) == BLOCK
+    assert set(samples(out)) == {500 + 2000 - 400}
+
+    # Loud sources clip instead of wrapping around
+    mixer, rings = mixer_with(constant(20000), constant(20000), constant(-5000))
+    mixer.fill(out)
+    assert set(samples(out)) == {32767 - 5000}
+
+
+def test_source_joins_after_prefill_and_leaves_when_dry():
+    rings = [RingBuffer(8 * BLOCK), RingBuffer(8 * BLOCK)]
+    mixer = Mixer(rings, BLOCK, prefill=3 * BLOCK)
+    out = bytearray(BLOCK)
+    rings[0].write_into(constant(100, 3 * BLOCK))
+    rings[1].write_into(constant(10, 2 * BLOCK))
+    # Only source 0 has its prefill; source 1 waits
+    assert mixer.fill(out) == BLOCK and set(samples(out)) == {100}
+    assert not mixer.is_playing(1)
+    rings[1].write_into(constant(10, BLOCK))
+    assert mixer.fill(out) == BLOCK and set(samples(out)) == {110}
+
+    # Source 0 has one block left, source 1 half a block after its second
+    rings[1].skip(BLOCK + BLOCK // 2)
+    assert mixer.fill(out) == BLOCK
+    assert samples(out) == [110] * (BLOCK // 4) + [100] * (BLOCK // 4)
+    assert list(mixer.underruns) == [0, 1] and not mixer.is_playing(1)
+
+    # Both dry: nothing to play, source 0 waits for its prefill again
+    assert mixer.fill(out) == 0
+    assert list(mixer.underruns) == [1, 1] and not mixer.is_playing(0)
+
+
+def test_later_source_longer_than_the_first_adds_onto_silence():
+    mixer, rings = mixer_with(constant(100, BLOCK + BLOCK // 2), constant(10, 2 * BLOCK))
+    out = bytearray(BLOCK)
+    mixer.fill(out)
+    out[:] = b"\xff" * BLOCK
+    # Source 0 only has half a block left
+    assert mixer.fill(out) == BLOCK
+    assert samples(out) == [110] * (BLOCK // 4) + [10] * (BLOCK // 4)
+
+
+def test_sink_takes_one_slot_per_central():
+    harness.install()
+    import bluetooth
+    from ble.ble_core import BLEAudioSink
+    from config import BLE_MAX_CONNECTIONS, CMD_SET_FEC
+    with harness.quiet():
+        sink = BLEAudioSink()
+        ble = bluetooth.BLE()
+        events = []
+        received = []
+        sink.set_connection_callback(lambda conn, up: events.append((conn, up)))
+        sink.set_audio_source_callback(lambda conn, data: received.append((conn, bytes(data))))
+        for conn in range(BLE_MAX_CONNECTIONS + 1):
+            ble.central_connect(conn)
+        # The extra central is disconnected straight away
+        assert sink.connection_count() == BLE_MAX_CONNECTIONS
+        assert BLE_MAX_CONNECTIONS not in ble.connections
+        assert events == [(conn, True) for conn in range(BLE_MAX_CONNECTIONS)]
+
+        control = sink._handles['audio_control']
+        ble.central_write(control, bytes([CMD_SET_FEC, 4]), conn_handle=1)
+        assert ble.notifications[-1] == (1, control, bytes([CMD_SET_FEC, 4]))
+        assert sink.get_fec(1).group_size == 4 and sink.get_fec(0).group_size == 0
+
+        data = sink._handles['audio_data']
+        ble.central_write(data, b"plain", conn_handle=0)
+        ble.central_write(data, bytes([0, 0]) + b"fec", conn_handle=1)
+        assert received == [(0, b"plain"), (1, b"fec")]
+
+        # A slot frees up for the next central
+        ble.central_disconnect(1)
+        assert events[-1] == (1, False) and sink.is_connected()
+        ble.central_connect(7)
+        assert sink.connection_count() == BLE_MAX_CONNECTIONS
+        assert sink.get_fec(7).group_size == 0
+
+
+def test_adapter_plays_the_sum_of_the_centrals():
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from config import AUDIO_SAMPLE_RATE, CMD_SET_SOURCE_GAIN
+
+    ble = bluetooth.BLE()
+    rate_hz = AUDIO_SAMPLE_RATE * 4 / 240
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        handles = adapter.ble_sink._handles
+        injectors = []
+        for conn, value in ((0, 1000), (1, 2000)):
+            ble.central_connect(conn)
+            packet = constant(value, 240)
+            injectors.append(ble.inject_writes(handles["audio_data"], rate_hz,
+                                               payload=lambda i, p=packet: p,
+                                               conn_handle=conn))
+        await asyncio.sleep(0.5)
+        i2s = adapter.i2s_driver.i2s
+        i2s.capture = bytearray()
+        await asyncio.sleep(0.1)
+        mixed = set(samples(i2s.capture))
+
+        ble.central_write(handles["audio_control"], bytes([CMD_SET_SOURCE_GAIN, 0]),
+                          conn_handle=1)
+        await asyncio.sleep(0.1)
+        i2s.capture = bytearray()
+        await asyncio.sleep(0.1)
+        muted = set(samples(i2s.capture))
+        for injector in injectors:
+            injector.stop()
+        await adapter.stop()
+        return mixed, muted
+
+    with harness.quiet():
+        mixed, muted = harness.run(main())
+    assert mixed == {3000}
+    assert muted == {1000}
+
+
+def test_each_central_streams_without_underruns():
+    for sources in (1, 3):
+        r = run_adapter_sources(sources, seconds=0.5)
+        assert r["connected"] == sources and r["playing"] == sources
+        assert r["packets"] in (183 * sources, 184 * sources)
+        assert r["underruns"] == 0
+        assert r["source_underruns"] == [0, 0, 0]
+        assert r["dropped"] == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
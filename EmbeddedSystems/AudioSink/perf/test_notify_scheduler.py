@@ -0,0 +1,172 @@
+"""
+Notification Scheduler Tests (host-side)
+
+Checks ble/notify_scheduler.py: updates within the window reach every
+subscribed connection as one notification of the latest value, nothing
+goes to connections that have not written the CCCD (or have cleared
+it), the per-connection budget holds notifications over to the next
+period, and a notification the stack refuses is sent again later.
+Checks that BLEAudioSink notifies status changes this way, from the
+adapter's task.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_notify_scheduler.py
+"""
+
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+
+
+def _scheduler(**kwargs):
+    """Scheduler on the fake radio with one notify characteristic."""
+    import bluetooth
+    from ble.irq_dispatch import IRQDispatcher
+    from ble.notify_scheduler import NotifyScheduler
+
+    ble = bluetooth.BLE()
+    irq = IRQDispatcher()
+    ble.irq(irq.dispatch)
+    ((handle,),) = ble.gatts_register_services(
+        ((bluetooth.UUID(0xA000), ((bluetooth.UUID(0xA001), bluetooth.FLAG_NOTIFY),)),))
+    notify = NotifyScheduler(ble, **kwargs)
+    notify.add(handle)
+    notify.register(irq)
+    irq.on(1, lambda data: notify.on_connect(data[0]))
+    irq.on(2, lambda data: notify.on_disconnect(data[0]))
+    return ble, notify, handle
+
+
+def test_updates_in_a_window_are_coalesced():
+    harness.install()
+    import time
+    ble, notify, handle = _scheduler(window_ms=20, budget=0)
+    for conn in (0, 1, 2):
+        ble.central_connect(conn)
+    ble.central_subscribe(handle, conn_handle=0)
+    ble.central_subscribe(handle, conn_handle=2)
+    assert notify.is_subscribed(2, handle) and not notify.is_subscribed(1, handle)
+
+    for k in range(5):
+        notify.update(handle, bytes([k]))
+    assert notify.poll() == 0               # Window still open
+    assert ble.notifications == []
+    assert ble.gatts_read(handle) == b"\x04"
+
+    time.sleep_ms(20)
+    assert notify.poll() == 2
+    assert sorted(ble.notifications) == [(0, handle, b"\x04"), (2, handle, b"\x04")]
+    assert notify.poll() == 0
+
+    # A cleared CCCD drops what was pending
+    notify.update(handle, b"\x05")
+    ble.central_subscribe(handle, conn_handle=2, notify=False)
+    time.sleep_ms(20)
+    notify.poll()
+    assert ble.notifications[-1] == (0, handle, b"\x05")
+    stats = notify.get_stats()
+    assert (stats["updates"], stats["coalesced"], stats["sent"]) == (6, 8, 3)
+    assert stats["subscribed"] == {0: 1, 1: 0, 2: 0}
+    ble.irq(None)
+
+
+def test_budget_holds_notifications_over():
+    harness.install()
+    import time
+    from ble.notify_scheduler import NotifyScheduler
+    ble, notify, handle = _scheduler(window_ms=0, budget=2, period_ms=100)
+    ble.central_connect(0)
+    ble.central_subscribe(handle, conn_handle=0)
+    for k in range(4):
+        notify.update(handle, bytes([k]))
+    # Two went out at once; the rest wait for the next period, merged
+    assert [n[2] for n in ble.notifications] == [b"\x00", b"\x01"]
+    assert notify.pending() == 1
+    time.sleep_ms(50)
+    assert notify.poll() == 0
+    time.sleep_ms(50)
+    assert notify.poll() == 1
+    assert ble.notifications[-1][2] == b"\x03"
+    assert notify.get_stats()["throttled"] == 2
+
+    # Every connection is notified when there is no CCCD to wait for
+    always = NotifyScheduler(ble, window_ms=0, budget=0)
+    always.add(handle, cccd=False)
+    always.on_connect(5)
+    always.update(handle, b"\x09")
+    assert ble.notifications[-1] == (5, handle, b"\x09")
+    try:
+        always.update(handle + 7)
+    except ValueError:
+        pass
+    else:
+        assert False, "unknown characteristic accepted"
+    ble.irq(None)
+
+
+def test_refused_notification_is_sent_again():
+    harness.install()
+    import time
+    ble, notify, handle = _scheduler(window_ms=10, budget=0, period_ms=30)
+    ble.central_connect(0)
+    ble.central_subscribe(handle, conn_handle=0)
+    sent = ble.gatts_notify
+
+    def full(conn_handle, value_handle, data=None):
+        raise OSError("ENOMEM")
+
+    ble.gatts_notify = full
+    notify.update(handle, b"\x01")
+    time.sleep_ms(10)
+    assert notify.poll() == 0 and notify.pending() == 1
+    ble.gatts_notify = sent
+    time.sleep_ms(30)
+    assert notify.poll() == 1
+    assert ble.notifications == [(0, handle, b"\x01")]
+    assert notify.get_stats()["refused"] == 1
+    ble.irq(None)
+
+
+def test_sink_notifies_subscribed_centrals_after_the_window():
+    harness.install()
+    import bluetooth
+    import uasyncio as asyncio
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from config import BLE_NOTIFY_WINDOW_MS, STATUS_PAUSED, STATUS_PLAYING
+
+    ble = bluetooth.BLE()
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        sink = adapter.ble_sink
+        status = sink._handles["audio_status"]
+        ble.central_connect(0)
+        ble.central_connect(1)
+        ble.central_subscribe(status, conn_handle=1)
+        del ble.notifications[:]
+        for k in range(6):
+            sink.set_status(STATUS_PLAYING if k % 2 else STATUS_PAUSED)
+        assert ble.notifications == []
+        await asyncio.sleep_ms(BLE_NOTIFY_WINDOW_MS + 10)
+        assert ble.notifications == [(1, status, bytes([STATUS_PLAYING]))]
+        stats = adapter.get_stats()
+        assert stats["notify"]["coalesced"] == 5
+        assert stats["connections"][1]["tx_packets"] == 1
+        await adapter.stop()
+
+    with harness.quiet():
+        harness.run(main())
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
@@ -0,0 +1,170 @@
+"""
+Wavetable Oscillator Tests (host-side)
+
+Checks audio/oscillator.py: the sine matches math.sin to within a few
+LSB at its amplitude and keeps its phase across blocks of any size, the
+square is band-limited below Nyquist, the sweep moves exponentially from
+f0 to f1 and repeats, the pink noise falls by about 3 dB per octave, and
+mono output and the table cache behave. Then checks that the test tone
+of audio_config fills its buffer from the oscillator.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_oscillator.py
+"""
+
+import cmath
+import math
+import os
+import struct
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from audio import oscillator
+from audio.oscillator import (Oscillator, WAVE_SINE, WAVE_SQUARE, WAVE_SWEEP, WAVE_PINK,
+                              SWEEP_BLOCK, PINK_BITS)
+
+RATE = 22050
+
+
+def render(osc, frames, block=256):
+    """Left channel of frames rendered in blocks."""
+    buf = bytearray(4 * block)
+    out = []
+    while len(out) < frames:
+        n = min(block, frames - len(out))
+        osc.fill(buf, n)
+        out.extend(struct.unpack_from("<%dh" % (2 * n), buf, 0)[0::2])
+    return out
+
+
+def level(samples, freq, rate=RATE):
+    """Amplitude of one frequency in samples (single-bin DFT)."""
+    w = -2j * math.pi * freq / rate
+    return 2 * abs(sum(v * cmath.exp(w * i) for i, v in enumerate(samples))) / len(samples)
+
+
+def test_sine_matches_math_sin():
+    osc = Oscillator(RATE, WAVE_SINE, 1000, amplitude=0.5)
+    samples = render(osc, 2000)
+    step = (osc._state[1] / (1 << oscillator.PHASE_BITS))
+    worst = max(abs(v - 16383.5 * math.sin(2 * math.pi * step * i)) for i, v in enumerate(samples))
+    assert worst < 8
+    # The quantised frequency is within a millihertz
+    assert abs(step * RATE - 1000) < 0.001
+
+
+def test_phase_is_continuous_across_blocks():
+    whole = render(Oscillator(RATE, WAVE_SINE, 441), 1000, block=1000)
+    for block in (1, 7, 128):
+        assert render(Oscillator(RATE, WAVE_SINE, 441), 1000, block) == whole
+    # Interleaved channels carry the same sample
+    buf = bytearray(40)
+    Oscillator(RATE, WAVE_SINE, 441).fill(buf)
+    samples = struct.unpack("<20h", buf)
+    assert samples[0::2] == samples[1::2]
+
+
+def test_square_is_band_limited():
+    for freq in (100, 1000, 5000):
+        osc = Oscillator(RATE, WAVE_SQUARE, freq, amplitude=1.0)
+        samples = render(osc, RATE // 10)
+        assert max(samples) > 32000 and min(samples) < -32000
+        fundamental = level(samples, freq)
+        if 3 * freq < RATE / 2:
+            assert level(samples, 3 * freq) / fundamental > 0.3
+        # Nothing at or above Nyquist that would alias back
+        harmonic = 3
+        while harmonic * freq < RATE / 2:
+            harmonic += 2
+        assert level(samples, (harmonic * freq) % RATE) / fundamental < 0.01
+        # No even harmonics
+        assert level(samples, 2 * freq) / fundamental < 0.01
+
+
+def test_sweep_moves_exponentially_and_repeats():
+    osc = Oscillator(RATE, WAVE_SINE, 440)
+    osc.sweep(100, 6400, 0.5)
+    assert osc.wave == WAVE_SWEEP and osc.frequency == 100
+    steps = int(0.5 * RATE) // SWEEP_BLOCK
+    render(osc, steps * SWEEP_BLOCK // 2)
+    # Half way through six octaves is three octaves up
+    assert abs(osc.frequency / 800 - 1) < 0.01
+    render(osc, steps * SWEEP_BLOCK // 2)
+    assert osc.sweeps == 1 and osc.frequency == 100
+    osc.reset()
+    assert osc.frequency == 100 and osc._state[0] == 0
+
+    # Zero crossings per block follow the frequency
+    osc.sweep(200, 8000, 1.0)
+    samples = render(osc, RATE)
+    def crossings(part):
+        return sum(1 for a, b in zip(part, part[1:]) if a < 0 <= b)
+    early = crossings(samples[:RATE // 10])
+    late = crossings(samples[-RATE // 10:])
+    assert late > 20 * early
+
+
+def test_pink_noise_falls_3db_per_octave():
+    osc = Oscillator(RATE, WAVE_PINK, amplitude=1.0)
+    size = 1 << PINK_BITS
+    samples = render(osc, size)
+    # The loop repeats exactly
+    assert render(osc, 64) == samples[:64]
+    assert abs(sum(samples)) / size < 200
+
+    def band_power(lo):
+        # Power in DFT bins lo..2*lo of the loop, sampled at 8 bins
+        bins = [lo + lo * k // 8 for k in range(8)]
+        return sum(level(samples, b * RATE / size) ** 2 for b in bins) / len(bins)
+
+    # Per-bin power falls 3 dB an octave: 1/8 over three octaves
+    ratio = band_power(256) / band_power(32)
+    assert 1 / 16 < ratio < 1 / 4
+
+
+def test_mono_and_table_cache():
+    osc = Oscillator(RATE, WAVE_SINE, 1000, channels=1)
+    buf = bytearray(20)
+    assert osc.fill(buf) == 10
+    stereo = bytearray(40)
+    Oscillator(RATE, WAVE_SINE, 1000).fill(stereo)
+    assert struct.unpack("<10h", buf) == struct.unpack("<20h", stereo)[0::2]
+
+    # Tables are shared and rebuilt after clear_tables()
+    assert Oscillator(RATE)._table is osc._table
+    oscillator.clear_tables()
+    assert Oscillator(RATE)._table is not osc._table
+    for bad in ((RATE, WAVE_SINE, RATE / 2), (RATE, 9, 440)):
+        try:
+            Oscillator(*bad)
+        except ValueError:
+            continue
+        raise AssertionError("accepted %r" % (bad,))
+
+
+def test_audio_config_test_tone():
+    harness.install()
+    from audio.audio_config import generate_test_tone
+    from config import AUDIO_SAMPLE_RATE
+
+    # 2005 frames hold exactly 40 cycles of 440 Hz at 22050 Hz
+    buf = bytearray(2005 * 4 + 2)
+    generate_test_tone(buf, len(buf))
+    samples = struct.unpack("<4010h", buf[:-2])
+    assert samples[0::2] == samples[1::2]
+    assert 16000 < max(samples) < 16400
+    assert abs(level(samples[0::2], 440, AUDIO_SAMPLE_RATE) - 16383) < 20
+    # The partial frame is left alone
+    assert buf[-2:] == b"\x00\x00"
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
@@ -0,0 +1,243 @@
+"""
+Packet Capture and Replay Tests (host-side)
+
+Checks audio/packet_capture.py: records survive the round trip through
+the log in order with their timestamps, records arriving while a flush
+is behind are dropped and counted instead of overwriting buffered ones,
+and the flush task writes a half-full buffer without waiting for its
+interval, and a session longer than the ticks_us() wrap replays with its
+recorded spacing. Then checks capture through BLEAudioAdapter (CMD_CAPTURE on
+the control characteristic, packets logged before FEC), that replaying
+a recorded session with its timing gives the same I2S output every
+time, and that replaying as fast as possible takes no simulated time.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_packet_capture.py
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import tempfile
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from bench_replay import record_session, replay_adapter
+
+
+def read_log(path, realtime=False):
+    """Replay a log into a list of (time us, kind, conn, payload)."""
+    from audio.packet_capture import PacketReplayer
+    records = []
+
+    def handler(kind, conn, data):
+        records.append((harness.virtual_clock.now_us(), kind, conn, bytes(data)))
+
+    harness.run(PacketReplayer(path).play(handler, realtime))
+    return records
+
+
+def test_records_round_trip_in_order():
+    harness.install()
+    from audio.packet_capture import (PacketCapture, KIND_AUDIO, KIND_CONTROL,
+                                      KIND_CONNECT, HEADER_SIZE, RECORD_SIZE)
+    clock = harness.virtual_clock
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log.apc")
+        capture = PacketCapture(path, buffer_size=256)
+        capture.record(KIND_CONNECT, 3)
+        clock.advance_us(1500)
+        capture.record(KIND_CONTROL, 3, b"\x0b\x04")
+        capture.flush()
+        clock.advance_us(20000)
+        capture.record(KIND_AUDIO, 3, memoryview(b"abcdef")[1:5])
+        capture.close()
+        assert os.path.getsize(path) == HEADER_SIZE + 3 * RECORD_SIZE + 2 + 4
+        assert capture.get_stats()["flushes"] == 2
+
+        records = read_log(path)
+        assert [r[1:] for r in records] == [(KIND_CONNECT, 3, b""), (KIND_CONTROL, 3, b"\x0b\x04"),
+                                            (KIND_AUDIO, 3, b"bcde")]
+        # With the recorded timing the spacing comes back, to the millisecond
+        start = clock.now_us()
+        records = read_log(path, realtime=True)
+        for record, recorded in zip(records, (0, 1500, 21500)):
+            assert 0 <= recorded - (record[0] - start) < 1000
+
+
+def test_replay_spacing_survives_the_ticks_wrap():
+    harness.install()
+    from audio.packet_capture import PacketCapture, KIND_AUDIO
+    clock = harness.virtual_clock
+    # Records 5 minutes apart: the last is past the 2**29 us ticks_diff
+    # range from the first, and the ticks wrap at 2**30 on the way
+    gaps = (0, 300000000, 300000000, 300000000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "long.apc")
+        capture = PacketCapture(path, buffer_size=256)
+        for i, gap in enumerate(gaps):
+            clock.advance_us(gap)
+            capture.record(KIND_AUDIO, 0, bytes([i]))
+        capture.close()
+
+        start = clock.now_us()
+        records = read_log(path, realtime=True)
+    assert [r[3] for r in records] == [bytes([i]) for i in range(len(gaps))]
+    recorded = 0
+    for record, gap in zip(records, gaps):
+        recorded += gap
+        assert 0 <= recorded - (record[0] - start) < 1000
+
+
+def test_full_buffer_drops_new_records():
+    harness.install()
+    from audio.packet_capture import PacketCapture, KIND_AUDIO, RECORD_SIZE
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log.apc")
+        capture = PacketCapture(path, buffer_size=4 * (RECORD_SIZE + 8))
+        for i in range(6):
+            capture.record(KIND_AUDIO, 0, bytes([i]) * 8)
+        assert capture.records == 4 and capture.dropped == 2
+        # After a flush the other buffer takes records again
+        capture.flush()
+        capture.record(KIND_AUDIO, 0, bytes([9]) * 8)
+        capture.close()
+        capture.record(KIND_AUDIO, 0, b"late")
+        assert capture.dropped == 3
+        assert [r[3][0] for r in read_log(path)] == [0, 1, 2, 3, 9]
+
+
+def test_half_full_buffer_is_flushed_early():
+    harness.install()
+    from audio.packet_capture import PacketCapture, KIND_AUDIO, RECORD_SIZE
+    clock = harness.virtual_clock
+
+    async def main():
+        capture = PacketCapture(os.path.join(tmp, "log.apc"), buffer_size=1024, flush_ms=500)
+        task = asyncio.create_task(capture.run())
+        await asyncio.sleep(0.01)
+        capture.record(KIND_AUDIO, 0, bytes(100))
+        await asyncio.sleep(0.1)
+        assert capture.flushes == 0
+        for _ in range(4):
+            capture.record(KIND_AUDIO, 0, bytes(100))
+        start = clock.now_us()
+        while not capture.flushes:
+            await asyncio.sleep(0)
+        woke_after = clock.now_us() - start
+        capture.close()
+        await task
+        return woke_after, capture
+
+    with tempfile.TemporaryDirectory() as tmp:
+        woke_after, capture = harness.run(main())
+    assert woke_after == 0
+    assert capture.records == 5 and capture.bytes > 5 * (RECORD_SIZE + 100)
+
+
+def test_adapter_captures_on_command():
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from audio.packet_capture import (KIND_AUDIO, KIND_CONTROL, KIND_CONNECT, KIND_DISCONNECT,
+                                      CAPTURE_ON, CAPTURE_OFF)
+    from config import CAPTURE_PATH, CMD_CAPTURE, CMD_SET_FEC
+
+    ble = bluetooth.BLE()
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        handles = adapter.ble_sink._handles
+        ble.central_connect(0)
+        ble.central_write(handles["audio_data"], b"before")
+        ble.central_write(handles["audio_control"], bytes([CMD_CAPTURE, CAPTURE_ON]))
+        ble.central_write(handles["audio_control"], bytes([CMD_SET_FEC, 2]))
+        # An FEC frame is logged as received: sequence header and all
+        frame = struct.pack("<H", 0) + bytes(8)
+        ble.central_write(handles["audio_data"], frame)
+        await asyncio.sleep(0.6)
+        assert adapter.get_stats()["capture"]["flushes"] >= 1
+        ble.central_disconnect(0)
+        ble.central_connect(1)
+        ble.central_write(handles["audio_control"], bytes([CMD_CAPTURE, CAPTURE_OFF]), conn_handle=1)
+        ble.central_write(handles["audio_data"], b"after", conn_handle=1)
+        assert adapter.capture is None and adapter.ble_sink.capture is None
+        await adapter.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            with harness.quiet():
+                harness.run(main())
+            records = read_log(CAPTURE_PATH)
+        finally:
+            os.chdir(cwd)
+    # The command that starts the capture comes before it, the one that
+    # stops it is the last record
+    assert [r[1:] for r in records] == [
+        (KIND_CONTROL, 0, bytes([CMD_SET_FEC, 2])),
+        (KIND_AUDIO, 0, struct.pack("<H", 0) + bytes(8)),
+        (KIND_DISCONNECT, 0, b""),
+        (KIND_CONNECT, 1, b""),
+        (KIND_CONTROL, 1, bytes([CMD_CAPTURE, CAPTURE_OFF])),
+    ]
+
+
+def test_replay_reproduces_the_session():
+    def output(play):
+        harness.install()
+        from audio.ble_audio_adapter import BLEAudioAdapter
+
+        async def main():
+            adapter = BLEAudioAdapter()
+            await adapter.start()
+            i2s = adapter.i2s_driver.i2s
+            i2s.capture = bytearray()
+            await play(adapter)
+            await asyncio.sleep(0.2)
+            await adapter.stop()
+            return bytes(i2s.capture), adapter.i2s_driver.engine.underruns
+
+        with harness.quiet():
+            return harness.run(main())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.apc")
+        stats = record_session(path, seconds=0.5, jitter_ms=20, loss=0.05)
+        assert stats["dropped"] == 0 and stats["records"] == stats["sent"] + 2
+
+        async def replay(adapter):
+            from audio.packet_capture import PacketReplayer
+            await PacketReplayer(path).play(adapter.ble_sink.replay)
+
+        first = output(replay)
+        second = output(replay)
+    # Deterministic: the same log gives the same output, underruns included
+    assert first == second
+    assert len(first[0].strip(b"\x00")) > 0.4 * 22050 * 4
+
+
+def test_fast_replay_takes_no_simulated_time():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.apc")
+        sent = record_session(path, seconds=0.5)["sent"]
+        timed = replay_adapter(path, realtime=True)
+        fast = replay_adapter(path, realtime=False)
+    assert timed["packets"] == fast["packets"] == sent
+    assert timed["dropped"] == 0
+    assert 0.49 < timed["sim_s"] < 0.51 and timed["late_us"] < 1000
+    assert fast["sim_s"] == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
@@ -0,0 +1,94 @@
+"""
+Packet Queue Tests (host-side)
+
+Checks the ingest queue used by BLEAudioAdapter: arrival order is kept,
+overflows are counted instead of blocking the producer, and a producer
+and consumer on separate threads never see a torn or reordered packet.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_packet_queue.py
+"""
+
+import os
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.packet_queue import PacketQueue
+from audio.packet_queue import test_packet_queue as packet_queue_self_test
+
+
+def test_in_module():
+    assert packet_queue_self_test()
+
+
+def test_overflow_counts_and_keeps_oldest():
+    q = PacketQueue(8, 16)
+    for seq in range(20):
+        q.put(struct.pack('<H', seq))
+    assert q.overflows == 12 and q.high_water == 8
+    seqs = []
+    while not q.is_empty():
+        seqs.append(struct.unpack_from('<H', q.peek())[0])
+        q.release()
+    assert seqs == list(range(8))
+
+
+def test_discard_counts_dropped():
+    q = PacketQueue(4, 4)
+    q.put(b'a')
+    q.put(b'b')
+    q.discard()
+    assert q.is_empty() and q.dropped == 2
+    assert q.put(b'c') and q.peek() == b'c'
+
+
+def test_threaded_order():
+    q = PacketQueue(16, 64)
+    total = 5000
+    received = []
+    done = threading.Event()
+
+    def producer():
+        seq = 0
+        while seq < total:
+            # Variable length, filled with the sequence so tearing shows
+            size = 2 + seq % 60
+            packet = bytes([seq & 0xFF]) * size
+            if q.put(struct.pack('<H', seq) + packet[2:]):
+                seq += 1
+            else:
+                time.sleep(0)
+        done.set()
+
+    def consumer():
+        while not (done.is_set() and q.is_empty()):
+            packet = q.peek()
+            if packet is None:
+                time.sleep(0)
+                continue
+            seq = struct.unpack_from('<H', packet)[0]
+            assert len(packet) == 2 + seq % 60
+            assert all(b == seq & 0xFF for b in packet[2:])
+            received.append(seq)
+            q.release()
+
+    threads = [threading.Thread(target=producer), threading.Thread(target=consumer)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert received == list(range(total))
+    assert q.enqueued == q.dequeued == total
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
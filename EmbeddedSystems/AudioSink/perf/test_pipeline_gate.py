@@ -0,0 +1,94 @@
+"""
+Pipeline Regression Gate (host-side)
+
+Runs the scenarios from perf/bench_pipeline.py on simulated time and
+checks the deterministic results: packet rates, underruns, overruns and
+heap allocation on the packet path. Host CPU times vary between
+machines and are not checked.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_pipeline_gate.py
+"""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import measure, run_adapter, run_ble_audio, run_i2s_audio
+
+SECONDS = 1.0
+
+# Heap bytes per packet on the ingest path. Under CPython this includes
+# the bytes object gatts_read() returns (the firmware gets one too) and
+# interpreter overhead such as memoryview objects.
+ADAPTER_ALLOC_PER_PACKET = 512
+BLE_AUDIO_ALLOC_PER_PACKET = 1024
+HEAP_GROWTH_LIMIT = 4096
+
+# I2SAudio polls its ring buffer from a task and sleeps 10 ms when less
+# than a chunk is buffered, which lets the DMA run dry; keep it from
+# getting worse until it moves to the IRQ-driven engine
+I2S_AUDIO_STARVATIONS = 40
+
+
+def test_adapter_nominal_rate_is_clean():
+    r = run_adapter(seconds=SECONDS)
+    assert r["packets"] in (367, 368)
+    assert r["underruns"] == 0
+    assert r["starvations"] == 0
+    assert r["overruns"] == 0
+    assert r["dropped"] == 0
+
+
+def test_adapter_overload_reports_overruns():
+    r = run_adapter(seconds=SECONDS, load=1.25)
+    assert r["overruns"] > 0 and r["dropped"] > 0
+    assert r["underruns"] == 0
+
+
+def test_adapter_underload_reports_underruns():
+    r = run_adapter(seconds=SECONDS, load=0.9)
+    assert r["underruns"] > 0
+    assert r["overruns"] == 0 and r["dropped"] == 0
+
+
+def test_ble_audio_nominal_rate_is_clean():
+    r = run_ble_audio(seconds=SECONDS)
+    assert r["packets"] in (735, 736)
+    assert r["underruns"] == 0
+    assert r["starvations"] == 0
+    assert r["dropped"] == 0
+
+
+def test_i2s_audio_baseline():
+    r = run_i2s_audio(seconds=SECONDS)
+    assert r["packets"] > 0
+    assert r["starvations"] <= I2S_AUDIO_STARVATIONS, r["starvations"]
+
+
+def test_runs_are_deterministic():
+    counters = ("packets", "underruns", "starvations", "overruns", "dropped")
+    first = run_adapter(seconds=0.5)
+    second = run_adapter(seconds=0.5)
+    assert [first[k] for k in counters] == [second[k] for k in counters]
+
+
+def test_packet_path_allocations():
+    r = measure(run_adapter, alloc=True, seconds=0.5)
+    assert r["alloc_bytes_per_packet"] < ADAPTER_ALLOC_PER_PACKET, r["alloc_bytes_per_packet"]
+    assert r["heap_growth_bytes"] < HEAP_GROWTH_LIMIT, r["heap_growth_bytes"]
+
+    r = measure(run_ble_audio, alloc=True, seconds=0.5)
+    assert r["alloc_bytes_per_packet"] < BLE_AUDIO_ALLOC_PER_PACKET, r["alloc_bytes_per_packet"]
+    assert r["heap_growth_bytes"] < HEAP_GROWTH_LIMIT, r["heap_growth_bytes"]
+    assert not tracemalloc.is_tracing()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
@@ -0,0 +1,274 @@
+"""
+Timestamped Playout Tests (host-side)
+
+Checks audio/playout_clock.py: the offset settles on the fastest
+packets, follows a drifting sender clock in limited steps, starts again
+when the sender's clock jumps, and works across the 2**30 wrap of the
+timestamps. Then streams timestamped packets into ble/ble_audio.py over
+a link with random delays and checks that a packet comes out at its
+timestamp plus the transit delay of the fastest packets plus
+PLAYOUT_LATENCY_MS whatever the jitter (to within a frame on a steady
+link); that this holds for a sender whose clock runs fast or slow; and that a
+packet missing on the link is concealed in its place. Last, a central
+turns timestamps on through the control characteristic of
+BLEAudioAdapter, whose ingest lines its packets up the same way.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_playout_clock.py
+"""
+
+import asyncio
+import os
+import random
+import struct
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+
+PTS_MASK = 0x3FFFFFFF
+FRAMES = 60                     # 240-byte stereo packets
+
+
+class TimedSender:
+    """
+    Virtual-clock sender of timestamped packets over a jittery link.
+
+    Packet i holds FRAMES frames of the value i + 1 and is produced at
+    the sender's audio rate, which is ppm faster than the sink's. It
+    arrives transit_us plus a random 0 to jitter_us later; packets in
+    lose are never delivered. rate defaults to the ble_audio sample rate;
+    in_order holds a packet back behind a slower one before it, as GATT
+    delivers.
+    """
+
+    def __init__(self, ble, handle, count, transit_us, jitter_us, ppm=0, clock_us=0,
+                 lose=(), seed=1, rate=None, in_order=False):
+        from ble.ble_config import AUDIO_SAMPLE_RATE
+        rate = rate or AUDIO_SAMPLE_RATE
+        self._ble = ble
+        self._handle = handle
+        rng = random.Random(seed)
+        start = harness.virtual_clock.now_us()
+        interval = FRAMES * 1e6 / (rate * (1 + ppm * 1e-6))
+        self.pts = []
+        self.sent = []
+        schedule = []
+        arrival = 0
+        for i in range(count):
+            sent = start + i * interval
+            # The sender's clock runs ppm fast along with its audio
+            pts = int(clock_us + (sent - start) * (1 + ppm * 1e-6)) & PTS_MASK
+            self.pts.append(pts)
+            self.sent.append(sent)
+            if i in lose:
+                continue
+            delayed = int(sent) + transit_us + rng.randint(0, jitter_us)
+            arrival = max(arrival, delayed) if in_order else delayed
+            value = (i + 1) & 0x7FFF
+            data = struct.pack("<HI", i & 0xFFFF, pts) + struct.pack("<hh", value, value) * FRAMES
+            schedule.append((arrival, i, data))
+        schedule.sort()
+        self._schedule = schedule
+        self._next = 0
+        harness.virtual_clock.register(self)
+
+    def next_event_us(self):
+        if self._next < len(self._schedule):
+            return self._schedule[self._next][0]
+        return None
+
+    def run_until(self, t):
+        while self._next < len(self._schedule) and self._schedule[self._next][0] <= t:
+            self._ble.central_write(self._handle, self._schedule[self._next][2])
+            self._next += 1
+
+
+def stream(count=600, transit_us=3000, jitter_us=0, ppm=0, clock_us=12345, lose=(), seed=1):
+    """
+    Play a timestamped stream through ble_audio.
+
+    Returns:
+        tuple: (sender, output start us, captured output, ble_audio stats)
+    """
+    harness.install()
+    import bluetooth
+    from ble import ble_audio
+    from ble.ble_config import SVC_AUDIO, CHAR_AUDIO_DATA, AUDIO_SAMPLE_RATE
+
+    ble = bluetooth.BLE()
+
+    async def main():
+        ble_audio.init()
+        ble_audio.set_timestamps(True)
+        ((handle,),) = ble.gatts_register_services((
+            (bluetooth.UUID(SVC_AUDIO),
+             ((bluetooth.UUID(CHAR_AUDIO_DATA),
+               bluetooth.FLAG_WRITE | bluetooth.FLAG_WRITE_NO_RESPONSE),)),
+        ))
+
+        def irq(event, data):
+            if event == bluetooth.IRQ_GATTS_WRITE:
+                ble_audio.process_audio_data(ble.gatts_read(data[1]))
+
+        ble.irq(irq)
+        i2s = ble_audio._i2s
+        i2s.capture = bytearray()
+        sender = TimedSender(ble, handle, count, transit_us, jitter_us, ppm, clock_us, lose, seed)
+        await asyncio.sleep(count * FRAMES / AUDIO_SAMPLE_RATE + 0.2)
+        result = (sender, i2s._stream_start_us, bytes(i2s.capture), ble_audio.get_stats())
+        ble_audio.set_timestamps(False)
+        ble_audio.deinit()
+        return result
+
+    with harness.quiet():
+        return harness.run(main())
+
+
+def play_time(start_us, output, i, rate=None):
+    """Virtual time at which the first frame of packet i played, or None."""
+    from ble.ble_config import AUDIO_SAMPLE_RATE
+    rate = rate or AUDIO_SAMPLE_RATE
+    value = (i + 1) & 0x7FFF
+    marker = struct.pack("<hh", value, value)
+    for k in range(0, len(output), 4):
+        if output[k:k + 4] == marker:
+            return start_us + k // 4 * 1000000 / rate
+    return None
+
+
+def test_offset_settles_on_fastest_packets():
+    harness.install()
+    from audio.playout_clock import PlayoutClock
+
+    clock = PlayoutClock(10, window=8, history=2, slew_us=50)
+    assert clock.due_us(0) is None
+    rng = random.Random(3)
+    for i in range(8):
+        pts = 1000 * i
+        clock.observe(pts, pts + 5000 + (0 if i == 5 else rng.randint(1, 3000)))
+    # The first window moves straight to the fastest packet
+    assert clock.offset == 5000 and clock.updates == 1
+    assert clock.due_us(70000) == 70000 + 5000 + 10000
+
+    # Slower from here on: once no window kept has a faster packet, the
+    # offset moves 50 us a window
+    for i in range(8, 16):
+        clock.observe(1000 * i, 1000 * i + 6000)
+    assert clock.offset == 5000
+    for i in range(16, 32):
+        clock.observe(1000 * i, 1000 * i + 6000)
+    assert clock.offset == 5100
+    # A restarted sender clock starts the estimate again
+    clock.observe(5000000, 12345678)
+    assert clock.restarts == 1 and clock.offset == 12345678 - 5000000
+
+
+def test_offset_works_across_the_wrap():
+    harness.install()
+    import time
+    from audio.playout_clock import PlayoutClock
+
+    clock = PlayoutClock(20, window=4)
+    base = PTS_MASK - 2500
+    for i in range(8):
+        pts = (base + 1000 * i) & PTS_MASK
+        clock.observe(pts, time.ticks_add(pts, -700))
+    assert clock.restarts == 0 and clock.offset == -700
+    assert clock.due_us(3) == 3 - 700 + 20000
+
+
+def test_latency_is_fixed_whatever_the_jitter():
+    from ble.ble_config import PLAYOUT_LATENCY_MS
+    expected = 3000 + PLAYOUT_LATENCY_MS * 1000
+    for jitter_us, seed in ((0, 1), (15000, 1), (15000, 2), (40000, 3)):
+        sender, start, output, stats = stream(jitter_us=jitter_us, seed=seed)
+        # Sent, then out the fastest transit plus the latency later: to
+        # within a frame on a steady link, plus the spread of the fastest
+        # packets of the windows kept on a jittery one
+        tolerance = 25 + jitter_us // 80
+        for i in (300, 450, 590):
+            t = play_time(start, output, i) - sender.sent[i]
+            assert abs(t - expected) < tolerance, (jitter_us, seed, i, t)
+        assert stats['playout']['late'] == 0 or jitter_us
+        assert stats['playout']['frames_trimmed'] == 0
+
+
+def test_drifting_sender_clock_is_followed():
+    from ble.ble_config import PLAYOUT_LATENCY_MS
+    expected = 3000 + PLAYOUT_LATENCY_MS * 1000
+    for ppm, fix in ((500, 'frames_dropped'), (-500, 'frames_inserted')):
+        sender, start, output, stats = stream(count=1500, jitter_us=5000, ppm=ppm)
+        # The sender's audio and clock run fast (slow): frames are dropped
+        # (repeated) to keep its packets at the same latency
+        for i in (300, 800, 1400):
+            t = play_time(start, output, i) - sender.sent[i]
+            assert abs(t - expected) < 150, (ppm, i, t)
+        assert stats['playout'][fix] > 20
+        assert stats['playout']['updates'] > 10
+
+
+def test_missing_packet_is_concealed_in_place():
+    sender, start, output, stats = stream(count=300, jitter_us=2000, lose=(150,))
+    # Not played: at most a few frames of the cross-fade from 149 to 151
+    # pass through its value
+    marker = struct.pack("<hh", 151, 151)
+    assert sum(output[k:k + 4] == marker for k in range(0, len(output), 4)) < FRAMES // 4
+    assert stats['jitter']['lost'] == 1 and stats['playout']['late'] == 0
+    # The packets after it still play on time
+    from ble.ble_config import PLAYOUT_LATENCY_MS
+    t = play_time(start, output, 152) - sender.sent[152]
+    assert abs(t - 3000 - PLAYOUT_LATENCY_MS * 1000) < 50
+
+
+
+def test_adapter_plays_timestamped_central_at_its_latency():
+    harness.install()
+    import bluetooth
+    from audio.ble_audio_adapter import BLEAudioAdapter
+    from config import AUDIO_SAMPLE_RATE, CMD_SET_TIMESTAMPS, PLAYOUT_LATENCY_MS
+
+    ble = bluetooth.BLE()
+
+    async def main():
+        adapter = BLEAudioAdapter()
+        await adapter.start()
+        handles = adapter.ble_sink._handles
+        ble.central_connect(0)
+        control = handles["audio_control"]
+        ble.central_write(control, bytes([CMD_SET_TIMESTAMPS, 1]))
+        await asyncio.sleep(0.01)
+        assert ble.notifications[-1] == (0, control, bytes([CMD_SET_TIMESTAMPS, 1]))
+        i2s = adapter.i2s_driver.i2s
+        i2s.capture = bytearray()
+        # The capture starts with the audio still queued in the DMA buffer
+        start = harness.virtual_clock.now_us() + i2s.queued_bytes() * 1000000 // (AUDIO_SAMPLE_RATE * 4)
+        sender = TimedSender(ble, handles["audio_data"], 200, 3000, 8000, seed=4,
+                             rate=AUDIO_SAMPLE_RATE, in_order=True)
+        await asyncio.sleep(200 * FRAMES / AUDIO_SAMPLE_RATE + 0.1)
+        stats = adapter.get_stats()["playout"]
+        await adapter.stop()
+        return sender, start, bytes(i2s.capture), stats
+
+    with harness.quiet():
+        sender, start, output, stats = harness.run(main())
+    # Sent, then out the fastest transit plus the latency later, though
+    # packets arrive up to 8 ms apart: to within the extra delay of the
+    # fastest packets of 200
+    expected = 3000 + PLAYOUT_LATENCY_MS * 1000
+    for i in (50, 120, 190):
+        t = play_time(start, output, i, AUDIO_SAMPLE_RATE) - sender.sent[i]
+        assert abs(t - expected) < 250, (i, t)
+    assert stats["waits"] > 0 and stats["late"] == 0
+    assert stats["clocks"][0]["updates"] > 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
@@ -0,0 +1,159 @@
+"""
+Resampler Quality Tests (host-side)
+
+Feeds sine tones through audio/resampler.py at every supported input
+rate and measures the output at the fixed I2S rate: SNR (signal
+against everything else, i.e. THD+N) and THD from the first harmonics.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_resampler.py
+"""
+
+import math
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.resampler import Resampler, SUPPORTED_RATES
+
+OUT_RATE = 22050
+BLOCK = 120                     # Input frames per call, like one packet
+
+
+def tone(freq, rate, count, channels, amplitude=16000):
+    """Interleaved int16 sine; the second channel is phase shifted."""
+    out = []
+    for i in range(count):
+        for ch in range(channels):
+            out.append(int(amplitude * math.sin(2 * math.pi * freq * i / rate + ch)))
+    return out
+
+
+def run(resampler, samples):
+    """Push samples through the resampler in BLOCK-frame calls."""
+    channels = resampler.channels
+    pcm = struct.pack("<%dh" % len(samples), *samples)
+    fb = 2 * channels
+    dst = bytearray(resampler.max_output(BLOCK) * fb)
+    out = []
+    for offset in range(0, len(pcm), BLOCK * fb):
+        block = pcm[offset:offset + BLOCK * fb]
+        frames = resampler.process(block, len(block) // fb, dst)
+        out.extend(struct.unpack_from("<%dh" % (frames * channels), dst, 0))
+    return out
+
+
+def fit(signal, freq, rate):
+    """Least-squares amplitude of signal at freq (sin/cos pair)."""
+    w = 2 * math.pi * freq / rate
+    ss = sc = cc = ys = yc = 0.0
+    for n, y in enumerate(signal):
+        s, c = math.sin(w * n), math.cos(w * n)
+        ss += s * s
+        sc += s * c
+        cc += c * c
+        ys += y * s
+        yc += y * c
+    det = ss * cc - sc * sc
+    a = (ys * cc - yc * sc) / det
+    b = (yc * ss - ys * sc) / det
+    return [a * math.sin(w * n) + b * math.cos(w * n) for n in range(len(signal))]
+
+
+def measure(signal, freq, rate):
+    """Return (SNR dB, THD dB) of signal against a pure tone at freq."""
+    fundamental = fit(signal, freq, rate)
+    residual = [y - f for y, f in zip(signal, fundamental)]
+    power = sum(f * f for f in fundamental)
+    noise = sum(r * r for r in residual)
+    harmonics = 0.0
+    for h in range(2, 6):
+        if h * freq < rate / 2:
+            harmonics += sum(v * v for v in fit(residual, h * freq, rate))
+    snr = 10 * math.log10(power / noise)
+    thd = 10 * math.log10(max(harmonics, 1e-9) / power)
+    return snr, thd
+
+
+def check_rate(in_rate, channels, freq=1000, min_snr=50, max_thd=-60):
+    resampler = Resampler(in_rate, OUT_RATE, channels, max_frames=BLOCK)
+    frames = in_rate // 5
+    out = run(resampler, tone(freq, in_rate, frames, channels))
+
+    # Output length follows the rate ratio
+    expected = frames * OUT_RATE // in_rate
+    slack = resampler.taps * OUT_RATE // in_rate + 2
+    assert abs(len(out) // channels - expected) <= slack
+
+    skip = 4 * resampler.taps * OUT_RATE // in_rate + 8
+    for ch in range(channels):
+        signal = out[skip * channels + ch::channels]
+        snr, thd = measure(signal, freq, OUT_RATE)
+        assert snr > min_snr, (in_rate, ch, snr)
+        assert thd < max_thd, (in_rate, ch, thd)
+    return resampler
+
+
+def test_all_rates_stereo():
+    for in_rate in SUPPORTED_RATES:
+        check_rate(in_rate, 2)
+
+
+def test_all_rates_mono():
+    for in_rate in SUPPORTED_RATES:
+        check_rate(in_rate, 1)
+
+
+def test_high_tone_upsampling():
+    # Near the top of the 8 kHz passband images must still be rejected
+    check_rate(8000, 1, freq=3000, min_snr=40)
+
+
+def test_downsampling_rejects_aliases():
+    # 15 kHz at 44.1 kHz is above the 22.05 kHz output's Nyquist rate
+    resampler = Resampler(44100, OUT_RATE, 1, max_frames=BLOCK)
+    out = run(resampler, tone(15000, 44100, 8820, 1))
+    tail = out[resampler.taps:]
+    rms = math.sqrt(sum(v * v for v in tail) / len(tail))
+    assert rms < 16000 / math.sqrt(2) / 300     # At least ~50 dB down
+
+
+def test_dc_gain_is_unity():
+    resampler = Resampler(16000, OUT_RATE, 1, max_frames=BLOCK)
+    out = run(resampler, [10000] * 4000)
+    assert all(abs(v - 10000) <= 2 for v in out[resampler.taps * 2:])
+
+
+def test_block_size_independent():
+    samples = tone(700, 16000, 2000, 2)
+    whole = run(Resampler(16000, OUT_RATE, 2, max_frames=BLOCK), samples)
+    # Odd block sizes must give the same stream
+    resampler = Resampler(16000, OUT_RATE, 2, max_frames=BLOCK)
+    pcm = struct.pack("<%dh" % len(samples), *samples)
+    dst = bytearray(resampler.max_output(BLOCK) * 4)
+    pieces = []
+    offset = 0
+    for size in [1, 37, 120, 5, 64] * 100:
+        block = pcm[offset:offset + size * 4]
+        if not block:
+            break
+        n = resampler.process(block, len(block) // 4, dst)
+        pieces.extend(struct.unpack_from("<%dh" % (2 * n), dst, 0))
+        offset += size * 4
+    assert pieces == whole
+
+
+if __name__ == "__main__":
+    for in_rate in SUPPORTED_RATES:
+        resampler = Resampler(in_rate, OUT_RATE, 1, max_frames=BLOCK)
+        out = run(resampler, tone(1000, in_rate, in_rate // 5, 1))
+        skip = 4 * resampler.taps * OUT_RATE // in_rate + 8
+        snr, thd = measure(out[skip:], 1000, OUT_RATE)
+        print(f"{in_rate:>6} -> {OUT_RATE} Hz: SNR {snr:5.1f} dB, THD {thd:6.1f} dB")
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
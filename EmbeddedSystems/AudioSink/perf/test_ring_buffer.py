@@ -0,0 +1,179 @@
+"""
+Ring Buffer Tests (host-side)
+
+Checks audio/ring_buffer.py: data comes out as written across the end
+of the storage, full and empty are told apart when the indices reach
+2*size and wrap to 0, peek_into() leaves the data in place, skip()
+drops only what is buffered and discard() drops what was written before
+it on the next read. Then checks that audio_config's AudioBuffer pops
+the packets one at a time, as they were pushed.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_ring_buffer.py
+"""
+
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+sys.path.insert(0, os.path.dirname(_HERE))
+
+import harness
+from audio.ring_buffer import RingBuffer
+
+
+def test_wrap_around_keeps_order():
+    ring = RingBuffer(8)
+    out = bytearray(8)
+    ring.write_into(b"abcdef")
+    assert ring.read_into(out, 4) == 4 and out[:4] == b"abcd"
+
+    # Six bytes from position 6: split at the end of the storage
+    assert ring.write_into(b"ghijkl") == 6
+    assert ring.count() == 8 and ring.free() == 0
+    assert ring.read_into(out) == 8
+    assert out == b"efghijkl"
+    assert ring.is_empty()
+
+
+def test_write_and_read_stop_at_capacity():
+    ring = RingBuffer(4)
+    assert ring.write_into(b"abcdef") == 4
+    assert ring.write_into(b"x") == 0
+    assert ring.level() == 100
+
+    out = bytearray(8)
+    assert ring.read_into(out) == 4 and out[:4] == b"abcd"
+    assert ring.read_into(out) == 0
+    assert ring.write_into(b"abcdef", 2) == 2
+    assert ring.count() == 2
+
+
+def test_full_and_empty_at_the_index_wrap():
+    ring = RingBuffer(4)
+    out = bytearray(4)
+    for round_ in range(5):
+        data = bytes([round_]) * 4
+        assert ring.is_empty() and not ring.is_full()
+        assert ring.write_into(data) == 4
+        assert ring.is_full() and not ring.is_empty()
+        assert ring.count() == 4 and ring.free() == 0
+        assert ring.read_into(out) == 4 and out == data
+
+    # Write index at 2*size wraps to 0 while the read index is still at 4
+    ring = RingBuffer(4)
+    ring.write_into(b"abcd")
+    ring.read_into(out)
+    assert ring.write_into(b"efgh") == 4
+    assert ring._write == 0 and ring._read == 4
+    assert ring.is_full() and ring.count() == 4
+    assert ring.read_into(out) == 4 and out == b"efgh"
+    assert ring.is_empty() and ring._read == 0
+
+
+def test_peek_into_does_not_consume():
+    ring = RingBuffer(8)
+    ring.write_into(b"abcdef")
+    ring.skip(5)
+    ring.write_into(b"ghij")
+    out = bytearray(8)
+
+    # Peek across the end of the storage
+    assert ring.peek_into(out, 3) == 3 and out[:3] == b"fgh"
+    assert ring.count() == 5
+    assert ring.peek_into(out) == 5 and out[:5] == b"fghij"
+    assert ring.read_into(out) == 5 and out[:5] == b"fghij"
+    assert ring.peek_into(out) == 0
+
+
+def test_skip_drops_only_what_is_buffered():
+    ring = RingBuffer(8)
+    ring.write_into(b"abcdef")
+    assert ring.skip(2) == 2
+    assert ring.skip(10) == 4
+    assert ring.skip(1) == 0
+    assert ring.is_empty()
+
+    ring.write_into(b"klmnopqr")
+    assert ring.skip(7) == 7
+    out = bytearray(8)
+    assert ring.read_into(out) == 1 and out[:1] == b"r"
+
+
+def test_discard_applies_on_the_next_read():
+    ring = RingBuffer(8)
+    out = bytearray(8)
+    ring.write_into(b"old")
+    ring.discard()
+    # The consumer has not acted on it yet
+    assert ring.count() == 3
+    ring.write_into(b"new")
+    assert ring.read_into(out) == 3 and out[:3] == b"new"
+
+    # Read past the discard position before seeing it: nothing is lost
+    ring.write_into(b"abcd")
+    ring.discard()
+    ring.write_into(b"ef")
+    ring.skip(5)
+    assert ring.read_into(out) == 1 and out[:1] == b"f"
+
+
+def test_clear_empties_the_ring():
+    ring = RingBuffer(4)
+    ring.write_into(b"abc")
+    ring.clear()
+    assert ring.is_empty() and ring.free() == 4
+
+
+def test_size_must_be_positive():
+    try:
+        RingBuffer(0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("RingBuffer(0) accepted")
+
+
+def test_audio_buffer_pops_one_packet_at_a_time():
+    harness.install()
+    from audio.audio_config import AudioBuffer
+
+    buffer = AudioBuffer(buffer_size=8, buffer_count=3)
+    assert buffer.pop() == (None, 0)
+    assert buffer.push(b"abc", 3)
+    assert buffer.push(b"0123456789", 10)   # truncated to buffer_size
+    assert buffer.push(b"xy", 2)
+
+    popped = []
+    while True:
+        data, size = buffer.pop()
+        if data is None:
+            break
+        popped.append(bytes(data[:size]))
+    assert popped == [b"abc", b"01234567", b"xy"]
+
+
+def test_audio_buffer_full():
+    harness.install()
+    from audio.audio_config import AudioBuffer
+
+    buffer = AudioBuffer(buffer_size=8, buffer_count=2)
+    assert buffer.push(b"a" * 8, 8)
+    assert buffer.push(b"b" * 8, 8)
+    assert not buffer.push(b"c", 1)
+    assert buffer.level() == 100
+
+    data, size = buffer.pop()
+    assert bytes(data[:size]) == b"a" * 8
+    assert buffer.push(b"c", 1)
+    buffer.clear()
+    assert buffer.pop() == (None, 0)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
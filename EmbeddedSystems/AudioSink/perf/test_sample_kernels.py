@@ -0,0 +1,162 @@
+"""
+Sample Kernel Tests (host-side)
+
+Checks audio/sample_kernels.py against a per-sample conversion: each
+16-bit or unsigned 8-bit sample widened, scaled by the Q15 gain with
+saturation and written once, or twice for mono, as 16-bit stereo. Runs
+at unity gain, zero gain, a partial gain and above unity, on the int16
+and uint8 extremes, for each kernel and for what select_kernel() picks
+per input format, and checks that mix_q15 adds with saturation. Then
+checks that the Q15 gain stays within one LSB of the float volume
+I2SDriver.write applied before.
+
+On the host the kernels are the portable fallbacks; on device the same
+names resolve to audio/_kernels_viper.py.
+
+Run from the AudioSink directory with pytest, or directly:
+
+    python3 perf/test_sample_kernels.py
+"""
+
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.sample_kernels import (
+    Q15_UNITY, volume_to_q15, select_kernel,
+    gain_q15, mix_q15, mono_to_stereo_q15, u8_to_s16_q15, u8_mono_to_stereo_q15
+)
+
+S16 = (-32768, -32767, -16384, -257, -1, 0, 1, 255, 16384, 32766, 32767)
+U8 = (0x00, 0x01, 0x7F, 0x80, 0x81, 0xFE, 0xFF)
+GAINS = (Q15_UNITY, 0, volume_to_q15(0.5), volume_to_q15(0.3), 2 * Q15_UNITY)
+
+
+def _reference(src, bits, channels, gain):
+    """Convert one sample at a time to 16-bit stereo, as a list of ints."""
+    out = []
+    step = bits // 8
+    for i in range(0, len(src), step):
+        if bits == 16:
+            v = struct.unpack_from("<h", src, i)[0]
+        else:
+            v = (src[i] - 128) << 8
+        v = max(-32768, min(32767, (v * gain) >> 15))
+        out.append(v)
+        if channels == 1:
+            out.append(v)
+    return out
+
+
+def _run(kernel, src, nsamples, out_samples, gain):
+    dst = bytearray(2 * out_samples + 4)
+    kernel(src, dst, nsamples, gain)
+    # Nothing is written past the converted block
+    assert dst[2 * out_samples:] == b"\x00" * 4
+    return list(struct.unpack_from("<%dh" % out_samples, dst, 0))
+
+
+def _s16(values):
+    return struct.pack("<%dh" % len(values), *values)
+
+
+def test_gain_q15():
+    src = _s16(S16)
+    for gain in GAINS:
+        out = _run(gain_q15, src, len(S16), len(S16), gain)
+        assert out == _reference(src, 16, 2, gain), gain
+    assert _run(gain_q15, src, len(S16), len(S16), Q15_UNITY) == list(S16)
+    assert _run(gain_q15, src, len(S16), len(S16), 0) == [0] * len(S16)
+    # Above unity the extremes saturate
+    out = _run(gain_q15, src, len(S16), len(S16), 2 * Q15_UNITY)
+    assert out[0] == -32768 and out[-1] == 32767
+
+
+def test_mono_to_stereo_q15():
+    src = _s16(S16)
+    for gain in GAINS:
+        out = _run(mono_to_stereo_q15, src, len(S16), 2 * len(S16), gain)
+        assert out == _reference(src, 16, 1, gain), gain
+    out = _run(mono_to_stereo_q15, src, len(S16), 2 * len(S16), Q15_UNITY)
+    assert out[0::2] == list(S16) and out[1::2] == list(S16)
+
+
+def test_u8_to_s16_q15():
+    src = bytes(U8)
+    for gain in GAINS:
+        out = _run(u8_to_s16_q15, src, len(U8), len(U8), gain)
+        assert out == _reference(src, 8, 2, gain), gain
+    out = _run(u8_to_s16_q15, src, len(U8), len(U8), Q15_UNITY)
+    assert out[0] == -32768 and out[U8.index(0x80)] == 0 and out[-1] == 32512
+
+
+def test_u8_mono_to_stereo_q15():
+    src = bytes(U8)
+    for gain in GAINS:
+        out = _run(u8_mono_to_stereo_q15, src, len(U8), 2 * len(U8), gain)
+        assert out == _reference(src, 8, 1, gain), gain
+    out = _run(u8_mono_to_stereo_q15, src, len(U8), 2 * len(U8), 0)
+    assert out == [0] * (2 * len(U8))
+
+
+def test_mix_q15_adds_with_saturation():
+    src = _s16(S16)
+    for gain in GAINS[:4]:
+        base = [0, 0, 100, -100, 32767, -32768, 20000, -20000, 1, -1, 0]
+        dst = bytearray(_s16(base))
+        mix_q15(src, dst, len(S16), gain)
+        scaled = _reference(src, 16, 2, gain)
+        expected = [max(-32768, min(32767, a + b)) for a, b in zip(base, scaled)]
+        assert list(struct.unpack("<%dh" % len(S16), dst)) == expected, gain
+
+
+def test_select_kernel_for_every_format():
+    inputs = {16: _s16(S16), 8: bytes(U8)}
+    for bits in (16, 8):
+        for channels in (2, 1):
+            kernel, sample_bytes, expand = select_kernel(bits, channels)
+            src = inputs[bits]
+            nsamples = len(src) // sample_bytes
+            assert sample_bytes == bits // 8
+            out_samples = len(src) * expand // 2
+            for gain in GAINS:
+                out = _run(kernel, src, nsamples, out_samples, gain)
+                assert out == _reference(src, bits, channels, gain), (bits, channels, gain)
+
+    for bits, channels in ((24, 2), (16, 3), (8, 0)):
+        try:
+            select_kernel(bits, channels)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError((bits, channels))
+
+
+def test_partial_block_converts_only_nsamples():
+    src = _s16(S16)
+    dst = bytearray(2 * len(S16))
+    gain_q15(src, dst, 3, Q15_UNITY)
+    assert list(struct.unpack("<%dh" % len(S16), dst)) == list(S16[:3]) + [0] * (len(S16) - 3)
+
+
+def test_within_one_lsb_of_the_float_volume():
+    # I2SDriver.write before the kernels: int(sample * volume) per sample
+    src = _s16(S16)
+    for volume in (1.0, 0.8, 0.5, 0.3, 0.01, 0.0):
+        out = _run(gain_q15, src, len(S16), len(S16), volume_to_q15(volume))
+        for sample, got in zip(S16, out):
+            assert abs(got - int(sample * volume)) <= 1, (volume, sample, got)
+
+    assert volume_to_q15(0.0) == 0
+    assert volume_to_q15(1.0) == Q15_UNITY
+    assert volume_to_q15(1.5) == Q15_UNITY
+    assert volume_to_q15(-0.5) == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: passed")
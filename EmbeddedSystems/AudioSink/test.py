@@ -5,7 +5,6 @@ Contains tests for I2S output and BLE components.
 """
 
 import time
-import math
 import struct
 import array
 import uasyncio as asyncio
@@ -15,6 +14,8 @@ from machine import Pin
 from audio.i2s_driver import I2SDriver, test_i2s_driver
 from ble.ble_core import BLEAudioSink, test_ble_audio_sink
 from audio.ble_audio_adapter import BLEAudioAdapter, test_ble_audio_adapter
+from audio.file_player import test_file_player
+from audio.oscillator import Oscillator
 from config import (
     I2S_BCK_PIN, I2S_WS_PIN, I2S_SD_PIN,
     AUDIO_SAMPLE_RATE, AUDIO_BIT_DEPTH, AUDIO_CHANNELS,
@@ -34,67 +35,35 @@ def blink_led(times=3, interval=0.2):
         time.sleep(interval)
 
 
-async def generate_test_audio(duration=1, frequency=440):
+def generate_test_audio(duration=1, frequency=440):
     """
     Generate test audio data (sine wave) for testing.
     
+    Chunks come from the wavetable oscillator and share one buffer, so
+    each must be written out before the next is taken.
+    
     Args:
         duration (float): Duration in seconds (limited to avoid memory issues)
         frequency (int): Frequency in Hz
         
-    Returns:
-        bytes: Audio data as bytes
+    Yields:
+        memoryview: Up to 256 frames of audio data
     """
-    # Force garbage collection before allocation
-    gc.collect()
-    
     # Limit duration to prevent excessive memory allocation
     duration = min(duration, 1.0)  # Max 1 second at a time
+    num_samples = int(duration * AUDIO_SAMPLE_RATE)
     
-    # Calculate parameters
-    sample_rate = AUDIO_SAMPLE_RATE
-    # Limit number of samples to reduce memory usage
-    num_samples = min(int(duration * sample_rate), sample_rate)
-
-    # Create a smaller buffer for chunk generation
+    # 50% amplitude to avoid clipping
+    osc = Oscillator(AUDIO_SAMPLE_RATE, freq=frequency, amplitude=0.5, channels=AUDIO_CHANNELS)
+    frame_bytes = 2 * AUDIO_CHANNELS
     chunk_size = 256  # Small chunk to avoid large allocations
-    buffer = bytearray(chunk_size * (2 if AUDIO_CHANNELS == 1 else 4))
+    buffer = bytearray(chunk_size * frame_bytes)
+    view = memoryview(buffer)
     
-    # Pre-compute some values to save on calculations
-    amplitude = 32767 * 0.5  # 50% amplitude to avoid clipping
-    angular_freq = 2 * math.pi * frequency
-    
-    # Generate in small chunks (returning a generator instead of full buffer)
-    total_chunks = (num_samples + chunk_size - 1) // chunk_size
-    
-    for chunk_idx in range(total_chunks):
-        # Calculate start sample for this chunk
-        start_sample = chunk_idx * chunk_size
-        # Calculate actual samples in this chunk (might be less for last chunk)
-        samples_in_chunk = min(chunk_size, num_samples - start_sample)
-        
-        # Generate chunk data
-        for i in range(samples_in_chunk):
-            t = (start_sample + i) / sample_rate
-            value = int(amplitude * math.sin(angular_freq * t))
-            
-            if AUDIO_CHANNELS == 2:
-                # Stereo: pack as two channels
-                offset = i * 4
-                struct.pack_into("<hh", buffer, offset, value, value)
-            else:
-                # Mono: pack as one channel
-                offset = i * 2
-                struct.pack_into("<h", buffer, offset, value)
-        
-        # Calculate actual size of this chunk's data
-        bytes_used = samples_in_chunk * (2 if AUDIO_CHANNELS == 1 else 4)
-        
-        # Yield this chunk
-        yield buffer[:bytes_used]
-        
-        # Force garbage collection between chunks
-        gc.collect()
+    for start_sample in range(0, num_samples, chunk_size):
+        # The last chunk might be shorter
+        frames = osc.fill(buffer, min(chunk_size, num_samples - start_sample))
+        yield view[:frames * frame_bytes]
 
 
 async def test_i2s_basic():
@@ -119,7 +88,7 @@ async def test_i2s_basic():
     # Create a short tone (0.5 seconds) at 440Hz
     try:
         # Generate and play in small chunks
-        for chunk in await generate_test_audio(0.5, 440):
+        for chunk in generate_test_audio(0.5, 440):
             buffer_full = await i2s.write(chunk)
             if buffer_full:
                 # Wait for buffer to drain if full
@@ -133,7 +102,7 @@ async def test_i2s_basic():
         
         # Try a different frequency (shorter duration)
         print("Playing test tone (880Hz)...")
-        for chunk in await generate_test_audio(0.3, 880): 
+        for chunk in generate_test_audio(0.3, 880): 
             buffer_full = await i2s.write(chunk)
             if buffer_full:
                 await asyncio.sleep_ms(10)
@@ -188,7 +157,7 @@ async def test_tone_sequence():
         print(f"Playing note: {frequency}Hz")
         try:
             # Generate and play in small chunks
-            for chunk in await generate_test_audio(duration, frequency):
+            for chunk in generate_test_audio(duration, frequency):
                 buffer_full = await i2s.write(chunk)
                 if buffer_full:
                     # Wait for buffer to drain if full
@@ -276,6 +245,7 @@ def run_interactive_menu():
         print("4. Run I2S driver test")
         print("5. Run BLE core test")
         print("6. Run all tests")
+        print("7. Play a WAV file from flash")
         print("0. Exit")
         
         try:
@@ -293,6 +263,8 @@ def run_interactive_menu():
                 test_ble_audio_sink()
             elif choice == '6':
                 run_all_tests()
+            elif choice == '7':
+                test_file_player(input("WAV file path: ") or "test.wav")
             elif choice == '0':
                 print("Exiting...")
                 break
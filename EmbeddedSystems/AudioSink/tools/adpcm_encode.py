@@ -0,0 +1,159 @@
+"""
+IMA-ADPCM Encoder (host-side)
+
+Encodes 16-bit PCM into the packet format decoded by audio/adpcm.py.
+Each packet starts with the encoder state for every channel, so the
+sink can decode any packet on its own.
+
+Usage (from the AudioSink directory):
+
+    python3 tools/adpcm_encode.py input.wav output.adpcm [--packet-size 240]
+
+The output file is the packets back to back; every packet except
+possibly the last is exactly packet-size bytes. Select the codec on the
+sink with the control command [CMD_SET_CODEC, CODEC_IMA_ADPCM] before
+streaming them to the audio data characteristic.
+"""
+
+import argparse
+import os
+import struct
+import sys
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.adpcm import STEP_TABLE, INDEX_TABLE, STEP_INDEX_MAX, HEADER_BYTES
+
+
+class AdpcmEncoder:
+    """
+    Streaming IMA-ADPCM encoder that keeps state across packets.
+    """
+
+    def __init__(self, channels=2):
+        """
+        Initialize the encoder.
+
+        Args:
+            channels (int): Channel count (1 or 2)
+        """
+        if channels not in (1, 2):
+            raise ValueError("ADPCM supports 1 or 2 channels")
+        self.channels = channels
+        self.preds = [0] * channels
+        self.indices = [0] * channels
+
+    def frames_per_packet(self, packet_size):
+        """Return the number of sample frames that fit in one packet."""
+        data = packet_size - HEADER_BYTES * self.channels
+        return data * 2 // self.channels
+
+    def _encode_sample(self, ch, sample):
+        """Encode one sample and update the channel state."""
+        pred = self.preds[ch]
+        index = self.indices[ch]
+        step = STEP_TABLE[index]
+
+        diff = sample - pred
+        nib = 0
+        if diff < 0:
+            nib = 8
+            diff = -diff
+        vpdiff = step >> 3
+        if diff >= step:
+            nib |= 4
+            diff -= step
+            vpdiff += step
+        half = step >> 1
+        if diff >= half:
+            nib |= 2
+            diff -= half
+            vpdiff += half
+        quarter = step >> 2
+        if diff >= quarter:
+            nib |= 1
+            vpdiff += quarter
+
+        pred = pred - vpdiff if nib & 8 else pred + vpdiff
+        self.preds[ch] = max(-32768, min(32767, pred))
+        self.indices[ch] = max(0, min(STEP_INDEX_MAX, index + INDEX_TABLE[nib & 7]))
+        return nib
+
+    def encode_packet(self, samples):
+        """
+        Encode interleaved samples into one packet.
+
+        Args:
+            samples (sequence): Interleaved int16 samples; mono packets
+                need an even count
+
+        Returns:
+            bytes: Encoded packet
+        """
+        channels = self.channels
+        packet = bytearray(HEADER_BYTES * channels)
+        for ch in range(channels):
+            struct.pack_into('<hBx', packet, ch * HEADER_BYTES,
+                             self.preds[ch], self.indices[ch])
+
+        if channels == 2:
+            for i in range(0, len(samples) - 1, 2):
+                low = self._encode_sample(0, samples[i])
+                packet.append(low | (self._encode_sample(1, samples[i + 1]) << 4))
+        else:
+            for i in range(0, len(samples) - 1, 2):
+                low = self._encode_sample(0, samples[i])
+                packet.append(low | (self._encode_sample(0, samples[i + 1]) << 4))
+        return bytes(packet)
+
+
+def encode_pcm(pcm, channels=2, packet_size=240):
+    """
+    Encode 16-bit little-endian PCM into a list of packets.
+
+    Args:
+        pcm (bytes): Interleaved 16-bit PCM
+        channels (int): Channel count (1 or 2)
+        packet_size (int): Maximum encoded packet size in bytes
+
+    Returns:
+        list: Encoded packets
+    """
+    encoder = AdpcmEncoder(channels)
+    samples = struct.unpack("<%dh" % (len(pcm) // 2), pcm[:len(pcm) & ~1])
+    per_packet = encoder.frames_per_packet(packet_size) * channels
+    return [encoder.encode_packet(samples[i:i + per_packet])
+            for i in range(0, len(samples), per_packet)]
+
+
+def main():
+    """Encode a 16-bit WAV file into ADPCM packets."""
+    parser = argparse.ArgumentParser(description="Encode a WAV file to IMA-ADPCM packets")
+    parser.add_argument("input", help="16-bit PCM WAV file")
+    parser.add_argument("output", help="Output packet file")
+    parser.add_argument("--packet-size", type=int, default=240,
+                        help="Encoded packet size in bytes (default: 240)")
+    args = parser.parse_args()
+
+    with wave.open(args.input, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            sys.exit("Only 16-bit WAV input is supported")
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        pcm = wav.readframes(wav.getnframes())
+
+    packets = encode_pcm(pcm, channels, args.packet_size)
+    with open(args.output, "wb") as f:
+        for packet in packets:
+            f.write(packet)
+
+    seconds = len(pcm) / (2 * channels * rate)
+    encoded = sum(len(p) for p in packets)
+    print(f"{len(packets)} packets, {encoded} bytes, {channels} ch @ {rate} Hz")
+    print(f"Bit rate: {encoded * 8 / seconds / 1000:.1f} kbit/s "
+          f"(PCM: {len(pcm) * 8 / seconds / 1000:.1f} kbit/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Credit-Paced Audio Sender (host-side)
+
+Reference sender for the credit flow control of ble/flow_control.py:
+it enables credits with [CMD_FLOW_CONTROL, FLOW_ON], then writes audio
+packets to the sink only while the number it has sent is behind the
+credit limit of the latest status notification. A sender that follows
+the limit never fills the sink's ingest queue or I2S buffer, so nothing
+is dropped or waited on however bursty the link is; packets that are
+not covered yet wait on the sender.
+
+CreditPacer holds the bookkeeping and works with any transport. main()
+streams a WAV or raw PCM file to the sink with bleak, which has to be
+installed for that (pip install bleak); the file must match the sink's
+input format (16-bit stereo at AUDIO_SAMPLE_RATE unless set otherwise
+over the control characteristic). Packets fill the ATT payload of the
+MTU the link negotiated (the sink asks for BLE_MTU_SIZE, see
+ble/link_profile.py), up to the sink's ingest slot size, unless a size
+is given.
+
+Usage (from the AudioSink directory):
+
+    python3 tools/credit_sender.py ADDRESS input.wav [--packet-size 240]
+"""
+
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ble.flow_control import CREDIT_STATUS_FORMAT, CREDIT_STATUS_SIZE, FLOW_ON, FLOW_OFF
+
+# As in config.py
+CMD_FLOW_CONTROL = 0x0F
+AUDIO_CHUNK_SIZE = 256
+ATT_HEADER = 3          # As in ble/link_profile.py
+AUDIO_DATA_CHAR_UUID = "00002a3d-0000-1000-8000-00805f9b34fb"
+AUDIO_CONTROL_CHAR_UUID = "00002a3e-0000-1000-8000-00805f9b34fb"
+AUDIO_STATUS_CHAR_UUID = "00002a3f-0000-1000-8000-00805f9b34fb"
+
+
+class CreditPacer:
+    """
+    Sender side of credit flow control.
+    """
+
+    def __init__(self):
+        """Initialize with no credits until the first notification."""
+        self.sent = 0           # Packets sent since FLOW_ON, modulo 65536
+        self.limit = None       # Latest credit limit, None before the first
+        self.status = None
+        self.notifications = 0
+
+    def enable_command(self, on=True):
+        """Return the control write that turns credits on (or off)."""
+        self.sent = 0
+        self.limit = None
+        return bytes([CMD_FLOW_CONTROL, FLOW_ON if on else FLOW_OFF])
+
+    def on_status(self, data):
+        """
+        Take a status notification.
+
+        Args:
+            data (bytes): Status byte, followed by the credit limit on a
+                flow-controlled connection
+        """
+        if len(data) >= CREDIT_STATUS_SIZE:
+            self.status, self.limit = struct.unpack_from(CREDIT_STATUS_FORMAT, data, 0)
+            self.notifications += 1
+        elif data:
+            self.status = data[0]
+
+    def available(self):
+        """Return the packets that may be sent now."""
+        if self.limit is None:
+            return 0
+        ahead = (self.limit - self.sent) & 0xFFFF
+        # A limit behind the count (lowered by the sink) allows nothing
+        return 0 if ahead >= 0x8000 else ahead
+
+    def on_sent(self, packets=1):
+        """Count packets sent (FEC parity frames included)."""
+        self.sent = (self.sent + packets) & 0xFFFF
+
+
+def packet_size_for(mtu):
+    """Return the audio bytes per write a link with this ATT MTU carries."""
+    return min(mtu - ATT_HEADER, AUDIO_CHUNK_SIZE)
+
+
+def read_pcm(path):
+    """Return the PCM data of a WAV file, or the whole of a raw file."""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as w:
+            return w.readframes(w.getnframes())
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def stream(address, path, packet_size=None):
+    """Stream a file to the sink at the pace its credits allow."""
+    from bleak import BleakClient
+
+    data = read_pcm(path)
+    pacer = CreditPacer()
+    credit = asyncio.Event()
+
+    def notified(_, value):
+        pacer.on_status(bytes(value))
+        credit.set()
+
+    async with BleakClient(address) as client:
+        if not packet_size:
+            packet_size = packet_size_for(client.mtu_size)
+            print(f"MTU {client.mtu_size}: {packet_size}-byte packets")
+        packets = [data[i:i + packet_size] for i in range(0, len(data), packet_size)]
+        await client.start_notify(AUDIO_STATUS_CHAR_UUID, notified)
+        await client.write_gatt_char(AUDIO_CONTROL_CHAR_UUID, pacer.enable_command(), response=True)
+        start = time.monotonic()
+        waits = 0
+        for packet in packets:
+            while not pacer.available():
+                credit.clear()
+                waits += 1
+                await credit.wait()
+            await client.write_gatt_char(AUDIO_DATA_CHAR_UUID, packet, response=False)
+            pacer.on_sent()
+        elapsed = time.monotonic() - start
+        await client.write_gatt_char(AUDIO_CONTROL_CHAR_UUID, pacer.enable_command(False),
+                                     response=True)
+    print(f"{len(packets)} packets in {elapsed:.1f} s, {waits} credit waits, "
+          f"{pacer.notifications} credit notifications")
+
+
+def main():
+    """Stream an audio file to the sink with credit flow control."""
+    parser = argparse.ArgumentParser(description="Send audio paced by the sink's credits")
+    parser.add_argument("address", help="BLE address of the sink")
+    parser.add_argument("input", help="WAV or raw PCM file in the sink's input format")
+    parser.add_argument("--packet-size", type=int, default=None,
+                        help="Audio bytes per write (default: what the negotiated MTU carries)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(stream(args.address, args.input, args.packet_size))
+    except ImportError:
+        sys.exit("Streaming needs bleak: pip install bleak")
+
+
+if __name__ == "__main__":
+    main()
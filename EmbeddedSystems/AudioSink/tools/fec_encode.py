@@ -0,0 +1,133 @@
+"""
+XOR Parity FEC Encoder (host-side)
+
+Frames audio packets for the FEC scheme decoded by audio/fec.py: every
+packet gets a group and index header, and after every group of N
+packets a parity packet carrying the XOR of the group is inserted.
+
+Negotiate the group size first: write [CMD_SET_FEC, N] to the control
+characteristic and use the N the sink notifies back on it (0 means FEC
+stays off). Parity packets are up to two bytes longer than the longest
+packet of their group, so leave that room under the ATT MTU or the
+L2CAP read size.
+
+Usage (from the AudioSink directory):
+
+    python3 tools/fec_encode.py input.adpcm output.fec --group 4 [--packet-size 240]
+
+The input is packets back to back, as written by tools/adpcm_encode.py;
+the output is the frames to send, each preceded by its length as a
+uint16 LE.
+"""
+
+import argparse
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio.fec import FEC_PARITY_INDEX
+
+
+class FecEncoder:
+    """
+    Streaming XOR parity encoder.
+    """
+
+    def __init__(self, group_size):
+        """
+        Initialize the encoder.
+
+        Args:
+            group_size (int): Data packets per parity packet (2-254)
+        """
+        if not 2 <= group_size < FEC_PARITY_INDEX:
+            raise ValueError("FEC group size must be 2-254")
+        self.group_size = group_size
+        self.group = 0
+        self._index = 0
+        self._parity = bytearray()
+        self._lengths = 0
+
+    def encode(self, packet):
+        """
+        Frame one packet.
+
+        Args:
+            packet (bytes): Packet as sent without FEC
+
+        Returns:
+            list: The data frame, followed by the parity frame when the
+                  packet completes a group
+        """
+        frames = [bytes([self.group, self._index]) + packet]
+        if len(packet) > len(self._parity):
+            self._parity.extend(bytes(len(packet) - len(self._parity)))
+        for i, b in enumerate(packet):
+            self._parity[i] ^= b
+        self._lengths ^= len(packet)
+        self._index += 1
+        if self._index == self.group_size:
+            frames.append(self.parity())
+        return frames
+
+    def parity(self):
+        """Return the parity frame of the current group and start the next."""
+        frame = (bytes([self.group, FEC_PARITY_INDEX]) +
+                 struct.pack("<H", self._lengths) + bytes(self._parity))
+        self.group = (self.group + 1) & 0xFF
+        self._index = 0
+        self._parity = bytearray()
+        self._lengths = 0
+        return frame
+
+
+def encode_packets(packets, group_size):
+    """
+    Frame a list of packets.
+
+    Args:
+        packets (list): Packets as sent without FEC
+        group_size (int): Data packets per parity packet
+
+    Returns:
+        list: Frames to send in order (an incomplete last group has no
+              parity frame)
+    """
+    encoder = FecEncoder(group_size)
+    frames = []
+    for packet in packets:
+        frames.extend(encoder.encode(packet))
+    return frames
+
+
+def main():
+    """Add FEC framing to a packet file."""
+    parser = argparse.ArgumentParser(description="Add XOR parity FEC to audio packets")
+    parser.add_argument("input", help="Packets back to back")
+    parser.add_argument("output", help="Output frame file")
+    parser.add_argument("--group", type=int, default=4,
+                        help="Data packets per parity packet (default: 4)")
+    parser.add_argument("--packet-size", type=int, default=240,
+                        help="Input packet size in bytes (default: 240)")
+    args = parser.parse_args()
+
+    with open(args.input, "rb") as f:
+        data = f.read()
+    size = args.packet_size
+    packets = [data[i:i + size] for i in range(0, len(data), size)]
+
+    frames = encode_packets(packets, args.group)
+    with open(args.output, "wb") as f:
+        for frame in frames:
+            f.write(struct.pack("<H", len(frame)))
+            f.write(frame)
+
+    sent = sum(len(frame) for frame in frames)
+    print(f"{len(packets)} packets, {len(frames)} frames, {sent} bytes")
+    print(f"Overhead: {100 * (sent - len(data)) / max(len(data), 1):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,11 @@ import struct
 import time
 from micropython import const
 from ble_advertising import advertising_payload
+# Shared BLE modules (copy irq_dispatch.py, deferred.py, notify_scheduler.py
+# and conn_slots.py from EmbeddedSystems/AudioSink/ble/ to ble/ on the board)
+from ble.irq_dispatch import IRQDispatcher
+from ble.deferred import DeferredWork
+from ble.notify_scheduler import NotifyScheduler
 import framebuf
 # Import for display to Waveshare E-Ink Display
 from Pico_ePaper_2_13_V4 import EPD_2in13_V4_Portrait, EPD_2in13_V4_Landscape
@@ -24,6 +29,15 @@ _IRQ_CENTRAL_DISCONNECT = const(2)
 _IRQ_GATTS_WRITE = const(3)
 _IRQ_GATTS_READ_REQUEST = const(4)
 
+# Deferred Work Constants; E-Ink refreshes run after the IRQ, from micropython.schedule()
+_DEFERRED_SLOTS = const(4)          # Writes waiting at once; further ones are dropped
+_DEFERRED_SLOT_SIZE = const(128)    # Longest write kept
+
+# Notification Constants; status changes are gathered and sent from the main loop (poll())
+_NOTIFY_WINDOW_MS = const(500)      # Status changes within this window share a notification
+_NOTIFY_BUDGET = const(4)           # Notifications per connection per period
+_NOTIFY_PERIOD_MS = const(1000)
+
 # Flag Constants
 _FLAG_READ = const(0x0002)
 _FLAG_WRITE = const(0x0008)
@@ -71,7 +85,9 @@ class BLEEinkDisplay:
     def __init__(self, ble, eink_display, name="eink-display"):
         self._ble = ble
         self._ble.active(True)
-        self._ble.irq(self._irq)
+        self._irq = IRQDispatcher()
+        self._work = DeferredWork(_DEFERRED_SLOTS, _DEFERRED_SLOT_SIZE, schedule=True)
+        self._ble.irq(self._work.timed(self._irq.dispatch))     # Timed, for get_irq_stats()
         self._eink = eink_display  # E-ink display object
         
         # Register services
@@ -81,6 +97,20 @@ class BLEEinkDisplay:
           self._handle_write_command,
           self._handle_notify_status),) = self._ble.gatts_register_services((_EINK_SERVICE,))
         
+        # Route each IRQ Event (and Write/Read handle) straight to its handler
+        self._irq.on(_IRQ_CENTRAL_CONNECT, self._on_connect)
+        self._irq.on(_IRQ_CENTRAL_DISCONNECT, self._on_disconnect)
+        self._irq.on_handle(_IRQ_GATTS_WRITE, self._handle_write_display, self._on_display_write)
+        self._irq.on_handle(_IRQ_GATTS_WRITE, self._handle_write_command, self._on_command_write)
+        self._irq.on(_IRQ_GATTS_READ_REQUEST, self._on_read_request)
+        self._irq.on_handle(_IRQ_GATTS_READ_REQUEST, self._handle_read_buffer, self._on_read_buffer)
+        
+        # Status Notifications only go to Subscribed Centrals (CCCD writes), coalesced and rate limited
+        self.notify = NotifyScheduler(self._ble, window_ms=_NOTIFY_WINDOW_MS,
+                                      budget=_NOTIFY_BUDGET, period_ms=_NOTIFY_PERIOD_MS)
+        self.notify.add(self._handle_notify_status)
+        self.notify.register(self._irq)
+        
         # Initialize characteristics
         self._ble.gatts_write(self._handle_read_buffer, b'Empty Buffer')
         self._ble.gatts_write(self._handle_read_status, b'Ready')
@@ -101,9 +131,8 @@ class BLEEinkDisplay:
             print("[+] BLE E-Ink Display service initialized")
 
     def notify_all(self, data):
-        """Send notification to all connected devices"""
-        for conn_handle in self._connections:
-            self._ble.gatts_notify(conn_handle, self._handle_notify_status, data)
+        """Notify subscribed devices; sent by the Notification Scheduler once its window ends"""
+        self.notify.update(self._handle_notify_status, data)
 
     def _update_status_and_notify(self, status, operation=None):
         """Update status and notify connected devices"""
@@ -120,127 +149,145 @@ class BLEEinkDisplay:
         # Send notification
         self.notify_all(notify_msg.encode())
 
-    def _irq(self, event, data):
-        if event == _IRQ_CENTRAL_CONNECT:
-            conn_handle, _, _ = data
-            if dbg:
-                print(f"[+] Connected: {conn_handle}")
-            self._connections.add(conn_handle)
-            self._update_status_and_notify("Connected", "Connection")
+    ## IRQ Event Handlers; registered with the IRQ Dispatcher in __init__()
+    def _on_connect(self, data):
+        conn_handle, _, _ = data
+        if dbg:
+            print(f"[+] Connected: {conn_handle}")
+        self._connections.add(conn_handle)
+        self.notify.on_connect(conn_handle)
+        self._update_status_and_notify("Connected", "Connection")
+
+    def _on_disconnect(self, data):
+        conn_handle, _, _ = data
+        if dbg:
+            print(f"[-] Disconnected: {conn_handle}")
+        self._connections.remove(conn_handle)
+        self.notify.on_disconnect(conn_handle)
+        self._update_status_and_notify("Disconnected", "Connection")
+        self._advertise()
+
+    # Nota Bene: Making the call to run the E-Ink displays SLOWS DOWN EVERYTHING!!!
+    #   - One can artificially slow down the Bluetooth Low Energy State Machine
+    #   - So the IRQ only copies the write into a Deferred Work slot; _show_display_write() runs after it
+    def _on_display_write(self, data):
+        conn_handle, attr_handle = data
+        self._work.defer_read(self._ble, self._show_display_write, conn_handle, attr_handle)
+
+    def _show_display_write(self, conn_handle, value):
+        value = bytes(value)        # The slot is reused once this returns
+        attr_handle = self._handle_write_display
+        if dbg:
+            print(f"[*] Display write: {value}")
+
+        # Use to change write display mode
+        safe_write_flag = False
+
+        # Check if writing TEMPLATE WRITE or SANITY ASCII WRITE to the E-Ink Display
+        if safe_write_flag:
+            # Perform the ASCii Safe Test Write to the Display String
+            self._display_text = self.ascii_safe_encoding(value)
+
 
-        elif event == _IRQ_CENTRAL_DISCONNECT:
-            conn_handle, _, _ = data
-            if dbg:
-                print(f"[-] Disconnected: {conn_handle}")
-            self._connections.remove(conn_handle)
-            self._update_status_and_notify("Disconnected", "Connection")
-            self._advertise()
-
-        elif event == _IRQ_GATTS_WRITE:
-            conn_handle, attr_handle = data
-            value = self._ble.gatts_read(attr_handle)
-
-            # Nota Bene: Making the call to run the E-Ink displays SLOWS DOWN EVERYTHING!!!
-            #   - One can artificially slow down the Bluetooth Low Energy State Machine
-            if attr_handle == self._handle_write_display:
-                if dbg:
-                    print(f"[*] Display write: {value}")
-
-                # Use to change write display mode
-                safe_write_flag = False
-
-                # Check if writing TEMPLATE WRITE or SANITY ASCII WRITE to the E-Ink Display
-                if safe_write_flag:
-                    # Perform the ASCii Safe Test Write to the Display String
-                    self._display_text = self.ascii_safe_encoding(value)
-
-
-                    if dbg:
-                        print(f"[*] AS-Mode - Displaying: {self._display_text}")
-
-                    #self._display_text = value.decode()
-                    self._eink.display_text(self._display_text)
-                    self._update_status_and_notify("Display updated", "Write")
-                else:
-                    # Perform the Template Based Write; NOTE: Will require COMPLETE SCREEN CLEAR upon write completion????
-                    #print("OTHER TESTING")
-                    if not self._display_template:
-                        print("[*] Setting the Display Template")
-                        # Create the Base Template
-                        self._eink.fill(0xFF)
-                        start_line = 10
-                        start_line = fit_text(self._eink, " -[ BLE Write ]- ", start_line, 30)      # Write on 10
-                        start_line = fit_text(self._eink, " Conn Handle: ", start_line, 30)         # Write on 30
-                        start_line = fit_text(self._eink, " Attr Handle: ", start_line, 30)         # Write on 50
-                        start_line += 30
-                        start_line = fit_text(self._eink, " Value: ", start_line, 30)                               # Write on 100 (50 + 20 + 30)
-                        # Set the Display Base
-                        self._eink.Display_Base(self._eink.buffer)
-                        self._eink.delay_ms(500)        # Quick added wait for good measure
-                        # Set the Template Flag
-                        self._display_template = True
-                    else:
-                        print("[*] Template Already Set")
-                    
-                    # Continue with Writing an Update to the Template
-                    def mask_and_write(text_string, text_column, text_row, row_width, col_width, write_strength=0xFF):
-                        # Variables
-                        pixel_char_width = 10
-
-                        # Create the Fill Space Rectangle
-                        self._eink.fill_rect(text_row-1, text_column-1, row_width*pixel_char_width, col_width*pixel_char_width, write_strength)
-
-                        # Carve out the Desired Text
-                        self._eink.text(text_string, text_row, text_column, 0xFF-write_strength)    # Note: Should produce the opposite of the write strneght?? Overflow testing space
-                        #self._eink.text(text_string, text_row, text_column, 0x00)
-
-                    value_fields = None
-                    # Produce any text chunking
-                    if len(value) > 30:
-                        value_fields = list(chunkstring(value, 30))
-                    
-                    # Safe Variable
-                    #safe_conn_handle = self.ascii_safe_encoding(str(conn_handle))
-                    #safe_attr_handle = self.ascii_safe_encoding(str(attr_handle))
-
-                    # Make a mask for each piece of information
-                    #mask_and_write(safe_conn_handle, 30, 60, len(safe_conn_handle), 1)     # Write the Connection Handle Value
-                    #mask_and_write(safe_attr_handle, 50, 60, len(safe_attr_handle), 1)     # Write the Attribute Handle Value
-                    mask_and_write(str(conn_handle), 30, 120, len(str(conn_handle)), 1)     # Write the Connection Handle Value
-                    mask_and_write(str(attr_handle), 50, 120, len(str(attr_handle)), 1)     # Write the Attribute Handle Value
-
-                    # Special Checks and Mask for the Written Data
-                    if value_fields:
-                        # Perform Special Write to Map
-                        print("DO SOMETHING!")
-                    else:
-                        # Safe Print
-                        safe_value = self.ascii_safe_encoding(value)
-                        # Perform a Normal Masking to the Screen
-                        #mask_and_write(value, 100, 100, len(value), 1)       # Write the Value Received
-                        mask_and_write(safe_value, 100, 60, len(safe_value), 1)       # Write the Value Received
-                        # NOTE: Current issue is that the previous mask for the data is not cleared before the new data is written
-
-                    # Display the Partial to the Screen
-                    self._eink.displayPartial(self._eink.buffer)
-                
-            elif attr_handle == self._handle_write_command:
-                if dbg:
-                    print(f"[*] Command write: {value}")
-                cmd = value.decode()
-                self._handle_command(cmd)
-                self._update_status_and_notify(f"Command executed: {cmd}", "Command")
-
-        elif event == _IRQ_GATTS_READ_REQUEST:
-            conn_handle, attr_handle = data
             if dbg:
-                print(f"[*] Read request - handle: {attr_handle}")
+                print(f"[*] AS-Mode - Displaying: {self._display_text}")
+
+            #self._display_text = value.decode()
+            self._eink.display_text(self._display_text)
+            self._update_status_and_notify("Display updated", "Write")
+        else:
+            # Perform the Template Based Write; NOTE: Will require COMPLETE SCREEN CLEAR upon write completion????
+            #print("OTHER TESTING")
+            if not self._display_template:
+                print("[*] Setting the Display Template")
+                # Create the Base Template
+                self._eink.fill(0xFF)
+                start_line = 10
+                start_line = fit_text(self._eink, " -[ BLE Write ]- ", start_line, 30)      # Write on 10
+                start_line = fit_text(self._eink, " Conn Handle: ", start_line, 30)         # Write on 30
+                start_line = fit_text(self._eink, " Attr Handle: ", start_line, 30)         # Write on 50
+                start_line += 30
+                start_line = fit_text(self._eink, " Value: ", start_line, 30)                               # Write on 100 (50 + 20 + 30)
+                # Set the Display Base
+                self._eink.Display_Base(self._eink.buffer)
+                self._eink.delay_ms(500)        # Quick added wait for good measure
+                # Set the Template Flag
+                self._display_template = True
+            else:
+                print("[*] Template Already Set")
+            
+            # Continue with Writing an Update to the Template
+            def mask_and_write(text_string, text_column, text_row, row_width, col_width, write_strength=0xFF):
+                # Variables
+                pixel_char_width = 10
+
+                # Create the Fill Space Rectangle
+                self._eink.fill_rect(text_row-1, text_column-1, row_width*pixel_char_width, col_width*pixel_char_width, write_strength)
+
+                # Carve out the Desired Text
+                self._eink.text(text_string, text_row, text_column, 0xFF-write_strength)    # Note: Should produce the opposite of the write strneght?? Overflow testing space
+                #self._eink.text(text_string, text_row, text_column, 0x00)
+
+            value_fields = None
+            # Produce any text chunking
+            if len(value) > 30:
+                value_fields = list(chunkstring(value, 30))
             
-            if attr_handle == self._handle_read_buffer:
-                # Update the Read Buffer
-                self._update_read_buffer()
-                # Send Notifications
-                
+            # Safe Variable
+            #safe_conn_handle = self.ascii_safe_encoding(str(conn_handle))
+            #safe_attr_handle = self.ascii_safe_encoding(str(attr_handle))
+
+            # Make a mask for each piece of information
+            #mask_and_write(safe_conn_handle, 30, 60, len(safe_conn_handle), 1)     # Write the Connection Handle Value
+            #mask_and_write(safe_attr_handle, 50, 60, len(safe_attr_handle), 1)     # Write the Attribute Handle Value
+            mask_and_write(str(conn_handle), 30, 120, len(str(conn_handle)), 1)     # Write the Connection Handle Value
+            mask_and_write(str(attr_handle), 50, 120, len(str(attr_handle)), 1)     # Write the Attribute Handle Value
+
+            # Special Checks and Mask for the Written Data
+            if value_fields:
+                # Perform Special Write to Map
+                print("DO SOMETHING!")
+            else:
+                # Safe Print
+                safe_value = self.ascii_safe_encoding(value)
+                # Perform a Normal Masking to the Screen
+                #mask_and_write(value, 100, 100, len(value), 1)       # Write the Value Received
+                mask_and_write(safe_value, 100, 60, len(safe_value), 1)       # Write the Value Received
+                # NOTE: Current issue is that the previous mask for the data is not cleared before the new data is written
+
+            # Display the Partial to the Screen
+            self._eink.displayPartial(self._eink.buffer)
+
+    def _on_command_write(self, data):
+        conn_handle, attr_handle = data
+        self._work.defer_read(self._ble, self._run_command_write, conn_handle, attr_handle)
+
+    def _run_command_write(self, conn_handle, value):
+        value = bytes(value)
+        if dbg:
+            print(f"[*] Command write: {value}")
+        cmd = value.decode()
+        self._handle_command(cmd)
+        self._update_status_and_notify(f"Command executed: {cmd}", "Command")
+
+    def _on_read_request(self, data):
+        conn_handle, attr_handle = data
+        if dbg:
+            print(f"[*] Read request - handle: {attr_handle}")
+
+    def _on_read_buffer(self, data):
+        self._on_read_request(data)
+        # The stack answers the read as this IRQ returns: update the Read
+        # Buffer now (one gatts_write), Send Notifications after the IRQ
+        self._update_read_buffer()
+        self._work.defer(self._run_read_buffer, data[0])
+
+    def _run_read_buffer(self, conn_handle, _):
+        self._update_status_and_notify("Buffer read", "Read")
+
+    def get_irq_stats(self):
+        """IRQ time and Deferred Work queue depth (see ble/deferred.py)"""
+        return self._work.get_stats()
 
     def _update_status(self, status):
         if dbg:
@@ -253,7 +300,6 @@ class BLEEinkDisplay:
         self._ble.gatts_write(self._handle_read_buffer, buffer_text.encode())
         if dbg:
             print(f"[*] Buffer updated: {buffer_text}")
-        self._update_status_and_notify("Buffer read", "Read")
 
     def _handle_command(self, cmd):
         """Handle display commands"""
@@ -606,6 +652,7 @@ def demo():
     
     try:
         while True:
+            ble_display.notify.poll()   # Send the Status Notifications gathered
             if ble_display._connections:
                 led.toggle()  # Blink when connected
             else:
@@ -653,6 +700,7 @@ def ble_eink_server():
     
     try:
         while True:
+            ble_display.notify.poll()   # Send the Status Notifications gathered
             if ble_display._connections:
                 led.toggle()  # Blink when connected
             else:
@@ -3,6 +3,9 @@ import struct
 import time
 from machine import Pin
 from micropython import const
+# Shared connection slots (copy EmbeddedSystems/AudioSink/ble/conn_slots.py
+# to ble/conn_slots.py on the board)
+from ble.conn_slots import ConnectionSlots
 
 # Debug flag
 dbg = 1
@@ -20,6 +23,9 @@ _IRQ_L2CAP_SEND_READY = const(26)
 _L2CAP_PSM = const(0x70)  # Protocol/Service Multiplexer (must be even number)
 _L2CAP_MTU = const(512)   # Maximum Transmission Unit
 
+# Centrals connected at once, each with its own L2CAP channel
+_MAX_CONNECTIONS = const(4)
+
 class BLEL2CAPDemo:
     def __init__(self, name="l2cap-demo"):
         """Initialize BLE and L2CAP communication."""
@@ -29,13 +35,15 @@ class BLEL2CAPDemo:
         
         # Device info
         self._name = name
-        self._connections = set()
+        
+        # Connection state: one slot per central, holding its L2CAP CID (0 = none)
+        self._slots = ConnectionSlots(_MAX_CONNECTIONS)
+        self._stalled = bytearray(_MAX_CONNECTIONS)   # Per slot: waiting for send ready
+        self._rx_buf = bytearray(_L2CAP_MTU)            # Shared receive buffer
         
         # L2CAP state
-        self._l2cap_connected = False
-        self._l2cap_conn_handle = None
-        self._l2cap_channel = None
-        self._send_ready = True
+        self._l2cap_connected = False   # Any channel open
+        self._send_ready = True         # No channel stalled
         
         # Status LED
         self.led = Pin("LED", Pin.OUT)
@@ -54,24 +62,31 @@ class BLEL2CAPDemo:
         if event == _IRQ_CENTRAL_CONNECT:
             # Central device connected
             conn_handle, _, _ = data
+            if self._slots.open(conn_handle) < 0:
+                # Every slot is taken
+                self._ble.gap_disconnect(conn_handle)
+                return
             if dbg:
-                print(f"[+] Connected: {conn_handle}")
-            self._connections.add(conn_handle)
+                print(f"[+] Connected: {conn_handle} ({len(self._slots)}/{_MAX_CONNECTIONS})")
+            # Keep advertising while a slot is free
+            if self._slots.free():
+                self._advertise()
             
         elif event == _IRQ_CENTRAL_DISCONNECT:
             # Central device disconnected
             conn_handle, _, _ = data
+            s = self._slots.close(conn_handle)
+            if s < 0:
+                return
             if dbg:
                 print(f"[-] Disconnected: {conn_handle}")
-            self._connections.remove(conn_handle)
-            self._l2cap_connected = False
-            self._l2cap_conn_handle = None
-            self._l2cap_channel = None
+            self._stalled[s] = 0
+            self._update_channel_state()
             self._advertise()
             
         elif event == _IRQ_L2CAP_ACCEPT:
             # L2CAP connection request
-            conn_handle, psm = data
+            conn_handle, cid, psm, our_mtu, peer_mtu = data
             if dbg:
                 print(f"[*] L2CAP Accept Request - Handle: {conn_handle}, PSM: {psm}")
             # Accept the connection (return 0 to accept, non-zero to reject)
@@ -79,20 +94,25 @@ class BLEL2CAPDemo:
             
         elif event == _IRQ_L2CAP_CONNECT:
             # L2CAP channel established
-            conn_handle, mtu, cid = data
+            conn_handle, cid, psm, our_mtu, peer_mtu = data
             if dbg:
-                print(f"[+] L2CAP Connected - Handle: {conn_handle}, MTU: {mtu}, CID: {cid}")
-            self._l2cap_connected = True
-            self._l2cap_conn_handle = conn_handle
-            self._l2cap_channel = cid
+                print(f"[+] L2CAP Connected - Handle: {conn_handle}, MTU: {peer_mtu}, CID: {cid}")
+            s = self._slots.slot(conn_handle)
+            if s >= 0:
+                self._slots.cid[s] = cid
+                self._slots.mtu[s] = min(peer_mtu, _L2CAP_MTU)
+            self._update_channel_state()
             
         elif event == _IRQ_L2CAP_DISCONNECT:
             # L2CAP channel disconnected
-            conn_handle, cid, status = data
+            conn_handle, cid, psm, status = data
             if dbg:
                 print(f"[-] L2CAP Disconnected - Handle: {conn_handle}, CID: {cid}, Status: {status}")
-            self._l2cap_connected = False
-            self._l2cap_channel = None
+            s = self._slots.slot(conn_handle)
+            if s >= 0 and self._slots.cid[s] == cid:
+                self._slots.cid[s] = 0
+                self._stalled[s] = 0
+            self._update_channel_state()
             
         elif event == _IRQ_L2CAP_RECV:
             # Data received on L2CAP channel
@@ -101,14 +121,30 @@ class BLEL2CAPDemo:
                 print(f"[*] L2CAP Receive - Handle: {conn_handle}, CID: {cid}")
             
             # Read the data
-            self._handle_l2cap_data()
+            self._handle_l2cap_data(conn_handle, cid)
             
         elif event == _IRQ_L2CAP_SEND_READY:
             # Channel ready for sending
             conn_handle, cid, status = data
             if dbg:
                 print(f"[*] L2CAP Send Ready - Handle: {conn_handle}, CID: {cid}, Status: {status}")
-            self._send_ready = True
+            s = self._slots.slot(conn_handle)
+            if s >= 0:
+                self._stalled[s] = 0
+            self._update_channel_state()
+
+    def _update_channel_state(self):
+        """Summarize the slots' channels into the demo's flags."""
+        slots = self._slots
+        connected = False
+        ready = True
+        for s in range(slots.count):
+            if slots.conn[s] >= 0 and slots.cid[s]:
+                connected = True
+                if self._stalled[s]:
+                    ready = False
+        self._l2cap_connected = connected
+        self._send_ready = ready
 
     def _advertise(self, interval_us=100000):
         """Start advertising L2CAP service."""
@@ -135,23 +171,39 @@ class BLEL2CAPDemo:
         except Exception as e:
             print(f"[-] Error starting L2CAP server: {e}")
 
-    def send_data(self, data):
-        """Send data over L2CAP channel."""
+    def send_data(self, data, conn_handle=None):
+        """Send data over the L2CAP channel of one central, or of every central that has one."""
         if not self._l2cap_connected:
             if dbg:
                 print("[-] Not connected")
             return False
             
+        # Convert string to bytes if necessary
+        if isinstance(data, str):
+            data = data.encode()
+        
+        slots = self._slots
+        if conn_handle is not None:
+            s = slots.slot(conn_handle)
+            return s >= 0 and self._send_slot(s, data)
+        sent = False
+        for s in range(slots.count):
+            if slots.conn[s] >= 0 and slots.cid[s] and not self._stalled[s]:
+                sent = self._send_slot(s, data) or sent
+        return sent
+
+    def _send_slot(self, s, data):
+        """Send data over the L2CAP channel of a slot."""
+        slots = self._slots
+        if not slots.cid[s]:
+            return False
         try:
-            # Convert string to bytes if necessary
-            if isinstance(data, str):
-                data = data.encode()
-                
-            # Send data
-            result = self._ble.l2cap_send(self._l2cap_conn_handle, self._l2cap_channel, data)
+            result = self._ble.l2cap_send(slots.conn[s], slots.cid[s], data)
+            slots.tx_packets[s] += 1
             if not result:
                 if dbg:
                     print("[!] Channel stalled, waiting for send ready")
+                self._stalled[s] = 1
                 self._send_ready = False
             return result
             
@@ -159,29 +211,27 @@ class BLEL2CAPDemo:
             print(f"[-] Error sending data: {e}")
             return False
 
-    def _handle_l2cap_data(self):
+    def _handle_l2cap_data(self, conn_handle, cid):
         """Handle received L2CAP data."""
-        if not self._l2cap_connected:
+        s = self._slots.slot(conn_handle)
+        if s < 0 or self._slots.cid[s] != cid:
             return
             
         try:
-            # Create buffer for receiving
-            buffer = bytearray(_L2CAP_MTU)
-            # Read data into buffer
-            bytes_read = self._ble.l2cap_recvinto(
-                self._l2cap_conn_handle,
-                self._l2cap_channel,
-                buffer
-            )
+            # Read data into the shared buffer
+            buffer = self._rx_buf
+            bytes_read = self._ble.l2cap_recvinto(conn_handle, cid, buffer)
             
             if bytes_read > 0:
+                self._slots.rx_packets[s] += 1
+                self._slots.rx_bytes[s] += bytes_read
                 # Process received data
                 data = buffer[:bytes_read]
                 if dbg:
                     print(f"[*] Received {bytes_read} bytes: {data}")
                 
-                # Echo data back (example handling)
-                self.send_data(f"Echo: {data.decode()}")
+                # Echo data back to the sender (example handling)
+                self.send_data(f"Echo: {data.decode()}", conn_handle)
                 
         except Exception as e:
             print(f"[-] Error receiving data: {e}")
@@ -197,8 +247,8 @@ def demo():
             if l2cap._l2cap_connected:
                 l2cap.led.toggle()
                 
-                # Send periodic test data
-                if l2cap._send_ready and counter % 10 == 0:
+                # Send periodic test data to every channel not stalled
+                if counter % 10 == 0:
                     test_data = f"Test message {counter}"
                     if dbg:
                         print(f"[*] Sending: {test_data}")
@@ -223,9 +273,10 @@ Usage Example:
 # Create L2CAP instance
 l2cap = BLEL2CAPDemo()
 
-# Send data when connected
+# Send data when connected: to every central with a channel, or to one
 if l2cap._l2cap_connected:
     l2cap.send_data("Hello L2CAP!")
+    l2cap.send_data("Hello central 0!", conn_handle=0)
 
 # Receive data is handled automatically via IRQ
 '''
\ No newline at end of file
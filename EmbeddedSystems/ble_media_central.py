@@ -2,6 +2,9 @@ import bluetooth
 import time
 from micropython import const
 from machine import Pin
+# Shared IRQ dispatcher (copy EmbeddedSystems/AudioSink/ble/irq_dispatch.py
+# to ble/irq_dispatch.py on the board)
+from ble.irq_dispatch import IRQDispatcher
 
 # Debug flag
 dbg = 1
@@ -32,7 +35,17 @@ class BLEMediaCentral:
     def __init__(self, max_devices=3):
         self._ble = bluetooth.BLE()
         self._ble.active(True)
-        self._ble.irq(self._irq)
+        # IRQ events go straight to their handlers through the dispatcher
+        self._irq = IRQDispatcher()
+        self._irq.on(_IRQ_SCAN_RESULT, self._on_scan_result)
+        self._irq.on(_IRQ_SCAN_DONE, self._on_scan_done)
+        self._irq.on(_IRQ_PERIPHERAL_CONNECT, self._on_peripheral_connect)
+        self._irq.on(_IRQ_PERIPHERAL_DISCONNECT, self._on_peripheral_disconnect)
+        self._irq.on(_IRQ_GATTC_SERVICE_RESULT, self._on_service_result)
+        self._irq.on(_IRQ_GATTC_SERVICE_DONE, self._on_service_done)
+        self._irq.on(_IRQ_GATTC_CHARACTERISTIC_RESULT, self._on_characteristic_result)
+        self._irq.on(_IRQ_GATTC_NOTIFY, self._on_notify)
+        self._ble.irq(self._irq.dispatch)
         
         # Device tracking
         self.max_devices = max_devices
@@ -52,84 +65,84 @@ class BLEMediaCentral:
         self._metadata = {}  # addr -> metadata dict
         self._positions = {}  # addr -> playback position
 
-    def _irq(self, event, data):
-        if event == _IRQ_SCAN_RESULT:
-            addr_type, addr, adv_type, rssi, adv_data = data
-            
-            # Check if device advertises our media service
-            if MEDIA_SERVICE_UUID.to_bytes() in bytes(adv_data):
-                addr = bytes(addr)  # Convert address to bytes
-                if addr not in self._scan_results and len(self._devices) < self.max_devices:
-                    name = self._decode_name(adv_data)
-                    if dbg:
-                        print(f"[*] Found media device: {name} ({addr})")
-                    self._scan_results.add(addr)
-                    self._devices[addr] = {"name": name, "services": {}}
-
-        elif event == _IRQ_SCAN_DONE:
-            self._scanning = False
-            if dbg:
-                print("[*] Scan complete")
-            
-            # Connect to discovered devices
-            for addr in self._scan_results:
-                if addr not in self._connections:
-                    self._connect_to_device(addr)
-
-        elif event == _IRQ_PERIPHERAL_CONNECT:
-            conn_handle, addr_type, addr = data
-            addr = bytes(addr)
-            if dbg:
-                print(f"[+] Connected: {self._devices[addr]['name']}")
-            self._connections[addr] = conn_handle
-            self._connecting = False
-            
-            # Discover services
-            self._ble.gattc_discover_services(conn_handle)
+    # IRQ event handlers, registered with the IRQ dispatcher in __init__()
+    def _on_scan_result(self, data):
+        addr_type, addr, adv_type, rssi, adv_data = data
 
-        elif event == _IRQ_PERIPHERAL_DISCONNECT:
-            conn_handle, addr_type, addr = data
-            addr = bytes(addr)
-            if dbg:
-                print(f"[-] Disconnected: {self._devices[addr]['name']}")
-            if addr in self._connections:
-                del self._connections[addr]
-                del self._characteristics[addr]
-
-        elif event == _IRQ_GATTC_SERVICE_RESULT:
-            conn_handle, start_handle, end_handle, uuid = data
-            if uuid == MEDIA_SERVICE_UUID:
-                addr = self._get_addr_from_conn_handle(conn_handle)
-                self._devices[addr]["services"][uuid] = (start_handle, end_handle)
+        # Check if device advertises our media service
+        if MEDIA_SERVICE_UUID.to_bytes() in bytes(adv_data):
+            addr = bytes(addr)  # Convert address to bytes
+            if addr not in self._scan_results and len(self._devices) < self.max_devices:
+                name = self._decode_name(adv_data)
                 if dbg:
-                    print(f"[+] Found media service on {self._devices[addr]['name']}")
+                    print(f"[*] Found media device: {name} ({addr})")
+                self._scan_results.add(addr)
+                self._devices[addr] = {"name": name, "services": {}}
 
-        elif event == _IRQ_GATTC_SERVICE_DONE:
-            conn_handle, status = data
-            addr = self._get_addr_from_conn_handle(conn_handle)
-            if MEDIA_SERVICE_UUID in self._devices[addr]["services"]:
-                start, end = self._devices[addr]["services"][MEDIA_SERVICE_UUID]
-                self._ble.gattc_discover_characteristics(conn_handle, start, end)
+    def _on_scan_done(self, data):
+        self._scanning = False
+        if dbg:
+            print("[*] Scan complete")
 
-        elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
-            conn_handle, def_handle, value_handle, properties, uuid = data
-            addr = self._get_addr_from_conn_handle(conn_handle)
-            
-            if addr not in self._characteristics:
-                self._characteristics[addr] = {}
-                
-            self._characteristics[addr][uuid] = value_handle
-            
-            if dbg and uuid in [PLAYBACK_CHAR_UUID, TRACK_INFO_CHAR_UUID, 
-                               VOLUME_CHAR_UUID, STATUS_CHAR_UUID,
-                               METADATA_CHAR_UUID, POSITION_CHAR_UUID,
-                               DURATION_CHAR_UUID]:
-                print(f"[+] Found characteristic {uuid} on {self._devices[addr]['name']}")
-
-        elif event == _IRQ_GATTC_NOTIFY:
-            conn_handle, value_handle, notify_data = data
+        # Connect to discovered devices
+        for addr in self._scan_results:
+            if addr not in self._connections:
+                self._connect_to_device(addr)
+
+    def _on_peripheral_connect(self, data):
+        conn_handle, addr_type, addr = data
+        addr = bytes(addr)
+        if dbg:
+            print(f"[+] Connected: {self._devices[addr]['name']}")
+        self._connections[addr] = conn_handle
+        self._connecting = False
+
+        # Discover services
+        self._ble.gattc_discover_services(conn_handle)
+
+    def _on_peripheral_disconnect(self, data):
+        conn_handle, addr_type, addr = data
+        addr = bytes(addr)
+        if dbg:
+            print(f"[-] Disconnected: {self._devices[addr]['name']}")
+        if addr in self._connections:
+            del self._connections[addr]
+            del self._characteristics[addr]
+
+    def _on_service_result(self, data):
+        conn_handle, start_handle, end_handle, uuid = data
+        if uuid == MEDIA_SERVICE_UUID:
             addr = self._get_addr_from_conn_handle(conn_handle)
-            self._handle_notification(addr, value_handle, notify_data)
+            self._devices[addr]["services"][uuid] = (start_handle, end_handle)
+            if dbg:
+                print(f"[+] Found media service on {self._devices[addr]['name']}")
+
+    def _on_service_done(self, data):
+        conn_handle, status = data
+        addr = self._get_addr_from_conn_handle(conn_handle)
+        if MEDIA_SERVICE_UUID in self._devices[addr]["services"]:
+            start, end = self._devices[addr]["services"][MEDIA_SERVICE_UUID]
+            self._ble.gattc_discover_characteristics(conn_handle, start, end)
+
+    def _on_characteristic_result(self, data):
+        conn_handle, def_handle, value_handle, properties, uuid = data
+        addr = self._get_addr_from_conn_handle(conn_handle)
+
+        if addr not in self._characteristics:
+            self._characteristics[addr] = {}
+
+        self._characteristics[addr][uuid] = value_handle
+
+        if dbg and uuid in [PLAYBACK_CHAR_UUID, TRACK_INFO_CHAR_UUID, 
+                           VOLUME_CHAR_UUID, STATUS_CHAR_UUID,
+                           METADATA_CHAR_UUID, POSITION_CHAR_UUID,
+                           DURATION_CHAR_UUID]:
+            print(f"[+] Found characteristic {uuid} on {self._devices[addr]['name']}")
+
+    def _on_notify(self, data):
+        conn_handle, value_handle, notify_data = data
+        addr = self._get_addr_from_conn_handle(conn_handle)
+        self._handle_notification(addr, value_handle, notify_data)
 
     def start_scan(self, duration_ms=5000):
         """Start scanning for media devices."""
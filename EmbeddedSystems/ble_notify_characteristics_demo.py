@@ -3,13 +3,23 @@ from machine import Pin
 import struct
 from micropython import const
 from ble_advertising import advertising_payload
+# Shared notification scheduler (copy notify_scheduler.py and conn_slots.py
+# from EmbeddedSystems/AudioSink/ble/ to ble/ on the board)
+from ble.notify_scheduler import NotifyScheduler
 import time
 
 # IRQ Event Constants
 _IRQ_CENTRAL_CONNECT = const(1)
 _IRQ_CENTRAL_DISCONNECT = const(2)
+_IRQ_GATTS_WRITE = const(3)
 _IRQ_GATTS_INDICATE_DONE = const(20)
 
+# Notifications gathered over this window go out together, at most _NOTIFY_BUDGET
+# per connection per _NOTIFY_PERIOD_MS, and only to centrals that subscribed
+_NOTIFY_WINDOW_MS = const(100)
+_NOTIFY_BUDGET = const(4)
+_NOTIFY_PERIOD_MS = const(1000)
+
 # Flag Constants for Notify/Indicate Characteristics
 _FLAG_READ = const(0x0002)
 _FLAG_NOTIFY = const(0x0010)
@@ -77,26 +87,43 @@ class BLENotifyDemo:
         self._connections = set()
         self._indicate_pending = False
         
+        # Scheduled notifications; CCCD writes tell who subscribed
+        self.notify = NotifyScheduler(self._ble, window_ms=_NOTIFY_WINDOW_MS,
+                                      budget=_NOTIFY_BUDGET, period_ms=_NOTIFY_PERIOD_MS)
+        for handle in (self._handle_basic_notify, self._handle_encrypted_notify,
+                       self._handle_authenticated_notify, self._handle_authorized_notify):
+            self.notify.add(handle)
+        
+        self._name = name
+        self._advertise()
+
+    def _advertise(self, interval_us=500000):
         # Split advertising to stay within size limits
         adv_data = advertising_payload(services=[_NOTIFY_DEMO_UUID])
-        resp_data = advertising_payload(name="notify-demo")
-        self._ble.gap_advertise(500000, adv_data=adv_data, resp_data=resp_data)
+        resp_data = advertising_payload(name=self._name)
+        self._ble.gap_advertise(interval_us, adv_data=adv_data, resp_data=resp_data)
 
     def _irq(self, event, data):
         if event == _IRQ_CENTRAL_CONNECT:
             conn_handle, _, _ = data
             print("[+] Connected:", conn_handle)
             self._connections.add(conn_handle)
+            self.notify.on_connect(conn_handle)
             self._update_status(f"Connected: {conn_handle}")
 
         elif event == _IRQ_CENTRAL_DISCONNECT:
             conn_handle, _, _ = data
             print("[-] Disconnected:", conn_handle)
             self._connections.remove(conn_handle)
+            self.notify.on_disconnect(conn_handle)
             self._indicate_pending = False
             self._advertise()
             self._update_status("Disconnected")
 
+        elif event == _IRQ_GATTS_WRITE:
+            # Subscriptions (CCCD writes)
+            self.notify.on_cccd_write(data)
+
         elif event == _IRQ_GATTS_INDICATE_DONE:
             conn_handle, value_handle, status = data
             print(f"[*] Indication {'acknowledged' if status == 0 else 'failed'}")
@@ -113,6 +140,9 @@ class BLENotifyDemo:
         1 = Encrypted
         2 = Authenticated
         3 = Authorized
+        
+        The value is written now and notified to subscribed centrals once
+        the scheduler's window ends (poll()); updates in between are merged.
         """
         if not self._connections:
             return
@@ -125,9 +155,8 @@ class BLENotifyDemo:
         ]
         
         if security_level < len(handles):
-            for conn_handle in self._connections:
-                self._ble.gatts_notify(conn_handle, handles[security_level], data)
-                self._update_status(f"Notification sent (level {security_level})")
+            if self.notify.update(handles[security_level], data):
+                self._update_status(f"Notification queued (level {security_level})")
 
     def indicate(self, data):
         """Send indication and wait for acknowledgment"""
@@ -148,6 +177,7 @@ def demo():
     counter = 0
     
     while True:
+        notify_demo.notify.poll()
         if notify_demo._connections:
             led.on()
             
@@ -3,6 +3,9 @@ import struct
 import time
 from machine import Pin
 from micropython import const
+# Shared deferred IRQ work (copy EmbeddedSystems/AudioSink/ble/deferred.py
+# to ble/deferred.py on the board)
+from ble.deferred import DeferredWork
 
 # Debug flag
 dbg = 1
@@ -23,6 +26,10 @@ _PASSKEY_ACTION_INPUT = const(2)
 _PASSKEY_ACTION_DISPLAY = const(3)
 _PASSKEY_ACTION_NUMERIC_COMPARISON = const(4)
 
+# Passkey prompts wait for the main loop (run_deferred()), never in the IRQ
+_DEFERRED_SLOTS = const(2)
+_PASSKEY_FORMAT = '<BI'     # action, passkey
+
 # Security levels
 _SECURITY_MODE1_LEVEL1 = const(0)  # No security
 _SECURITY_MODE1_LEVEL2 = const(1)  # Unauthenticated pairing with encryption
@@ -33,7 +40,9 @@ class BLESecureDevice:
     def __init__(self, name="secure-device"):
         self._ble = bluetooth.BLE()
         self._ble.active(True)
-        self._ble.irq(self._irq)
+        self._work = DeferredWork(_DEFERRED_SLOTS, struct.calcsize(_PASSKEY_FORMAT))
+        self._passkey_buf = bytearray(struct.calcsize(_PASSKEY_FORMAT))
+        self._ble.irq(self._work.timed(self._irq))
         self._name = name
         self._connections = set()
         self.led = Pin("LED", Pin.OUT)
@@ -130,20 +139,37 @@ class BLESecureDevice:
                 print(f"[*] Passkey: {passkey:06d}")
                 self._ble.gap_passkey(conn_handle, action, passkey)
                 
-            elif action == _PASSKEY_ACTION_INPUT:
-                # Request passkey input
-                print("[?] Enter passkey displayed on peer device:")
-                passkey = int(input())
-                self._ble.gap_passkey(conn_handle, action, passkey)
-                
-            elif action == _PASSKEY_ACTION_NUMERIC_COMPARISON:
-                # Request numeric comparison
-                print(f"[?] Compare: {passkey:06d}")
-                print("    Accept? (y/n):")
-                if input().strip().lower() == 'y':
-                    self._ble.gap_passkey(conn_handle, action, 1)
-                else:
-                    self._ble.gap_passkey(conn_handle, action, 0)
+            elif action == _PASSKEY_ACTION_INPUT or action == _PASSKEY_ACTION_NUMERIC_COMPARISON:
+                # The user answers from the main loop; input() would block the IRQ
+                struct.pack_into(_PASSKEY_FORMAT, self._passkey_buf, 0, action, passkey or 0)
+                if not self._work.defer(self._passkey_prompt, conn_handle, self._passkey_buf):
+                    print("[!] Passkey prompt dropped, one is already waiting")
+
+    def _passkey_prompt(self, conn_handle, slot):
+        """Ask the user for the passkey action deferred from the IRQ."""
+        action, passkey = struct.unpack_from(_PASSKEY_FORMAT, slot)
+        if action == _PASSKEY_ACTION_INPUT:
+            # Request passkey input
+            print("[?] Enter passkey displayed on peer device:")
+            passkey = int(input())
+            self._ble.gap_passkey(conn_handle, action, passkey)
+            
+        elif action == _PASSKEY_ACTION_NUMERIC_COMPARISON:
+            # Request numeric comparison
+            print(f"[?] Compare: {passkey:06d}")
+            print("    Accept? (y/n):")
+            if input().strip().lower() == 'y':
+                self._ble.gap_passkey(conn_handle, action, 1)
+            else:
+                self._ble.gap_passkey(conn_handle, action, 0)
+
+    def run_deferred(self):
+        """Run the work deferred from the IRQ (call from the main loop)."""
+        return self._work.drain()
+
+    def get_irq_stats(self):
+        """IRQ time and deferred queue depth (see ble/deferred.py)."""
+        return self._work.get_stats()
 
     def _advertise(self, interval_us=100000):
         """Start advertising with security flags."""
@@ -183,6 +209,9 @@ def demo():
     
     try:
         while True:
+            # Answer passkey prompts outside the IRQ
+            secure_dev.run_deferred()
+            
             # Blink LED based on security state
             if secure_dev._connections:
                 if secure_dev.is_encrypted():
@@ -42,6 +42,9 @@ import struct
 import time
 from machine import Pin, PWM
 from ble_advertising import advertising_payload
+# Shared IRQ dispatcher (copy EmbeddedSystems/AudioSink/ble/irq_dispatch.py
+# to ble/irq_dispatch.py on the board)
+from ble.irq_dispatch import IRQDispatcher
 
 from micropython import const
 
@@ -413,8 +416,9 @@ class BLESimplePeripheral:
         self._ble = ble
         # Sets the BLE radio to being on
         self._ble.active(True)
-        # Registers a callback for events from the BLE stack; using the Class' _irq function at the BLE Object's callback
-        self._ble.irq(self._irq)
+        # Registers a callback for events from the BLE stack; using the Class' IRQ Dispatcher as the BLE Object's callback
+        self._irq = IRQDispatcher()
+        self._ble.irq(self._irq.dispatch)
         # Configures the server with the specified services; which replaces any existing services
         #((self._handle_tx, self._handle_rx),) = self._ble.gatts_register_services((_UART_SERVICE,))
         # Configures the Read Service into the Server
@@ -437,6 +441,8 @@ class BLESimplePeripheral:
             (self._handle__indiciate_read, self._handle__indicate_write_no_response, self._handle__indicate_write_response),    # INDICATE
             (self._handle__notify_indicate_read, self._handle__notify_indicate_write_no_response, self._handle__notify_indicate_write_response),    # NOTIFY + INDICATE
          ) = self._ble.gatts_register_services(_SERVICES)
+        # Map each IRQ Event (and Write handle) to its handler function; Note: Needs the handles from above
+        self._register_irq_handlers()
         # Other configuration
         self._connections = set()
         self._write_callback = None
@@ -459,267 +465,344 @@ class BLESimplePeripheral:
         self.LED_SWITCH = False 
         #self.oj_led = Pin(TEST__ORANGE_WIRE, Pin.OUT)
 
-    # Function definition for BLE Event Handling
+    # Function for registering the BLE Event Handlers with the IRQ Dispatcher
     #   - Note: There is a full example of all expected data breakdowns for each event within the micropython library listed above; THIS is WHERE knowledge of each OUTPUT COMES FROM
-    def _irq(self, event, data):
-        ## Connection Events
-        # A central device has connected to this peripheral
-        if event == _IRQ_CENTRAL_CONNECT:
-            conn_handle, _, _ = data
-            #print("New connection", conn_handle)
-            print("[+] New connection\t-\t[ {0} ]".format(conn_handle))
-            self._connections.add(conn_handle)
-        # A central device has disconnected to this peripheral
-        elif event == _IRQ_CENTRAL_DISCONNECT:
-            conn_handle, _, _ = data
-            #print("Disconnected", conn_handle)
-            print("[-] Disconnected\t-\t[ {0} ]".format(conn_handle))
-            self._connections.remove(conn_handle)
-            self._advertise()
-        # Connection update event has occurred
-        elif event == _IRQ_CONNECTION_UPDATE:
-            print("[*] IRQ Connection Update has Occurred")
-            print("\tEvent:\t\t{0}\n\tData:\t\t{1}".format(event, data))
-            pass
-
-        ## Write Events
-        # A client has written to this Characteristic or Descriptor
-        elif event == _IRQ_GATTS_WRITE:
-            print("[*] Write Event Occuring")
-            # Extract the Connection Hande ('conn_handle') and Value Handle ('value_handle') from the received data; Note: 'data' is an expected event variable(, or is it configured elsewhere?)
-            conn_handle, value_handle = data
-            # Extract the value of the data at the 'value_handle' via GATT
-            value = self._ble.gatts_read(value_handle)
-            print("\tValue:\t\t{0}\n\tValue Handle:\t{1}".format(value, value_handle))
-            ## Breakdown of Write Event based on Intended Handle
-            # Write action for regular function of UART RX line; NOTE: Pay attention to the self._write* properties being used as secondary checks for what function is called
-            if value_handle == self._handle_rx and self._write_callback:
-                print("[+] Making Callack since Value Handle [{0}] Matched Handle RX [{1}]".format(value_handle, self._handle_rx))
-                # Call to the established function pointed to by 'self._write_callback()'
-                self._write_callback(value)
-            # Write action for the Write Service Characteristic 01
-            elif value_handle == self._handle__write_general and self._write_service__char_01__callback:
-                print("[+] Making W-Serv Char 01 Callback since Value Handle [{0}] Matched Handle RX [{1}]".format(value_handle, self._handle__write_general))
-                self._write_service__char_01__callback(value)
-            # Write action for the Write Service Characteristic 02
-            elif value_handle == self._handle__write_variable and self._write_service__char_02__callback:
-                print("[+] Making W-Serv Char 02 Callback since Value Handle [{0}] Matched Handle RX [{1}]".format(value_handle, self._handle__write_variable))
-                self._write_service__char_02__callback(value)     ## TODO: Fix to make the correct callback function call
-                #self._write_callback(value)
-            # Write action for the RGB Array Write Characteristic
-            elif value_handle == self._handle__rgb_array_write and self._rgb_service__array_write__callback:
-                print("[+] Making RGB Array Write Callback since Value Handle [{0}] Matched Handle RX [{1}]".format(value_handle, self._handle__rgb_array_write))
-                self._rgb_service__array_write__callback(value)
-
-        # A client has completed a write event to a Characteristic or Descriptor
-        elif event == _IRQ_GATTC_WRITE_DONE:
-            print("[*] Write Event has Completed")
-
-        ## Reading Events
-        # A client has requests a read to this Characteristic or Descriptor
-        elif event == _IRQ_GATTS_READ_REQUEST:
-            print("[*] Read Request Event Occuring")
-            #conn_handle, value_handle, unknown = data
-            #conn_handle, value_handle = data
-            conn_handle, attr_handle = data
-            if dbg != 1:        # ~!~
-                #print("[?] Debugging [ _IRQ_GATTS_READ_REQUEST ] Event\t\t-\t\tVariable Breakdown:\n\tConn Handle:\t\t{0}\n\tValue Handle:\t\t{1}\n\tUnknown Third Thing:\t{2}".format(conn_handle, value_handle, unknown))
-                print("[?] Debugging [ _IRQ_GATTS_READ_REQUEST ] Event\t\t-\tVariable Breakdown:\n\tConn Handle:\t\t{0}\n\tAttr Handle:\t\t{1}".format(conn_handle, attr_handle))
-            ## Note: Unsure how to capture the Response Code, may not need this here?
-            '''
-            _GATTS_NO_ERROR = const(0x00)
-            _GATTS_ERROR_READ_NOT_PERMITTED = const(0x02)
-            _GATTS_ERROR_WRITE_NOT_PERMITTED = const(0x03)
-            _GATTS_ERROR_INSUFFICIENT_AUTHENTICATION = const(0x05)
-            _GATTS_ERROR_INSUFFICIENT_AUTHORIZATION = const(0x08)
-            _GATTS_ERROR_INSUFFICIENT_ENCRYPTION = const(0x0f)
-            '''
-        # A client has generated a result from a read event to a Characteristic or Descriptor
-        elif event == _IRQ_GATTC_READ_RESULT :
-            print("[*] Read Result Event Occuring")
-            if dbg != 1:        # ~!~
-                print("[?] Debugging [ _IRQ_GATTC_READ_RESULT ] Event\t\t-\t\tVariable Breakdown:\n\tData:\t\t{0}".format(data))
-            # A gattc_read() has completed
-            conn_handle, value_handle, char_data = data
-        # A client has completed a read event to a Characteristic or Descriptor
-        elif event == _IRQ_GATTC_READ_DONE:
-            print("[*] Read Event has Completed")
-            if dbg != 1:        # ~!~
-                print("[?] Debugging [ _IRQ_GATTC_READ_DONE ] Event\t\t-\t\tVariable Breakdown:\n\tData:\t\t{0}".format(data))
-            # A gattc_read() has completed.
-            # Note: Status will be zero on success, implementation-specific value otherwise.
-            conn_handle, value_handle, status = data
-
-        ## Scan Events
-        # A single scan result; NOTE: This event is not defined
-        elif event == _IRQ_SCAN_RESULT:
-            print("[*] Single Scan Result:")
-            addr_type, addr, adv_type, rssi, adv_data = data
-            print("\tAddress Type:\t{0}\n\tAddress:\t\t{1}\n\tAdv Type:\t{2}\n\tRSSI:\t\t{3}\n\tAdv Data:\t\t{4}".format(addr_type, addr, adv_type, rssi, adv_data))
-        # Scan duration finished or was manually stopped
-        elif event == _IRQ_SCAN_DONE:
-            print("[*] IRQ Scan Completed OR Stopped")
-            pass
-
-        ## Notification/Indicate Events
-        # A GATT Notify Event has Occurred
-        elif event == _IRQ_GATTC_NOTIFY:
-            print("[*] GATT Notify Event Occuring")
-            # A server has sent a notify request.
-            conn_handle, value_handle, notify_data = data
-            if dbg != 0:
-                print("[+] IRQ Event::Notify Event:\t[ Connection Handle ]:{0}\t\t[ Value Handle ]:{1}\t\t[ Notify Data ]:{2}".format(conn_handle, value_handle, notify_data))
-        # A GATT Indicate Event has Occurred
-        elif event == _IRQ_GATTC_INDICATE: 
-            print("[*] GATT Indicate Event Occuring")
-            # A server has sent an indicate request.
-            conn_handle, value_handle, notify_data = data
-            if dbg != 0:
-                print("[+] IRQ Event::Indicate Event:\t[ Connection Handle ]:{0}\t\t[ Value Handle ]:{1}\t\t[ Notify Data ]:{2}".format(conn_handle, value_handle, notify_data))
-        # A GATT Indicate Event has Completed
-        elif event == _IRQ_GATTS_INDICATE_DONE:
-            print("[*] GATT Indicate Event has Completed")
-            # A client has acknowledged the indication.
-            # Note: Status will be zero on successful acknowledgment, implementation-specific value otherwise.
-            conn_handle, value_handle, status = data
-            if dbg != 0:
-                print("[+] IRQ Event::Indicate Completed:\t[ Connection Handle ]:{0}\t\t[ Value Handle ]:{1}\t\t[ Status ]:{2}".format(conn_handle, value_handle, status))
-
-        ## Services Events
-        # Result from a service being discovered 
-        elif event == _IRQ_GATTC_SERVICE_RESULT:
-            # Called for each service found by gattc_discover_services().
-            conn_handle, start_handle, end_handle, uuid = data
-            print("[*] GATT Service Discovered by Scan")
-            if dbg != 0:
-                print("[+] IRQ Event::Service Result:\t[ Connection Handle ]:{0}\t\t[ Start Handle ]:{1}\t\t[ End Handle ]:{2}\t\t[ UUID ]:{3}".format(conn_handle, start_handle, end_handle, uuid))
-
-        # Service discovery has completed
-        elif event == _IRQ_GATTC_SERVICE_DONE:
-            # Called once service discovery is complete.
-            # Note: Status will be zero on success, implementation-specific value otherwise.
-            conn_handle, status = data
-            print("[*] GATT Service Discovery has Completed")
-            if dbg != 0:
-                print("[+] IRQ Event::Service Done:\t[ Connection Handle ]:{0}\t\t[ Status ]:{1}".format(conn_handle, status))
-
-        ## Characteristics Events
-        # Result from a characteristic being discovered
-        elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
-            # Called for each characteristic found by gattc_discover_services().
-            conn_handle, end_handle, value_handle, properties, uuid = data
-            print("[*] GATT Characteristic Discovered by Scan")
-            if dbg != 0:
-                print("[+] IRQ Event::Characteristic Result:\t[ Connection Handle ]:{0}\t\t[ End Handle ]:{1}\t\t[ Value Handle ]:{2}\t\t[ Properties ]:{3}\t\t[ UUID ]:{4}".format(conn_handle, end_handle, value_handle, properties, uuid))
-        # Characteristic discovery has completed
-        elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
-            # Called once service discovery is complete.
-            # Note: Status will be zero on success, implementation-specific value otherwise.
-            conn_handle, status = data
-            print("[*] GATT Characteristic Discovery has Completed")
-            if dbg != 0:
-                print("[+] IRQ Event::Characteristic Done:\t[ Connection Handle ]:{0}\t\t[ Status ]:{1}".format(conn_handle, status))
-
-        ## Descriptor Events
-        # Result from a descriptor being discovered
-        elif event == _IRQ_GATTC_DESCRIPTOR_RESULT:
-            # Called for each descriptor found by gattc_discover_descriptors().
-            conn_handle, dsc_handle, uuid = data
-            print("[*] GATT Descriptor Discovered by Scan")
-            if dbg != 0:
-                print("[+] IRQ Event::Descriptor Result:\t[ Connection Handle ]:{0}\t\t[ Descriptor Handle ]:{1}\t\t[ UUID ]:{2}".format(conn_handle, dsc_handle, uuid))
-        # Descriptor discovery has completed
-        elif event == _IRQ_GATTC_DESCRIPTOR_DONE:
-            # Called once service discovery is complete.
-            # Note: Status will be zero on success, implementation-specific value otherwise.
-            conn_handle, status = data
-            print("[*] GATT Descriptor Discovery has Completed")
-            if dbg != 0:
-                print("[+] IRQ Event::Descriptor Done:\t[ Connection Handle ]:{0}\t\t[ Status ]:{1}".format(conn_handle, status))
-
-        ## L2CAP Events
-        # An L2CAP Accept Event Occured
-        elif event == _IRQ_L2CAP_ACCEPT:
-            # A new channel has been accepted.
-            # Return a non-zero integer to reject the connection, or zero (or None) to accept.
-            conn_handle, cid, psm, our_mtu, peer_mtu = data
-            print("[*] L2CAP Accept Event Occuring")
-            if dbg != 0:
-                print("[+] IRQ Event::L2CAP Accept:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}\t\t[ PSM ]:{2}\t\t[ Our MTU ]:{3}\t\t[ Peer MTU ]:{4}".format(conn_handle, cid, psm, our_mtu, peer_mtu))
-        # An L2CAP Connect Event Occured
-        elif event == _IRQ_L2CAP_CONNECT:
-            # A new channel is now connected (either as a result of connecting or accepting).
-            conn_handle, cid, psm, our_mtu, peer_mtu = data
-            print("[*] L2CAP Connect Event Occuring")
-            if dbg != 0:
-                print("[+] IRQ Event::L2CAP Connect:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}\t\t[ PSM ]:{2}\t\t[ Our MTU ]:{3}\t\t[ Peer MTU ]:{4}".format(conn_handle, cid, psm, our_mtu, peer_mtu))
-        # An L2CAP Disconnect Event Occured
-        elif event == _IRQ_L2CAP_DISCONNECT:
-            # Existing channel has disconnected (status is zero), or a connection attempt failed (non-zero status).
-            conn_handle, cid, psm, status = data
-            print("[*] L2CAP Disconnect Event Occuring")
-            if dbg != 0:
-                print("[+] IRQ Event::L2CAP Disconnect:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}\t\t[ PSM ]:{2}\t\t[ Status ]:{3}".format(conn_handle, cid, psm, status))
-        # An L2CAP Received Event Occured
-        elif event == _IRQ_L2CAP_RECV:
-            # New data is available on the channel. Use l2cap_recvinto to read.
-            conn_handle, cid = data
-            print("[*] L2CAP Received Event Occuring")
-            if dbg != 0:
-                print("[+] IRQ Event::L2CAP Received:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}".format(conn_handle, cid))
-        # An L2cap Send Ready Event Occured
-        elif event == _IRQ_L2CAP_SEND_READY:
-            # A previous l2cap_send that returned False has now completed and the channel is ready to send again.
-            # If status is non-zero, then the transmit buffer overflowed and the application should re-send the data.
-            conn_handle, cid, status = data
-            print("[*] L2CAP Send Ready Event Occuring")
-            if dbg != 0:
-                print("[+] IRQ Event::L2CAP Send Ready:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}\t\t[ Status ]:{2}".format(conn_handle, cid, status))
-
-        ## Secret Events
-        # A Get Secret Event is Occuring
-        elif event == _IRQ_GET_SECRET:
-            print("[*] Get Secret Event Occuring")
-            # Return a stored secret.
-            # If key is None, return the index'th value of this sec_type.
-            # Otherwise return the corresponding value for this sec_type and key.
-            sec_type, index, key = data
-            if dbg != 0:
-                print("[+] IRQ Event::Get Secret:\t[ Sec Type ]:{0}\t\t[ Index ]:{1}\t\t[ Key ]:{2}".format(sec_type, index, key))
-            return value
-        # A Set Secret Event is Occuring
-        elif event == _IRQ_SET_SECRET:
-            print("[*] Set Secret Event Occuring")
-            # Save a secret to the store for this sec_type and key.
-            sec_type, key, value = data
-            if dbg != 0:
-                print("[+] IRQ Event::Set Secret:\t[ Sec Type ]:{0}\t\t[ Index ]:{1}\t\t[ Key ]:{2}".format(sec_type, key, value))
-            return True
-
-        ## Encryption Events
-        elif event == _IRQ_ENCRYPTION_UPDATE:
-            print("[*] Encryption Update Event Occuring")
-            # The encryption state has changed (likely as a result of pairing or bonding).
-            conn_handle, encrypted, authenticated, bonded, key_size = data
-            if dbg != 0:
-                print("[+] IRQ Event::Encryption Update:\t[ Conneciton Handle ]:{0}\t\t[ Encrypted ]:{1}\t\t[ Authenticated ]:{2}\t\t[ Bonded ]:{3}\t\t[ Key Size ]:{4}".format(conn_handle, encrypted, authenticated, bonded, key_size))
-
-        ## Passkey Action Events
-        elif event == _IRQ_PASSKEY_ACTION:
-            print("[*] Passkey Action Event Occuring")
-            # Respond to a passkey request during pairing.
-            # See gap_passkey() for details.
-            # action will be an action that is compatible with the configured "io" config.
-            # passkey will be non-zero if action is "numeric comparison".
-            conn_handle, action, passkey = data
-            if dbg != 0:
-                print("[+] IRQ Event::Passkey Action:\t[ Connection Handle ]:{0}\t\t[ Action ]:{1}\t\t[ Passkey ]:{2}".format(conn_handle, action, passkey))
-        
+    #   - Note: Each event (and each Write handle) goes straight to its own function, instead of walking an if/elif chain on every IRQ
+    def _register_irq_handlers(self):
+        for event, handler in (
+            # Connection Events
+            (_IRQ_CENTRAL_CONNECT, self._irq__central_connect),
+            (_IRQ_CENTRAL_DISCONNECT, self._irq__central_disconnect),
+            (_IRQ_CONNECTION_UPDATE, self._irq__connection_update),
+            # Write Events
+            (_IRQ_GATTS_WRITE, self._irq__gatts_write),
+            (_IRQ_GATTC_WRITE_DONE, self._irq__gattc_write_done),
+            # Reading Events
+            (_IRQ_GATTS_READ_REQUEST, self._irq__gatts_read_request),
+            (_IRQ_GATTC_READ_RESULT, self._irq__gattc_read_result),
+            (_IRQ_GATTC_READ_DONE, self._irq__gattc_read_done),
+            # Scan Events
+            (_IRQ_SCAN_RESULT, self._irq__scan_result),
+            (_IRQ_SCAN_DONE, self._irq__scan_done),
+            # Notification/Indicate Events
+            (_IRQ_GATTC_NOTIFY, self._irq__gattc_notify),
+            (_IRQ_GATTC_INDICATE, self._irq__gattc_indicate),
+            (_IRQ_GATTS_INDICATE_DONE, self._irq__gatts_indicate_done),
+            # Services Events
+            (_IRQ_GATTC_SERVICE_RESULT, self._irq__gattc_service_result),
+            (_IRQ_GATTC_SERVICE_DONE, self._irq__gattc_service_done),
+            # Characteristics Events
+            (_IRQ_GATTC_CHARACTERISTIC_RESULT, self._irq__gattc_characteristic_result),
+            (_IRQ_GATTC_CHARACTERISTIC_DONE, self._irq__gattc_characteristic_done),
+            # Descriptor Events
+            (_IRQ_GATTC_DESCRIPTOR_RESULT, self._irq__gattc_descriptor_result),
+            (_IRQ_GATTC_DESCRIPTOR_DONE, self._irq__gattc_descriptor_done),
+            # L2CAP Events
+            (_IRQ_L2CAP_ACCEPT, self._irq__l2cap_accept),
+            (_IRQ_L2CAP_CONNECT, self._irq__l2cap_connect),
+            (_IRQ_L2CAP_DISCONNECT, self._irq__l2cap_disconnect),
+            (_IRQ_L2CAP_RECV, self._irq__l2cap_recv),
+            (_IRQ_L2CAP_SEND_READY, self._irq__l2cap_send_ready),
+            # Secret Events
+            (_IRQ_GET_SECRET, self._irq__get_secret),
+            (_IRQ_SET_SECRET, self._irq__set_secret),
+            # Encryption Events
+            (_IRQ_ENCRYPTION_UPDATE, self._irq__encryption_update),
+            # Passkey Action Events
+            (_IRQ_PASSKEY_ACTION, self._irq__passkey_action),
+        ):
+            self._irq.on(event, handler)
+        ## Breakdown of Write Event based on Intended Handle; other handles fall back to self._irq__gatts_write()
+        self._irq.on_handle(_IRQ_GATTS_WRITE, self._handle_rx, self._irq__write_rx)
+        self._irq.on_handle(_IRQ_GATTS_WRITE, self._handle__write_general, self._irq__write_general)
+        self._irq.on_handle(_IRQ_GATTS_WRITE, self._handle__write_variable, self._irq__write_variable)
+        self._irq.on_handle(_IRQ_GATTS_WRITE, self._handle__rgb_array_write, self._irq__write_rgb_array)
         ## Unknown/Unexpected Events
-        # Unknown Debugging Check for IRQ
-        else:
-            if dbg != 0:    # ~!~
-                print("[!] Unkonwn [ _IRQ ] Event Occured!\n\tEvent\t\t{0}\n\tData:\t\t{1}".format(event, data))
+        self._irq.on_unhandled(self._irq__unknown)
+
+    ## Connection Events
+    # A central device has connected to this peripheral
+    def _irq__central_connect(self, data):
+        conn_handle, _, _ = data
+        #print("New connection", conn_handle)
+        print("[+] New connection\t-\t[ {0} ]".format(conn_handle))
+        self._connections.add(conn_handle)
+
+    # A central device has disconnected to this peripheral
+    def _irq__central_disconnect(self, data):
+        conn_handle, _, _ = data
+        #print("Disconnected", conn_handle)
+        print("[-] Disconnected\t-\t[ {0} ]".format(conn_handle))
+        self._connections.remove(conn_handle)
+        self._advertise()
+
+    # Connection update event has occurred
+    def _irq__connection_update(self, data):
+        print("[*] IRQ Connection Update has Occurred")
+        print("\tEvent:\t\t{0}\n\tData:\t\t{1}".format(_IRQ_CONNECTION_UPDATE, data))
+
+    ## Write Events
+    # A client has written to this Characteristic or Descriptor
+    def _irq__gatts_write(self, data):
+        print("[*] Write Event Occuring")
+        # Extract the Connection Hande ('conn_handle') and Value Handle ('value_handle') from the received data; Note: 'data' is an expected event variable(, or is it configured elsewhere?)
+        conn_handle, value_handle = data
+        # Extract the value of the data at the 'value_handle' via GATT
+        value = self._ble.gatts_read(value_handle)
+        print("\tValue:\t\t{0}\n\tValue Handle:\t{1}".format(value, value_handle))
+        return value
+
+    # Write action for regular function of UART RX line; NOTE: Pay attention to the self._write* properties being used as secondary checks for what function is called
+    def _irq__write_rx(self, data):
+        value = self._irq__gatts_write(data)
+        if self._write_callback:
+            print("[+] Making Callack since Value Handle [{0}] Matched Handle RX [{1}]".format(data[1], self._handle_rx))
+            # Call to the established function pointed to by 'self._write_callback()'
+            self._write_callback(value)
+
+    # Write action for the Write Service Characteristic 01
+    def _irq__write_general(self, data):
+        value = self._irq__gatts_write(data)
+        if self._write_service__char_01__callback:
+            print("[+] Making W-Serv Char 01 Callback since Value Handle [{0}] Matched Handle RX [{1}]".format(data[1], self._handle__write_general))
+            self._write_service__char_01__callback(value)
+
+    # Write action for the Write Service Characteristic 02
+    def _irq__write_variable(self, data):
+        value = self._irq__gatts_write(data)
+        if self._write_service__char_02__callback:
+            print("[+] Making W-Serv Char 02 Callback since Value Handle [{0}] Matched Handle RX [{1}]".format(data[1], self._handle__write_variable))
+            self._write_service__char_02__callback(value)     ## TODO: Fix to make the correct callback function call
+            #self._write_callback(value)
+
+    # Write action for the RGB Array Write Characteristic
+    def _irq__write_rgb_array(self, data):
+        value = self._irq__gatts_write(data)
+        if self._rgb_service__array_write__callback:
+            print("[+] Making RGB Array Write Callback since Value Handle [{0}] Matched Handle RX [{1}]".format(data[1], self._handle__rgb_array_write))
+            self._rgb_service__array_write__callback(value)
+
+    # A client has completed a write event to a Characteristic or Descriptor
+    def _irq__gattc_write_done(self, data):
+        print("[*] Write Event has Completed")
+
+    ## Reading Events
+    # A client has requests a read to this Characteristic or Descriptor
+    def _irq__gatts_read_request(self, data):
+        print("[*] Read Request Event Occuring")
+        #conn_handle, value_handle, unknown = data
+        #conn_handle, value_handle = data
+        conn_handle, attr_handle = data
+        if dbg != 1:        # ~!~
+            #print("[?] Debugging [ _IRQ_GATTS_READ_REQUEST ] Event\t\t-\t\tVariable Breakdown:\n\tConn Handle:\t\t{0}\n\tValue Handle:\t\t{1}\n\tUnknown Third Thing:\t{2}".format(conn_handle, value_handle, unknown))
+            print("[?] Debugging [ _IRQ_GATTS_READ_REQUEST ] Event\t\t-\tVariable Breakdown:\n\tConn Handle:\t\t{0}\n\tAttr Handle:\t\t{1}".format(conn_handle, attr_handle))
+        ## Note: Unsure how to capture the Response Code, may not need this here?
+        '''
+        _GATTS_NO_ERROR = const(0x00)
+        _GATTS_ERROR_READ_NOT_PERMITTED = const(0x02)
+        _GATTS_ERROR_WRITE_NOT_PERMITTED = const(0x03)
+        _GATTS_ERROR_INSUFFICIENT_AUTHENTICATION = const(0x05)
+        _GATTS_ERROR_INSUFFICIENT_AUTHORIZATION = const(0x08)
+        _GATTS_ERROR_INSUFFICIENT_ENCRYPTION = const(0x0f)
+        '''
+
+    # A client has generated a result from a read event to a Characteristic or Descriptor
+    def _irq__gattc_read_result(self, data):
+        print("[*] Read Result Event Occuring")
+        if dbg != 1:        # ~!~
+            print("[?] Debugging [ _IRQ_GATTC_READ_RESULT ] Event\t\t-\t\tVariable Breakdown:\n\tData:\t\t{0}".format(data))
+        # A gattc_read() has completed
+        conn_handle, value_handle, char_data = data
+
+    # A client has completed a read event to a Characteristic or Descriptor
+    def _irq__gattc_read_done(self, data):
+        print("[*] Read Event has Completed")
+        if dbg != 1:        # ~!~
+            print("[?] Debugging [ _IRQ_GATTC_READ_DONE ] Event\t\t-\t\tVariable Breakdown:\n\tData:\t\t{0}".format(data))
+        # A gattc_read() has completed.
+        # Note: Status will be zero on success, implementation-specific value otherwise.
+        conn_handle, value_handle, status = data
+
+    ## Scan Events
+    # A single scan result; NOTE: This event is not defined
+    def _irq__scan_result(self, data):
+        print("[*] Single Scan Result:")
+        addr_type, addr, adv_type, rssi, adv_data = data
+        print("\tAddress Type:\t{0}\n\tAddress:\t\t{1}\n\tAdv Type:\t{2}\n\tRSSI:\t\t{3}\n\tAdv Data:\t\t{4}".format(addr_type, addr, adv_type, rssi, adv_data))
+
+    # Scan duration finished or was manually stopped
+    def _irq__scan_done(self, data):
+        print("[*] IRQ Scan Completed OR Stopped")
+
+    ## Notification/Indicate Events
+    # A GATT Notify Event has Occurred
+    def _irq__gattc_notify(self, data):
+        print("[*] GATT Notify Event Occuring")
+        # A server has sent a notify request.
+        conn_handle, value_handle, notify_data = data
+        if dbg != 0:
+            print("[+] IRQ Event::Notify Event:\t[ Connection Handle ]:{0}\t\t[ Value Handle ]:{1}\t\t[ Notify Data ]:{2}".format(conn_handle, value_handle, notify_data))
+
+    # A GATT Indicate Event has Occurred
+    def _irq__gattc_indicate(self, data):
+        print("[*] GATT Indicate Event Occuring")
+        # A server has sent an indicate request.
+        conn_handle, value_handle, notify_data = data
+        if dbg != 0:
+            print("[+] IRQ Event::Indicate Event:\t[ Connection Handle ]:{0}\t\t[ Value Handle ]:{1}\t\t[ Notify Data ]:{2}".format(conn_handle, value_handle, notify_data))
+
+    # A GATT Indicate Event has Completed
+    def _irq__gatts_indicate_done(self, data):
+        print("[*] GATT Indicate Event has Completed")
+        # A client has acknowledged the indication.
+        # Note: Status will be zero on successful acknowledgment, implementation-specific value otherwise.
+        conn_handle, value_handle, status = data
+        if dbg != 0:
+            print("[+] IRQ Event::Indicate Completed:\t[ Connection Handle ]:{0}\t\t[ Value Handle ]:{1}\t\t[ Status ]:{2}".format(conn_handle, value_handle, status))
+
+    ## Services Events
+    # Result from a service being discovered
+    def _irq__gattc_service_result(self, data):
+        # Called for each service found by gattc_discover_services().
+        conn_handle, start_handle, end_handle, uuid = data
+        print("[*] GATT Service Discovered by Scan")
+        if dbg != 0:
+            print("[+] IRQ Event::Service Result:\t[ Connection Handle ]:{0}\t\t[ Start Handle ]:{1}\t\t[ End Handle ]:{2}\t\t[ UUID ]:{3}".format(conn_handle, start_handle, end_handle, uuid))
+
+    # Service discovery has completed
+    def _irq__gattc_service_done(self, data):
+        # Called once service discovery is complete.
+        # Note: Status will be zero on success, implementation-specific value otherwise.
+        conn_handle, status = data
+        print("[*] GATT Service Discovery has Completed")
+        if dbg != 0:
+            print("[+] IRQ Event::Service Done:\t[ Connection Handle ]:{0}\t\t[ Status ]:{1}".format(conn_handle, status))
+
+    ## Characteristics Events
+    # Result from a characteristic being discovered
+    def _irq__gattc_characteristic_result(self, data):
+        # Called for each characteristic found by gattc_discover_services().
+        conn_handle, end_handle, value_handle, properties, uuid = data
+        print("[*] GATT Characteristic Discovered by Scan")
+        if dbg != 0:
+            print("[+] IRQ Event::Characteristic Result:\t[ Connection Handle ]:{0}\t\t[ End Handle ]:{1}\t\t[ Value Handle ]:{2}\t\t[ Properties ]:{3}\t\t[ UUID ]:{4}".format(conn_handle, end_handle, value_handle, properties, uuid))
+
+    # Characteristic discovery has completed
+    def _irq__gattc_characteristic_done(self, data):
+        # Called once service discovery is complete.
+        # Note: Status will be zero on success, implementation-specific value otherwise.
+        conn_handle, status = data
+        print("[*] GATT Characteristic Discovery has Completed")
+        if dbg != 0:
+            print("[+] IRQ Event::Characteristic Done:\t[ Connection Handle ]:{0}\t\t[ Status ]:{1}".format(conn_handle, status))
+
+    ## Descriptor Events
+    # Result from a descriptor being discovered
+    def _irq__gattc_descriptor_result(self, data):
+        # Called for each descriptor found by gattc_discover_descriptors().
+        conn_handle, dsc_handle, uuid = data
+        print("[*] GATT Descriptor Discovered by Scan")
+        if dbg != 0:
+            print("[+] IRQ Event::Descriptor Result:\t[ Connection Handle ]:{0}\t\t[ Descriptor Handle ]:{1}\t\t[ UUID ]:{2}".format(conn_handle, dsc_handle, uuid))
+
+    # Descriptor discovery has completed
+    def _irq__gattc_descriptor_done(self, data):
+        # Called once service discovery is complete.
+        # Note: Status will be zero on success, implementation-specific value otherwise.
+        conn_handle, status = data
+        print("[*] GATT Descriptor Discovery has Completed")
+        if dbg != 0:
+            print("[+] IRQ Event::Descriptor Done:\t[ Connection Handle ]:{0}\t\t[ Status ]:{1}".format(conn_handle, status))
+
+    ## L2CAP Events
+    # An L2CAP Accept Event Occured
+    def _irq__l2cap_accept(self, data):
+        # A new channel has been accepted.
+        # Return a non-zero integer to reject the connection, or zero (or None) to accept.
+        conn_handle, cid, psm, our_mtu, peer_mtu = data
+        print("[*] L2CAP Accept Event Occuring")
+        if dbg != 0:
+            print("[+] IRQ Event::L2CAP Accept:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}\t\t[ PSM ]:{2}\t\t[ Our MTU ]:{3}\t\t[ Peer MTU ]:{4}".format(conn_handle, cid, psm, our_mtu, peer_mtu))
+
+    # An L2CAP Connect Event Occured
+    def _irq__l2cap_connect(self, data):
+        # A new channel is now connected (either as a result of connecting or accepting).
+        conn_handle, cid, psm, our_mtu, peer_mtu = data
+        print("[*] L2CAP Connect Event Occuring")
+        if dbg != 0:
+            print("[+] IRQ Event::L2CAP Connect:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}\t\t[ PSM ]:{2}\t\t[ Our MTU ]:{3}\t\t[ Peer MTU ]:{4}".format(conn_handle, cid, psm, our_mtu, peer_mtu))
+
+    # An L2CAP Disconnect Event Occured
+    def _irq__l2cap_disconnect(self, data):
+        # Existing channel has disconnected (status is zero), or a connection attempt failed (non-zero status).
+        conn_handle, cid, psm, status = data
+        print("[*] L2CAP Disconnect Event Occuring")
+        if dbg != 0:
+            print("[+] IRQ Event::L2CAP Disconnect:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}\t\t[ PSM ]:{2}\t\t[ Status ]:{3}".format(conn_handle, cid, psm, status))
+
+    # An L2CAP Received Event Occured
+    def _irq__l2cap_recv(self, data):
+        # New data is available on the channel. Use l2cap_recvinto to read.
+        conn_handle, cid = data
+        print("[*] L2CAP Received Event Occuring")
+        if dbg != 0:
+            print("[+] IRQ Event::L2CAP Received:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}".format(conn_handle, cid))
+
+    # An L2cap Send Ready Event Occured
+    def _irq__l2cap_send_ready(self, data):
+        # A previous l2cap_send that returned False has now completed and the channel is ready to send again.
+        # If status is non-zero, then the transmit buffer overflowed and the application should re-send the data.
+        conn_handle, cid, status = data
+        print("[*] L2CAP Send Ready Event Occuring")
+        if dbg != 0:
+            print("[+] IRQ Event::L2CAP Send Ready:\t[ Connection Handle ]:{0}\t\t[ CID ]:{1}\t\t[ Status ]:{2}".format(conn_handle, cid, status))
+
+    ## Secret Events
+    # A Get Secret Event is Occuring
+    def _irq__get_secret(self, data):
+        print("[*] Get Secret Event Occuring")
+        # Return a stored secret.
+        # If key is None, return the index'th value of this sec_type.
+        # Otherwise return the corresponding value for this sec_type and key.
+        sec_type, index, key = data
+        if dbg != 0:
+            print("[+] IRQ Event::Get Secret:\t[ Sec Type ]:{0}\t\t[ Index ]:{1}\t\t[ Key ]:{2}".format(sec_type, index, key))
+        # Note: No secrets are stored by this peripheral
+        return None
+
+    # A Set Secret Event is Occuring
+    def _irq__set_secret(self, data):
+        print("[*] Set Secret Event Occuring")
+        # Save a secret to the store for this sec_type and key.
+        sec_type, key, value = data
+        if dbg != 0:
+            print("[+] IRQ Event::Set Secret:\t[ Sec Type ]:{0}\t\t[ Index ]:{1}\t\t[ Key ]:{2}".format(sec_type, key, value))
+        return True
+
+    ## Encryption Events
+    def _irq__encryption_update(self, data):
+        print("[*] Encryption Update Event Occuring")
+        # The encryption state has changed (likely as a result of pairing or bonding).
+        conn_handle, encrypted, authenticated, bonded, key_size = data
+        if dbg != 0:
+            print("[+] IRQ Event::Encryption Update:\t[ Conneciton Handle ]:{0}\t\t[ Encrypted ]:{1}\t\t[ Authenticated ]:{2}\t\t[ Bonded ]:{3}\t\t[ Key Size ]:{4}".format(conn_handle, encrypted, authenticated, bonded, key_size))
+
+    ## Passkey Action Events
+    def _irq__passkey_action(self, data):
+        print("[*] Passkey Action Event Occuring")
+        # Respond to a passkey request during pairing.
+        # See gap_passkey() for details.
+        # action will be an action that is compatible with the configured "io" config.
+        # passkey will be non-zero if action is "numeric comparison".
+        conn_handle, action, passkey = data
+        if dbg != 0:
+            print("[+] IRQ Event::Passkey Action:\t[ Connection Handle ]:{0}\t\t[ Action ]:{1}\t\t[ Passkey ]:{2}".format(conn_handle, action, passkey))
+
+    ## Unknown/Unexpected Events
+    # Unknown Debugging Check for IRQ
+    def _irq__unknown(self, event, data):
+        if dbg != 0:    # ~!~
+            print("[!] Unkonwn [ _IRQ ] Event Occured!\n\tEvent\t\t{0}\n\tData:\t\t{1}".format(event, data))
 
     # Function for sending the notification to ALL connected devices
     def send(self, data):